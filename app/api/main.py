@@ -1,12 +1,17 @@
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from app.shared.auth.routes import router as auth_router
 from app.shared.models.schemas import GameStatsResponse
 from app.api.routes import router as matches_router
+from app.shared.core.container import Container
+from app.shared.observability.metrics import CONTENT_TYPE, REGISTRY
+from app.shared.observability.tracing import configure_tracing
 
 # Configure logging
 logging.basicConfig(
@@ -14,12 +19,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+configure_tracing('debrief-api')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	"""Open this worker's connection pools on startup and close them on shutdown"""
+	async with Container() as container:
+		app.state.container = container
+		yield
+
 
 # Create FastAPI app
 app = FastAPI(
 	title='Debrief API',
 	version='1.0.0',
 	description='Discord bot for Call of Duty statistics extraction and analysis',
+	lifespan=lifespan,
 )
 app.mount('/static', StaticFiles(directory='app/static'), name='static')
 templates = Jinja2Templates(directory='app/templates')
@@ -35,6 +51,12 @@ def health_check():
 	return {'status': 'ok'}
 
 
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+	"""Prometheus scrape endpoint"""
+	return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.post('/schemas/test')
 def test_game_stats(game_stats: GameStatsResponse):
 	"""Test endpoint for validating GameStatsResponse schemas"""
@@ -3,7 +3,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.shared.auth.dependencies import get_current_user
-from app.shared.db.mongo import db
+from app.shared.core.container import get_container
 from app.shared.repositories import MatchRepository, serialize_mongo_documents
 
 logger = logging.getLogger(__name__)
@@ -13,7 +13,7 @@ router = APIRouter(prefix='/api/matches', tags=['matches'])
 
 def get_match_repository() -> MatchRepository:
 	"""Dependency to get MatchRepository instance"""
-	return MatchRepository(db)
+	return get_container().match_repository()
 
 
 @router.get('')
@@ -4,10 +4,15 @@ from app.bot.commands.commands import (
     QueryDatabaseCommand,
 )
 from app.bot.commands.bus import CommandBus
+from app.bot.commands.middleware import SingleFlight, Timeout, default_middlewares, timing
 
 __all__ = [
     "Command",
     "AnalyzeImagesCommand",
     "QueryDatabaseCommand",
     "CommandBus",
+    "SingleFlight",
+    "Timeout",
+    "default_middlewares",
+    "timing",
 ]
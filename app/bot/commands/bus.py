@@ -1,6 +1,10 @@
 import logging
+from functools import partial
 from typing import Callable, Any
 
+from app.bot.commands.middleware import Middleware, Next, timing
+from app.shared.observability.tracing import start_span
+
 logger = logging.getLogger(__name__)
 
 
@@ -8,11 +12,21 @@ class CommandBus:
     """Command bus for executing commands with single handlers.
 
     Unlike events which can have multiple subscribers, each command
-    should have exactly one handler that executes it.
+    should have exactly one handler that executes it. Every command passes
+    through the middlewares first (see app.bot.commands.middleware), so
+    timeouts, latency measurement and dedupe are applied in one place rather
+    than in each handler. Without a list, only `timing` is used.
     """
 
-    def __init__(self):
+    def __init__(self, middlewares: list[Middleware] | None = None):
         self.handlers: dict[type, Callable] = {}
+        self.middlewares: list[Middleware] = (
+            [timing] if middlewares is None else list(middlewares)
+        )
+
+    def use(self, middleware: Middleware) -> None:
+        """Add a middleware inside the ones already added"""
+        self.middlewares.append(middleware)
 
     def register(self, command_type: type, handler: Callable) -> None:
         """Register a handler for a command type.
@@ -44,17 +58,34 @@ class CommandBus:
         handler = self.handlers[command_type]
         try:
             logger.debug(f"Calling handler: {handler.__name__}")
-            result = handler(command)
-            # Check if the result is a coroutine (async function)
-            if hasattr(result, "__await__"):
-                return await result
-            return result
+            with start_span(
+                f"command {command_type.__name__}",
+                trace_id=getattr(command, "trace_id", None),
+                parent_span_id=getattr(command, "parent_span_id", None),
+                command=command_type.__name__,
+            ):
+                return await self._chain(handler)(command)
         except Exception as e:
             logger.error(
                 f"Error in command handler {handler.__name__}: {str(e)}", exc_info=True
             )
             raise
 
+    def _chain(self, handler: Callable) -> Next:
+        """Wrap the handler call in every middleware, the first one outermost"""
+
+        async def call_handler(command: Any) -> Any:
+            result = handler(command)
+            # Check if the result is a coroutine (async function)
+            if hasattr(result, "__await__"):
+                return await result
+            return result
+
+        call_next = call_handler
+        for middleware in reversed(self.middlewares):
+            call_next = partial(middleware, call_next=call_next)
+        return call_next
+
     def clear_handlers(self) -> None:
         """Clear all registered handlers (useful for testing)"""
         self.handlers.clear()
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
+from app.shared.observability.tracing import current_span_id, current_trace_id
 
 
 class Command(BaseModel):
@@ -16,18 +17,30 @@ class Command(BaseModel):
         frozen=True,
     )
 
+    # Trace context, inherited from the span active when the command is created
+    trace_id: str = Field(
+        default_factory=current_trace_id, description="Trace this command belongs to"
+    )
+    parent_span_id: str | None = Field(
+        default_factory=current_span_id, description="Span that created the command"
+    )
+
 
 class DiscordCommand(Command):
     """Base class for commands that originate from Discord interactions.
 
     These commands include metadata about the Discord user, message, and channel
     that triggered the command. This allows handlers to send responses back to
-    the correct place in Discord.
+    the correct place in Discord. For slash commands the message ID is the
+    interaction ID, and the interaction token is kept for follow-up messages.
     """
 
     discord_user_id: int = Field(..., gt=0, description="Discord user ID")
     discord_message_id: int = Field(..., gt=0, description="Discord message ID")
     discord_channel_id: int = Field(..., gt=0, description="Discord channel ID")
+    discord_interaction_token: str | None = Field(
+        None, description="Slash command token for follow-up messages"
+    )
 
 
 class AnalyzeImagesCommand(DiscordCommand):
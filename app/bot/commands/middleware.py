@@ -0,0 +1,132 @@
+"""Built-in CommandBus middlewares
+
+A middleware is an async callable taking the command and `call_next`, which
+runs the rest of the chain and finally the handler:
+
+    async def log_queries(command, call_next):
+        logger.info(f"Running {type(command).__name__}")
+        return await call_next(command)
+
+The first middleware given to the bus is the outermost one. Cancelling the
+caller cancels whatever is running underneath, and no middleware here turns a
+cancellation into an error.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.bot.commands.commands import AnalyzeImagesCommand, QueryDatabaseCommand
+from app.shared.core.settings import Settings, settings
+from app.shared.observability.metrics import (
+	COMMAND_SECONDS,
+	COMMAND_SINGLE_FLIGHT_TOTAL,
+	COMMANDS_TOTAL,
+	observe,
+)
+
+logger = logging.getLogger(__name__)
+
+Next = Callable[[Any], Awaitable[Any]]
+Middleware = Callable[[Any, Next], Awaitable[Any]]
+
+# Differ between otherwise identical commands, so they are not part of the key
+TRACE_FIELDS = frozenset({'trace_id', 'parent_span_id'})
+
+
+async def timing(command: Any, call_next: Next) -> Any:
+	"""Record command latency and outcome in the command metrics"""
+	with observe(COMMAND_SECONDS, COMMANDS_TOTAL, command=type(command).__name__):
+		return await call_next(command)
+
+
+class Timeout:
+	"""Fail commands that run longer than their type's limit with TimeoutError
+
+	The handler is cancelled when the limit is reached. Command types missing
+	from `timeouts` use `default`, and None means no limit.
+	"""
+
+	def __init__(self, timeouts: dict[type, float], default: float | None = None):
+		self.timeouts = timeouts
+		self.default = default
+
+	async def __call__(self, command: Any, call_next: Next) -> Any:
+		seconds = self.timeouts.get(type(command), self.default)
+		if seconds is None:
+			return await call_next(command)
+		try:
+			async with asyncio.timeout(seconds):
+				return await call_next(command)
+		except TimeoutError as e:
+			raise TimeoutError(
+				f'{type(command).__name__} timed out after {seconds:g} seconds'
+			) from e
+
+
+def command_key(command: Any) -> Hashable | None:
+	"""Identity of a command without its trace context; None if it can't be hashed"""
+	try:
+		key = (type(command),) + tuple(value for name, value in command if name not in TRACE_FIELDS)
+		hash(key)
+	except TypeError:
+		return None
+	return key
+
+
+class SingleFlight:
+	"""Run identical concurrent commands once and give every caller the result
+
+	A command that arrives while an identical one is running waits for it
+	instead of running again. The shared run is cancelled only once every
+	caller waiting on it has been cancelled.
+	"""
+
+	def __init__(self, key: Callable[[Any], Hashable | None] = command_key):
+		self.key = key
+		self._inflight: dict[Hashable, tuple[asyncio.Task, list[int]]] = {}
+
+	def __len__(self) -> int:
+		return len(self._inflight)
+
+	async def __call__(self, command: Any, call_next: Next) -> Any:
+		key = self.key(command)
+		if key is None:
+			return await call_next(command)
+
+		flight = self._inflight.get(key)
+		if flight is None:
+			task = asyncio.ensure_future(call_next(command))
+			flight = self._inflight[key] = (task, [0])
+			task.add_done_callback(lambda _: self._inflight.pop(key, None))
+		else:
+			COMMAND_SINGLE_FLIGHT_TOTAL.inc(command=type(command).__name__)
+			logger.info(f'Joining identical {type(command).__name__} already running')
+
+		task, waiters = flight
+		waiters[0] += 1
+		try:
+			# Shielded so one caller leaving doesn't cancel the others' result
+			return await asyncio.shield(task)
+		except asyncio.CancelledError:
+			if waiters[0] == 1 and not task.done():
+				task.cancel()
+			raise
+		finally:
+			waiters[0] -= 1
+
+
+def default_middlewares(config: Settings = settings) -> list[Middleware]:
+	"""Middlewares the bot and the workers run every command through"""
+	middlewares: list[Middleware] = [timing]
+	if config.COMMAND_SINGLE_FLIGHT_ENABLED:
+		middlewares.append(SingleFlight())
+	middlewares.append(
+		Timeout(
+			{
+				AnalyzeImagesCommand: config.COMMAND_ANALYZE_TIMEOUT_SECONDS,
+				QueryDatabaseCommand: config.COMMAND_QUERY_TIMEOUT_SECONDS,
+			}
+		)
+	)
+	return middlewares
@@ -1,10 +1,24 @@
-from app.bot.events.events import GameStatsAnalyzed, MatchSaved, QueryExecuted, Event
-from app.bot.events.dispatcher import EventDispatcher
+from app.bot.events.events import (
+    CommandFailed,
+    DuplicateMatchDetected,
+    GameStatsAnalyzed,
+    MatchSaved,
+    MatchSaveFailed,
+    QueryExecuted,
+    Event,
+)
+from app.bot.events.dispatcher import BACKGROUND, FOREGROUND, BackgroundPool, EventDispatcher
 
 __all__ = [
     "GameStatsAnalyzed",
     "MatchSaved",
+    "MatchSaveFailed",
     "QueryExecuted",
+    "CommandFailed",
+    "DuplicateMatchDetected",
     "EventDispatcher",
+    "BackgroundPool",
+    "FOREGROUND",
+    "BACKGROUND",
     "Event",
 ]
@@ -1,24 +1,144 @@
+import asyncio
 import logging
-from typing import Callable, Any
+import time
+from collections import deque
+from functools import partial
+from typing import Awaitable, Callable, Any
+
+from app.shared.core.settings import Settings, settings
+from app.shared.observability.metrics import (
+    EVENT_BACKGROUND_DROPPED_TOTAL,
+    EVENT_BACKGROUND_QUEUE_DEPTH,
+    EVENT_BACKGROUND_RUNNING,
+    EVENT_BACKGROUND_WAIT_SECONDS,
+    EVENT_HANDLER_CALLS_TOTAL,
+    EVENT_HANDLER_SECONDS,
+    observe,
+)
+from app.shared.observability.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
+# Subscriber priorities. Foreground handlers run inline in `emit`, in
+# subscription order. Background handlers are queued and run later, so they
+# never hold up the user-visible work that follows an event.
+FOREGROUND = "foreground"
+BACKGROUND = "background"
+
+# What a full background queue does with one more handler call
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+def handler_name(handler: Callable) -> str:
+    """Readable name for a handler, looking through functools.partial wrappers"""
+    while isinstance(handler, partial):
+        handler = handler.func
+    return getattr(handler, "__name__", type(handler).__name__)
+
+
+class BackgroundPool:
+    """Bounded queue of handler calls run by at most `concurrency` tasks
+
+    Tasks are started on demand and exit once the queue is empty, so an idle
+    pool holds no tasks. When the queue is full, `overflow` decides whether the
+    oldest waiting call or the new one is dropped.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_queue: int = 1000,
+        overflow: str = DROP_OLDEST,
+    ):
+        if overflow not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self._pending: deque[tuple[float, str, str, Callable[[], Awaitable]]] = deque()
+        self._workers: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "BackgroundPool":
+        return cls(
+            concurrency=config.EVENT_BACKGROUND_CONCURRENCY,
+            max_queue=config.EVENT_BACKGROUND_QUEUE_SIZE,
+            overflow=config.EVENT_BACKGROUND_OVERFLOW,
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, event: str, handler: str, call: Callable[[], Awaitable]) -> bool:
+        """Queue a handler call; returns False when the call itself was dropped"""
+        if len(self._pending) >= self.max_queue:
+            if self.overflow == DROP_NEWEST:
+                self._dropped(event, handler)
+                return False
+            _, old_event, old_handler, _ = self._pending.popleft()
+            self._dropped(old_event, old_handler)
+        self._pending.append((time.monotonic(), event, handler, call))
+        EVENT_BACKGROUND_QUEUE_DEPTH.set(len(self._pending))
+        if len(self._workers) < self.concurrency:
+            task = asyncio.create_task(self._drain())
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+        return True
+
+    def _dropped(self, event: str, handler: str) -> None:
+        EVENT_BACKGROUND_DROPPED_TOTAL.inc(event=event, handler=handler)
+        logger.warning(f"Background queue full, dropped {handler} for {event}")
+
+    async def _drain(self) -> None:
+        while self._pending:
+            queued_at, _, _, call = self._pending.popleft()
+            EVENT_BACKGROUND_QUEUE_DEPTH.set(len(self._pending))
+            EVENT_BACKGROUND_WAIT_SECONDS.observe(time.monotonic() - queued_at)
+            EVENT_BACKGROUND_RUNNING.inc()
+            try:
+                await call()
+            finally:
+                EVENT_BACKGROUND_RUNNING.dec()
+        # Leave the pool before yielding again, so a call submitted from now
+        # on starts a new task instead of waiting for this one
+        self._workers.discard(asyncio.current_task())
+
+    async def join(self) -> None:
+        """Wait until every queued call has finished"""
+        while self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+
 
 class EventDispatcher:
     """Simple event dispatcher for decoupled communication"""
 
-    def __init__(self):
+    def __init__(self, background: BackgroundPool | None = None):
         self.handlers: dict[type, list[Callable]] = {}
+        self.priorities: dict[tuple[type, Callable], str] = {}
+        # An idle pool is empty, and so falsy
+        self.background = background if background is not None else BackgroundPool()
+
+    def subscribe(
+        self, event_type: type, handler: Callable, priority: str = FOREGROUND
+    ) -> None:
+        """Subscribe a handler to an event type
 
-    def subscribe(self, event_type: type, handler: Callable) -> None:
-        """Subscribe a handler to an event type"""
+        Handlers that only do bookkeeping should subscribe as BACKGROUND so
+        they can't delay replies to the user.
+        """
+        if priority not in (FOREGROUND, BACKGROUND):
+            raise ValueError(f"Unknown priority: {priority}")
         if event_type not in self.handlers:
             self.handlers[event_type] = []
         self.handlers[event_type].append(handler)
-        logger.debug(f"Subscribed {handler.__name__} to {event_type.__name__}")
+        self.priorities[(event_type, handler)] = priority
+        logger.debug(
+            f"Subscribed {handler_name(handler)} to {event_type.__name__} ({priority})"
+        )
 
     async def emit(self, event: Any) -> None:
-        """Emit an event and call all registered handlers"""
+        """Emit an event, running foreground handlers and queueing background ones"""
         event_type = type(event)
         logger.debug(f"Emitting event: {event_type.__name__}")
 
@@ -27,21 +147,51 @@ class EventDispatcher:
             return
 
         for handler in self.handlers[event_type]:
-            try:
-                logger.debug(f"Calling handler: {handler.__name__}")
-                if hasattr(handler, "__call__"):
+            if self.priorities.get((event_type, handler)) == BACKGROUND:
+                self.background.submit(
+                    event_type.__name__,
+                    handler_name(handler),
+                    partial(self._call, handler, event),
+                )
+            else:
+                await self._call(handler, event)
+
+    async def _call(self, handler: Callable, event: Any) -> None:
+        event_type = type(event)
+        name = handler_name(handler)
+        try:
+            logger.debug(f"Calling handler: {name}")
+            if hasattr(handler, "__call__"):
+                with (
+                    start_span(
+                        f"handle {event_type.__name__} {name}",
+                        trace_id=getattr(event, "trace_id", None),
+                        parent_span_id=getattr(event, "parent_span_id", None),
+                        event=event_type.__name__,
+                        handler=name,
+                    ),
+                    observe(
+                        EVENT_HANDLER_SECONDS,
+                        EVENT_HANDLER_CALLS_TOTAL,
+                        event=event_type.__name__,
+                        handler=name,
+                    ),
+                ):
                     result = handler(event)
                     # Check if the result is a coroutine (async function)
                     if hasattr(result, "__await__"):
                         await result
-            except Exception as e:
-                logger.error(
-                    f"Error in handler {handler.__name__}: {str(e)}", exc_info=True
-                )
+        except Exception as e:
+            logger.error(f"Error in handler {name}: {str(e)}", exc_info=True)
+
+    async def join(self) -> None:
+        """Wait for queued background handlers, e.g. before shutting down"""
+        await self.background.join()
 
     def clear_handlers(self) -> None:
         """Clear all registered handlers (useful for testing)"""
         self.handlers.clear()
+        self.priorities.clear()
         logger.debug("Cleared all event handlers")
 
     @property
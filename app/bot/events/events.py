@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
 from typing import Any
 from pydantic import BaseModel, Field, ConfigDict
-from app.shared.models.schemas import GameStatsResponse
+from app.shared.models.schemas import ExtractionStamp, GameStatsResponse
+from app.shared.observability.tracing import current_span_id, current_trace_id
 
 
 class Event(BaseModel):
@@ -16,6 +17,13 @@ class Event(BaseModel):
         default_factory=lambda: datetime.now(timezone.utc),
         description="When the event occurred",
     )
+    # Trace context, inherited from the span active when the event is created
+    trace_id: str = Field(
+        default_factory=current_trace_id, description="Trace this event belongs to"
+    )
+    parent_span_id: str | None = Field(
+        default_factory=current_span_id, description="Span that emitted the event"
+    )
 
     model_config = ConfigDict(
         # Events should be immutable once created
@@ -24,6 +32,16 @@ class Event(BaseModel):
         arbitrary_types_allowed=True,
     )
 
+    @classmethod
+    def trusted(cls, **data: Any) -> "Event":
+        """Create an event from values that were already validated.
+
+        Handlers pass on models and IDs that were validated when they entered
+        the system, so validating them again is skipped. Defaults (timestamp,
+        trace context) are still filled in.
+        """
+        return cls.model_construct(**data)
+
 
 class DiscordContext(BaseModel):
     """Context for events that originate from Discord interactions.
@@ -36,12 +54,29 @@ class DiscordContext(BaseModel):
     discord_user_id: int = Field(..., gt=0, description="Discord user ID")
     discord_message_id: int = Field(..., gt=0, description="Discord message ID")
     discord_channel_id: int = Field(..., gt=0, description="Discord channel ID")
+    discord_interaction_token: str | None = Field(
+        None, description="Slash command token for follow-up messages"
+    )
 
 
 class GameStatsAnalyzed(Event, DiscordContext):
     """Event emitted after Gemini successfully analyzed game stats"""
 
     game_stats: GameStatsResponse
+    image_hash: str | None = Field(None, description="Perceptual hash of the scoreboard")
+    screenshots: list[str] | None = Field(
+        None, description="Digests of the archived screenshots"
+    )
+    extraction: ExtractionStamp | None = Field(
+        None, description="Prompt and model that produced game_stats"
+    )
+
+
+class DuplicateMatchDetected(Event, DiscordContext):
+    """Event emitted when a scoreboard was already analyzed for the same user"""
+
+    duplicate_of_message_id: int = Field(..., gt=0)
+    distance: int = Field(..., ge=0, description="Differing bits between the two hashes")
 
 
 class MatchSaved(Event, DiscordContext):
@@ -51,6 +86,19 @@ class MatchSaved(Event, DiscordContext):
     game_stats: GameStatsResponse
 
 
+class MatchSaveFailed(Event, DiscordContext):
+    """Event emitted when analyzed match data could not be saved to MongoDB"""
+
+    error: str
+
+
+class CommandFailed(Event, DiscordContext):
+    """Event emitted when a queued command has failed its final attempt"""
+
+    command: str = Field(..., min_length=1)
+    error: str
+
+
 class QueryExecuted(Event, DiscordContext):
     """Event emitted after database query is successfully executed"""
 
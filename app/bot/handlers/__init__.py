@@ -1,9 +1,11 @@
 from app.bot.handlers.gemini import register_gemini_command_handlers
 from app.bot.handlers.db import register_mongodb_event_handlers
 from app.bot.handlers.discord import register_discord_event_handlers
+from app.bot.handlers.jobs import register_job_queue_command_handlers
 
 __all__ = [
     "register_gemini_command_handlers",
     "register_mongodb_event_handlers",
     "register_discord_event_handlers",
+    "register_job_queue_command_handlers",
 ]
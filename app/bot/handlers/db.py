@@ -1,12 +1,14 @@
 import logging
+from functools import partial
 from app.bot.events import (
     GameStatsAnalyzed,
     MatchSaved,
+    MatchSaveFailed,
     EventDispatcher,
 )
 from app.shared.repositories import MatchRepository
 from app.shared.models.schemas import MatchDocument
-from app.shared.db.mongo import db
+from app.shared.core.container import get_container
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +16,7 @@ logger = logging.getLogger(__name__)
 async def handle_game_stats_analyzed(
     event: GameStatsAnalyzed,
     dispatcher: EventDispatcher,
-    matches_repository: MatchRepository = MatchRepository(db),
+    matches_repository: MatchRepository | None = None,
 ) -> None:
     """Handle GameStatsAnalyzed event by saving match data to MongoDB.
 
@@ -24,13 +26,19 @@ async def handle_game_stats_analyzed(
         f"Saving match data for user {event.discord_user_id}, message {event.discord_message_id}"
     )
 
+    if matches_repository is None:
+        matches_repository = get_container().match_repository()
+
     try:
-        match_document = MatchDocument(
+        match_document = MatchDocument.trusted(
             discord_user_id=event.discord_user_id,
             discord_message_id=event.discord_message_id,
             discord_channel_id=event.discord_channel_id,
             game_stats=event.game_stats,
             created_at=event.timestamp,
+            image_hash=event.image_hash,
+            screenshots=event.screenshots,
+            extraction=event.extraction,
         )
 
         match_id = await matches_repository.insert_one(match_document)
@@ -38,17 +46,29 @@ async def handle_game_stats_analyzed(
         logger.info(f"Successfully saved match with ID: {match_id}")
 
         # Emit MatchSaved EVENT for other subscribers
-        saved_event = MatchSaved(
+        saved_event = MatchSaved.trusted(
             match_id=match_id,
             discord_user_id=event.discord_user_id,
             discord_message_id=event.discord_message_id,
             discord_channel_id=event.discord_channel_id,
+            discord_interaction_token=event.discord_interaction_token,
             game_stats=event.game_stats,
         )
         await dispatcher.emit(saved_event)
 
     except Exception as e:
         logger.error(f"Error saving match to MongoDB: {str(e)}", exc_info=True)
+        # The dispatcher swallows this error, so tell the analysis side the
+        # message wasn't saved and may be submitted again
+        await dispatcher.emit(
+            MatchSaveFailed.trusted(
+                discord_user_id=event.discord_user_id,
+                discord_message_id=event.discord_message_id,
+                discord_channel_id=event.discord_channel_id,
+                discord_interaction_token=event.discord_interaction_token,
+                error=str(e),
+            )
+        )
         raise
 
 
@@ -59,6 +79,6 @@ def register_mongodb_event_handlers(dispatcher: EventDispatcher) -> None:
     Events can have multiple subscribers.
     """
     dispatcher.subscribe(
-        GameStatsAnalyzed, lambda event: handle_game_stats_analyzed(event, dispatcher)
+        GameStatsAnalyzed, partial(handle_game_stats_analyzed, dispatcher=dispatcher)
     )
     logger.info("Registered MongoDB event handlers")
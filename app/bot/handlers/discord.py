@@ -1,8 +1,27 @@
+import json
 import logging
-from app.bot.events import MatchSaved, QueryExecuted, EventDispatcher
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from app.bot.events import (
+    CommandFailed,
+    DuplicateMatchDetected,
+    MatchSaved,
+    QueryExecuted,
+    EventDispatcher,
+)
+from app.shared.observability.metrics import (
+    DISCORD_SEND_SECONDS,
+    DISCORD_SENDS_TOTAL,
+    observe,
+)
+from app.shared.observability.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
+# Interaction tokens stop working 15 minutes after the slash command was used;
+# later results go to the channel instead
+FOLLOWUP_WINDOW = timedelta(minutes=14)
+
 
 def get_channel_from_cache(bot, channel_id: int):
     """Helper function to get channel from cache"""
@@ -27,31 +46,63 @@ async def fetch_channel_from_api(bot, channel_id: int):
         return None
 
 
+async def resolve_channel(bot, channel_id: int):
+    """Find a channel in the cache, falling back to the Discord API"""
+    channel = get_channel_from_cache(bot, channel_id)
+    if channel is None:
+        logger.info(f"Channel {channel_id} not in cache, fetching from API...")
+        channel = await fetch_channel_from_api(bot, channel_id)
+
+    if channel is None:
+        logger.error(
+            f"Unable to send message: Channel {channel_id} could not be found after API fetch"
+        )
+    return channel
+
+
+def followup_webhook(bot, token: str):
+    """Webhook that sends follow-up messages for a slash command"""
+    import discord
+
+    return discord.Webhook.partial(bot.application_id, token, client=bot)
+
+
+async def resolve_destination(bot, event):
+    """Where to reply to an event: the slash command's follow-up, else its channel"""
+    import discord
+
+    token = getattr(event, "discord_interaction_token", None)
+    if token is not None and getattr(bot, "application_id", None) is not None:
+        # For slash commands the message ID is the interaction ID, which
+        # encodes when the command was used
+        used_at = discord.utils.snowflake_time(event.discord_message_id)
+        if datetime.now(timezone.utc) - used_at < FOLLOWUP_WINDOW:
+            return followup_webhook(bot, token)
+        logger.info(f"Interaction {event.discord_message_id} expired, replying in the channel")
+    return await resolve_channel(bot, event.discord_channel_id)
+
+
 async def handle_match_saved_event(bot, event: MatchSaved):
     """Event subscriber that sends match saved notification to Discord.
 
     This is an event subscriber - it reacts to something that already happened.
     """
-    channel = get_channel_from_cache(bot, event.discord_channel_id)
+    channel = await resolve_destination(bot, event)
     if channel is None:
-        logger.info(
-            f"Channel {event.discord_channel_id} not in cache, fetching from API..."
-        )
-        channel = await fetch_channel_from_api(bot, event.discord_channel_id)
-
-    if channel is None:
-        logger.error(
-            f"Unable to send message: Channel {event.discord_channel_id} could not be found after API fetch"
-        )
         return
 
+    game_stats_json = json.dumps(event.game_stats.document, indent=2, ensure_ascii=False)
     result_message = (
         f"✅ Analysis complete! Match saved with ID: `{event.match_id}`\n"
-        f"```json\n{event.game_stats.model_dump_json(indent=2)}\n```"
+        f"```json\n{game_stats_json}\n```"
     )
 
     try:
-        await channel.send(content=result_message)
+        with (
+            start_span("discord send", kind="client", message_kind="match_saved"),
+            observe(DISCORD_SEND_SECONDS, DISCORD_SENDS_TOTAL, kind="match_saved"),
+        ):
+            await channel.send(content=result_message)
         logger.info(f"Sent message to channel {event.discord_channel_id} successfully")
     except Exception as e:
         logger.error(
@@ -65,17 +116,8 @@ async def handle_query_executed_event(bot, event: QueryExecuted):
 
     This is an event subscriber - it reacts to something that already happened.
     """
-    channel = get_channel_from_cache(bot, event.discord_channel_id)
+    channel = await resolve_destination(bot, event)
     if channel is None:
-        logger.info(
-            f"Channel {event.discord_channel_id} not in cache, fetching from API..."
-        )
-        channel = await fetch_channel_from_api(bot, event.discord_channel_id)
-
-    if channel is None:
-        logger.error(
-            f"Unable to send message: Channel {event.discord_channel_id} could not be found after API fetch"
-        )
         return
 
     result_message = (
@@ -84,7 +126,11 @@ async def handle_query_executed_event(bot, event: QueryExecuted):
     )
 
     try:
-        await channel.send(content=result_message)
+        with (
+            start_span("discord send", kind="client", message_kind="query_executed"),
+            observe(DISCORD_SEND_SECONDS, DISCORD_SENDS_TOTAL, kind="query_executed"),
+        ):
+            await channel.send(content=result_message)
         logger.info(f"Sent query result to channel {event.discord_channel_id}")
     except Exception as e:
         logger.error(
@@ -93,14 +139,67 @@ async def handle_query_executed_event(bot, event: QueryExecuted):
         )
 
 
+async def handle_command_failed_event(bot, event: CommandFailed):
+    """Event subscriber that tells the user a queued request could not be completed.
+
+    This is an event subscriber - it reacts to something that already happened.
+    """
+    channel = await resolve_destination(bot, event)
+    if channel is None:
+        return
+
+    try:
+        with (
+            start_span("discord send", kind="client", message_kind="command_failed"),
+            observe(DISCORD_SEND_SECONDS, DISCORD_SENDS_TOTAL, kind="command_failed"),
+        ):
+            await channel.send(
+                content=f"❌ Error processing request for <@{event.discord_user_id}>: {event.error}"
+            )
+        logger.info(f"Sent failure notice to channel {event.discord_channel_id}")
+    except Exception as e:
+        logger.error(
+            f"Failed to send failure notice to channel {event.discord_channel_id}: {e}",
+            exc_info=True,
+        )
+
+
+async def handle_duplicate_match_event(bot, event: DuplicateMatchDetected):
+    """Event subscriber that tells the user a scoreboard was already analyzed.
+
+    This is an event subscriber - it reacts to something that already happened.
+    """
+    channel = await resolve_destination(bot, event)
+    if channel is None:
+        return
+
+    try:
+        with (
+            start_span("discord send", kind="client", message_kind="duplicate_match"),
+            observe(DISCORD_SEND_SECONDS, DISCORD_SENDS_TOTAL, kind="duplicate_match"),
+        ):
+            await channel.send(
+                content=(
+                    f"🔁 <@{event.discord_user_id}>, this scoreboard looks like one you already "
+                    "posted, so it wasn't analyzed again."
+                )
+            )
+        logger.info(f"Sent duplicate notice to channel {event.discord_channel_id}")
+    except Exception as e:
+        logger.error(
+            f"Failed to send duplicate notice to channel {event.discord_channel_id}: {e}",
+            exc_info=True,
+        )
+
+
 def register_discord_event_handlers(dispatcher: EventDispatcher, bot) -> None:
     """Register Discord event subscribers.
 
     These subscribers react to events and send messages back to Discord.
     Events can have multiple subscribers.
     """
-    dispatcher.subscribe(MatchSaved, lambda event: handle_match_saved_event(bot, event))
-    dispatcher.subscribe(
-        QueryExecuted, lambda event: handle_query_executed_event(bot, event)
-    )
+    dispatcher.subscribe(MatchSaved, partial(handle_match_saved_event, bot))
+    dispatcher.subscribe(QueryExecuted, partial(handle_query_executed_event, bot))
+    dispatcher.subscribe(CommandFailed, partial(handle_command_failed_event, bot))
+    dispatcher.subscribe(DuplicateMatchDetected, partial(handle_duplicate_match_event, bot))
     logger.info("Registered Discord event handlers")
@@ -1,7 +1,32 @@
+import asyncio
 import logging
+from functools import partial
+from typing import Callable
 from app.bot.commands import AnalyzeImagesCommand, QueryDatabaseCommand
-from app.bot.events import GameStatsAnalyzed, QueryExecuted, EventDispatcher
-from app.shared.services.gemini import GeminiClient
+from app.bot.events import (
+    DuplicateMatchDetected,
+    GameStatsAnalyzed,
+    MatchSaveFailed,
+    QueryExecuted,
+    EventDispatcher,
+)
+from app.shared.core.container import get_container
+from app.shared.observability.metrics import (
+    DUPLICATE_SCREENSHOTS_TOTAL,
+    SCREENSHOTS_ARCHIVED_TOTAL,
+)
+from app.shared.screenshots import ScreenshotArchive
+from app.shared.services.dedupe import RecentKeys
+from app.shared.models.schemas import ExtractionStamp
+from app.shared.services.gemini import GeminiClient, extraction_version
+from app.shared.services.phash import (
+    NearDuplicate,
+    PostedScoreboard,
+    ScreenshotHasher,
+    format_hash,
+    image_digest,
+    stats_digest,
+)
 from app.shared.core.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -10,43 +35,171 @@ logger = logging.getLogger(__name__)
 async def handle_analyze_images_command(
     command: AnalyzeImagesCommand,
     dispatcher: EventDispatcher,
-    client: GeminiClient = GeminiClient,
+    client: Callable[..., GeminiClient] | None = None,
+    recent: RecentKeys | None = None,
+    hasher: ScreenshotHasher | None = None,
+    archive: ScreenshotArchive | None = None,
 ) -> None:
     """Handle command to analyze images using Gemini AI.
 
     This is a command handler - it executes the command and emits events
-    to notify other parts of the system about what happened.
+    to notify other parts of the system about what happened. When `recent`
+    is given, a message that is already being or has been analyzed is skipped.
+    When `hasher` is given, a scoreboard the same user posted recently is not
+    saved again, and one posted by someone else is logged as a duplicate. A
+    hash hit alone proves nothing, so a repost is only skipped once the
+    screenshot bytes or the extracted stats match the earlier post.
+    When `archive` is given, the screenshots are stored while Gemini runs.
     """
+    key = (command.discord_message_id, command.discord_user_id)
+    if recent is not None and not recent.claim(key):
+        logger.info(f"Skipping repeated analysis of message {command.discord_message_id}")
+        return
+
     logger.info(
         f"Analyzing images for user {command.discord_user_id}, message {command.discord_message_id}"
     )
 
+    if client is None:
+        client = get_container().gemini_client
+
     try:
+        image_hash = None
+        if hasher is not None:
+            image_hash = await hasher.hash(command.image_one)
+        if image_hash is not None:
+            digest = image_digest(command.image_one)
+            earlier = _earlier_posts(command, image_hash, hasher)
+            same_bytes = next((e for e in earlier if e.key.image_digest == digest), None)
+            if same_bytes is not None:
+                # The exact same file needs no extraction to be confirmed
+                await _emit_duplicate(command, same_bytes, dispatcher)
+                return
+
         gemini_client = client(api_key=settings.GEMINI_API_KEY)
-        game_stats = await gemini_client.generate_game_stats(
-            command.image_one, command.image_two
-        )
+        analysis = gemini_client.generate_game_stats(command.image_one, command.image_two)
+        screenshots = None
+        if archive is None:
+            game_stats = await analysis
+        else:
+            game_stats, screenshots = await asyncio.gather(
+                analysis, _archive_screenshots(command, archive)
+            )
 
-        logger.info(f"Successfully analyzed stats: {game_stats.model_dump()}")
+        logger.info(f"Successfully analyzed stats: {game_stats.document}")
+        if image_hash is not None:
+            stats = stats_digest(game_stats.document)
+            same_stats = next((e for e in earlier if e.key.stats_digest == stats), None)
+            if same_stats is not None:
+                await _emit_duplicate(command, same_stats, dispatcher)
+                return
+            if earlier:
+                DUPLICATE_SCREENSHOTS_TOTAL.inc(outcome="distinct")
+                logger.info(
+                    f"Scoreboard in message {command.discord_message_id} hashes like message "
+                    f"{earlier[0].key.message_id} but its stats differ, saving it"
+                )
+            hasher.remember(
+                image_hash,
+                PostedScoreboard(
+                    message_id=command.discord_message_id,
+                    user_id=command.discord_user_id,
+                    image_digest=digest,
+                    stats_digest=stats,
+                ),
+            )
 
         # Emit GameStatsAnalyzed EVENT for other handlers to process
-        analyzed_event = GameStatsAnalyzed(
+        analyzed_event = GameStatsAnalyzed.trusted(
             game_stats=game_stats,
             discord_user_id=command.discord_user_id,
             discord_message_id=command.discord_message_id,
             discord_channel_id=command.discord_channel_id,
+            discord_interaction_token=command.discord_interaction_token,
+            image_hash=format_hash(image_hash) if image_hash is not None else None,
+            screenshots=screenshots,
+            extraction=ExtractionStamp(
+                version=extraction_version(), model=game_stats.extracted_by
+            ),
         )
         await dispatcher.emit(analyzed_event)
 
-    except Exception as e:
-        logger.error(f"Error analyzing images: {str(e)}", exc_info=True)
+    except BaseException:
+        # Failures are logged by the command bus. Cancellation (e.g. a command
+        # timeout) counts too, so a retry of the same message gets through.
+        if recent is not None:
+            recent.release(key)
         raise
 
 
+async def _archive_screenshots(
+    command: AnalyzeImagesCommand, archive: ScreenshotArchive
+) -> list[str] | None:
+    """Store the screenshots, returning their digests; None if the archive failed"""
+    images = [image for image in (command.image_one, command.image_two) if image]
+    try:
+        return [
+            await archive.store(image, f"{command.discord_message_id}-{i}")
+            for i, image in enumerate(images)
+        ]
+    except Exception as e:
+        # Archiving is best effort; the analysis still counts
+        SCREENSHOTS_ARCHIVED_TOTAL.inc(outcome="failed")
+        logger.warning(
+            f"Could not archive screenshots of message {command.discord_message_id}: {e}"
+        )
+        return None
+
+
+def _earlier_posts(
+    command: AnalyzeImagesCommand, image_hash: int, hasher: ScreenshotHasher
+) -> list[NearDuplicate]:
+    """Recent scoreboards of the same user that hash close to this one
+
+    Near matches from other users are only logged: a teammate's upload of the
+    same lobby still has this user's own stats.
+    """
+    own, others = [], []
+    for near in hasher.candidates(image_hash):
+        if near.key.message_id == command.discord_message_id:
+            # A retry of the same message, not a repost
+            continue
+        (own if near.key.user_id == command.discord_user_id else others).append(near)
+
+    if others:
+        DUPLICATE_SCREENSHOTS_TOTAL.inc(outcome="flagged")
+        logger.info(
+            f"Scoreboard in message {command.discord_message_id} matches message "
+            f"{others[0].key.message_id} from another user ({others[0].distance} bits apart)"
+        )
+    return own
+
+
+async def _emit_duplicate(
+    command: AnalyzeImagesCommand, earlier: NearDuplicate, dispatcher: EventDispatcher
+) -> None:
+    """Emit DuplicateMatchDetected for a confirmed repost"""
+    DUPLICATE_SCREENSHOTS_TOTAL.inc(outcome="merged")
+    logger.info(
+        f"Message {command.discord_message_id} repeats message {earlier.key.message_id}, "
+        "not saving it again"
+    )
+    await dispatcher.emit(
+        DuplicateMatchDetected.trusted(
+            duplicate_of_message_id=earlier.key.message_id,
+            distance=earlier.distance,
+            discord_user_id=command.discord_user_id,
+            discord_message_id=command.discord_message_id,
+            discord_channel_id=command.discord_channel_id,
+            discord_interaction_token=command.discord_interaction_token,
+        )
+    )
+
+
 async def handle_query_database_command(
     command: QueryDatabaseCommand,
     dispatcher: EventDispatcher,
-    client: GeminiClient = GeminiClient,
+    client: Callable[..., GeminiClient] | None = None,
     repository=None,
 ) -> None:
     """Handle command to query database using natural language.
@@ -58,38 +211,43 @@ async def handle_query_database_command(
         f"Handling database query for user {command.discord_user_id}, message {command.discord_message_id}"
     )
 
-    try:
-        # Import repository if not provided (for production use)
-        if repository is None:
-            from app.shared.db.mongo import db
-            from app.shared.repositories import MatchRepository
+    # Use the process-wide clients unless provided (tests pass fakes)
+    if repository is None:
+        repository = get_container().match_repository()
+    if client is None:
+        client = get_container().gemini_client
 
-            repository = MatchRepository(db)
+    # Generate MongoDB query using Gemini
+    gemini_client = client(api_key=settings.GEMINI_API_KEY)
+    db_query_response = await gemini_client.generate_db_query(command.query)
 
-        # Generate MongoDB query using Gemini
-        gemini_client = client(api_key=settings.GEMINI_API_KEY)
-        db_query_response = await gemini_client.generate_db_query(command.query)
+    logger.info(f"Successfully got Gemini query response: {db_query_response}")
 
-        logger.info(f"Successfully got Gemini query response: {db_query_response}")
+    # Execute the query - db_query_response is already a dict from response.json()
+    result = await repository.aggregate(db_query_response)
 
-        # Execute the query - db_query_response is already a dict from response.json()
-        result = await repository.aggregate(db_query_response)
+    logger.info(f"MongoDB aggregation result: {result}")
 
-        logger.info(f"MongoDB aggregation result: {result}")
+    # Emit QueryExecuted EVENT for other handlers to process
+    query_executed_event = QueryExecuted(
+        query=command.query,
+        db_response=result,
+        discord_user_id=command.discord_user_id,
+        discord_message_id=command.discord_message_id,
+        discord_channel_id=command.discord_channel_id,
+        discord_interaction_token=command.discord_interaction_token,
+    )
+    await dispatcher.emit(query_executed_event)
 
-        # Emit QueryExecuted EVENT for other handlers to process
-        query_executed_event = QueryExecuted(
-            query=command.query,
-            db_response=result,
-            discord_user_id=command.discord_user_id,
-            discord_message_id=command.discord_message_id,
-            discord_channel_id=command.discord_channel_id,
-        )
-        await dispatcher.emit(query_executed_event)
 
-    except Exception as e:
-        logger.error(f"Error handling database query: {str(e)}", exc_info=True)
-        raise
+async def handle_match_save_failed(event: MatchSaveFailed, recent: RecentKeys) -> None:
+    """Release the dedupe claim of a message whose match wasn't saved.
+
+    Otherwise a resubmission would be skipped for MATCH_DEDUPE_TTL_SECONDS
+    although nothing was stored.
+    """
+    recent.release((event.discord_message_id, event.discord_user_id))
+    logger.info(f"Message {event.discord_message_id} was not saved, accepting it again")
 
 
 def register_gemini_command_handlers(command_bus, dispatcher: EventDispatcher) -> None:
@@ -98,12 +256,20 @@ def register_gemini_command_handlers(command_bus, dispatcher: EventDispatcher) -
     Command handlers execute business logic and emit events.
     Each command has exactly one handler.
     """
+    recent = RecentKeys(settings.MATCH_DEDUPE_MAX_KEYS, settings.MATCH_DEDUPE_TTL_SECONDS)
+    hasher = ScreenshotHasher.from_settings(settings)
+    archive = (
+        get_container().screenshot_archive() if settings.SCREENSHOT_ARCHIVE_ENABLED else None
+    )
     command_bus.register(
         AnalyzeImagesCommand,
-        lambda cmd: handle_analyze_images_command(cmd, dispatcher),
+        lambda cmd: handle_analyze_images_command(
+            cmd, dispatcher, recent=recent, hasher=hasher, archive=archive
+        ),
     )
     command_bus.register(
         QueryDatabaseCommand,
         lambda cmd: handle_query_database_command(cmd, dispatcher),
     )
+    dispatcher.subscribe(MatchSaveFailed, partial(handle_match_save_failed, recent=recent))
     logger.info("Registered Gemini command handlers")
@@ -0,0 +1,45 @@
+import logging
+from app.bot.commands import AnalyzeImagesCommand, QueryDatabaseCommand, Command
+from app.shared.core.settings import settings
+from app.shared.job_queue import JobQueue
+from app.shared.services.dedupe import RecentKeys
+
+logger = logging.getLogger(__name__)
+
+# Commands that run on app.bot.worker processes when the job queue is enabled
+QUEUED_COMMANDS: tuple[type[Command], ...] = (AnalyzeImagesCommand, QueryDatabaseCommand)
+
+
+async def enqueue_command(
+	command: Command, queue: JobQueue, recent: RecentKeys | None = None
+) -> str | None:
+	"""Command handler that persists the command for a worker instead of running it.
+
+	Returns the job ID. Workers execute the real handler and emit the events.
+	With `recent`, an analysis of a message that was already queued is dropped
+	and None is returned.
+	"""
+	if recent is None or not isinstance(command, AnalyzeImagesCommand):
+		return await queue.enqueue(command)
+
+	key = (command.discord_message_id, command.discord_user_id)
+	if not recent.claim(key):
+		logger.info(f'Not queueing repeated analysis of message {command.discord_message_id}')
+		return None
+	try:
+		return await queue.enqueue(command)
+	except BaseException:
+		recent.release(key)
+		raise
+
+
+def register_job_queue_command_handlers(command_bus, queue: JobQueue) -> None:
+	"""Register enqueueing handlers for every queued command type.
+
+	Used by the Discord front-end process, so the gateway process only accepts
+	work while worker processes run it.
+	"""
+	recent = RecentKeys(settings.MATCH_DEDUPE_MAX_KEYS, settings.MATCH_DEDUPE_TTL_SECONDS)
+	for command_type in QUEUED_COMMANDS:
+		command_bus.register(command_type, lambda cmd: enqueue_command(cmd, queue, recent))
+	logger.info('Registered job queue command handlers')
@@ -0,0 +1,205 @@
+"""Shard launcher - spreads the bot's gateway shards over several processes
+
+Usage:
+    uv run python -m app.bot.launcher [--processes 4] [--shards 16]
+
+One event loop handles gateway traffic, downloads, validation and event
+fan-out for every guild its shards cover. Past a few thousand guilds, that
+loop rather than Gemini becomes the limit, so this launcher splits the shards
+into contiguous ranges and runs one `app.bot.main` process per range, each as
+an AutoShardedBot. Every process inherits the launcher's environment (and so
+the same `.env` configuration). Only these variables differ:
+
+- DISCORD_SHARD_IDS: the process's range of shards
+- BOT_METRICS_PORT: offset by the process index when set, so each process
+  serves its own shard health metrics
+- DISCORD_SYNC_COMMANDS: left on for the first process only, so slash
+  commands are registered once
+
+Without `--shards` or DISCORD_SHARD_COUNT, the shard count Discord recommends
+is used. Process starts are staggered to stay within Discord's identify rate
+limit. A process that exits is restarted after a backoff, and on SIGTERM the
+launcher stops every process and waits for them to exit.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+from app.shared.core.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_URL = 'https://discord.com/api/v10/gateway/bot'
+# Discord allows max_concurrency shard identifies per this many seconds
+IDENTIFY_INTERVAL_SECONDS = 5.0
+
+
+def shard_ranges(shard_count: int, processes: int) -> list[list[int]]:
+	"""Split shards into contiguous, near-equal ranges, one per process"""
+	processes = max(1, min(processes, shard_count))
+	size, extra = divmod(shard_count, processes)
+	ranges, start = [], 0
+	for index in range(processes):
+		end = start + size + (1 if index < extra else 0)
+		ranges.append(list(range(start, end)))
+		start = end
+	return ranges
+
+
+def child_env(
+	index: int,
+	shard_ids: list[int],
+	shard_count: int,
+	config: Settings = settings,
+	environ: dict[str, str] | None = None,
+) -> dict[str, str]:
+	"""Environment of the bot process running `shard_ids`"""
+	env = dict(os.environ if environ is None else environ)
+	env['DISCORD_AUTO_SHARD'] = 'true'
+	env['DISCORD_SHARD_COUNT'] = str(shard_count)
+	env['DISCORD_SHARD_IDS'] = ','.join(str(shard_id) for shard_id in shard_ids)
+	if index > 0:
+		env['DISCORD_SYNC_COMMANDS'] = 'false'
+	if config.BOT_METRICS_PORT is not None:
+		env['BOT_METRICS_PORT'] = str(config.BOT_METRICS_PORT + index)
+	return env
+
+
+async def gateway_info(token: str) -> dict[str, Any]:
+	"""Recommended shard count and identify limits for the bot token"""
+	import httpx
+
+	async with httpx.AsyncClient(timeout=10) as client:
+		response = await client.get(GATEWAY_URL, headers={'Authorization': f'Bot {token}'})
+		response.raise_for_status()
+		return response.json()
+
+
+async def _spawn(env: dict[str, str]) -> asyncio.subprocess.Process:
+	return await asyncio.create_subprocess_exec(sys.executable, '-m', 'app.bot.main', env=env)
+
+
+class ShardLauncher:
+	"""Runs and supervises one bot process per shard range"""
+
+	def __init__(
+		self,
+		ranges: list[list[int]],
+		shard_count: int,
+		start_interval: float = 0.0,
+		restart_delay: float = 5.0,
+		max_restart_delay: float = 120.0,
+		stable_after: float = 600.0,
+		spawn: Callable[[dict[str, str]], Awaitable[Any]] = _spawn,
+		sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+		clock: Callable[[], float] = time.monotonic,
+		config: Settings = settings,
+	):
+		self.ranges = ranges
+		self.shard_count = shard_count
+		# Wait between process starts so their shards don't identify at once
+		self.start_interval = start_interval
+		self.restart_delay = restart_delay
+		self.max_restart_delay = max_restart_delay
+		# A process that ran this long crashed on its own, not in a crash loop
+		self.stable_after = stable_after
+		self.spawn = spawn
+		self.sleep = sleep
+		self.clock = clock
+		self.config = config
+		self.processes: dict[int, Any] = {}
+		self.restarts: dict[int, int] = {index: 0 for index in range(len(ranges))}
+		self._stopping = asyncio.Event()
+
+	async def run(self) -> None:
+		supervisors = []
+		for index in range(len(self.ranges)):
+			if self._stopping.is_set():
+				break
+			if index > 0:
+				await self.sleep(self.start_interval)
+			supervisors.append(asyncio.create_task(self._supervise(index)))
+		await asyncio.gather(*supervisors)
+
+	def stop(self) -> None:
+		"""Terminate every bot process; `run` returns once they have exited"""
+		self._stopping.set()
+		for process in self.processes.values():
+			if process.returncode is None:
+				process.terminate()
+
+	async def _supervise(self, index: int) -> None:
+		shard_ids = self.ranges[index]
+		env = child_env(index, shard_ids, self.shard_count, self.config)
+		delay = self.restart_delay
+		while not self._stopping.is_set():
+			process = self.processes[index] = await self.spawn(env)
+			if self._stopping.is_set():
+				# stop() ran while this process was starting, so it missed it
+				process.terminate()
+				await process.wait()
+				break
+			logger.info(f'Started shards {shard_ids[0]}-{shard_ids[-1]} (pid {process.pid})')
+			started = self.clock()
+			code = await process.wait()
+			if self._stopping.is_set():
+				break
+			if self.clock() - started >= self.stable_after:
+				delay = self.restart_delay
+			self.restarts[index] += 1
+			logger.error(
+				f'Shards {shard_ids[0]}-{shard_ids[-1]} exited with {code}, '
+				f'restarting in {delay:.0f}s'
+			)
+			await self.sleep(delay)
+			delay = min(delay * 2, self.max_restart_delay)
+
+
+async def launch(args: argparse.Namespace) -> None:
+	shard_count = args.shards or settings.DISCORD_SHARD_COUNT
+	max_concurrency = 1
+	if shard_count is None:
+		info = await gateway_info(settings.DISCORD_BOT_TOKEN)
+		shard_count = info['shards']
+		max_concurrency = info['session_start_limit']['max_concurrency']
+		logger.info(f'Discord recommends {shard_count} shards')
+
+	ranges = shard_ranges(shard_count, args.processes)
+	launcher = ShardLauncher(
+		ranges,
+		shard_count,
+		# A process identifies its shards one bucket at a time
+		start_interval=len(ranges[0]) * IDENTIFY_INTERVAL_SECONDS / max_concurrency,
+	)
+	loop = asyncio.get_running_loop()
+	for sig in (signal.SIGTERM, signal.SIGINT):
+		loop.add_signal_handler(sig, launcher.stop)
+	logger.info(f'Running {shard_count} shards in {len(ranges)} processes')
+	await launcher.run()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument(
+		'--processes',
+		type=int,
+		default=settings.DISCORD_SHARD_PROCESSES,
+		help='bot processes to run',
+	)
+	parser.add_argument('--shards', type=int, help='total shards (default: Discord recommends)')
+	args = parser.parse_args()
+
+	logging.basicConfig(
+		level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+	)
+	asyncio.run(launch(args))
+
+
+if __name__ == '__main__':
+	main()
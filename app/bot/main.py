@@ -2,12 +2,17 @@
 
 import asyncio
 import logging
+import tracemalloc
 
-from app.bot.commands import CommandBus
+from app.bot.commands import CommandBus, default_middlewares
+from app.shared.core.container import Container
 from app.shared.core.settings import settings
-from app.bot.events import EventDispatcher
+from app.bot.events import BackgroundPool, EventDispatcher
 from app.shared.services.discord import bot
+from app.bot.handlers import register_job_queue_command_handlers
 from app.bot.utils import setup_handlers
+from app.shared.observability.metrics import start_metrics_server
+from app.shared.observability.tracing import configure_tracing
 
 # Configure logging
 logging.basicConfig(
@@ -19,22 +24,45 @@ logger = logging.getLogger(__name__)
 async def main():
 	"""Start the Discord bot"""
 	logger.info('Starting Discord bot...')
+	configure_tracing('debrief-bot')
+	if settings.MEMORY_TRACEMALLOC_FRAMES:
+		# Allocation tracing for /memory; slows allocation down while on
+		tracemalloc.start(settings.MEMORY_TRACEMALLOC_FRAMES)
 
 	# Create dispatcher and command bus
-	event_dispatcher = EventDispatcher()
-	command_bus = CommandBus()
+	event_dispatcher = EventDispatcher(BackgroundPool.from_settings())
+	command_bus = CommandBus(default_middlewares())
 
 	# Setup command bus and event dispatcher
 	bot.command_bus = command_bus
 	bot.event_dispatcher = event_dispatcher
 
-	# Register handlers
-	setup_handlers(command_bus, event_dispatcher)
+	# Connection pools live for the lifetime of the bot and are closed on exit
+	async with Container() as container:
+		await container.match_repository().ensure_indexes()
+		if settings.SCREENSHOT_ARCHIVE_ENABLED:
+			await container.screenshot_archive().ensure_indexes()
 
-	# Start bot (this blocks until the bot is stopped)
-	async with bot:
-		logger.info('Discord bot started successfully.')
-		await bot.start(settings.DISCORD_BOT_TOKEN)
+		# Register handlers
+		if settings.JOB_QUEUE_ENABLED:
+			# Front-end only: commands are queued and run by app.bot.worker processes
+			queue = container.job_queue()
+			await queue.ensure_indexes()
+			register_job_queue_command_handlers(command_bus, queue)
+		else:
+			setup_handlers(command_bus, event_dispatcher)
+
+		# Optional Prometheus scrape endpoint for the bot process
+		if settings.BOT_METRICS_PORT is not None:
+			await start_metrics_server(settings.BOT_METRICS_PORT, settings.BOT_METRICS_HOST)
+
+		# Start bot (this blocks until the bot is stopped)
+		async with bot:
+			logger.info('Discord bot started successfully.')
+			await bot.start(settings.DISCORD_BOT_TOKEN)
+
+		# Let queued background handlers finish while the pools are still open
+		await event_dispatcher.join()
 
 
 if __name__ == '__main__':
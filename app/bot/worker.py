@@ -0,0 +1,206 @@
+"""Job worker entrypoint - runs analysis and query jobs from the MongoDB queue
+
+Start any number of these next to the Discord front-end (with
+JOB_QUEUE_ENABLED=true on the bot):
+
+    uv run python -m app.bot.worker
+
+Workers connect to Discord over REST only, to post results, and never open a
+gateway connection. On SIGTERM a worker stops claiming new jobs and finishes
+the ones it holds. Jobs held by a killed worker become claimable again when
+their lease expires.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from app.bot.commands import Command, CommandBus, default_middlewares
+from app.bot.events import BackgroundPool, CommandFailed, EventDispatcher
+from app.bot.handlers import (
+	register_discord_event_handlers,
+	register_gemini_command_handlers,
+	register_mongodb_event_handlers,
+)
+from app.bot.handlers.jobs import QUEUED_COMMANDS
+from app.shared.core.container import Container
+from app.shared.core.settings import settings
+from app.shared.job_queue import Job, JobQueue
+from app.shared.observability.metrics import JOB_SECONDS, observe, start_metrics_server
+from app.shared.observability.tracing import configure_tracing, start_span
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+	"""Claims jobs and executes them through the command bus"""
+
+	def __init__(
+		self,
+		queue: JobQueue,
+		command_bus: CommandBus,
+		dispatcher: EventDispatcher | None = None,
+		command_types: tuple[type[Command], ...] = QUEUED_COMMANDS,
+		worker_id: str | None = None,
+		concurrency: int = 1,
+		visibility_timeout: float = 120.0,
+		poll_interval: float = 1.0,
+	):
+		self.queue = queue
+		self.command_bus = command_bus
+		self.dispatcher = dispatcher
+		self.command_types = {command_type.__name__: command_type for command_type in command_types}
+		self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+		self.concurrency = concurrency
+		self.visibility_timeout = visibility_timeout
+		self.poll_interval = poll_interval
+		self._stopping = asyncio.Event()
+
+	def stop(self) -> None:
+		"""Stop claiming new jobs; jobs already running are finished"""
+		logger.info(f'Worker {self.worker_id} stopping')
+		self._stopping.set()
+
+	async def run(self) -> None:
+		"""Run `concurrency` claim loops until stopped"""
+		logger.info(f'Worker {self.worker_id} started with concurrency {self.concurrency}')
+		await asyncio.gather(*(self._loop() for _ in range(self.concurrency)))
+
+	async def _loop(self) -> None:
+		while not self._stopping.is_set():
+			try:
+				processed = await self.run_once()
+			except Exception as e:
+				logger.error(f'Worker {self.worker_id} failed to claim a job: {e}', exc_info=True)
+				processed = False
+			if not processed:
+				# Idle or erroring - wait before polling again, waking early on stop
+				try:
+					await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+				except asyncio.TimeoutError:
+					pass
+
+	async def run_once(self) -> bool:
+		"""Claim and process a single job; False when none was available"""
+		job = await self.queue.claim(
+			self.worker_id, list(self.command_types), self.visibility_timeout
+		)
+		if job is None:
+			return False
+		await self.process(job)
+		return True
+
+	async def process(self, job: Job) -> None:
+		heartbeat = asyncio.create_task(self._heartbeat(job))
+		command = None
+		try:
+			with observe(JOB_SECONDS, type=job.type):
+				command = await self._load_command(job)
+				with start_span(
+					f'job {job.type}',
+					trace_id=command.trace_id,
+					parent_span_id=command.parent_span_id,
+					kind='consumer',
+					job_id=str(job.id),
+					attempt=job.attempts,
+				):
+					await self.command_bus.execute(command)
+		except Exception as e:
+			error = f'{type(e).__name__}: {e}'
+			logger.warning(f'Job {job.id} attempt {job.attempts} failed: {error}')
+			retrying = await self.queue.nack(job, error)
+			if not retrying:
+				await self._emit_failure(job, command, str(e))
+		else:
+			await self.queue.ack(job)
+		finally:
+			heartbeat.cancel()
+
+	async def _load_command(self, job: Job) -> Command:
+		command_type = self.command_types.get(job.type)
+		if command_type is None:
+			raise ValueError(f'Unknown job type {job.type}')
+		blobs = await self.queue.load_blobs(job)
+		# Jobs come from storage, so they are validated again like any external input
+		return command_type.model_validate({**job.payload, **blobs})
+
+	async def _heartbeat(self, job: Job) -> None:
+		"""Keep the lease alive while the job runs"""
+		while True:
+			await asyncio.sleep(self.visibility_timeout / 3)
+			if not await self.queue.extend_lease(job, self.visibility_timeout):
+				logger.warning(f'Worker {self.worker_id} lost the lease on job {job.id}')
+				return
+
+	async def _emit_failure(self, job: Job, command: Command | None, error: str) -> None:
+		if self.dispatcher is None or command is None:
+			logger.error(f'Job {job.id} failed permanently: {error}')
+			return
+		if not hasattr(command, 'discord_channel_id'):
+			return
+		await self.dispatcher.emit(
+			CommandFailed.trusted(
+				command=job.type,
+				error=error,
+				discord_user_id=command.discord_user_id,
+				discord_message_id=command.discord_message_id,
+				discord_channel_id=command.discord_channel_id,
+				discord_interaction_token=command.discord_interaction_token,
+				trace_id=command.trace_id,
+				parent_span_id=command.parent_span_id,
+			)
+		)
+
+
+async def main():
+	"""Run a job worker process"""
+	import discord
+
+	configure_tracing('debrief-worker')
+
+	async with Container() as container:
+		queue = container.job_queue()
+		await queue.ensure_indexes()
+		await container.match_repository().ensure_indexes()
+		if settings.SCREENSHOT_ARCHIVE_ENABLED:
+			await container.screenshot_archive().ensure_indexes()
+
+		# REST-only Discord client for posting results; no gateway connection
+		discord_client = discord.Client(intents=discord.Intents.none())
+		await discord_client.login(settings.DISCORD_BOT_TOKEN)
+
+		dispatcher = EventDispatcher(BackgroundPool.from_settings())
+		command_bus = CommandBus(default_middlewares())
+		register_gemini_command_handlers(command_bus, dispatcher)
+		register_mongodb_event_handlers(dispatcher)
+		register_discord_event_handlers(dispatcher, discord_client)
+
+		if settings.WORKER_METRICS_PORT is not None:
+			await start_metrics_server(settings.WORKER_METRICS_PORT, settings.BOT_METRICS_HOST)
+
+		worker = JobWorker(
+			queue,
+			command_bus,
+			dispatcher,
+			concurrency=settings.JOB_WORKER_CONCURRENCY,
+			visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+			poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+		)
+		loop = asyncio.get_running_loop()
+		for sig in (signal.SIGTERM, signal.SIGINT):
+			loop.add_signal_handler(sig, worker.stop)
+
+		try:
+			await worker.run()
+		finally:
+			await dispatcher.join()
+			await discord_client.close()
+
+
+if __name__ == '__main__':
+	logging.basicConfig(
+		level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+	)
+	asyncio.run(main())
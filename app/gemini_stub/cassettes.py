@@ -0,0 +1,53 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(model: str, body: dict[str, Any]) -> str:
+	"""Hash a generateContent request into a stable cassette key
+
+	The body is serialised with sorted keys so that dict ordering differences
+	between SDK versions do not change the key.
+
+	Args:
+	    model: Model name from the request path (e.g. gemini-2.5-flash-lite)
+	    body: JSON body sent by google-genai
+
+	Returns:
+	    Hex encoded SHA-256 digest of the canonical request
+	"""
+	canonical = json.dumps(
+		{'model': model, 'body': body}, sort_keys=True, separators=(',', ':'), ensure_ascii=False
+	)
+	return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CassetteStore:
+	"""Recorded Gemini responses stored as one JSON file per request key"""
+
+	def __init__(self, directory: str | Path):
+		self.directory = Path(directory)
+
+	def path_for(self, key: str) -> Path:
+		return self.directory / f'{key}.json'
+
+	def load(self, key: str) -> dict[str, Any] | None:
+		"""Return the recorded response for a key, or None if nothing was recorded"""
+		path = self.path_for(key)
+		if not path.exists():
+			return None
+		with path.open(encoding='utf-8') as f:
+			return json.load(f)['response']
+
+	def save(self, key: str, model: str, response: dict[str, Any]) -> Path:
+		"""Record a response for a key, overwriting any previous recording"""
+		self.directory.mkdir(parents=True, exist_ok=True)
+		path = self.path_for(key)
+		with path.open('w', encoding='utf-8') as f:
+			json.dump({'model': model, 'response': response}, f, indent=2, ensure_ascii=False)
+		logger.info(f'Recorded Gemini response for {model} as {path.name}')
+		return path
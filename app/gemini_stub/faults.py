@@ -0,0 +1,76 @@
+import copy
+import math
+import random
+from typing import Any
+
+from app.shared.core.settings import Settings
+
+
+class FaultInjector:
+	"""Decides how much latency to add and which failures to inject per request
+
+	All randomness comes from a single `random.Random` so a fixed seed makes
+	soak and benchmark runs reproducible.
+	"""
+
+	def __init__(
+		self,
+		distribution: str = 'none',
+		latency_ms: float = 0.0,
+		spread: float = 0.0,
+		rate_limit_probability: float = 0.0,
+		malformed_probability: float = 0.0,
+		seed: int | None = None,
+	):
+		self.distribution = distribution
+		self.latency_ms = latency_ms
+		self.spread = spread
+		self.rate_limit_probability = rate_limit_probability
+		self.malformed_probability = malformed_probability
+		self.random = random.Random(seed)
+
+	@classmethod
+	def from_settings(cls, settings: Settings) -> 'FaultInjector':
+		return cls(
+			distribution=settings.GEMINI_STUB_LATENCY_DISTRIBUTION,
+			latency_ms=settings.GEMINI_STUB_LATENCY_MS,
+			spread=settings.GEMINI_STUB_LATENCY_SPREAD,
+			rate_limit_probability=settings.GEMINI_STUB_RATE_LIMIT_PROBABILITY,
+			malformed_probability=settings.GEMINI_STUB_MALFORMED_PROBABILITY,
+			seed=settings.GEMINI_STUB_SEED,
+		)
+
+	def sample_latency(self) -> float:
+		"""Sample the delay to apply before responding, in seconds"""
+		if self.distribution == 'fixed':
+			delay_ms = self.latency_ms
+		elif self.distribution == 'uniform':
+			delay_ms = self.random.uniform(
+				self.latency_ms - self.spread, self.latency_ms + self.spread
+			)
+		elif self.distribution == 'lognormal':
+			# latency_ms is the median, spread is sigma of the underlying normal
+			delay_ms = self.latency_ms * math.exp(self.random.gauss(0.0, self.spread))
+		else:
+			delay_ms = 0.0
+		return max(delay_ms, 0.0) / 1000
+
+	def should_rate_limit(self) -> bool:
+		return self.random.random() < self.rate_limit_probability
+
+	def should_corrupt(self) -> bool:
+		return self.random.random() < self.malformed_probability
+
+
+def corrupt_response(response: dict[str, Any]) -> dict[str, Any]:
+	"""Return a copy of a response whose candidate text is truncated mid-JSON
+
+	The envelope stays valid so google-genai parses it, but the model output
+	fails `model_validate_json` the same way a cut-off generation would.
+	"""
+	corrupted = copy.deepcopy(response)
+	for candidate in corrupted.get('candidates', []):
+		for part in candidate.get('content', {}).get('parts', []):
+			if 'text' in part:
+				part['text'] = part['text'][: len(part['text']) // 2]
+	return corrupted
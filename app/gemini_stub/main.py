@@ -0,0 +1,117 @@
+"""Local Gemini stand-in server - replays recorded generateContent responses
+
+Run with `uvicorn app.gemini_stub.main:app --port 8080` and set
+GEMINI_BASE_URL=http://localhost:8080 so GeminiClient talks to it instead of
+the live API.
+"""
+
+import asyncio
+import logging
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.gemini_stub.cassettes import CassetteStore, request_key
+from app.gemini_stub.faults import FaultInjector, corrupt_response
+from app.shared.core.settings import Settings, settings
+
+logging.basicConfig(
+	level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _error_response(status_code: int, status: str, message: str, headers=None) -> JSONResponse:
+	"""Build an error body in the shape google-genai's APIError expects"""
+	return JSONResponse(
+		status_code=status_code,
+		content={'error': {'code': status_code, 'message': message, 'status': status}},
+		headers=headers,
+	)
+
+
+def create_app(
+	config: Settings = settings,
+	store: CassetteStore | None = None,
+	faults: FaultInjector | None = None,
+) -> FastAPI:
+	"""Create the stand-in app from settings
+
+	Args:
+	    config: Settings holding the GEMINI_STUB_* options
+	    store: Cassette store override (defaults to GEMINI_STUB_CASSETTE_DIR)
+	    faults: Fault injector override (defaults to the GEMINI_STUB_* fault options)
+
+	Returns:
+	    FastAPI application serving the generateContent surface
+	"""
+	stub = FastAPI(title='Gemini Stand-in', version='1.0.0')
+	stub.state.store = store or CassetteStore(config.GEMINI_STUB_CASSETTE_DIR)
+	stub.state.faults = faults or FaultInjector.from_settings(config)
+
+	@stub.get('/')
+	def health_check():
+		"""Health check endpoint"""
+		return {'status': 'ok', 'mode': config.GEMINI_STUB_MODE}
+
+	@stub.post('/{api_version}/models/{model}:generateContent')
+	async def generate_content(api_version: str, model: str, request: Request):
+		"""Serve a recorded response for the request, injecting configured faults"""
+		body = await request.json()
+		key = request_key(model, body)
+		faults: FaultInjector = stub.state.faults
+
+		delay = faults.sample_latency()
+		if delay:
+			await asyncio.sleep(delay)
+
+		if faults.should_rate_limit():
+			logger.info(f'Injecting 429 for {model} request {key[:12]}')
+			return _error_response(
+				429,
+				'RESOURCE_EXHAUSTED',
+				'Resource has been exhausted (e.g. check quota).',
+				headers={'Retry-After': str(config.GEMINI_STUB_RETRY_AFTER_SECONDS)},
+			)
+
+		response = stub.state.store.load(key)
+		if response is None and config.GEMINI_STUB_MODE == 'record':
+			response = await _record(api_version, model, body, key, request)
+			if isinstance(response, Response):
+				return response
+
+		if response is None:
+			logger.warning(f'No recording for {model} request {key[:12]}')
+			return _error_response(
+				404, 'NOT_FOUND', f'No recorded response for request {key} (model {model})'
+			)
+
+		if faults.should_corrupt():
+			logger.info(f'Injecting malformed JSON for {model} request {key[:12]}')
+			response = corrupt_response(response)
+
+		return response
+
+	async def _record(api_version: str, model: str, body: dict, key: str, request: Request):
+		"""Forward a request to the live API and record a successful response"""
+		url = f'{config.GEMINI_STUB_UPSTREAM_URL}/{api_version}/models/{model}:generateContent'
+		headers = {'x-goog-api-key': request.headers.get('x-goog-api-key', config.GEMINI_API_KEY)}
+		async with httpx.AsyncClient(timeout=120) as client:
+			upstream = await client.post(url, json=body, headers=headers)
+		if upstream.status_code != 200:
+			logger.warning(f'Upstream returned {upstream.status_code}, not recording')
+			# Passed through as is, since error bodies needn't be JSON
+			return Response(
+				upstream.content,
+				status_code=upstream.status_code,
+				media_type=upstream.headers.get('content-type'),
+			)
+		response = upstream.json()
+		stub.state.store.save(key, model, response)
+		return response
+
+	return stub
+
+
+app = create_app()
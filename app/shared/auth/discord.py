@@ -1,5 +1,6 @@
 import logging
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
 import httpx
 
@@ -10,6 +11,16 @@ logger = logging.getLogger(__name__)
 DISCORD_API_BASE = 'https://discord.com/api/v10'
 
 
+@asynccontextmanager
+async def _http_client(client: httpx.AsyncClient | None) -> AsyncIterator[httpx.AsyncClient]:
+	"""Use the shared client when given, otherwise a short-lived one"""
+	if client is not None:
+		yield client
+		return
+	async with httpx.AsyncClient() as new_client:
+		yield new_client
+
+
 def get_discord_oauth_url() -> str:
 	"""Get the Discord OAuth 2.0 authorization URL
 
@@ -30,11 +41,14 @@ def get_discord_oauth_url() -> str:
 	return url
 
 
-async def exchange_code_for_token(code: str) -> Optional[str]:
+async def exchange_code_for_token(
+	code: str, client: httpx.AsyncClient | None = None
+) -> Optional[str]:
 	"""Exchange authorization code for access token
 
 	Args:
 	    code: Authorization code from Discord redirect
+	    client: Shared HTTP client, a new one is created when omitted
 
 	Returns:
 	    Access token string, or None if exchange fails
@@ -49,8 +63,8 @@ async def exchange_code_for_token(code: str) -> Optional[str]:
 	headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
 	try:
-		async with httpx.AsyncClient() as client:
-			response = await client.post(
+		async with _http_client(client) as http:
+			response = await http.post(
 				f'{DISCORD_API_BASE}/oauth2/token', data=data, headers=headers
 			)
 			logger.info(f'Received response from Discord token exchange {response.json()}')
@@ -71,11 +85,14 @@ async def exchange_code_for_token(code: str) -> Optional[str]:
 		return None
 
 
-async def get_discord_user(access_token: str) -> Optional[dict]:
+async def get_discord_user(
+	access_token: str, client: httpx.AsyncClient | None = None
+) -> Optional[dict]:
 	"""Fetch Discord user information using access token
 
 	Args:
 	    access_token: Discord OAuth access token
+	    client: Shared HTTP client, a new one is created when omitted
 
 	Returns:
 	    Dict with user info (id, username, avatar, etc.), or None if fetch fails
@@ -83,8 +100,8 @@ async def get_discord_user(access_token: str) -> Optional[dict]:
 	headers = {'Authorization': f'Bearer {access_token}'}
 
 	try:
-		async with httpx.AsyncClient() as client:
-			response = await client.get(f'{DISCORD_API_BASE}/users/@me', headers=headers)
+		async with _http_client(client) as http:
+			response = await http.get(f'{DISCORD_API_BASE}/users/@me', headers=headers)
 			response.raise_for_status()
 
 			user_data = response.json()
@@ -1,12 +1,14 @@
 import logging
 
-from fastapi import APIRouter, HTTPException, Query, Request
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
 from app.shared.auth.discord import exchange_code_for_token, get_discord_oauth_url, get_discord_user
 from app.shared.auth.jwt import create_access_token
+from app.shared.core.container import get_container
 
 # Set up Jinja2 templates
 templates = Jinja2Templates(directory='app/templates')
@@ -16,6 +18,11 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix='/api/auth', tags=['auth'])
 
 
+def get_http_client() -> httpx.AsyncClient:
+	"""Dependency to get the process-wide HTTP client"""
+	return get_container().http
+
+
 class AuthResponse(BaseModel):
 	"""Response containing JWT access token"""
 
@@ -46,7 +53,11 @@ async def get_discord_login_url() -> AuthUrlResponse:
 
 
 @router.get('/discord/callback')
-async def discord_oauth_callback(code: str = Query(...), request: Request = None) -> HTMLResponse:
+async def discord_oauth_callback(
+	code: str = Query(...),
+	request: Request = None,
+	http_client: httpx.AsyncClient = Depends(get_http_client),
+) -> HTMLResponse:
 	"""Handle Discord OAuth callback
 
 	This endpoint receives the authorization code from Discord after the user
@@ -56,6 +67,7 @@ async def discord_oauth_callback(code: str = Query(...), request: Request = None
 	Args:
 	    code: Authorization code from Discord
 	    request: FastAPI request object for template rendering
+	    http_client: Shared HTTP client for the Discord API calls
 
 	Returns:
 	    HTML page displaying the JWT access token
@@ -66,13 +78,13 @@ async def discord_oauth_callback(code: str = Query(...), request: Request = None
 	logger.info('Processing Discord OAuth callback')
 
 	# Exchange authorization code for access token
-	access_token = await exchange_code_for_token(code)
+	access_token = await exchange_code_for_token(code, http_client)
 	if not access_token:
 		logger.error('Failed to exchange Discord code for access token')
 		raise HTTPException(status_code=400, detail='Failed to authenticate with Discord')
 
 	# Fetch user information
-	user_data = await get_discord_user(access_token)
+	user_data = await get_discord_user(access_token, http_client)
 	if not user_data:
 		logger.error('Failed to fetch Discord user data')
 		raise HTTPException(
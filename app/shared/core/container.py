@@ -0,0 +1,163 @@
+"""Per-process resource container
+
+Connection pools for MongoDB and outbound HTTP, and the Gemini client built on
+top of the HTTP pool, are created when a process starts (FastAPI lifespan or
+the bot's `main()`) and closed when it stops. Nothing is created at import
+time, so uvicorn workers each open their own pools after forking.
+
+    async with Container() as container:
+        repository = container.match_repository()
+"""
+
+import logging
+from typing import TYPE_CHECKING
+
+import httpx
+
+from app.shared.core.settings import Settings, settings
+from app.shared.db.mongo import create_client
+from app.shared.job_queue import JobQueue
+from app.shared.repositories import MatchRepository
+from app.shared.screenshots import ScreenshotArchive
+from app.shared.services.gemini import GeminiClient
+from app.shared.services.gemini_gateway import GeminiGateway
+from app.shared.services.hedging import Hedger
+from app.shared.services.model_router import ModelRouter
+
+if TYPE_CHECKING:
+	from pymongo import AsyncMongoClient
+	from pymongo.asynchronous.database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class Container:
+	"""Shared clients for one process"""
+
+	def __init__(self, config: Settings = settings):
+		self.config = config
+		self._mongo_client: 'AsyncMongoClient | None' = None
+		self._http: httpx.AsyncClient | None = None
+		self._gemini_clients: dict[str | None, GeminiClient] = {}
+		# Shared by every Gemini client so limits apply to the whole process
+		self.gemini_gateway = GeminiGateway.from_settings(config)
+		self.gemini_hedger = Hedger.from_settings(config) if config.GEMINI_HEDGING_ENABLED else None
+		self.gemini_router = ModelRouter.from_settings(config)
+
+	def open(self) -> None:
+		"""Create the connection pools"""
+		self._mongo_client = create_client(self.config)
+		self._http = httpx.AsyncClient(
+			timeout=self.config.HTTP_TIMEOUT_SECONDS,
+			limits=httpx.Limits(
+				max_connections=self.config.HTTP_MAX_CONNECTIONS,
+				max_keepalive_connections=self.config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+				keepalive_expiry=self.config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+			),
+		)
+		logger.info(
+			f'Opened resource pools (mongo maxPoolSize={self.config.MONGODB_MAX_POOL_SIZE}, '
+			f'http max_connections={self.config.HTTP_MAX_CONNECTIONS})'
+		)
+
+	async def aclose(self) -> None:
+		"""Close every pool, continuing past failures so nothing is leaked"""
+		for gemini_client in self._gemini_clients.values():
+			try:
+				await gemini_client.aclose()
+			except Exception as e:
+				logger.warning(f'Error closing Gemini client: {e}')
+		self._gemini_clients.clear()
+		if self._http is not None:
+			try:
+				await self._http.aclose()
+			except Exception as e:
+				logger.warning(f'Error closing HTTP client: {e}')
+			self._http = None
+		if self._mongo_client is not None:
+			try:
+				await self._mongo_client.close()
+			except Exception as e:
+				logger.warning(f'Error closing MongoDB client: {e}')
+			self._mongo_client = None
+		logger.info('Closed resource pools')
+
+	async def __aenter__(self) -> 'Container':
+		self.open()
+		set_container(self)
+		return self
+
+	async def __aexit__(self, *exc_info) -> None:
+		if _container is self:
+			set_container(None)
+		await self.aclose()
+
+	@property
+	def mongo_client(self) -> 'AsyncMongoClient':
+		if self._mongo_client is None:
+			raise RuntimeError('Container is not open')
+		return self._mongo_client
+
+	@property
+	def db(self) -> 'AsyncDatabase':
+		return self.mongo_client.get_database(self.config.MONGODB_DB)
+
+	@property
+	def http(self) -> httpx.AsyncClient:
+		if self._http is None:
+			raise RuntimeError('Container is not open')
+		return self._http
+
+	def match_repository(self) -> MatchRepository:
+		return MatchRepository(self.db)
+
+	def job_queue(self) -> JobQueue:
+		return JobQueue(
+			self.db,
+			max_attempts=self.config.JOB_MAX_ATTEMPTS,
+			retry_base_seconds=self.config.JOB_RETRY_BASE_SECONDS,
+			retry_max_seconds=self.config.JOB_RETRY_MAX_SECONDS,
+			retention_seconds=self.config.JOB_RETENTION_SECONDS,
+		)
+
+	def screenshot_archive(self) -> ScreenshotArchive:
+		return ScreenshotArchive(self.db, retention_days=self.config.SCREENSHOT_RETENTION_DAYS)
+
+	def gemini_client(self, api_key: str | None = None) -> GeminiClient:
+		"""Shared GeminiClient for an API key, using the pooled HTTP client
+
+		Has the same call signature as the `GeminiClient` class, so it can be
+		passed to handlers wherever a client factory is expected.
+		"""
+		client = self._gemini_clients.get(api_key)
+		if client is None:
+			client = self._gemini_clients[api_key] = GeminiClient(
+				api_key=api_key,
+				http_client=self.http,
+				gateway=self.gemini_gateway,
+				hedger=self.gemini_hedger,
+				router=self.gemini_router,
+				repair_max_fields=self.config.GEMINI_REPAIR_MAX_FIELDS,
+				enum_match_threshold=self.config.GEMINI_ENUM_MATCH_THRESHOLD,
+				batch_max_size=(
+					self.config.GEMINI_BATCH_MAX_SIZE if self.config.GEMINI_BATCHING_ENABLED else 1
+				),
+				batch_max_wait=self.config.GEMINI_BATCH_MAX_WAIT_SECONDS,
+			)
+		return client
+
+
+_container: Container | None = None
+
+
+def get_container() -> Container:
+	"""The open container for this process"""
+	if _container is None:
+		raise RuntimeError('No resource container is open in this process')
+	return _container
+
+
+def set_container(container: Container | None) -> None:
+	"""Replace the process container (useful for testing)"""
+	global _container
+	_container = container
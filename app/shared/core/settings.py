@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -8,9 +10,35 @@ class Settings(BaseSettings):
 	MONGODB_DB: str = 'scoreboard_db'
 	MONGODB_USER: str = 'admin'
 	MONGODB_PASSWORD: str = 'password'
+	# Connection pool, created per process (each uvicorn worker gets its own)
+	MONGODB_MAX_POOL_SIZE: int = 100
+	MONGODB_MIN_POOL_SIZE: int = 0
+	MONGODB_MAX_IDLE_TIME_MS: int | None = None
+	MONGODB_CONNECT_TIMEOUT_MS: int = 20_000
+	MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30_000
+	MONGODB_SOCKET_TIMEOUT_MS: int | None = None
+	MONGODB_COMPRESSORS: str | None = None  # e.g. 'zstd,zlib'; zstd/snappy need extra packages
+
+	# Outbound HTTP client shared by Discord OAuth and Gemini calls
+	HTTP_MAX_CONNECTIONS: int = 100
+	HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+	HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+	HTTP_TIMEOUT_SECONDS: float = 60.0
 
 	# Discord Bot
 	DISCORD_BOT_TOKEN: str = 'secret_token'
+	# !stats/!query need the privileged message content intent; slash commands don't
+	DISCORD_PREFIX_COMMANDS_ENABLED: bool = True
+	DISCORD_SYNC_COMMANDS: bool = True  # register slash commands with Discord on startup
+	# 'lean' keeps only the guild and channel data replies need; 'default' is discord.py's
+	DISCORD_CACHE_POLICY: Literal['lean', 'default'] = 'lean'
+	DISCORD_MAX_MESSAGES: int = 100  # message cache size with the lean policy; 0 disables it
+	MEMORY_TRACEMALLOC_FRAMES: int = 0  # trace allocations for /memory; 0 leaves tracing off
+	# Sharding - app.bot.launcher sets the shard options for each bot process it starts
+	DISCORD_AUTO_SHARD: bool = False  # run the gateway as an AutoShardedBot
+	DISCORD_SHARD_COUNT: int | None = None  # total shards; None uses Discord's recommendation
+	DISCORD_SHARD_IDS: str | None = None  # comma-separated shards run by this process
+	DISCORD_SHARD_PROCESSES: int = 1  # bot processes the launcher spreads shards over
 
 	# Discord OAuth 2.0
 	DISCORD_CLIENT_ID: str = 'your_client_id'
@@ -19,6 +47,89 @@ class Settings(BaseSettings):
 
 	# Gemini API
 	GEMINI_API_KEY: str = 'secret_api_key'
+	GEMINI_BASE_URL: str | None = None  # e.g. http://gemini-stub:8080 to use the stand-in server
+
+	# Gemini load control, per process and per traffic class (analysis = !stats, query = !query)
+	GEMINI_ANALYSIS_MAX_CONCURRENCY: int = 8
+	GEMINI_ANALYSIS_LATENCY_TARGET_SECONDS: float = 20.0
+	GEMINI_QUERY_MAX_CONCURRENCY: int = 4
+	GEMINI_QUERY_LATENCY_TARGET_SECONDS: float = 8.0
+	GEMINI_MIN_CONCURRENCY: int = 1
+	GEMINI_CONCURRENCY_BACKOFF_RATIO: float = 0.5  # limit multiplier on 429 or slow responses
+	GEMINI_MAX_ATTEMPTS: int = 4  # including the first call
+	GEMINI_RETRY_BASE_SECONDS: float = 0.5
+	GEMINI_RETRY_MAX_SECONDS: float = 20.0
+	GEMINI_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive failures before the circuit opens
+	GEMINI_BREAKER_RESET_SECONDS: float = 30.0  # open time before a half-open probe
+	# Comma-separated models tried in order; later ones are used only on escalation
+	GEMINI_ANALYSIS_MODELS: str = 'gemini-2.5-flash-lite,gemini-2.5-flash'
+	GEMINI_QUERY_MODELS: str = 'gemini-2.5-flash-lite,gemini-2.5-flash'
+	GEMINI_ESCALATION_MIN_CONFIDENCE: float = 1.0  # share of consistency checks an answer must pass
+	GEMINI_REPAIR_MAX_FIELDS: int = 6  # re-ask at most this many invalid fields; 0 disables repair
+	GEMINI_ENUM_MATCH_THRESHOLD: float = 0.8  # similarity to map a near-miss weapon/map/team name
+	GEMINI_BATCHING_ENABLED: bool = False
+	GEMINI_BATCH_MAX_SIZE: int = 4  # image sets packed into one analysis request
+	GEMINI_BATCH_MAX_WAIT_SECONDS: float = 0.3  # how long the first analysis waits for company
+	GEMINI_HEDGING_ENABLED: bool = False
+	GEMINI_HEDGE_PERCENTILE: float = 0.95  # latency percentile after which a call is hedged
+	GEMINI_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+	GEMINI_HEDGE_MAX_RATIO: float = 0.05  # hedges as a fraction of all calls, process-wide
+	GEMINI_HEDGE_WINDOW: int = 200  # recent latencies the percentile is taken over
+	GEMINI_HEDGE_MIN_SAMPLES: int = 20  # no hedging until this many latencies are known
+
+	# Gemini stand-in server (app.gemini_stub)
+	GEMINI_STUB_MODE: Literal['replay', 'record'] = 'replay'
+	GEMINI_STUB_CASSETTE_DIR: str = 'app/gemini_stub/cassettes'
+	GEMINI_STUB_UPSTREAM_URL: str = 'https://generativelanguage.googleapis.com'
+	GEMINI_STUB_LATENCY_DISTRIBUTION: Literal['none', 'fixed', 'uniform', 'lognormal'] = 'none'
+	GEMINI_STUB_LATENCY_MS: float = 0.0  # fixed value, uniform centre or lognormal median
+	GEMINI_STUB_LATENCY_SPREAD: float = 0.0  # uniform half-width in ms, or lognormal sigma
+	GEMINI_STUB_RATE_LIMIT_PROBABILITY: float = 0.0
+	GEMINI_STUB_RETRY_AFTER_SECONDS: int = 1
+	GEMINI_STUB_MALFORMED_PROBABILITY: float = 0.0
+	GEMINI_STUB_SEED: int | None = None
+
+	# Job queue - durable analysis and query jobs in MongoDB
+	JOB_QUEUE_ENABLED: bool = False  # bot enqueues commands for app.bot.worker processes
+	JOB_WORKER_CONCURRENCY: int = 4  # jobs run in parallel by each worker process
+	JOB_VISIBILITY_TIMEOUT_SECONDS: float = 120.0  # lease length, renewed while running
+	JOB_POLL_INTERVAL_SECONDS: float = 1.0
+	JOB_MAX_ATTEMPTS: int = 5
+	JOB_RETRY_BASE_SECONDS: float = 5.0  # doubled after every failed attempt
+	JOB_RETRY_MAX_SECONDS: float = 300.0
+	JOB_RETENTION_SECONDS: int = 7 * 24 * 3600  # finished jobs are removed after this
+	WORKER_METRICS_PORT: int | None = None  # serve /metrics from a worker process when set
+
+	# Duplicate submissions - repeats of the same message are dropped within this window
+	MATCH_DEDUPE_MAX_KEYS: int = 10_000
+	MATCH_DEDUPE_TTL_SECONDS: float = 3600.0
+	# Near-duplicate screenshots - needs the phash extra (numpy and pillow)
+	PHASH_ENABLED: bool = False
+	PHASH_MAX_DISTANCE: int = 8  # differing bits (of 64) still counted as a possible repost
+	PHASH_RECENT_SIZE: int = 5000  # scoreboard hashes remembered per process
+
+	# Screenshot archive - original uploads kept in GridFS for reprocessing
+	SCREENSHOT_ARCHIVE_ENABLED: bool = False
+	SCREENSHOT_RETENTION_DAYS: int | None = 180  # None keeps screenshots forever
+
+	# Command bus middlewares
+	COMMAND_ANALYZE_TIMEOUT_SECONDS: float | None = 180.0  # None disables the limit
+	COMMAND_QUERY_TIMEOUT_SECONDS: float | None = 60.0
+	COMMAND_SINGLE_FLIGHT_ENABLED: bool = True  # identical concurrent commands run once
+
+	# Background event subscribers (bookkeeping that must not delay replies)
+	EVENT_BACKGROUND_CONCURRENCY: int = 4  # background handlers run at once, per process
+	EVENT_BACKGROUND_QUEUE_SIZE: int = 1000  # waiting handler calls before overflow
+	EVENT_BACKGROUND_OVERFLOW: Literal['drop_oldest', 'drop_newest'] = 'drop_oldest'
+
+	# Metrics
+	BOT_METRICS_PORT: int | None = None  # serve /metrics from the bot process when set
+	BOT_METRICS_HOST: str = '0.0.0.0'
+
+	# Tracing
+	TRACE_EXPORTER: Literal['none', 'jsonl', 'otlp'] = 'none'
+	TRACE_FILE: str = 'traces.jsonl'
+	OTLP_ENDPOINT: str = 'http://localhost:4318/v1/traces'
 
 	# JWT Configuration
 	JWT_SECRET: str = 'your_jwt_secret_key_change_in_production'
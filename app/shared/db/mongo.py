@@ -1,5 +1,33 @@
-from pymongo import AsyncMongoClient
-from app.shared.core.settings import settings
+"""MongoDB client factory
 
-client = AsyncMongoClient(settings.MONGODB_URI)
-db = client.get_database(settings.MONGODB_DB)
+Clients are created by `app.shared.core.container.Container` when a process
+starts, never at import time. A client created before uvicorn forks its workers
+would share sockets between processes, so each process builds its own pool.
+"""
+
+from typing import TYPE_CHECKING
+
+from app.shared.core.settings import Settings, settings
+
+if TYPE_CHECKING:
+	from pymongo import AsyncMongoClient
+
+
+def create_client(config: Settings = settings) -> 'AsyncMongoClient':
+	"""Create an AsyncMongoClient with the pool settings from config"""
+	# pymongo is imported here so processes that never use MongoDB skip it
+	from pymongo import AsyncMongoClient
+
+	options = {
+		'maxPoolSize': config.MONGODB_MAX_POOL_SIZE,
+		'minPoolSize': config.MONGODB_MIN_POOL_SIZE,
+		'connectTimeoutMS': config.MONGODB_CONNECT_TIMEOUT_MS,
+		'serverSelectionTimeoutMS': config.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+	}
+	if config.MONGODB_MAX_IDLE_TIME_MS is not None:
+		options['maxIdleTimeMS'] = config.MONGODB_MAX_IDLE_TIME_MS
+	if config.MONGODB_SOCKET_TIMEOUT_MS is not None:
+		options['socketTimeoutMS'] = config.MONGODB_SOCKET_TIMEOUT_MS
+	if config.MONGODB_COMPRESSORS:
+		options['compressors'] = config.MONGODB_COMPRESSORS
+	return AsyncMongoClient(config.MONGODB_URI, **options)
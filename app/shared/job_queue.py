@@ -0,0 +1,254 @@
+"""Durable job queue stored in MongoDB
+
+Jobs are claimed with a single atomic `find_one_and_update`, which hands the
+job to one worker and hides it from the others until its lease runs out. A
+worker that finishes acks the job, and a worker that fails nacks it for a
+delayed retry. A worker that dies just lets the lease expire, and the job
+becomes claimable again. Once a job has used `max_attempts` claims it is
+marked failed.
+
+`available_at` does double duty. For pending jobs it is when the job (or its
+retry) may run, and for leased jobs it is when the lease expires. A claim
+therefore only has to look for pending or leased jobs whose `available_at`
+has passed.
+
+Binary payload fields (screenshots) go to a GridFS bucket, because two 10MB
+images would not fit in a 16MB BSON document.
+"""
+
+import io
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+from app.shared.observability.metrics import JOBS_TOTAL
+from app.shared.observability.tracing import start_span
+
+if TYPE_CHECKING:
+	from pymongo.asynchronous.database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def utcnow() -> datetime:
+	return datetime.now(timezone.utc)
+
+
+@dataclass
+class Job:
+	"""A claimed job, valid while its lease token matches the stored one"""
+
+	id: Any
+	type: str
+	payload: dict[str, Any]
+	attempts: int
+	max_attempts: int
+	lease_token: str
+	blobs: dict[str, Any] = field(default_factory=dict)
+	created_at: datetime | None = None
+
+	@classmethod
+	def from_document(cls, document: dict[str, Any]) -> 'Job':
+		return cls(
+			id=document['_id'],
+			type=document['type'],
+			payload=document['payload'],
+			attempts=document['attempts'],
+			max_attempts=document['max_attempts'],
+			lease_token=document['lease_token'],
+			blobs=document.get('blobs', {}),
+			created_at=document.get('created_at'),
+		)
+
+
+class JobQueue:
+	"""Claim/lease/ack queue on the `jobs` collection"""
+
+	def __init__(
+		self,
+		db: 'AsyncDatabase',
+		collection: str = 'jobs',
+		max_attempts: int = 5,
+		retry_base_seconds: float = 5.0,
+		retry_max_seconds: float = 300.0,
+		retention_seconds: int = 7 * 24 * 3600,
+	):
+		self.db = db
+		self.collection = db[collection]
+		self.blob_bucket_name = f'{collection}_blobs'
+		self.max_attempts = max_attempts
+		self.retry_base_seconds = retry_base_seconds
+		self.retry_max_seconds = retry_max_seconds
+		self.retention_seconds = retention_seconds
+		self._bucket = None
+
+	@property
+	def bucket(self):
+		if self._bucket is None:
+			from gridfs import AsyncGridFSBucket
+
+			self._bucket = AsyncGridFSBucket(self.db, bucket_name=self.blob_bucket_name)
+		return self._bucket
+
+	async def ensure_indexes(self) -> None:
+		"""Create the claim index and expire finished jobs after the retention period"""
+		await self.collection.create_index(
+			[('status', 1), ('type', 1), ('available_at', 1)], name='claim'
+		)
+		await self.collection.create_index(
+			'finished_at', name='retention', expireAfterSeconds=self.retention_seconds
+		)
+
+	async def enqueue(self, command: BaseModel, max_attempts: int | None = None) -> str:
+		"""Persist a command as a pending job and return the job ID"""
+		payload = command.model_dump()
+		job_type = type(command).__name__
+		blobs = {}
+		for name, value in list(payload.items()):
+			if isinstance(value, bytes):
+				blobs[name] = await self.bucket.upload_from_stream(
+					f'{job_type}.{name}', io.BytesIO(value)
+				)
+				del payload[name]
+
+		now = utcnow()
+		result = await self.collection.insert_one(
+			{
+				'type': job_type,
+				'payload': payload,
+				'blobs': blobs,
+				'status': PENDING,
+				'attempts': 0,
+				'max_attempts': max_attempts or self.max_attempts,
+				'available_at': now,
+				'created_at': now,
+				'updated_at': now,
+			}
+		)
+		JOBS_TOTAL.inc(type=job_type, outcome='enqueued')
+		logger.info(f'Enqueued {job_type} job {result.inserted_id}')
+		return str(result.inserted_id)
+
+	async def claim(
+		self, worker_id: str, types: list[str], visibility_timeout: float
+	) -> Job | None:
+		"""Atomically lease the oldest available job of the given types"""
+		from pymongo import ReturnDocument
+
+		while True:
+			now = utcnow()
+			document = await self.collection.find_one_and_update(
+				{
+					'status': {'$in': [PENDING, LEASED]},
+					'type': {'$in': types},
+					'available_at': {'$lte': now},
+				},
+				{
+					'$set': {
+						'status': LEASED,
+						'leased_by': worker_id,
+						'lease_token': uuid.uuid4().hex,
+						'available_at': now + timedelta(seconds=visibility_timeout),
+						'updated_at': now,
+					},
+					'$inc': {'attempts': 1},
+				},
+				sort=[('available_at', 1)],
+				return_document=ReturnDocument.AFTER,
+			)
+			if document is None:
+				return None
+
+			job = Job.from_document(document)
+			if job.attempts <= job.max_attempts:
+				return job
+			# The previous holder's lease expired on its final attempt
+			await self._finish(job, FAILED, 'Lease expired on final attempt')
+
+	async def extend_lease(self, job: Job, visibility_timeout: float) -> bool:
+		"""Push the lease deadline out; False when the lease was lost to another worker"""
+		now = utcnow()
+		result = await self.collection.update_one(
+			{'_id': job.id, 'lease_token': job.lease_token, 'status': LEASED},
+			{
+				'$set': {
+					'available_at': now + timedelta(seconds=visibility_timeout),
+					'updated_at': now,
+				}
+			},
+		)
+		return result.modified_count == 1
+
+	async def ack(self, job: Job) -> bool:
+		"""Mark a job done; False when the lease was lost before finishing"""
+		return await self._finish(job, DONE)
+
+	async def nack(self, job: Job, error: str) -> bool:
+		"""Release a failed job for a delayed retry, or fail it when out of attempts
+
+		Returns True when the job will be retried.
+		"""
+		if job.attempts >= job.max_attempts:
+			await self._finish(job, FAILED, error)
+			return False
+
+		delay = min(self.retry_base_seconds * 2 ** (job.attempts - 1), self.retry_max_seconds)
+		now = utcnow()
+		result = await self.collection.update_one(
+			{'_id': job.id, 'lease_token': job.lease_token, 'status': LEASED},
+			{
+				'$set': {
+					'status': PENDING,
+					'available_at': now + timedelta(seconds=delay),
+					'last_error': error,
+					'updated_at': now,
+				},
+				'$unset': {'lease_token': '', 'leased_by': ''},
+			},
+		)
+		if result.modified_count == 1:
+			JOBS_TOTAL.inc(type=job.type, outcome='retried')
+			logger.info(f'Job {job.id} failed attempt {job.attempts}, retrying in {delay:.0f}s')
+		return True
+
+	async def _finish(self, job: Job, status: str, error: str | None = None) -> bool:
+		now = utcnow()
+		update: dict[str, Any] = {'status': status, 'finished_at': now, 'updated_at': now}
+		if error is not None:
+			update['last_error'] = error
+		result = await self.collection.update_one(
+			{'_id': job.id, 'lease_token': job.lease_token, 'status': LEASED},
+			{'$set': update, '$unset': {'lease_token': ''}},
+		)
+		if result.modified_count != 1:
+			JOBS_TOTAL.inc(type=job.type, outcome='lease_lost')
+			logger.warning(f'Lost lease on job {job.id} before marking it {status}')
+			return False
+		JOBS_TOTAL.inc(type=job.type, outcome=status)
+		await self._delete_blobs(job)
+		return True
+
+	async def load_blobs(self, job: Job) -> dict[str, bytes]:
+		"""Download the binary payload fields of a job"""
+		blobs = {}
+		with start_span('mongo load job blobs', kind='client', job_type=job.type):
+			for name, file_id in job.blobs.items():
+				stream = await self.bucket.open_download_stream(file_id)
+				blobs[name] = await stream.read()
+		return blobs
+
+	async def _delete_blobs(self, job: Job) -> None:
+		for file_id in job.blobs.values():
+			try:
+				await self.bucket.delete(file_id)
+			except Exception as e:
+				logger.warning(f'Failed to delete blob {file_id} of job {job.id}: {e}')
@@ -0,0 +1,134 @@
+"""Map near-miss enum strings from Gemini onto enum members
+
+Many failed extractions are only a character off: "JAGER 45" for "JÄGER 45",
+"PEACEKEEPER MKI" for "PEACEKEEPER MK1", "SEARCH & DESTROY". Fixing these
+locally takes microseconds, while a repair or retry is another Gemini call.
+
+Each enum gets an `EnumIndex` built once. A lookup tries three things in order:
+
+1. an exact match on a folded key: case, accents, punctuation and spacing
+   removed, and look-alike characters (I/L/1, O/0, S/5, B/8) merged;
+2. the members sharing character trigrams with the input, ranked by edit
+   distance between folded keys;
+3. no match, when the best similarity is under the threshold or two members
+   tie. The value is then left for validation to reject.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from enum import StrEnum
+from functools import cache, lru_cache
+from typing import Any, get_args
+
+from app.shared.models.enums import GameModes, Maps, Teams
+from app.shared.models.types import PrimaryWeaponType, SecondaryWeaponType
+
+_CONFUSABLES = str.maketrans({'i': '1', 'l': '1', 'o': '0', 's': '5', 'b': '8'})
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Normalized fields of a GameStatsResponse payload and the enums they accept
+GAME_STATS_ENUM_FIELDS: dict[tuple[str, ...], tuple[type[StrEnum], ...]] = {
+	('map',): (Maps,),
+	('team',): (Teams,),
+	('game_mode',): (GameModes,),
+	('primary_weapon_stats', 'primary_weapon_name'): get_args(get_args(PrimaryWeaponType)[0]),
+	('secondary_weapon_stats', 'secondary_weapon_name'): (get_args(SecondaryWeaponType)[0],),
+}
+
+
+def fold(value: str) -> str:
+	"""Comparison key: no accents, case, punctuation or look-alike characters"""
+	decomposed = unicodedata.normalize('NFKD', value.casefold())
+	ascii_only = ''.join(c for c in decomposed if not unicodedata.combining(c))
+	ascii_only = ascii_only.replace('&', 'and')
+	return _NON_ALNUM.sub('', ascii_only).translate(_CONFUSABLES)
+
+
+def _trigrams(key: str) -> set[str]:
+	padded = f'  {key} '
+	return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+	"""Levenshtein distance"""
+	if len(a) < len(b):
+		a, b = b, a
+	previous = list(range(len(b) + 1))
+	for i, ca in enumerate(a, 1):
+		current = [i]
+		for j, cb in enumerate(b, 1):
+			current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+		previous = current
+	return previous[-1]
+
+
+class EnumIndex:
+	"""Precomputed lookup of members of one or more StrEnums"""
+
+	def __init__(self, *enums: type[StrEnum]):
+		self.members: dict[str, StrEnum] = {}
+		self.by_trigram: dict[str, set[str]] = defaultdict(set)
+		for enum in enums:
+			for member in enum:
+				key = fold(member.value)
+				self.members[key] = member
+				for trigram in _trigrams(key):
+					self.by_trigram[trigram].add(key)
+		self.lookup = lru_cache(maxsize=1024)(self._lookup)
+
+	def _lookup(self, value: str, threshold: float) -> tuple[StrEnum | None, float]:
+		key = fold(value)
+		member = self.members.get(key)
+		if member is not None:
+			return member, 1.0
+		if not key:
+			return None, 0.0
+
+		candidates = set()
+		for trigram in _trigrams(key):
+			candidates |= self.by_trigram.get(trigram, set())
+		scored = sorted(
+			(1 - edit_distance(key, candidate) / max(len(key), len(candidate)), candidate)
+			for candidate in candidates
+		)
+		if not scored:
+			return None, 0.0
+		best_score, best = scored[-1]
+		if best_score < threshold or (len(scored) > 1 and scored[-2][0] == best_score):
+			return None, best_score
+		return self.members[best], best_score
+
+	def match(self, value: str, threshold: float = 0.8) -> StrEnum | None:
+		"""The member `value` most likely means, or None when unsure"""
+		return self.lookup(value, threshold)[0]
+
+
+@cache
+def enum_index(*enums: type[StrEnum]) -> EnumIndex:
+	return EnumIndex(*enums)
+
+
+def normalize_game_stats(data: Any, threshold: float = 0.8) -> list[tuple[str, ...]]:
+	"""Replace near-miss enum strings in a GameStatsResponse payload in place
+
+	Returns the paths of the fields that were changed.
+	"""
+	changed = []
+	if not isinstance(data, dict):
+		return changed
+	for path, enums in GAME_STATS_ENUM_FIELDS.items():
+		parent = data
+		for name in path[:-1]:
+			parent = parent.get(name)
+			if not isinstance(parent, dict):
+				break
+		else:
+			value = parent.get(path[-1])
+			if not isinstance(value, str):
+				continue
+			member = enum_index(*enums).match(value, threshold)
+			if member is not None and member.value != value:
+				parent[path[-1]] = member.value
+				changed.append(path)
+	return changed
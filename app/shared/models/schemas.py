@@ -1,5 +1,16 @@
-from pydantic import BaseModel, Field, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    TypeAdapter,
+    ValidationInfo,
+    ValidatorFunctionWrapHandler,
+    field_validator,
+    model_validator,
+)
 from datetime import datetime
+from functools import cached_property
 from typing import Any, Dict, List, Optional, Union, Literal
 from app.shared.models.types import PrimaryWeaponType, SecondaryWeaponType, Knife
 from app.shared.models.enums import (
@@ -23,6 +34,8 @@ HARDPOINT_SCORE_MAX = 250
 class WeaponStats(BaseModel):
     """Base model for weapon statistics."""
 
+    model_config = ConfigDict(frozen=True)
+
     eliminations: int = Field(ge=0, le=ELIM_MAX, description="Number of eliminations")
     elimination_death_ratio: float = Field(
         ge=0, le=ELIM_RATIO_MAX, description="Elimination to death ratio"
@@ -52,6 +65,8 @@ class SecondaryWeaponStats(WeaponStats):
 
 
 class MeleeWeaponStats(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     melee_weapon_name: Knife = Field(..., description="Name of the melee weapon")
     kill_death_ratio: float = Field(
         ge=0,
@@ -64,6 +79,8 @@ class MeleeWeaponStats(BaseModel):
 
 
 class Scoreboard(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     player: str = Field(..., description="Player's in-game name")
     eliminations: int = Field(ge=0, le=ELIM_MAX, description="Number of eliminations")
     deaths: int = Field(ge=0, le=DEATH_MAX, description="Number of deaths")
@@ -141,8 +158,35 @@ class SearchAndDestroyGameStats(GameStats):
     )
 
 
+ScoreboardType = Union[HardpointScoreboard, OverloadScoreboard, SearchAndDestroyScoreboard]
+
+# game_mode is the tag of the scoreboard union. It lives on the parent model rather
+# than inside the scoreboard, so dispatch happens in GameStatsResponse instead of
+# through a pydantic discriminator, keeping the external JSON shape unchanged.
+SCOREBOARD_TYPES: dict[GameModes, type[Scoreboard]] = {
+    GameModes.HARDPOINT: HardpointScoreboard,
+    GameModes.OVERLOAD: OverloadScoreboard,
+    GameModes.SEARCH_AND_DESTROY: SearchAndDestroyScoreboard,
+}
+SCOREBOARD_ADAPTERS: dict[GameModes, TypeAdapter] = {
+    game_mode: TypeAdapter(scoreboard_type)
+    for game_mode, scoreboard_type in SCOREBOARD_TYPES.items()
+}
+SCOREBOARD_MISMATCH_MESSAGES: dict[GameModes, str] = {
+    GameModes.HARDPOINT: "Scoreboard must be of type HardpointScoreboard for Hardpoint mode",
+    GameModes.OVERLOAD: "Scoreboard must be of type OverloadScoreboard for Overload mode",
+    GameModes.SEARCH_AND_DESTROY: "Scoreboard must be of type SearchAndDestroyScoreboard for Search and Destroy mode",
+}
+
+
 class GameStatsResponse(BaseModel):
-    """Response model that accepts any game mode variant for API responses."""
+    """Response model that accepts any game mode variant for API responses.
+
+    Frozen, along with the weapon and scoreboard models it holds, so the
+    cached `document` dump can't fall out of date with the fields.
+    """
+
+    model_config = ConfigDict(frozen=True)
 
     primary_weapon_stats: Optional[PrimaryWeaponStats] = Field(
         None, description="Primary weapon statistics as shown in Weapon Stats section"
@@ -155,38 +199,66 @@ class GameStatsResponse(BaseModel):
     )
     map: Maps = Field(..., description="Map where the game was played")
     team: Teams = Field(..., description="Team of the player")
+    # game_mode must stay declared before scoreboard so it is validated first
     game_mode: GameModes = Field(..., description="Game mode played")
-    scoreboard: Union[
-        HardpointScoreboard, OverloadScoreboard, SearchAndDestroyScoreboard
-    ] = Field(..., description="Scoreboard statistics for the game mode")
+    scoreboard: ScoreboardType = Field(
+        ..., description="Scoreboard statistics for the game mode"
+    )
+    # Set by GeminiClient to the model that produced this answer
+    _extracted_by: Optional[str] = PrivateAttr(default=None)
+
+    @field_validator("scoreboard", mode="wrap")
+    @classmethod
+    def validate_scoreboard_for_game_mode(
+        cls, value: Any, handler: ValidatorFunctionWrapHandler, info: ValidationInfo
+    ) -> Scoreboard:
+        """Validate the scoreboard only against the model for its game mode.
+
+        Falls back to the full union when game_mode is invalid or the targeted
+        model rejects the payload, so error messages match the plain union.
+        """
+        adapter = SCOREBOARD_ADAPTERS.get(info.data.get("game_mode"))
+        if adapter is not None:
+            try:
+                return adapter.validate_python(value)
+            except ValueError:
+                pass
+        return handler(value)
 
     # ensure that the scoreboard type matches the game mode
     @model_validator(mode="after")
     def validate_scoreboard(self):
-        game_mode = self.game_mode
-        scoreboard = self.scoreboard
-
-        if game_mode == GameModes.HARDPOINT and not isinstance(
-            scoreboard, HardpointScoreboard
-        ):
-            raise ValueError(
-                "Scoreboard must be of type HardpointScoreboard for Hardpoint mode"
-            )
-        elif game_mode == GameModes.OVERLOAD and not isinstance(
-            scoreboard, OverloadScoreboard
-        ):
-            raise ValueError(
-                "Scoreboard must be of type OverloadScoreboard for Overload mode"
-            )
-        elif game_mode == GameModes.SEARCH_AND_DESTROY and not isinstance(
-            scoreboard, SearchAndDestroyScoreboard
-        ):
-            raise ValueError(
-                "Scoreboard must be of type SearchAndDestroyScoreboard for Search and Destroy mode"
-            )
-
+        if not isinstance(self.scoreboard, SCOREBOARD_TYPES[self.game_mode]):
+            raise ValueError(SCOREBOARD_MISMATCH_MESSAGES[self.game_mode])
         return self
 
+    @cached_property
+    def document(self) -> Dict[str, Any]:
+        """JSON-compatible dump, computed once and reused for Mongo and Discord.
+
+        Treat the returned dict as read-only, it is shared by every caller.
+        Use model_copy(update=...) to change fields, the copy dumps afresh.
+        """
+        return self.model_dump(mode="json")
+
+    def model_copy(self, *, update=None, deep=False) -> "GameStatsResponse":
+        copy = super().model_copy(update=update, deep=deep)
+        # The copy shares __dict__ entries, including the cached dump
+        copy.__dict__.pop("document", None)
+        return copy
+
+    @property
+    def extracted_by(self) -> Optional[str]:
+        """Gemini model that produced these stats, when known."""
+        return self._extracted_by
+
+
+class ExtractionStamp(BaseModel):
+    """Which prompt and model produced a match's game stats."""
+
+    version: str = Field(..., description="Fingerprint of the analysis prompt and schema")
+    model: Optional[str] = Field(None, description="Gemini model that answered")
+
 
 class MatchDocument(BaseModel):
     discord_user_id: int = Field(
@@ -202,6 +274,26 @@ class MatchDocument(BaseModel):
     created_at: datetime = Field(
         ..., description="Timestamp when the match was saved to MongoDB"
     )
+    image_hash: str | None = Field(
+        None, description="Perceptual hash of the scoreboard screenshot"
+    )
+    screenshots: list[str] | None = Field(
+        None, description="SHA-256 digests of the original screenshots in the archive"
+    )
+    extraction: ExtractionStamp | None = Field(
+        None, description="Prompt and model that produced game_stats"
+    )
+
+    @classmethod
+    def trusted(cls, **data: Any) -> "MatchDocument":
+        """Build from values that were already validated, skipping validation."""
+        return cls.model_construct(**data)
+
+    def to_mongo(self) -> Dict[str, Any]:
+        """Document to insert, reusing the cached game_stats dump."""
+        document = self.model_dump(exclude={"game_stats"})
+        document["game_stats"] = self.game_stats.document
+        return document
 
 
 ALLOWED_AGGREGATION_OPERATORS = Literal["$match", "$group", "$project", "$sort", "$limit", "$skip", "$unwind"]
@@ -0,0 +1,88 @@
+"""Memory report for a running process
+
+Lists the live objects tracked by the garbage collector, grouped by type with
+their count and shallow size. When tracemalloc is tracing (started with
+`MEMORY_TRACEMALLOC_FRAMES`), it adds the source lines that allocated the most
+memory and the traced peak. Taking a report walks every object in the process,
+so it is meant for an occasional admin command, not for scraping.
+"""
+
+import gc
+import sys
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass
+
+
+@dataclass
+class TypeUsage:
+	name: str
+	count: int
+	size: int
+
+
+@dataclass
+class Allocation:
+	location: str
+	size: int
+	count: int
+
+
+def _format_size(size: float) -> str:
+	for unit in ('B', 'KiB', 'MiB'):
+		if abs(size) < 1024:
+			return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+		size /= 1024
+	return f'{size:.1f} GiB'
+
+
+def object_usage(limit: int = 10) -> list[TypeUsage]:
+	"""Types with the most shallow memory among gc-tracked objects"""
+	counts: dict[str, int] = defaultdict(int)
+	sizes: dict[str, int] = defaultdict(int)
+	for obj in gc.get_objects():
+		kind = type(obj)
+		name = f'{kind.__module__}.{kind.__qualname__}'
+		counts[name] += 1
+		sizes[name] += sys.getsizeof(obj, 0)
+	top = sorted(sizes, key=sizes.__getitem__, reverse=True)[:limit]
+	return [TypeUsage(name, counts[name], sizes[name]) for name in top]
+
+
+def top_allocations(limit: int = 10) -> list[Allocation] | None:
+	"""Source lines holding the most traced memory; None when tracemalloc is off"""
+	if not tracemalloc.is_tracing():
+		return None
+	snapshot = tracemalloc.take_snapshot().filter_traces(
+		(tracemalloc.Filter(False, tracemalloc.__file__),)
+	)
+	return [
+		Allocation(str(stat.traceback[0]), stat.size, stat.count)
+		for stat in snapshot.statistics('lineno')[:limit]
+	]
+
+
+def memory_report(limit: int = 10, caches: dict[str, int] | None = None) -> str:
+	"""Plain-text report of object types, allocations and any given cache sizes"""
+	lines = []
+	if caches:
+		lines.append('Caches: ' + ', '.join(f'{name} {size}' for name, size in caches.items()))
+
+	lines.append('Objects by type (shallow size):')
+	lines.extend(
+		f'  {_format_size(usage.size):>10}  {usage.count:>8}  {usage.name}'
+		for usage in object_usage(limit)
+	)
+
+	allocations = top_allocations(limit)
+	if allocations is None:
+		lines.append('tracemalloc is off; set MEMORY_TRACEMALLOC_FRAMES to trace allocations')
+	else:
+		current, peak = tracemalloc.get_traced_memory()
+		lines.append(
+			f'Traced memory: {_format_size(current)} (peak {_format_size(peak)}). Top lines:'
+		)
+		lines.extend(
+			f'  {_format_size(a.size):>10}  {a.count:>8}  {a.location}' for a in allocations
+		)
+	return '\n'.join(lines)
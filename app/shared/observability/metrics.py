@@ -0,0 +1,440 @@
+"""Minimal Prometheus-compatible metrics registry
+
+Counters and histograms are kept in process memory and rendered in the
+Prometheus text exposition format (version 0.0.4). Each process (API worker or
+bot) has its own registry, so scrape every process separately.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds - covers fast Mongo reads up to slow multimodal Gemini calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+	return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+	if not labels:
+		return ''
+	inner = ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+	return f'{{{inner}}}'
+
+
+def _format_value(value: float) -> str:
+	if value == float('inf'):
+		return '+Inf'
+	return repr(float(value))
+
+
+class Metric:
+	"""Base class for labelled metrics"""
+
+	type_name = 'untyped'
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._lock = threading.Lock()
+
+	def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+		if set(labels) != set(self.labelnames):
+			raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+		return tuple(str(labels[name]) for name in self.labelnames)
+
+	def _labels(self, key: tuple[str, ...]) -> dict[str, str]:
+		return dict(zip(self.labelnames, key))
+
+	def samples(self) -> Iterator[str]:
+		raise NotImplementedError
+
+	def render(self) -> str:
+		lines = [
+			f'# HELP {self.name} {_escape(self.documentation)}',
+			f'# TYPE {self.name} {self.type_name}',
+		]
+		lines.extend(self.samples())
+		return '\n'.join(lines)
+
+
+class Counter(Metric):
+	"""Monotonically increasing count"""
+
+	type_name = 'counter'
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+		super().__init__(name, documentation, labelnames)
+		self._values: dict[tuple[str, ...], float] = {}
+
+	def inc(self, amount: float = 1.0, **labels: str) -> None:
+		if amount < 0:
+			raise ValueError('Counters can only be incremented')
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def value(self, **labels: str) -> float:
+		return self._values.get(self._key(labels), 0.0)
+
+	def total(self) -> float:
+		"""Sum over every label combination"""
+		with self._lock:
+			return sum(self._values.values())
+
+	def samples(self) -> Iterator[str]:
+		with self._lock:
+			values = dict(self._values)
+		for key, value in values.items():
+			yield f'{self.name}{_format_labels(self._labels(key))} {_format_value(value)}'
+
+
+class Gauge(Metric):
+	"""Value that can go up and down"""
+
+	type_name = 'gauge'
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+		super().__init__(name, documentation, labelnames)
+		self._values: dict[tuple[str, ...], float] = {}
+
+	def set(self, value: float, **labels: str) -> None:
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = value
+
+	def inc(self, amount: float = 1.0, **labels: str) -> None:
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def dec(self, amount: float = 1.0, **labels: str) -> None:
+		self.inc(-amount, **labels)
+
+	def value(self, **labels: str) -> float:
+		return self._values.get(self._key(labels), 0.0)
+
+	def samples(self) -> Iterator[str]:
+		with self._lock:
+			values = dict(self._values)
+		for key, value in values.items():
+			yield f'{self.name}{_format_labels(self._labels(key))} {_format_value(value)}'
+
+
+class Histogram(Metric):
+	"""Distribution of observed values in cumulative buckets"""
+
+	type_name = 'histogram'
+
+	def __init__(
+		self,
+		name: str,
+		documentation: str,
+		labelnames: tuple[str, ...] = (),
+		buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+	):
+		super().__init__(name, documentation, labelnames)
+		self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+		# per label set: [bucket counts..., sum, count]
+		self._values: dict[tuple[str, ...], list[float]] = {}
+
+	def observe(self, value: float, **labels: str) -> None:
+		key = self._key(labels)
+		index = bisect_left(self.buckets, value)
+		with self._lock:
+			state = self._values.get(key)
+			if state is None:
+				state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+			state[index] += 1
+			state[-2] += value
+			state[-1] += 1
+
+	def count(self, **labels: str) -> float:
+		state = self._values.get(self._key(labels))
+		return state[-1] if state else 0.0
+
+	def sum(self, **labels: str) -> float:
+		state = self._values.get(self._key(labels))
+		return state[-2] if state else 0.0
+
+	def samples(self) -> Iterator[str]:
+		with self._lock:
+			values = {key: list(state) for key, state in self._values.items()}
+		for key, state in values.items():
+			labels = self._labels(key)
+			cumulative = 0.0
+			for bound, bucket_count in zip(self.buckets, state):
+				cumulative += bucket_count
+				bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+				yield f'{self.name}_bucket{bucket_labels} {_format_value(cumulative)}'
+			yield f'{self.name}_sum{_format_labels(labels)} {_format_value(state[-2])}'
+			yield f'{self.name}_count{_format_labels(labels)} {_format_value(state[-1])}'
+
+
+class MetricsRegistry:
+	"""Collection of metrics rendered together on a scrape"""
+
+	def __init__(self):
+		self._metrics: dict[str, Metric] = {}
+
+	def register(self, metric: Metric) -> Metric:
+		if metric.name in self._metrics:
+			raise ValueError(f'Metric {metric.name} is already registered')
+		self._metrics[metric.name] = metric
+		return metric
+
+	def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+		return self.register(Counter(name, documentation, labelnames))
+
+	def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+		return self.register(Gauge(name, documentation, labelnames))
+
+	def histogram(
+		self,
+		name: str,
+		documentation: str,
+		labelnames: tuple[str, ...] = (),
+		buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+	) -> Histogram:
+		return self.register(Histogram(name, documentation, labelnames, buckets))
+
+	def render(self) -> str:
+		"""Render all metrics in the Prometheus text exposition format"""
+		return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+def default_outcome(exc: BaseException | None) -> str:
+	"""Map the result of a timed block to an outcome label"""
+	if exc is None:
+		return 'success'
+	if isinstance(exc, asyncio.CancelledError):
+		return 'cancelled'
+	if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+		return 'timeout'
+	return 'error'
+
+
+@contextmanager
+def observe(
+	histogram: Histogram,
+	counter: Counter | None = None,
+	outcome: Callable[[BaseException | None], str] = default_outcome,
+	**labels: str,
+) -> Iterator[None]:
+	"""Time a block into a histogram and count it, labelled with its outcome
+
+	Works around awaits, so it can wrap async calls:
+
+	    with observe(MONGO_OPERATION_SECONDS, operation='insert_one'):
+	        await collection.insert_one(document)
+	"""
+	start = time.perf_counter()
+	error: BaseException | None = None
+	try:
+		yield
+	except BaseException as e:
+		error = e
+		raise
+	finally:
+		result = outcome(error)
+		histogram.observe(time.perf_counter() - start, outcome=result, **labels)
+		if counter is not None:
+			counter.inc(outcome=result, **labels)
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+	try:
+		request_line = await reader.readline()
+		# Drain headers, we only care about the request line
+		while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+			pass
+		parts = request_line.decode('latin-1').split()
+		if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+			status, content_type, body = '200 OK', CONTENT_TYPE, REGISTRY.render().encode()
+		else:
+			status, content_type, body = '404 Not Found', 'text/plain', b'Not Found\n'
+		writer.write(
+			f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+			f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1')
+			+ body
+		)
+		await writer.drain()
+	except Exception as e:
+		logger.warning(f'Error serving metrics scrape: {e}')
+	finally:
+		writer.close()
+
+
+async def start_metrics_server(port: int, host: str = '0.0.0.0') -> asyncio.Server:
+	"""Start a lightweight HTTP listener serving GET /metrics on the running loop"""
+	server = await asyncio.start_server(_handle_scrape, host, port)
+	logger.info(f'Serving metrics on http://{host}:{port}/metrics')
+	return server
+
+
+REGISTRY = MetricsRegistry()
+
+COMMANDS_TOTAL = REGISTRY.counter(
+	'debrief_commands_total', 'Commands executed by the command bus', ('command', 'outcome')
+)
+COMMAND_SECONDS = REGISTRY.histogram(
+	'debrief_command_duration_seconds', 'Command handler latency', ('command', 'outcome')
+)
+EVENT_HANDLER_CALLS_TOTAL = REGISTRY.counter(
+	'debrief_event_handler_calls_total',
+	'Event handler invocations by the event dispatcher',
+	('event', 'handler', 'outcome'),
+)
+EVENT_HANDLER_SECONDS = REGISTRY.histogram(
+	'debrief_event_handler_duration_seconds',
+	'Event handler latency',
+	('event', 'handler', 'outcome'),
+)
+GEMINI_REQUESTS_TOTAL = REGISTRY.counter(
+	'debrief_gemini_requests_total', 'Gemini API calls', ('model', 'operation', 'outcome')
+)
+GEMINI_REQUEST_SECONDS = REGISTRY.histogram(
+	'debrief_gemini_request_duration_seconds',
+	'Gemini API call latency including response validation',
+	('model', 'operation', 'outcome'),
+)
+MONGO_OPERATIONS_TOTAL = REGISTRY.counter(
+	'debrief_mongo_operations_total', 'MongoDB operations', ('operation', 'outcome')
+)
+MONGO_OPERATION_SECONDS = REGISTRY.histogram(
+	'debrief_mongo_operation_duration_seconds',
+	'MongoDB operation latency',
+	('operation', 'outcome'),
+)
+DISCORD_SENDS_TOTAL = REGISTRY.counter(
+	'debrief_discord_sends_total', 'Messages sent to Discord', ('kind', 'outcome')
+)
+DISCORD_SEND_SECONDS = REGISTRY.histogram(
+	'debrief_discord_send_duration_seconds', 'Discord message send latency', ('kind', 'outcome')
+)
+JOBS_TOTAL = REGISTRY.counter(
+	'debrief_jobs_total',
+	'Job queue transitions (enqueued, retried, done, failed, lease_lost)',
+	('type', 'outcome'),
+)
+JOB_SECONDS = REGISTRY.histogram(
+	'debrief_job_duration_seconds', 'Time a worker spent running a job', ('type', 'outcome')
+)
+GEMINI_CONCURRENCY_LIMIT = REGISTRY.gauge(
+	'debrief_gemini_concurrency_limit',
+	'Current adaptive concurrency limit for Gemini calls',
+	('traffic_class',),
+)
+GEMINI_INFLIGHT = REGISTRY.gauge(
+	'debrief_gemini_inflight_requests', 'Gemini calls currently in flight', ('traffic_class',)
+)
+GEMINI_BREAKER_STATE = REGISTRY.gauge(
+	'debrief_gemini_circuit_state',
+	'Gemini circuit breaker state (0 closed, 1 half-open, 2 open)',
+	('traffic_class',),
+)
+GEMINI_RETRIES_TOTAL = REGISTRY.counter(
+	'debrief_gemini_retries_total',
+	'Gemini calls retried after a failure',
+	('traffic_class', 'reason'),
+)
+GEMINI_HEDGES_TOTAL = REGISTRY.counter(
+	'debrief_gemini_hedges_total',
+	'Slow Gemini calls considered for hedging, by result',
+	('traffic_class', 'outcome'),
+)
+GEMINI_HEDGE_DELAY_SECONDS = REGISTRY.gauge(
+	'debrief_gemini_hedge_delay_seconds',
+	'Current wait before a Gemini call is hedged',
+	('traffic_class',),
+)
+GEMINI_ROUTING_TOTAL = REGISTRY.counter(
+	'debrief_gemini_routing_total', 'Gemini model tier outcomes', ('operation', 'model', 'outcome')
+)
+GEMINI_CONFIDENCE = REGISTRY.histogram(
+	'debrief_gemini_confidence',
+	'Confidence score of valid Gemini answers',
+	('operation', 'model'),
+	buckets=(0.25, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+GEMINI_REPAIRS_TOTAL = REGISTRY.counter(
+	'debrief_gemini_repairs_total',
+	'Invalid Gemini extractions by field-level repair result',
+	('outcome',),
+)
+GEMINI_NORMALIZED_FIELDS_TOTAL = REGISTRY.counter(
+	'debrief_gemini_normalized_fields_total',
+	'Near-miss enum values in Gemini answers mapped onto enum members locally',
+	('field',),
+)
+GEMINI_BATCH_SIZE = REGISTRY.histogram(
+	'debrief_gemini_batch_size',
+	'Screenshot analyses sent together in one Gemini request',
+	buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+GEMINI_BATCH_FALLBACKS_TOTAL = REGISTRY.counter(
+	'debrief_gemini_batch_fallbacks_total',
+	'Batched analyses retried as single requests',
+	('reason',),
+)
+GEMINI_TOKENS_TOTAL = REGISTRY.counter(
+	'debrief_gemini_tokens_total',
+	'Tokens reported by Gemini responses (prompt, output, thinking)',
+	('model', 'operation', 'kind'),
+)
+DUPLICATE_MATCHES_TOTAL = REGISTRY.counter(
+	'debrief_duplicate_matches_total',
+	'Repeated match submissions dropped, in memory or by the unique index',
+	('stage',),
+)
+DUPLICATE_SCREENSHOTS_TOTAL = REGISTRY.counter(
+	'debrief_duplicate_screenshots_total',
+	'Scoreboards hashing like a recent one: merged, distinct stats, or flagged (other user)',
+	('outcome',),
+)
+SCREENSHOTS_ARCHIVED_TOTAL = REGISTRY.counter(
+	'debrief_screenshots_archived_total',
+	'Screenshots sent to the archive (stored, deduplicated, failed)',
+	('outcome',),
+)
+EVENT_BACKGROUND_QUEUE_DEPTH = REGISTRY.gauge(
+	'debrief_event_background_queue_depth', 'Background event handlers waiting for a free slot'
+)
+EVENT_BACKGROUND_RUNNING = REGISTRY.gauge(
+	'debrief_event_background_running', 'Background event handlers currently running'
+)
+EVENT_BACKGROUND_WAIT_SECONDS = REGISTRY.histogram(
+	'debrief_event_background_wait_seconds',
+	'Time background event handlers spent queued before running',
+)
+EVENT_BACKGROUND_DROPPED_TOTAL = REGISTRY.counter(
+	'debrief_event_background_dropped_total',
+	'Background event handlers dropped because the queue was full',
+	('event', 'handler'),
+)
+COMMAND_SINGLE_FLIGHT_TOTAL = REGISTRY.counter(
+	'debrief_command_single_flight_total',
+	'Commands that joined an identical command already running instead of running again',
+	('command',),
+)
+DISCORD_SHARD_UP = REGISTRY.gauge(
+	'debrief_discord_shard_up',
+	'Whether each gateway shard run by this process is connected (1) or not (0)',
+	('shard',),
+)
+DISCORD_SHARD_LATENCY_SECONDS = REGISTRY.gauge(
+	'debrief_discord_shard_latency_seconds',
+	'Gateway heartbeat latency of each shard run by this process',
+	('shard',),
+)
@@ -0,0 +1,297 @@
+"""Lightweight trace context and span export
+
+A trace follows one user request through the command bus, event dispatcher and
+external calls. The active span lives in a context variable so it follows
+awaits and tasks, and `Command`/`Event` models copy it into `trace_id` and
+`parent_span_id` when they are created. Finished spans go to a background
+exporter that writes JSON lines or posts OTLP/HTTP JSON to a collector.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from app.shared.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def new_trace_id() -> str:
+	return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+	return secrets.token_hex(8)
+
+
+@dataclass
+class Span:
+	"""A timed unit of work within a trace"""
+
+	name: str
+	trace_id: str
+	span_id: str
+	parent_span_id: str | None = None
+	kind: str = 'internal'
+	start_time_ns: int = field(default_factory=time.time_ns)
+	end_time_ns: int | None = None
+	attributes: dict[str, Any] = field(default_factory=dict)
+	status: str = 'ok'
+	status_message: str | None = None
+
+	@property
+	def duration_ms(self) -> float | None:
+		if self.end_time_ns is None:
+			return None
+		return (self.end_time_ns - self.start_time_ns) / 1_000_000
+
+	def set_attribute(self, key: str, value: Any) -> None:
+		self.attributes[key] = value
+
+	def to_dict(self) -> dict[str, Any]:
+		return {
+			'name': self.name,
+			'trace_id': self.trace_id,
+			'span_id': self.span_id,
+			'parent_span_id': self.parent_span_id,
+			'kind': self.kind,
+			'start_time_ns': self.start_time_ns,
+			'end_time_ns': self.end_time_ns,
+			'duration_ms': self.duration_ms,
+			'attributes': self.attributes,
+			'status': self.status,
+			'status_message': self.status_message,
+		}
+
+
+_current_span: ContextVar[Span | None] = ContextVar('current_span', default=None)
+
+
+def current_span() -> Span | None:
+	return _current_span.get()
+
+
+def current_trace_id() -> str:
+	"""Trace ID of the active span, or a fresh one when starting a new trace"""
+	span = _current_span.get()
+	return span.trace_id if span is not None else new_trace_id()
+
+
+def current_span_id() -> str | None:
+	span = _current_span.get()
+	return span.span_id if span is not None else None
+
+
+class SpanProcessor:
+	"""Hands finished spans to an export function on a background thread
+
+	Spans are batched so the event loop never blocks on file or network I/O.
+	When the queue is full new spans are dropped rather than slowing requests.
+	"""
+
+	def __init__(
+		self,
+		export_batch: Callable[[list[Span]], None],
+		max_batch_size: int = 256,
+		flush_interval: float = 2.0,
+		max_queue_size: int = 10_000,
+	):
+		self.export_batch = export_batch
+		self.max_batch_size = max_batch_size
+		self.flush_interval = flush_interval
+		self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=max_queue_size)
+		self._dropped = 0
+		self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+		self._thread.start()
+
+	def on_end(self, span: Span) -> None:
+		try:
+			self._queue.put_nowait(span)
+		except queue.Full:
+			self._dropped += 1
+			if self._dropped == 1 or self._dropped % 1000 == 0:
+				logger.warning(f'Span export queue full, dropped {self._dropped} spans')
+
+	def _run(self) -> None:
+		batch: list[Span] = []
+		deadline = time.monotonic() + self.flush_interval
+		while True:
+			timeout = max(deadline - time.monotonic(), 0)
+			try:
+				span = self._queue.get(timeout=timeout)
+			except queue.Empty:
+				span = ...
+			if span is None:
+				self._flush(batch)
+				return
+			if span is not ...:
+				batch.append(span)
+			if len(batch) >= self.max_batch_size or time.monotonic() >= deadline:
+				self._flush(batch)
+				batch = []
+				deadline = time.monotonic() + self.flush_interval
+
+	def _flush(self, batch: list[Span]) -> None:
+		if not batch:
+			return
+		try:
+			self.export_batch(batch)
+		except Exception as e:
+			logger.warning(f'Failed to export {len(batch)} spans: {e}')
+
+	def shutdown(self, timeout: float = 5.0) -> None:
+		"""Flush queued spans and stop the export thread"""
+		if not self._thread.is_alive():
+			return
+		self._queue.put(None)
+		self._thread.join(timeout)
+
+
+def jsonl_writer(path: str) -> Callable[[list[Span]], None]:
+	"""Export function appending one JSON object per span to a file"""
+
+	def export(spans: list[Span]) -> None:
+		with open(path, 'a', encoding='utf-8') as f:
+			for span in spans:
+				f.write(json.dumps(span.to_dict(), default=str) + '\n')
+
+	return export
+
+
+_OTLP_KINDS = {'internal': 1, 'server': 2, 'client': 3, 'producer': 4, 'consumer': 5}
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+	if isinstance(value, bool):
+		return {'boolValue': value}
+	if isinstance(value, int):
+		return {'intValue': str(value)}
+	if isinstance(value, float):
+		return {'doubleValue': value}
+	return {'stringValue': str(value)}
+
+
+def to_otlp(spans: list[Span], service_name: str) -> dict[str, Any]:
+	"""Encode spans as an OTLP/HTTP JSON ExportTraceServiceRequest"""
+	otlp_spans = []
+	for span in spans:
+		otlp_span = {
+			'traceId': span.trace_id,
+			'spanId': span.span_id,
+			'name': span.name,
+			'kind': _OTLP_KINDS.get(span.kind, 1),
+			'startTimeUnixNano': str(span.start_time_ns),
+			'endTimeUnixNano': str(span.end_time_ns or span.start_time_ns),
+			'attributes': [
+				{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()
+			],
+			'status': {'code': 2 if span.status == 'error' else 1},
+		}
+		if span.parent_span_id:
+			otlp_span['parentSpanId'] = span.parent_span_id
+		if span.status_message:
+			otlp_span['status']['message'] = span.status_message
+		otlp_spans.append(otlp_span)
+
+	return {
+		'resourceSpans': [
+			{
+				'resource': {
+					'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]
+				},
+				'scopeSpans': [{'scope': {'name': 'debrief'}, 'spans': otlp_spans}],
+			}
+		]
+	}
+
+
+def otlp_http_poster(endpoint: str, service_name: str) -> Callable[[list[Span]], None]:
+	"""Export function posting spans to an OTLP/HTTP collector (JSON encoding)"""
+	import httpx
+
+	client = httpx.Client(timeout=5.0)
+
+	def export(spans: list[Span]) -> None:
+		response = client.post(endpoint, json=to_otlp(spans, service_name))
+		response.raise_for_status()
+
+	return export
+
+
+_processor: SpanProcessor | None = None
+
+
+def configure_tracing(service_name: str) -> SpanProcessor | None:
+	"""Install the exporter selected by TRACE_EXPORTER for this process"""
+	global _processor
+	if _processor is not None:
+		_processor.shutdown()
+		_processor = None
+
+	if settings.TRACE_EXPORTER == 'jsonl':
+		export = jsonl_writer(settings.TRACE_FILE)
+	elif settings.TRACE_EXPORTER == 'otlp':
+		export = otlp_http_poster(settings.OTLP_ENDPOINT, service_name)
+	else:
+		return None
+
+	_processor = SpanProcessor(export)
+	atexit.register(_processor.shutdown)
+	logger.info(f'Tracing enabled for {service_name} using {settings.TRACE_EXPORTER} exporter')
+	return _processor
+
+
+def set_span_processor(processor: SpanProcessor | None) -> None:
+	"""Replace the active span processor (useful for testing)"""
+	global _processor
+	_processor = processor
+
+
+@contextmanager
+def start_span(
+	name: str,
+	trace_id: str | None = None,
+	parent_span_id: str | None = None,
+	kind: str = 'internal',
+	**attributes: Any,
+) -> Iterator[Span]:
+	"""Run a block inside a span that becomes the current span
+
+	Without explicit IDs the span joins the current trace as a child of the
+	current span. Pass `trace_id`/`parent_span_id` from a `Command` or `Event`
+	to continue the trace that created it.
+	"""
+	parent = _current_span.get()
+	if trace_id is None:
+		trace_id = parent.trace_id if parent is not None else new_trace_id()
+		if parent_span_id is None and parent is not None:
+			parent_span_id = parent.span_id
+
+	span = Span(
+		name=name,
+		trace_id=trace_id,
+		span_id=new_span_id(),
+		parent_span_id=parent_span_id,
+		kind=kind,
+		attributes=attributes,
+	)
+	token = _current_span.set(span)
+	try:
+		yield span
+	except BaseException as e:
+		span.status = 'error'
+		span.status_message = f'{type(e).__name__}: {e}'
+		raise
+	finally:
+		span.end_time_ns = time.time_ns()
+		_current_span.reset(token)
+		if _processor is not None:
+			_processor.on_end(span)
@@ -1,10 +1,19 @@
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
 from bson import ObjectId
-from pymongo.asynchronous.database import AsyncDatabase
 
 from app.shared.models.schemas import MatchDocument, MongoPipeline
+from app.shared.observability.metrics import (
+	DUPLICATE_MATCHES_TOTAL,
+	MONGO_OPERATION_SECONDS,
+	MONGO_OPERATIONS_TOTAL,
+	observe,
+)
+from app.shared.observability.tracing import start_span
+
+if TYPE_CHECKING:
+	from pymongo.asynchronous.database import AsyncDatabase
 
 logger = logging.getLogger(__name__)
 
@@ -20,27 +29,154 @@ def serialize_mongo_documents(data: Any) -> Any:
 	return data
 
 
+def _match_key(match: MatchDocument) -> dict:
+	return {
+		'discord_message_id': match.discord_message_id,
+		'discord_user_id': match.discord_user_id,
+	}
+
+
 class MatchRepository:
 	"""Repository for managing match data in MongoDB"""
 
-	def __init__(self, db: AsyncDatabase):
-		self.db: AsyncDatabase = db
+	def __init__(self, db: 'AsyncDatabase'):
+		self.db: 'AsyncDatabase' = db
+
+	async def ensure_indexes(self) -> None:
+		"""Make (discord_message_id, discord_user_id) unique so repeats can't be saved twice"""
+		from pymongo.errors import OperationFailure
+
+		try:
+			await self.db.matches.create_index(
+				[('discord_message_id', 1), ('discord_user_id', 1)], name='message', unique=True
+			)
+		except OperationFailure as e:
+			# Existing duplicates block the index; upserts still dedupe, just not atomically
+			logger.error(f'Could not create unique match index, remove duplicate matches: {e}')
 
 	async def insert_one(self, match_data: MatchDocument) -> str:
-		"""Save analyzed match data to MongoDB"""
+		"""Save analyzed match data to MongoDB, once per Discord message
+
+		Saving a match for a message that already has one keeps the stored match
+		and returns its ID, so retried submissions are harmless.
+		"""
 		if not isinstance(match_data, MatchDocument):
 			raise ValueError('match_data must be an instance of MatchDocument')
-		result = await self.db.matches.insert_one(match_data.model_dump())
-		# Convert ObjectId to string to match expected return type
-		return str(result.inserted_id)
+		key = _match_key(match_data)
+		with (
+			start_span('mongo insert_one', kind='client', collection='matches'),
+			observe(MONGO_OPERATION_SECONDS, MONGO_OPERATIONS_TOTAL, operation='insert_one'),
+		):
+			# MongoDB retries an upsert that races another on the unique index
+			result = await self.db.matches.update_one(
+				key, {'$setOnInsert': match_data.to_mongo()}, upsert=True
+			)
+			if result.upserted_id is not None:
+				# Convert ObjectId to string to match expected return type
+				return str(result.upserted_id)
+			existing = await self.db.matches.find_one(key, {'_id': 1})
+		DUPLICATE_MATCHES_TOTAL.inc(stage='database')
+		logger.info(f'Match for message {match_data.discord_message_id} was already saved')
+		return str(existing['_id'])
+
+	async def insert_many(self, matches: list[MatchDocument]) -> list[str]:
+		"""Save many matches in one round trip, e.g. for a backfill
+
+		Matches for messages that are already saved are skipped. Returns the IDs
+		of the matches that were new.
+		"""
+		from pymongo import UpdateOne
+
+		if not all(isinstance(match, MatchDocument) for match in matches):
+			raise ValueError('matches must be MatchDocument instances')
+		if not matches:
+			return []
+		requests = [
+			UpdateOne(_match_key(match), {'$setOnInsert': match.to_mongo()}, upsert=True)
+			for match in matches
+		]
+		with (
+			start_span('mongo bulk_write', kind='client', collection='matches', count=len(matches)),
+			observe(MONGO_OPERATION_SECONDS, MONGO_OPERATIONS_TOTAL, operation='insert_many'),
+		):
+			result = await self.db.matches.bulk_write(requests, ordered=False)
+		duplicates = len(matches) - result.upserted_count
+		if duplicates:
+			DUPLICATE_MATCHES_TOTAL.inc(duplicates, stage='database')
+		return [str(result.upserted_ids[i]) for i in sorted(result.upserted_ids)]
+
+	async def iter_stale(
+		self, version: str, models: list[str], limit: int | None = None
+	) -> AsyncIterator[dict]:
+		"""Archived matches extracted with another prompt version or a retired model
+
+		Yields `_id`, `game_stats`, `screenshots` and `extraction` in `_id` order.
+		Matches without archived screenshots, or marked by
+		`mark_screenshots_missing`, can't be re-extracted and are skipped.
+		"""
+		query = {
+			'screenshots': {'$ne': None},
+			'screenshots_missing': {'$ne': True},
+			'$or': [
+				{'extraction.version': {'$ne': version}},
+				{'extraction.model': {'$nin': [*models, None]}},
+			],
+		}
+		projection = {'game_stats': 1, 'screenshots': 1, 'extraction': 1}
+		cursor = self.db.matches.find(query, projection).sort('_id', 1)
+		if limit is not None:
+			cursor = cursor.limit(limit)
+		async for document in cursor:
+			yield document
+
+	async def update_extractions(self, updates: list[tuple[Any, dict, dict]]) -> int:
+		"""Replace game_stats and the extraction stamp of many matches in one round trip
+
+		Each update is `(match _id, game_stats, extraction)`. Returns how many
+		matches were modified.
+		"""
+		from pymongo import UpdateOne
+
+		if not updates:
+			return 0
+		requests = [
+			UpdateOne({'_id': match_id}, {'$set': {'game_stats': stats, 'extraction': stamp}})
+			for match_id, stats, stamp in updates
+		]
+		with (
+			start_span('mongo bulk_write', kind='client', collection='matches', count=len(updates)),
+			observe(MONGO_OPERATION_SECONDS, MONGO_OPERATIONS_TOTAL, operation='update_many'),
+		):
+			result = await self.db.matches.bulk_write(requests, ordered=False)
+		return result.modified_count
+
+	async def mark_screenshots_missing(self, match_ids: list[Any]) -> int:
+		"""Flag matches whose archived screenshots are gone, so they aren't re-extracted
+
+		Returns how many matches were modified.
+		"""
+		if not match_ids:
+			return 0
+		with (
+			start_span('mongo update_many', kind='client', collection='matches'),
+			observe(MONGO_OPERATION_SECONDS, MONGO_OPERATIONS_TOTAL, operation='update_many'),
+		):
+			result = await self.db.matches.update_many(
+				{'_id': {'$in': match_ids}}, {'$set': {'screenshots_missing': True}}
+			)
+		return result.modified_count
 
 	async def aggregate(self, pipeline: dict) -> list[dict]:
 		"""Run an aggregation pipeline on the matches collection"""
 		mp = MongoPipeline.model_validate(pipeline)
 		pymongo_pipeline = [{s.operator: s.expression} for s in mp.stages]
 		logger.info(f'Running MongoDB aggregation with pipeline: {pymongo_pipeline}')
-		cursor = await self.db.matches.aggregate(pymongo_pipeline)
-		return await cursor.to_list(length=None)
+		with (
+			start_span('mongo aggregate', kind='client', collection='matches'),
+			observe(MONGO_OPERATION_SECONDS, MONGO_OPERATIONS_TOTAL, operation='aggregate'),
+		):
+			cursor = await self.db.matches.aggregate(pymongo_pipeline)
+			return await cursor.to_list(length=None)
 
 	async def list_by_user(
 		self, discord_user_id: int, limit: int = 10, skip: int = 0
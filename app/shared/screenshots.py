@@ -0,0 +1,140 @@
+"""Archive of original screenshot uploads in GridFS
+
+Keeping the uploads means a better prompt or model can be run again over past
+matches, and real screenshots can be turned into benchmark fixtures, without
+asking anyone to upload again.
+
+Screenshots are content-addressed. A match links to its screenshots by their
+SHA-256 digest, stored as `metadata.sha256` on the GridFS file, and a unique
+index on that field means the same image is stored only once, however often
+it is posted. Uploads and downloads go through GridFS in 255KB chunks, so a
+screenshot never has to fit in one BSON document.
+
+Every store of an image, new or deduplicated, sets `metadata.last_referenced`.
+Screenshots no match has referenced within the retention period are deleted
+by `prune`, which `app.tools.prune_screenshots` runs. A match keeps its
+digests after that, and `read` simply returns None for them.
+"""
+
+import hashlib
+import io
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, AsyncIterator
+
+from app.shared.observability.metrics import SCREENSHOTS_ARCHIVED_TOTAL
+from app.shared.observability.tracing import start_span
+
+if TYPE_CHECKING:
+	from pymongo.asynchronous.database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def digest(image: bytes) -> str:
+	"""Content address of a screenshot"""
+	return hashlib.sha256(image).hexdigest()
+
+
+class ScreenshotArchive:
+	"""Deduplicated screenshot storage in a GridFS bucket"""
+
+	def __init__(
+		self,
+		db: 'AsyncDatabase',
+		bucket_name: str = 'screenshots',
+		retention_days: int | None = 180,
+	):
+		self.db = db
+		self.bucket_name = bucket_name
+		self.retention_days = retention_days
+		self._bucket = None
+
+	@property
+	def bucket(self):
+		if self._bucket is None:
+			from gridfs import AsyncGridFSBucket
+
+			self._bucket = AsyncGridFSBucket(self.db, bucket_name=self.bucket_name)
+		return self._bucket
+
+	@property
+	def files(self):
+		return self.db[f'{self.bucket_name}.files']
+
+	async def ensure_indexes(self) -> None:
+		"""Make the content digest unique, so each image is stored once"""
+		await self.files.create_index('metadata.sha256', name='sha256', unique=True)
+		await self.files.create_index('metadata.last_referenced', name='last_referenced')
+
+	async def store(self, image: bytes, filename: str = 'screenshot') -> str:
+		"""Save a screenshot unless it is already archived, returning its digest"""
+		from bson import ObjectId
+		from pymongo.errors import DuplicateKeyError
+
+		key = digest(image)
+		now = datetime.now(timezone.utc)
+		with start_span('gridfs store', kind='client', bucket=self.bucket_name, size=len(image)):
+			existing = await self._find(key)
+			if existing is not None:
+				await self._touch({'_id': existing._id}, now)
+				SCREENSHOTS_ARCHIVED_TOTAL.inc(outcome='deduplicated')
+				return key
+			file_id = ObjectId()
+			try:
+				await self.bucket.upload_from_stream_with_id(
+					file_id,
+					filename,
+					io.BytesIO(image),
+					metadata={'sha256': key, 'last_referenced': now},
+				)
+			except DuplicateKeyError:
+				# Stored by someone else since the lookup. GridFS wrote our chunks
+				# before the files document was rejected, so they are orphaned.
+				await self.db[f'{self.bucket_name}.chunks'].delete_many({'files_id': file_id})
+				await self._touch({'metadata.sha256': key}, now)
+				SCREENSHOTS_ARCHIVED_TOTAL.inc(outcome='deduplicated')
+				return key
+		SCREENSHOTS_ARCHIVED_TOTAL.inc(outcome='stored')
+		return key
+
+	async def _touch(self, query: dict, now: datetime) -> None:
+		"""Record that a match referenced the screenshot, postponing its pruning"""
+		await self.files.update_one(query, {'$set': {'metadata.last_referenced': now}})
+
+	async def stream(self, key: str) -> AsyncIterator[bytes]:
+		"""Yield a screenshot chunk by chunk; nothing if it isn't archived"""
+		grid_out = await self._find(key)
+		if grid_out is None:
+			return
+		while chunk := await grid_out.readchunk():
+			yield chunk
+
+	async def read(self, key: str) -> bytes | None:
+		"""A whole screenshot, or None if it isn't archived"""
+		chunks = [chunk async for chunk in self.stream(key)]
+		return b''.join(chunks) if chunks else None
+
+	async def prune(self, now: datetime | None = None) -> int:
+		"""Delete screenshots not referenced within the retention period, returning how many"""
+		if self.retention_days is None:
+			return 0
+		cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+		query = {
+			'$or': [
+				{'metadata.last_referenced': {'$lt': cutoff}},
+				# Archived before last_referenced was recorded
+				{'metadata.last_referenced': {'$exists': False}, 'uploadDate': {'$lt': cutoff}},
+			]
+		}
+		deleted = 0
+		async for grid_out in self.bucket.find(query):
+			await self.bucket.delete(grid_out._id)
+			deleted += 1
+		logger.info(f'Pruned {deleted} screenshots last referenced before {cutoff:%Y-%m-%d}')
+		return deleted
+
+	async def _find(self, key: str):
+		async for grid_out in self.bucket.find({'metadata.sha256': key}, limit=1):
+			return grid_out
+		return None
@@ -0,0 +1,115 @@
+"""Micro-batching of screenshot analyses
+
+During bursts each `AnalyzeImagesCommand` would cost its own Gemini request.
+With batching enabled, analyses submitted within `max_wait` seconds of each
+other are packed into one request (up to `max_size` image sets), and Gemini
+answers with an array of `GameStatsResponse`. This saves per-request overhead
+and puts less pressure on the rate limit.
+
+Each result goes back to the caller that submitted it. Items the batch could
+not answer (a failed request, an invalid or low-confidence item) fall back
+to a normal single request, so batching never turns a success into a failure.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from app.shared.models.schemas import GameStatsResponse
+from app.shared.observability.metrics import GEMINI_BATCH_FALLBACKS_TOTAL, GEMINI_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+ImageSet = tuple[bytes, bytes | None]
+
+
+@dataclass
+class PendingAnalysis:
+	image_one: bytes
+	image_two: bytes | None
+	future: asyncio.Future
+
+
+class AnalysisBatcher:
+	"""Collects analyses for a short window and sends them as one request"""
+
+	def __init__(
+		self,
+		run_batch: Callable[[list[ImageSet]], Awaitable[list[GameStatsResponse | None]]],
+		run_single: Callable[[bytes, bytes | None], Awaitable[GameStatsResponse]],
+		max_size: int = 4,
+		max_wait: float = 0.3,
+	):
+		self.run_batch = run_batch
+		self.run_single = run_single
+		self.max_size = max_size
+		self.max_wait = max_wait
+		self._pending: list[PendingAnalysis] = []
+		self._timer: asyncio.Task | None = None
+		# Strong references so running batches aren't garbage collected
+		self._tasks: set[asyncio.Task] = set()
+
+	async def submit(self, image_one: bytes, image_two: bytes | None = None) -> GameStatsResponse:
+		"""Analyze one image set as part of the next batch"""
+		future = asyncio.get_running_loop().create_future()
+		self._pending.append(PendingAnalysis(image_one, image_two, future))
+		if len(self._pending) >= self.max_size:
+			self._flush()
+		elif self._timer is None:
+			self._timer = asyncio.create_task(self._flush_later())
+		return await future
+
+	async def _flush_later(self) -> None:
+		await asyncio.sleep(self.max_wait)
+		self._timer = None
+		self._flush()
+
+	def _flush(self) -> None:
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+		batch, self._pending = self._pending, []
+		if batch:
+			task = asyncio.create_task(self._run(batch))
+			self._tasks.add(task)
+			task.add_done_callback(self._tasks.discard)
+
+	async def _run(self, batch: list[PendingAnalysis]) -> None:
+		# Callers that gave up while waiting don't need an answer
+		batch = [pending for pending in batch if not pending.future.done()]
+		if not batch:
+			return
+		GEMINI_BATCH_SIZE.observe(len(batch))
+		if len(batch) == 1:
+			await self._single(batch[0])
+			return
+
+		try:
+			results = await self.run_batch(
+				[(pending.image_one, pending.image_two) for pending in batch]
+			)
+		except Exception as e:
+			logger.warning(f'Batch of {len(batch)} analyses failed, sending them one by one: {e}')
+			GEMINI_BATCH_FALLBACKS_TOTAL.inc(len(batch), reason='batch_failed')
+			results = [None] * len(batch)
+
+		await asyncio.gather(
+			*(self._resolve(pending, result) for pending, result in zip(batch, results))
+		)
+
+	async def _resolve(self, pending: PendingAnalysis, result: GameStatsResponse | None) -> None:
+		if result is None:
+			await self._single(pending)
+		elif not pending.future.done():
+			pending.future.set_result(result)
+
+	async def _single(self, pending: PendingAnalysis) -> None:
+		try:
+			result = await self.run_single(pending.image_one, pending.image_two)
+		except Exception as e:
+			if not pending.future.done():
+				pending.future.set_exception(e)
+		else:
+			if not pending.future.done():
+				pending.future.set_result(result)
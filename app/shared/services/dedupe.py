@@ -0,0 +1,64 @@
+"""Drop repeated match submissions before they cost anything
+
+The same `!stats` message can be delivered more than once: the gateway replays
+events after a resume, and the job queue retries a worker that lost its lease.
+Every repeat would mean another Gemini analysis and another match in MongoDB.
+
+`RecentKeys` remembers the (message, user) keys this process has accepted in
+the last `ttl` seconds, up to `max_size` keys, so repeats are dropped before
+any work starts. A key is released again if its analysis or its save fails,
+so a genuine retry still goes through. Repeats that reach another process are caught by the
+unique index on the matches collection (see `MatchRepository.ensure_indexes`).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from app.shared.observability.metrics import DUPLICATE_MATCHES_TOTAL
+
+
+class RecentKeys:
+	"""Bounded set of keys seen recently, oldest forgotten first"""
+
+	def __init__(
+		self,
+		max_size: int = 10_000,
+		ttl: float = 3600.0,
+		clock: Callable[[], float] = time.monotonic,
+	):
+		self.max_size = max_size
+		self.ttl = ttl
+		self.clock = clock
+		self._seen: OrderedDict[Hashable, float] = OrderedDict()
+
+	def claim(self, key: Hashable) -> bool:
+		"""Remember `key`, returning False if it was already claimed"""
+		now = self.clock()
+		self._expire(now)
+		if key in self._seen:
+			DUPLICATE_MATCHES_TOTAL.inc(stage='memory')
+			return False
+		self._seen[key] = now
+		if len(self._seen) > self.max_size:
+			self._seen.popitem(last=False)
+		return True
+
+	def release(self, key: Hashable) -> None:
+		"""Forget `key` so it can be claimed again"""
+		self._seen.pop(key, None)
+
+	def _expire(self, now: float) -> None:
+		# Keys are claimed in time order, so expired ones are at the front
+		while self._seen:
+			key, claimed_at = next(iter(self._seen.items()))
+			if now - claimed_at < self.ttl:
+				break
+			del self._seen[key]
+
+	def __contains__(self, key: Hashable) -> bool:
+		claimed_at = self._seen.get(key)
+		return claimed_at is not None and self.clock() - claimed_at < self.ttl
+
+	def __len__(self) -> int:
+		return len(self._seen)
@@ -1,14 +1,94 @@
+import asyncio
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
 import logging
 
 from app.bot.commands import AnalyzeImagesCommand, QueryDatabaseCommand
+from app.shared.core.settings import Settings, settings
+from app.shared.observability.memory import memory_report
+from app.shared.observability.metrics import DISCORD_SHARD_LATENCY_SECONDS, DISCORD_SHARD_UP
+from app.shared.observability.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+def bot_intents(prefix_commands: bool, lean: bool = True) -> discord.Intents:
+    """Gateway intents for the bot
+
+    Prefix commands need every guild message and its content. Slash commands
+    arrive as interactions whatever the intents, so without prefix commands
+    message events are not subscribed to at all. The lean policy keeps only
+    the guild events that channel lookups for replies rely on, instead of also
+    caching emojis, voice states, reactions and the like.
+    """
+    intents = discord.Intents.none() if lean else discord.Intents.default()
+    intents.guilds = True
+    intents.message_content = prefix_commands
+    intents.messages = prefix_commands
+    return intents
+
+
+def bot_options(config: Settings = settings) -> dict:
+    """Intents and cache settings for the bot, from DISCORD_CACHE_POLICY"""
+    lean = config.DISCORD_CACHE_POLICY == "lean"
+    options = {"intents": bot_intents(config.DISCORD_PREFIX_COMMANDS_ENABLED, lean)}
+    if lean:
+        # discord.py reads max_messages=0 as its default of 1000; None disables it
+        options["max_messages"] = config.DISCORD_MAX_MESSAGES or None
+        options["member_cache_flags"] = discord.MemberCacheFlags.none()
+        options["chunk_guilds_at_startup"] = False
+    return options
+
+
+def cache_sizes(client: discord.Client) -> dict[str, int]:
+    """Objects held in the bot's Discord cache"""
+    guilds = client.guilds
+    return {
+        "guilds": len(guilds),
+        "channels": sum(len(guild.channels) for guild in guilds),
+        "members": sum(len(guild.members) for guild in guilds),
+        "emojis": len(client.emojis),
+        "messages": len(client.cached_messages),
+    }
+
+
+def shard_options(config: Settings = settings) -> dict:
+    """Shard count and the shards this process runs, when auto-sharding"""
+    if not config.DISCORD_AUTO_SHARD:
+        return {}
+    options = {"shard_count": config.DISCORD_SHARD_COUNT}
+    if config.DISCORD_SHARD_IDS:
+        if config.DISCORD_SHARD_COUNT is None:
+            raise ValueError("DISCORD_SHARD_IDS needs DISCORD_SHARD_COUNT")
+        options["shard_ids"] = [int(i) for i in config.DISCORD_SHARD_IDS.split(",")]
+    return options
+
+
+def create_bot(config: Settings = settings) -> commands.Bot:
+    """The gateway bot; an AutoShardedBot when DISCORD_AUTO_SHARD is set"""
+    bot_class = commands.AutoShardedBot if config.DISCORD_AUTO_SHARD else commands.Bot
+    return bot_class(command_prefix="!", **bot_options(config), **shard_options(config))
+
+
+def shard_health(client: discord.Client) -> dict[int, tuple[bool, float]]:
+    """Whether each shard of this process is connected, and its heartbeat latency"""
+    shards = getattr(client, "shards", None)
+    if shards is None:
+        connected = client.is_ready() and not client.is_closed()
+        return {client.shard_id or 0: (connected, client.latency)}
+    return {
+        shard_id: (not shard.is_closed(), shard.latency) for shard_id, shard in shards.items()
+    }
+
+
+def record_shard_health(client: discord.Client) -> None:
+    for shard_id, (connected, latency) in shard_health(client).items():
+        DISCORD_SHARD_UP.set(1 if connected else 0, shard=shard_id)
+        DISCORD_SHARD_LATENCY_SECONDS.set(latency, shard=shard_id)
+
+
+bot = create_bot()
 
 
 @bot.event
@@ -16,6 +96,39 @@ async def on_ready():
     logger.debug("Logged in as %s", bot.user)
 
 
+@tasks.loop(seconds=30)
+async def shard_health_loop():
+    record_shard_health(bot)
+
+
+@bot.event
+async def setup_hook():
+    # Registering slash commands with Discord is rate limited, so it can be
+    # turned off once they are in place
+    if settings.DISCORD_SYNC_COMMANDS:
+        synced = await bot.tree.sync()
+        logger.info(f"Synced {len(synced)} slash commands")
+    shard_health_loop.start()
+
+
+@bot.event
+async def on_shard_ready(shard_id):
+    logger.info(f"Shard {shard_id} ready")
+    record_shard_health(bot)
+
+
+@bot.event
+async def on_shard_disconnect(shard_id):
+    logger.warning(f"Shard {shard_id} disconnected")
+    record_shard_health(bot)
+
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    logger.info(f"Shard {shard_id} resumed")
+    record_shard_health(bot)
+
+
 @bot.command()
 async def ping(ctx):
     logger.info(f"ping command triggered by {ctx.author}")
@@ -25,6 +138,12 @@ async def ping(ctx):
 @bot.command()
 async def stats(ctx):
     """Analyzes game stats from two images using Gemini AI."""
+    # Root span for the whole request - the command and its events join this trace
+    with start_span("discord !stats", discord_message_id=ctx.message.id):
+        await _stats(ctx)
+
+
+async def _stats(ctx):
     logger.info(f"stats command triggered by {ctx.author}")
 
     try:
@@ -86,7 +205,11 @@ async def _execute_analyze_command(ctx, *, image_one, image_two=None):
 @bot.command()
 async def query(ctx):
     """Queries Gemini AI with user input and returns the response."""
+    with start_span("discord !query", discord_message_id=ctx.message.id):
+        await _query(ctx)
 
+
+async def _query(ctx):
     message_content = ctx.message.content[len("!query ") :].strip()
 
     if not message_content:
@@ -114,3 +237,99 @@ async def query(ctx):
     except Exception as e:
         logger.error(f"Error in query command: {str(e)}", exc_info=True)
         await ctx.send(f"❌ Error processing request: {str(e)}")
+
+
+# Slash commands. They are acknowledged with a deferred response straight
+# away, because Discord drops interactions not answered within three seconds.
+# Results arrive later as follow-up messages sent by the event handlers, using
+# the interaction token carried on the command.
+
+
+@bot.tree.command(name="ping", description="Check that the bot is responding")
+async def ping_slash(interaction: discord.Interaction):
+    logger.info(f"/ping triggered by {interaction.user}")
+    await interaction.response.send_message("Pong!")
+
+
+@bot.tree.command(name="stats", description="Extract your stats from match screenshots")
+@app_commands.describe(
+    scoreboard="End-of-game scoreboard screenshot", weapons="Weapon stats screenshot"
+)
+async def stats_slash(
+    interaction: discord.Interaction,
+    scoreboard: discord.Attachment,
+    weapons: discord.Attachment | None = None,
+):
+    with start_span("discord /stats", discord_message_id=interaction.id):
+        await _stats_interaction(interaction, [a for a in (scoreboard, weapons) if a])
+
+
+async def _stats_interaction(interaction: discord.Interaction, attachments):
+    logger.info(f"/stats triggered by {interaction.user}")
+    try:
+        _validate_attachments(attachments)
+    except ValueError as e:
+        logger.warning(str(e))
+        await interaction.response.send_message(str(e), ephemeral=True)
+        return
+
+    await interaction.response.defer(thinking=True)
+    try:
+        image_one, image_two = await _download_images(attachments)
+        command = AnalyzeImagesCommand(
+            image_one=image_one,
+            image_two=image_two,
+            discord_user_id=interaction.user.id,
+            discord_message_id=interaction.id,
+            discord_channel_id=interaction.channel_id,
+            discord_interaction_token=interaction.token,
+        )
+        await interaction.client.command_bus.execute(command)
+    except Exception as e:
+        logger.error(f"Error in /stats: {str(e)}", exc_info=True)
+        await interaction.followup.send(f"❌ Error processing request: {str(e)}")
+
+
+@bot.tree.command(name="query", description="Ask a question about your match history")
+@app_commands.describe(question="For example: what is my average K/D on Hardpoint?")
+async def query_slash(interaction: discord.Interaction, question: str):
+    with start_span("discord /query", discord_message_id=interaction.id):
+        await _query_interaction(interaction, question.strip())
+
+
+async def _query_interaction(interaction: discord.Interaction, question: str):
+    logger.info(f"/query triggered by {interaction.user} with query: {question}")
+    if not question:
+        await interaction.response.send_message("Please provide a query.", ephemeral=True)
+        return
+
+    await interaction.response.defer(thinking=True)
+    try:
+        command = QueryDatabaseCommand(
+            query=question,
+            discord_user_id=interaction.user.id,
+            discord_message_id=interaction.id,
+            discord_channel_id=interaction.channel_id,
+            discord_interaction_token=interaction.token,
+        )
+        await interaction.client.command_bus.execute(command)
+    except Exception as e:
+        logger.error(f"Error in /query: {str(e)}", exc_info=True)
+        await interaction.followup.send(f"❌ Error processing request: {str(e)}")
+
+
+@bot.tree.command(name="memory", description="Memory report for the bot process (owner only)")
+@app_commands.default_permissions(administrator=True)
+async def memory_slash(interaction: discord.Interaction):
+    if not await interaction.client.is_owner(interaction.user):
+        await interaction.response.send_message(
+            "This command is for the bot owner.", ephemeral=True
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    # Walking every object is slow; run it off the loop so the shards keep heartbeating
+    report = await asyncio.to_thread(memory_report, caches=cache_sizes(interaction.client))
+    logger.info(f"Memory report requested by {interaction.user}:\n{report}")
+    # Discord messages are capped at 2000 characters
+    await interaction.followup.send(f"```\n{report[:1900]}\n```", ephemeral=True)
@@ -1,7 +1,42 @@
-from google import genai
-from google.genai import types
+import copy
+import hashlib
 import json
+import logging
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, TypeVar
+from pydantic import BaseModel, ValidationError
+from app.shared.core.settings import settings
+from app.shared.models.normalize import normalize_game_stats
 from app.shared.models.schemas import GameStatsResponse, MongoPipeline, MatchDocument
+from app.shared.observability.metrics import (
+    GEMINI_BATCH_FALLBACKS_TOTAL,
+    GEMINI_NORMALIZED_FIELDS_TOTAL,
+    GEMINI_REPAIRS_TOTAL,
+    GEMINI_REQUEST_SECONDS,
+    GEMINI_REQUESTS_TOTAL,
+    GEMINI_TOKENS_TOTAL,
+    default_outcome,
+    observe,
+)
+from app.shared.observability.tracing import start_span
+from app.shared.services.batching import AnalysisBatcher
+from app.shared.services.gemini_gateway import ANALYSIS, QUERY
+from app.shared.services.model_router import ModelRouter, extraction_confidence
+from app.shared.services.repair import RepairPlan, plan_repair
+
+# google.genai takes a few hundred milliseconds to import, so it is only loaded
+# when a client is created. Processes that never call Gemini don't pay for it.
+if TYPE_CHECKING:
+    import httpx
+    from google.genai import types
+
+    from app.shared.services.gemini_gateway import GeminiGateway
+    from app.shared.services.hedging import Hedger
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 MATCH_ANALYSIS_PROMPT = """
 Here are two images of a player in Call of Duty: Black ops 7.
@@ -12,7 +47,16 @@ the scoreboard. Be careful to distinguish zeros and eights, since
 the zeros tend to have a dot in the middle of them. 
 """
 
-DB_QUERY_PROMPT = """
+BATCH_ANALYSIS_PROMPT = (
+    MATCH_ANALYSIS_PROMPT
+    + """
+The screenshots below come from %d different matches. Each match starts with
+a "Match N:" line followed by its screenshots. Return a JSON array with one
+object per match, in the same order as the matches.
+"""
+)
+
+_DB_QUERY_PROMPT_TEMPLATE = """
 You are a PyMongo and MongoDB analytics expert.
 
 The collection contains match documents with the following schema:
@@ -34,39 +78,389 @@ Rules:
 - CRITICAL: Every $group stage MUST include an "_id" field. Use "_id": null for aggregations across all documents, or specify a grouping field like "_id": "$field_name".
 
 Generate a MongoDB aggregation pipeline based on the following user request:
-""" % (
-    MatchDocument.model_json_schema()
-)
+"""
+
+
+@cache
+def db_query_prompt() -> str:
+    """Query prompt with the match schema, generated once on first use"""
+    return _DB_QUERY_PROMPT_TEMPLATE % (MatchDocument.model_json_schema(),)
+
+
+@cache
+def _json_schema(model: type[BaseModel]) -> dict[str, Any]:
+    return model.model_json_schema()
+
+
+def response_schema(model: type[BaseModel]) -> dict[str, Any]:
+    """JSON schema for a response model, generated once per model.
+
+    Returns a copy because the SDK rewrites schema dicts in place.
+    """
+    return copy.deepcopy(_json_schema(model))
+
+
+@cache
+def _batch_json_schema() -> dict[str, Any]:
+    items = copy.deepcopy(_json_schema(GameStatsResponse))
+    # Keep shared definitions at the root so "#/$defs/..." references resolve
+    defs = items.pop("$defs", {})
+    return {"type": "array", "items": items, "$defs": defs}
+
+
+def batch_response_schema() -> dict[str, Any]:
+    """Schema for an array of GameStatsResponse, copied for the same reason"""
+    return copy.deepcopy(_batch_json_schema())
+
+
+@cache
+def extraction_version() -> str:
+    """Fingerprint of the analysis prompt and response schema
+
+    Stored on every match, so matches extracted before a prompt or schema
+    change can be found and re-extracted.
+    """
+    digest = hashlib.sha256(MATCH_ANALYSIS_PROMPT.encode())
+    digest.update(json.dumps(_json_schema(GameStatsResponse), sort_keys=True).encode())
+    return digest.hexdigest()[:12]
+
+
+@dataclass
+class _PendingRepair:
+    """An extraction that failed validation on a few fields, kept for repair"""
+
+    data: Any
+    plan: RepairPlan
+
+
+def __getattr__(name: str):
+    # Keep DB_QUERY_PROMPT importable without building it at import time
+    if name == "DB_QUERY_PROMPT":
+        return db_query_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def gemini_outcome(exc: BaseException | None) -> str:
+    """Outcome label for a Gemini call, separating quota and bad output failures"""
+    from google.genai import errors
+
+    if isinstance(exc, errors.APIError) and exc.code == 429:
+        return "rate_limited"
+    if isinstance(exc, (ValidationError, json.JSONDecodeError)):
+        return "invalid_response"
+    return default_outcome(exc)
+
+
+def record_usage(response: Any, model: str, operation: str) -> None:
+    """Count the tokens a response reports, when it carries usage metadata"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, attribute in (
+        ("prompt", "prompt_token_count"),
+        ("output", "candidates_token_count"),
+        ("thinking", "thoughts_token_count"),
+    ):
+        count = getattr(usage, attribute, None)
+        if count:
+            GEMINI_TOKENS_TOTAL.inc(count, model=model, operation=operation, kind=kind)
 
 
 class GeminiClient:
     model = "gemini-2.5-flash-lite"
 
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str | None = None,
+        http_client: "httpx.AsyncClient | None" = None,
+        gateway: "GeminiGateway | None" = None,
+        hedger: "Hedger | None" = None,
+        router: "ModelRouter | None" = None,
+        repair_max_fields: int | None = None,
+        enum_match_threshold: float | None = None,
+        batch_max_size: int = 1,
+        batch_max_wait: float = 0.3,
+    ):
+        from google import genai
+        from google.genai import types
+
+        # GEMINI_BASE_URL points the SDK at a stand-in server (app.gemini_stub)
+        base_url = base_url or settings.GEMINI_BASE_URL
+        http_options = None
+        if base_url or http_client is not None:
+            # A caller-owned httpx client is reused across requests and is not
+            # closed by the SDK
+            http_options = types.HttpOptions(
+                base_url=base_url, httpx_async_client=http_client
+            )
         if api_key is None:
-            self.client = genai.Client()
+            self.client = genai.Client(http_options=http_options)
         else:
-            self.client = genai.Client(api_key=api_key)
+            self.client = genai.Client(api_key=api_key, http_options=http_options)
+        # Concurrency limits, circuit breaking and retries; calls go straight
+        # to the SDK when no gateway is given
+        self.gateway = gateway
+        # Sends a second copy of unusually slow calls when given
+        self.hedger = hedger
+        # Models to try per operation; without a router every call uses `model`
+        self.router = router or ModelRouter.single(self.model)
+        # Invalid extractions with at most this many bad fields are repaired
+        # by re-asking just those fields; 0 disables repair
+        self.repair_max_fields = (
+            settings.GEMINI_REPAIR_MAX_FIELDS
+            if repair_max_fields is None
+            else repair_max_fields
+        )
+        # Similarity needed to map a misspelt weapon, map or team onto its enum
+        self.enum_match_threshold = (
+            settings.GEMINI_ENUM_MATCH_THRESHOLD
+            if enum_match_threshold is None
+            else enum_match_threshold
+        )
+        # Concurrent analyses share one request when batching is enabled
+        self.batcher = None
+        if batch_max_size > 1:
+            self.batcher = AnalysisBatcher(
+                self._generate_game_stats_batch,
+                self._generate_game_stats,
+                max_size=batch_max_size,
+                max_wait=batch_max_wait,
+            )
+
+    async def aclose(self) -> None:
+        await self.client.aio.aclose()
+
+    async def _send(
+        self,
+        traffic_class: str,
+        operation: str,
+        model: str,
+        request: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Send one logical request to a model, through the gateway when configured"""
+
+        async def attempt() -> T:
+            with (
+                start_span("gemini generate_content", kind="client", model=model),
+                observe(
+                    GEMINI_REQUEST_SECONDS,
+                    GEMINI_REQUESTS_TOTAL,
+                    outcome=gemini_outcome,
+                    model=model,
+                    operation=operation,
+                ),
+            ):
+                return await request()
+
+        async def timed_attempt() -> T:
+            # The hedge threshold learns from single attempts, without retry sleeps
+            return await self.hedger.timed(traffic_class, attempt)
+
+        async def send() -> T:
+            once = attempt if self.hedger is None else timed_attempt
+            if self.gateway is None:
+                return await once()
+            return await self.gateway.call(traffic_class, once)
+
+        if self.hedger is None:
+            return await send()
+        return await self.hedger.run(traffic_class, send)
 
     async def generate_game_stats(
         self, image_one: bytes, image_two: bytes | None = None
     ) -> GameStatsResponse:
-        async with self.client.aio as aclient:
-            response = await aclient.models.generate_content(
-                model=self.model,
-                contents=self.create_contents(image_one, image_two),
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=GameStatsResponse.model_json_schema(),
-                ),
+        if self.batcher is not None:
+            return await self.batcher.submit(image_one, image_two)
+        return await self._generate_game_stats(image_one, image_two)
+
+    async def _generate_game_stats(
+        self, image_one: bytes, image_two: bytes | None = None
+    ) -> GameStatsResponse:
+        async def request(model: str) -> GameStatsResponse:
+            stats = await self._send(
+                ANALYSIS,
+                "generate_game_stats",
+                model,
+                lambda: self._request_game_stats(model, image_one, image_two),
             )
+            if isinstance(stats, _PendingRepair):
+                # A separate request, so retrying it never repeats the extraction
+                stats = await self._repair_game_stats(model, image_one, image_two, stats)
+            stats._extracted_by = model
+            return stats
+
+        with start_span("gemini generate_game_stats"):
+            return await self.router.run(ANALYSIS, request, confidence=extraction_confidence)
+
+    async def _generate_game_stats_batch(
+        self, image_sets: list[tuple[bytes, bytes | None]]
+    ) -> list[GameStatsResponse | None]:
+        """Analyze several image sets in one request on the fastest model
+
+        Items that come back invalid or below the router's confidence threshold
+        are None, for the caller to retry as single requests.
+        """
+        model = self.router.models(ANALYSIS)[0]
+        with start_span("gemini generate_game_stats_batch", size=len(image_sets)):
+            items = await self._send(
+                ANALYSIS,
+                "generate_game_stats_batch",
+                model,
+                lambda: self._request_game_stats_batch(model, image_sets),
+            )
+        return [self._batch_item(item, model) for item in items]
+
+    async def _request_game_stats_batch(
+        self, model: str, image_sets: list[tuple[bytes, bytes | None]]
+    ) -> list[Any]:
+        from google.genai import types
+
+        contents: list["types.Part | str"] = [BATCH_ANALYSIS_PROMPT % len(image_sets)]
+        for number, (image_one, image_two) in enumerate(image_sets, 1):
+            contents.append(f"Match {number}:")
+            contents.extend(self.create_contents(image_one, image_two)[1:])
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=batch_response_schema(),
+            ),
+        )
+        record_usage(response, model, "generate_game_stats_batch")
+        items = json.loads(response.text)
+        if not isinstance(items, list) or len(items) != len(image_sets):
+            raise ValueError(f"Expected a list of {len(image_sets)} analyses")
+        return items
+
+    def _batch_item(self, data: Any, model: str) -> GameStatsResponse | None:
+        try:
+            stats = GameStatsResponse.model_validate(data)
+        except ValidationError as e:
+            try:
+                stats = self._validate_normalized(data, e)
+            except ValidationError:
+                GEMINI_BATCH_FALLBACKS_TOTAL.inc(reason="invalid")
+                return None
+        if extraction_confidence(stats) < self.router.min_confidence:
+            GEMINI_BATCH_FALLBACKS_TOTAL.inc(reason="low_confidence")
+            return None
+        stats._extracted_by = model
+        return stats
+
+    async def _request_game_stats(
+        self, model: str, image_one: bytes, image_two: bytes | None
+    ) -> GameStatsResponse | _PendingRepair:
+        from google.genai import types
+
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=self.create_contents(image_one, image_two),
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema(GameStatsResponse),
+            ),
+        )
+        record_usage(response, model, "generate_game_stats")
+        try:
             return GameStatsResponse.model_validate_json(response.text)
+        except ValidationError as e:
+            error = e
+
+        # Valid answers never get here, so normalizing costs nothing on the
+        # common path. Near-miss enum values are fixed locally first, and only
+        # what is still invalid is sent back to Gemini.
+        try:
+            data = json.loads(response.text)
+        except json.JSONDecodeError:
+            raise error
+        try:
+            return self._validate_normalized(data, error)
+        except ValidationError as e:
+            error = e
+        if not self.repair_max_fields:
+            raise error
+        plan = plan_repair(data, error, self.repair_max_fields)
+        if plan is None:
+            GEMINI_REPAIRS_TOTAL.inc(outcome="unrepairable")
+            raise error
+        return _PendingRepair(data, plan)
+
+    def _validate_normalized(
+        self, data: Any, error: ValidationError
+    ) -> GameStatsResponse:
+        """Validate an answer after fixing near-miss enum values in place
+
+        Raises `error` unchanged when there was nothing to normalize.
+        """
+        normalized = normalize_game_stats(data, self.enum_match_threshold)
+        if not normalized:
+            raise error
+        for path in normalized:
+            GEMINI_NORMALIZED_FIELDS_TOTAL.inc(field=".".join(path))
+        return GameStatsResponse.model_validate(data)
+
+    async def _repair_game_stats(
+        self,
+        model: str,
+        image_one: bytes,
+        image_two: bytes | None,
+        pending: _PendingRepair,
+    ) -> GameStatsResponse:
+        """Re-ask only the fields that failed validation and merge them back in
+
+        The repair is its own Gemini request, with its own concurrency slot,
+        retries and metrics. An answer that is still invalid raises.
+        """
+        plan = pending.plan
+        logger.info(f"Repairing {len(plan.paths)} invalid fields: {plan.paths}")
+        with start_span("gemini repair", fields=len(plan.paths)):
+            try:
+                stats = await self._send(
+                    ANALYSIS,
+                    "repair_game_stats",
+                    model,
+                    lambda: self._request_repair(model, image_one, image_two, pending),
+                )
+            except ValidationError:
+                GEMINI_REPAIRS_TOTAL.inc(outcome="failed")
+                raise
+        GEMINI_REPAIRS_TOTAL.inc(outcome="repaired")
+        return stats
+
+    async def _request_repair(
+        self,
+        model: str,
+        image_one: bytes,
+        image_two: bytes | None,
+        pending: _PendingRepair,
+    ) -> GameStatsResponse:
+        from google.genai import types
+
+        plan = pending.plan
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=self.create_contents(image_one, image_two, prompt=plan.prompt()),
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_json_schema=plan.model.model_json_schema(),
+            ),
+        )
+        record_usage(response, model, "repair_game_stats")
+        repair = plan.model.model_validate_json(response.text)
+        return GameStatsResponse.model_validate(plan.merge(pending.data, repair))
 
     def create_contents(
-        self, image_one: bytes, image_two: bytes | None = None
-    ) -> list[types.Part | str]:
+        self,
+        image_one: bytes,
+        image_two: bytes | None = None,
+        prompt: str = MATCH_ANALYSIS_PROMPT,
+    ) -> list["types.Part | str"]:
+        from google.genai import types
+
         contents = [
-            MATCH_ANALYSIS_PROMPT,
+            prompt,
             types.Part.from_bytes(
                 data=image_one,
                 mime_type="image/png",
@@ -82,14 +476,31 @@ class GeminiClient:
         return contents
 
     async def generate_db_query(self, prompt: str) -> dict:
-        async with self.client.aio as aclient:
-            response = await aclient.models.generate_content(
-                model=self.model,
-                contents=DB_QUERY_PROMPT + prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_json_schema=MongoPipeline.model_json_schema(),
+        with start_span("gemini generate_db_query"):
+            return await self.router.run(
+                QUERY,
+                lambda model: self._send(
+                    QUERY,
+                    "generate_db_query",
+                    model,
+                    lambda: self._request_db_query(model, prompt),
                 ),
             )
-            # Return the parsed pipeline dict from the response
-            return response.parsed
+
+    async def _request_db_query(self, model: str, prompt: str) -> dict:
+        from google.genai import types
+
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=db_query_prompt() + prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_json_schema=response_schema(MongoPipeline),
+            ),
+        )
+        record_usage(response, model, "generate_db_query")
+        # Validate here so an unusable pipeline escalates to the next model
+        # instead of failing later in the repository
+        MongoPipeline.model_validate(response.parsed)
+        # Return the parsed pipeline dict from the response
+        return response.parsed
@@ -0,0 +1,348 @@
+"""Load control for Gemini calls: adaptive concurrency, circuit breaking and retries
+
+Each traffic class ("analysis" for screenshot extraction, "query" for !query
+pipelines) has its own budget. A burst of screenshot analyses under quota
+pressure therefore cannot starve the cheap query calls, and the reverse holds too.
+
+- `AdaptiveLimiter` caps in-flight calls with an AIMD limit. The limit grows by
+  about one slot per window of fast successes and is cut multiplicatively on a
+  429 or when latency goes over target.
+- `CircuitBreaker` fails fast after repeated upstream failures. After a cool-down
+  it lets a single probe call through (half-open) and closes again if the probe
+  succeeds.
+- `GeminiGateway.call` retries rate limits and transient failures with full
+  jitter backoff. It never waits less than the server's `Retry-After`.
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+from app.shared.core.settings import Settings, settings
+from app.shared.observability.metrics import (
+	GEMINI_BREAKER_STATE,
+	GEMINI_CONCURRENCY_LIMIT,
+	GEMINI_INFLIGHT,
+	GEMINI_RETRIES_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+ANALYSIS = 'analysis'
+QUERY = 'query'
+
+# Failure classes
+RATE_LIMITED = 'rate_limited'
+UNAVAILABLE = 'unavailable'
+FATAL = 'fatal'
+
+_UNAVAILABLE_CODES = {500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+	"""Raised instead of calling Gemini while the circuit is open"""
+
+	def __init__(self, traffic_class: str, retry_in: float):
+		self.traffic_class = traffic_class
+		self.retry_in = retry_in
+		super().__init__(
+			f'Gemini is temporarily unavailable, try again in {max(retry_in, 1):.0f} seconds'
+		)
+
+
+def classify_failure(exc: BaseException) -> str:
+	"""Whether a failed call was rate limited, transiently unavailable or should not be retried"""
+	import httpx
+	from google.genai import errors
+
+	if isinstance(exc, errors.APIError):
+		if exc.code == 429:
+			return RATE_LIMITED
+		if exc.code in _UNAVAILABLE_CODES:
+			return UNAVAILABLE
+		return FATAL
+	if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, TimeoutError, ConnectionError)):
+		return UNAVAILABLE
+	return FATAL
+
+
+def _parse_duration(value: str) -> float | None:
+	"""Parse a google.rpc.RetryInfo duration such as '3s' or '1.5s'"""
+	try:
+		return float(value.rstrip('s'))
+	except (AttributeError, ValueError):
+		return None
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+	"""Delay requested by the server, from Retry-After or RetryInfo error details"""
+	headers = getattr(getattr(exc, 'response', None), 'headers', None)
+	if headers is not None:
+		value = headers.get('retry-after')
+		if value:
+			try:
+				return max(float(value), 0.0)
+			except ValueError:
+				try:
+					when = email.utils.parsedate_to_datetime(value)
+					return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+				except (TypeError, ValueError):
+					pass
+
+	details = getattr(exc, 'details', None)
+	if isinstance(details, dict):
+		for detail in details.get('error', {}).get('details', []) or []:
+			if isinstance(detail, dict) and 'retryDelay' in detail:
+				return _parse_duration(detail['retryDelay'])
+	return None
+
+
+class AdaptiveLimiter:
+	"""Concurrency limit adjusted by additive increase / multiplicative decrease"""
+
+	def __init__(
+		self,
+		name: str,
+		max_limit: int,
+		min_limit: int = 1,
+		latency_target: float = 10.0,
+		backoff_ratio: float = 0.5,
+		initial_limit: float | None = None,
+	):
+		self.name = name
+		self.min_limit = min_limit
+		self.max_limit = max_limit
+		self.latency_target = latency_target
+		self.backoff_ratio = backoff_ratio
+		self.limit = float(initial_limit if initial_limit is not None else max_limit)
+		self.inflight = 0
+		self._condition = asyncio.Condition()
+		GEMINI_CONCURRENCY_LIMIT.set(self.limit, traffic_class=name)
+
+	@asynccontextmanager
+	async def slot(self) -> AsyncIterator[None]:
+		"""Hold one in-flight slot, waiting while the limit is reached"""
+		async with self._condition:
+			await self._condition.wait_for(lambda: self.inflight < int(self.limit))
+			self.inflight += 1
+			GEMINI_INFLIGHT.set(self.inflight, traffic_class=self.name)
+		try:
+			yield
+		finally:
+			async with self._condition:
+				self.inflight -= 1
+				GEMINI_INFLIGHT.set(self.inflight, traffic_class=self.name)
+				self._condition.notify_all()
+
+	def on_success(self, latency: float) -> None:
+		if latency > self.latency_target:
+			self._decrease()
+		else:
+			# +1 slot after roughly `limit` successes, i.e. once per window
+			self._set(self.limit + 1 / self.limit)
+
+	def on_overload(self) -> None:
+		self._decrease()
+
+	def _decrease(self) -> None:
+		self._set(self.limit * self.backoff_ratio)
+
+	def _set(self, limit: float) -> None:
+		previous = int(self.limit)
+		self.limit = min(max(limit, self.min_limit), self.max_limit)
+		GEMINI_CONCURRENCY_LIMIT.set(self.limit, traffic_class=self.name)
+		if int(self.limit) != previous:
+			logger.info(f'Gemini {self.name} concurrency limit {previous} -> {int(self.limit)}')
+
+
+class CircuitBreaker:
+	"""Open after consecutive failures, probe once after a cool-down"""
+
+	CLOSED = 'closed'
+	OPEN = 'open'
+	HALF_OPEN = 'half_open'
+	_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+	def __init__(
+		self,
+		name: str,
+		failure_threshold: int = 5,
+		reset_timeout: float = 30.0,
+		clock: Callable[[], float] = time.monotonic,
+	):
+		self.name = name
+		self.failure_threshold = failure_threshold
+		self.reset_timeout = reset_timeout
+		self.clock = clock
+		self.state = self.CLOSED
+		self.failures = 0
+		self.opened_at = 0.0
+		self._probe_in_flight = False
+		self._record_state()
+
+	def before_call(self) -> None:
+		"""Raise CircuitOpenError unless a call may go through now"""
+		if self.state == self.OPEN:
+			elapsed = self.clock() - self.opened_at
+			if elapsed < self.reset_timeout:
+				raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+			self._transition(self.HALF_OPEN)
+		if self.state == self.HALF_OPEN:
+			if self._probe_in_flight:
+				raise CircuitOpenError(self.name, self.reset_timeout)
+			self._probe_in_flight = True
+
+	def on_success(self) -> None:
+		self.failures = 0
+		self._probe_in_flight = False
+		if self.state != self.CLOSED:
+			self._transition(self.CLOSED)
+
+	def on_failure(self) -> None:
+		self._probe_in_flight = False
+		self.failures += 1
+		if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+			self.opened_at = self.clock()
+			if self.state != self.OPEN:
+				self._transition(self.OPEN)
+
+	def on_ignored(self) -> None:
+		"""A call ended without saying anything about upstream health"""
+		self._probe_in_flight = False
+
+	def _transition(self, state: str) -> None:
+		logger.warning(f'Gemini {self.name} circuit {self.state} -> {state}')
+		self.state = state
+		self._record_state()
+
+	def _record_state(self) -> None:
+		GEMINI_BREAKER_STATE.set(self._STATE_VALUES[self.state], traffic_class=self.name)
+
+
+@dataclass
+class TrafficClassPolicy:
+	"""Budget for one traffic class"""
+
+	max_concurrency: int
+	latency_target: float
+
+
+class GeminiGateway:
+	"""Per-process gate every Gemini call goes through"""
+
+	def __init__(
+		self,
+		policies: dict[str, TrafficClassPolicy],
+		min_concurrency: int = 1,
+		backoff_ratio: float = 0.5,
+		max_attempts: int = 4,
+		retry_base_seconds: float = 0.5,
+		retry_max_seconds: float = 20.0,
+		breaker_failure_threshold: int = 5,
+		breaker_reset_seconds: float = 30.0,
+		clock: Callable[[], float] = time.monotonic,
+		sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+		jitter: Callable[[], float] = random.random,
+	):
+		self.max_attempts = max_attempts
+		self.retry_base_seconds = retry_base_seconds
+		self.retry_max_seconds = retry_max_seconds
+		self.clock = clock
+		self.sleep = sleep
+		self.jitter = jitter
+		self.limiters = {
+			name: AdaptiveLimiter(
+				name,
+				max_limit=policy.max_concurrency,
+				min_limit=min(min_concurrency, policy.max_concurrency),
+				latency_target=policy.latency_target,
+				backoff_ratio=backoff_ratio,
+			)
+			for name, policy in policies.items()
+		}
+		self.breakers = {
+			name: CircuitBreaker(
+				name,
+				failure_threshold=breaker_failure_threshold,
+				reset_timeout=breaker_reset_seconds,
+				clock=clock,
+			)
+			for name in policies
+		}
+
+	@classmethod
+	def from_settings(cls, config: Settings = settings) -> 'GeminiGateway':
+		return cls(
+			{
+				ANALYSIS: TrafficClassPolicy(
+					config.GEMINI_ANALYSIS_MAX_CONCURRENCY,
+					config.GEMINI_ANALYSIS_LATENCY_TARGET_SECONDS,
+				),
+				QUERY: TrafficClassPolicy(
+					config.GEMINI_QUERY_MAX_CONCURRENCY, config.GEMINI_QUERY_LATENCY_TARGET_SECONDS
+				),
+			},
+			min_concurrency=config.GEMINI_MIN_CONCURRENCY,
+			backoff_ratio=config.GEMINI_CONCURRENCY_BACKOFF_RATIO,
+			max_attempts=config.GEMINI_MAX_ATTEMPTS,
+			retry_base_seconds=config.GEMINI_RETRY_BASE_SECONDS,
+			retry_max_seconds=config.GEMINI_RETRY_MAX_SECONDS,
+			breaker_failure_threshold=config.GEMINI_BREAKER_FAILURE_THRESHOLD,
+			breaker_reset_seconds=config.GEMINI_BREAKER_RESET_SECONDS,
+		)
+
+	def backoff(self, attempt: int, exc: BaseException) -> float:
+		"""Full jitter exponential delay, never shorter than the server's Retry-After"""
+		ceiling = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempt - 1))
+		delay = self.jitter() * ceiling
+		retry_after = retry_after_seconds(exc)
+		if retry_after is not None:
+			delay = max(delay, retry_after)
+		return delay
+
+	async def call(self, traffic_class: str, request: Callable[[], Awaitable[T]]) -> T:
+		"""Run `request` within the traffic class budget, retrying transient failures"""
+		limiter = self.limiters[traffic_class]
+		breaker = self.breakers[traffic_class]
+		attempt = 0
+		while True:
+			attempt += 1
+			breaker.before_call()
+			try:
+				async with limiter.slot():
+					started = self.clock()
+					result = await request()
+			except asyncio.CancelledError:
+				breaker.on_ignored()
+				raise
+			except Exception as e:
+				failure = classify_failure(e)
+				if failure == FATAL:
+					# Bad input or bad output, not a sign of upstream trouble
+					breaker.on_ignored()
+					raise
+				breaker.on_failure()
+				if failure == RATE_LIMITED:
+					limiter.on_overload()
+				if attempt >= self.max_attempts:
+					raise
+				delay = self.backoff(attempt, e)
+				GEMINI_RETRIES_TOTAL.inc(traffic_class=traffic_class, reason=failure)
+				logger.info(
+					f'Gemini {traffic_class} call {failure} on attempt {attempt}, '
+					f'retrying in {delay:.2f}s'
+				)
+				await self.sleep(delay)
+				continue
+
+			breaker.on_success()
+			limiter.on_success(self.clock() - started)
+			return result
@@ -0,0 +1,159 @@
+"""Hedged Gemini requests to cut tail latency
+
+If a call has not answered within the recent p95 latency (per traffic class),
+a second identical request is sent. Whichever answers first wins and the other
+is cancelled. Only the slowest few percent of calls are hedged, so the extra
+load is small, and those are the calls users notice.
+
+Hedges are paid for from a process-wide token budget that every request tops
+up by `max_ratio`. Hedges therefore never exceed that fraction of traffic. When
+Gemini slows down across the board the budget runs dry instead of doubling the
+load on an upstream that is already struggling.
+
+Latencies come from single attempts wrapped in `Hedger.timed`, not from the
+whole call passed to `run`. Retry backoff and Retry-After sleeps would
+otherwise push the threshold up after every bout of throttling, and stop
+hedging just when it helps.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from app.shared.core.settings import Settings, settings
+from app.shared.observability.metrics import GEMINI_HEDGE_DELAY_SECONDS, GEMINI_HEDGES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LatencyWindow:
+	"""The most recent successful call latencies"""
+
+	def __init__(self, size: int = 200):
+		self.samples: deque[float] = deque(maxlen=size)
+
+	def __len__(self) -> int:
+		return len(self.samples)
+
+	def record(self, latency: float) -> None:
+		self.samples.append(latency)
+
+	def percentile(self, q: float) -> float | None:
+		if not self.samples:
+			return None
+		ordered = sorted(self.samples)
+		return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class HedgeBudget:
+	"""Token bucket refilled by requests, one token per hedge"""
+
+	def __init__(self, max_ratio: float, burst: float = 10.0):
+		self.max_ratio = max_ratio
+		self.burst = burst
+		self.tokens = 0.0
+
+	def on_request(self) -> None:
+		self.tokens = min(self.tokens + self.max_ratio, self.burst)
+
+	def try_acquire(self) -> bool:
+		if self.tokens < 1:
+			return False
+		self.tokens -= 1
+		return True
+
+
+class Hedger:
+	"""Run a request, and a second copy of it if the first is slower than usual"""
+
+	def __init__(
+		self,
+		percentile: float = 0.95,
+		min_delay: float = 1.0,
+		max_ratio: float = 0.05,
+		window: int = 200,
+		min_samples: int = 20,
+		clock: Callable[[], float] = time.monotonic,
+	):
+		self.percentile = percentile
+		self.min_delay = min_delay
+		self.window = window
+		self.min_samples = min_samples
+		self.clock = clock
+		self.budget = HedgeBudget(max_ratio)
+		self.latencies: dict[str, LatencyWindow] = {}
+
+	@classmethod
+	def from_settings(cls, config: Settings = settings) -> 'Hedger':
+		return cls(
+			percentile=config.GEMINI_HEDGE_PERCENTILE,
+			min_delay=config.GEMINI_HEDGE_MIN_DELAY_SECONDS,
+			max_ratio=config.GEMINI_HEDGE_MAX_RATIO,
+			window=config.GEMINI_HEDGE_WINDOW,
+			min_samples=config.GEMINI_HEDGE_MIN_SAMPLES,
+		)
+
+	def _window(self, key: str) -> LatencyWindow:
+		window = self.latencies.get(key)
+		if window is None:
+			window = self.latencies[key] = LatencyWindow(self.window)
+		return window
+
+	def delay(self, key: str) -> float | None:
+		"""Seconds to wait before hedging, or None until enough latencies are known"""
+		window = self._window(key)
+		if len(window) < self.min_samples:
+			return None
+		delay = max(window.percentile(self.percentile), self.min_delay)
+		GEMINI_HEDGE_DELAY_SECONDS.set(delay, traffic_class=key)
+		return delay
+
+	async def timed(self, key: str, request: Callable[[], Awaitable[T]]) -> T:
+		"""Run one attempt of a request, recording its latency if it succeeds"""
+		started = self.clock()
+		result = await request()
+		self._window(key).record(self.clock() - started)
+		return result
+
+	async def run(self, key: str, request: Callable[[], Awaitable[T]]) -> T:
+		"""Return the first successful result of `request` and at most one hedge"""
+		self.budget.on_request()
+		delay = self.delay(key)
+		primary = asyncio.create_task(request())
+		hedge = None
+		try:
+			if delay is None:
+				return await primary
+
+			done, _ = await asyncio.wait({primary}, timeout=delay)
+			if done:
+				return primary.result()
+			if not self.budget.try_acquire():
+				GEMINI_HEDGES_TOTAL.inc(traffic_class=key, outcome='budget_exhausted')
+				return await primary
+
+			logger.info(f'Gemini {key} call slower than {delay:.2f}s, sending a hedged request')
+			hedge = asyncio.create_task(request())
+			return await self._first_success(key, primary, hedge)
+		finally:
+			# Cancel the loser, or both if the caller itself was cancelled
+			primary.cancel()
+			if hedge is not None:
+				hedge.cancel()
+
+	async def _first_success(self, key: str, primary: asyncio.Task, hedge: asyncio.Task):
+		pending = {primary, hedge}
+		while pending:
+			done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+			for task in done:
+				if task.exception() is None:
+					outcome = 'primary_won' if task is primary else 'hedge_won'
+					GEMINI_HEDGES_TOTAL.inc(traffic_class=key, outcome=outcome)
+					return task.result()
+		# Both copies failed; report the original request's error
+		GEMINI_HEDGES_TOTAL.inc(traffic_class=key, outcome='both_failed')
+		raise primary.exception()
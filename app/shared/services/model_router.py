@@ -0,0 +1,154 @@
+"""Tiered Gemini model routing
+
+Each operation has an ordered list of models, fastest and cheapest first. A
+request starts on the first tier and only moves to the next when the answer
+fails validation (malformed JSON, an unknown weapon, a scoreboard that doesn't
+match the game mode) or is valid but scores below the confidence threshold.
+
+When the last tier still fails validation, the best answer from an earlier
+tier is returned if there was one, so a hard screenshot ends up with
+best-effort stats instead of an error. The same goes for any other failure
+of a later tier, e.g. an open circuit or a server error; without an earlier
+answer to fall back on, those errors propagate rather than escalate. Every
+tier's outcome is counted, and the confidence of every answer is recorded, so
+the thresholds can be tuned against real traffic.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from pydantic import ValidationError
+
+from app.shared.core.settings import Settings, settings
+from app.shared.models.schemas import GameStatsResponse, WeaponStats
+from app.shared.observability.metrics import GEMINI_CONFIDENCE, GEMINI_ROUTING_TOTAL
+from app.shared.services.gemini_gateway import ANALYSIS, QUERY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Absolute slack allowed when checking a reported ratio against its parts,
+# since the game rounds ratios to two decimals
+RATIO_TOLERANCE = 0.05
+
+# Routing outcomes
+ACCEPTED = 'accepted'
+INVALID = 'invalid'
+LOW_CONFIDENCE = 'low_confidence'
+ERROR = 'error'
+FALLBACK = 'fallback'
+
+
+def _ratio_consistent(ratio: float, numerator: int, denominator: int) -> bool:
+	expected = numerator / denominator if denominator else float(numerator)
+	return abs(ratio - expected) <= max(RATIO_TOLERANCE, expected * 0.02)
+
+
+def _weapon_consistent(weapon: WeaponStats | None) -> bool:
+	if weapon is None:
+		return True
+	return weapon.headshot_kills <= weapon.eliminations
+
+
+def extraction_confidence(stats: GameStatsResponse) -> float:
+	"""Share of cross-field consistency checks an extracted screenshot passes
+
+	Misread digits usually break an identity the game itself guarantees, e.g.
+	an 8 read as a 0 in the deaths column no longer matches the E/D ratio.
+	"""
+	scoreboard = stats.scoreboard
+	checks = [
+		_ratio_consistent(
+			scoreboard.elimination_death_ratio, scoreboard.eliminations, scoreboard.deaths
+		),
+		_weapon_consistent(stats.primary_weapon_stats),
+		_weapon_consistent(stats.secondary_weapon_stats),
+	]
+	return sum(checks) / len(checks)
+
+
+@dataclass
+class Attempt(Generic[T]):
+	"""A tier's answer and its confidence"""
+
+	model: str
+	result: T
+	confidence: float
+
+
+class ModelRouter:
+	"""Try models in order, escalating on invalid or low-confidence answers"""
+
+	def __init__(self, tiers: dict[str, list[str]], min_confidence: float = 1.0):
+		for operation, models in tiers.items():
+			if not models:
+				raise ValueError(f'No Gemini models configured for {operation}')
+		self.tiers = tiers
+		self.min_confidence = min_confidence
+
+	@classmethod
+	def single(cls, model: str) -> 'ModelRouter':
+		"""A router that always uses one model, i.e. no escalation"""
+		return cls({ANALYSIS: [model], QUERY: [model]})
+
+	@classmethod
+	def from_settings(cls, config: Settings = settings) -> 'ModelRouter':
+		def models(name: str) -> list[str]:
+			value = getattr(config, name)
+			models = [model.strip() for model in value.split(',') if model.strip()]
+			if not models:
+				raise ValueError(f'{name} must list at least one Gemini model')
+			return models
+
+		return cls(
+			{ANALYSIS: models('GEMINI_ANALYSIS_MODELS'), QUERY: models('GEMINI_QUERY_MODELS')},
+			min_confidence=config.GEMINI_ESCALATION_MIN_CONFIDENCE,
+		)
+
+	def models(self, operation: str) -> list[str]:
+		return self.tiers[operation]
+
+	async def run(
+		self,
+		operation: str,
+		request: Callable[[str], Awaitable[T]],
+		confidence: Callable[[T], float] | None = None,
+	) -> T:
+		"""Call `request(model)` tier by tier until an answer is good enough"""
+		models = self.models(operation)
+		best: Attempt[T] | None = None
+		for tier, model in enumerate(models):
+			last = tier == len(models) - 1
+			try:
+				result = await request(model)
+			except (ValidationError, json.JSONDecodeError) as e:
+				GEMINI_ROUTING_TOTAL.inc(operation=operation, model=model, outcome=INVALID)
+				if last and best is None:
+					raise
+				logger.info(f'{model} gave an invalid {operation} response, escalating: {e}')
+				continue
+			except Exception as e:
+				if best is None:
+					raise
+				GEMINI_ROUTING_TOTAL.inc(operation=operation, model=model, outcome=ERROR)
+				logger.warning(f'{model} failed on {operation}, keeping an earlier answer: {e}')
+				break
+
+			score = confidence(result) if confidence is not None else 1.0
+			GEMINI_CONFIDENCE.observe(score, operation=operation, model=model)
+			if score >= self.min_confidence:
+				GEMINI_ROUTING_TOTAL.inc(operation=operation, model=model, outcome=ACCEPTED)
+				return result
+
+			GEMINI_ROUTING_TOTAL.inc(operation=operation, model=model, outcome=LOW_CONFIDENCE)
+			if best is None or score > best.confidence:
+				best = Attempt(model, result, score)
+			if not last:
+				logger.info(f'{model} {operation} confidence {score:.2f}, escalating')
+
+		# No tier answered confidently enough, or a later one was invalid or failed
+		GEMINI_ROUTING_TOTAL.inc(operation=operation, model=best.model, outcome=FALLBACK)
+		return best.result
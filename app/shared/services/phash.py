@@ -0,0 +1,166 @@
+"""Spot screenshots of a match that was already posted
+
+The same lobby often gets uploaded more than once: recropped, re-encoded,
+posted by a teammate, or photographed off the screen. Byte hashes miss all of
+these. A difference hash (dHash) does not: the scoreboard is shrunk to a 9x8
+grayscale thumbnail, and each bit records whether a pixel is brighter than its
+right neighbour. Scaling, compression and small colour shifts barely change
+the bits, so two screenshots of the same scoreboard land a few bits apart.
+
+Hashes of recently analyzed scoreboards are kept in a `HashIndex`, and a new
+scoreboard within `max_distance` bits of one is a possible repost. Only a
+possible one: at 9x8 the hash mostly sees the scoreboard's layout, so two
+different matches on the same UI can hash identically. A hit is confirmed by
+the screenshot's exact bytes before extraction, or by the extracted stats
+after it (see `PostedScoreboard`). Heavy crops and perspective distortion
+still defeat the hash; those fall through to a normal analysis.
+
+Decoding and hashing need NumPy and Pillow from the optional `phash` extra:
+without them `ScreenshotHasher.from_settings` returns None and nothing is
+checked.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+from dataclasses import dataclass
+from typing import Hashable
+
+from app.shared.core.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(image: bytes, size: int = 8) -> int:
+	"""Difference hash of an image as a `size * size` bit integer"""
+	import numpy as np
+	from PIL import Image
+
+	with Image.open(io.BytesIO(image)) as img:
+		thumbnail = img.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS)
+	pixels = np.asarray(thumbnail, dtype=np.int16)
+	bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+	return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a: int, b: int) -> int:
+	"""Number of bits that differ between two hashes"""
+	return (a ^ b).bit_count()
+
+
+def format_hash(value: int) -> str:
+	"""Fixed-width hex form stored on match documents"""
+	return f'{value:016x}'
+
+
+def image_digest(image: bytes) -> str:
+	return hashlib.sha256(image).hexdigest()
+
+
+def stats_digest(document: dict) -> str:
+	"""Digest of extracted game stats, equal only for identical stats"""
+	return hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class PostedScoreboard:
+	"""What is remembered about an analyzed scoreboard to confirm a hash hit"""
+
+	message_id: int
+	user_id: int
+	image_digest: str
+	stats_digest: str
+
+
+@dataclass(frozen=True)
+class NearDuplicate:
+	key: Hashable
+	distance: int
+
+
+class HashIndex:
+	"""The most recent `max_size` hashes, searched for the nearest one
+
+	A linear scan of a few thousand integers takes well under a millisecond,
+	far cheaper than the analysis it can save.
+	"""
+
+	def __init__(self, max_size: int = 5000, max_distance: int = 8):
+		self.max_size = max_size
+		self.max_distance = max_distance
+		self._hashes: list[int] = []
+		self._keys: list[Hashable] = []
+		self._next = 0
+
+	def add(self, value: int, key: Hashable) -> None:
+		"""Remember a hash, replacing the oldest one when full"""
+		if len(self._hashes) < self.max_size:
+			self._hashes.append(value)
+			self._keys.append(key)
+			return
+		self._hashes[self._next] = value
+		self._keys[self._next] = key
+		self._next = (self._next + 1) % self.max_size
+
+	def within(self, value: int) -> list[NearDuplicate]:
+		"""Every remembered hash within `max_distance` bits, nearest first"""
+		found = [
+			NearDuplicate(self._keys[i], distance)
+			for i, other in enumerate(self._hashes)
+			if (distance := (value ^ other).bit_count()) <= self.max_distance
+		]
+		return sorted(found, key=lambda near: near.distance)
+
+	def nearest(self, value: int) -> NearDuplicate | None:
+		"""Closest remembered hash within `max_distance` bits, if any"""
+		best = None
+		for i, other in enumerate(self._hashes):
+			distance = (value ^ other).bit_count()
+			if distance <= self.max_distance and (best is None or distance < best.distance):
+				best = NearDuplicate(self._keys[i], distance)
+				if distance == 0:
+					break
+		return best
+
+	def __len__(self) -> int:
+		return len(self._hashes)
+
+
+class ScreenshotHasher:
+	"""Hashes scoreboards off the event loop and checks them against recent ones"""
+
+	def __init__(self, index: HashIndex):
+		self.index = index
+
+	@classmethod
+	def from_settings(cls, config: Settings) -> 'ScreenshotHasher | None':
+		if not config.PHASH_ENABLED:
+			return None
+		missing = [name for name in ('numpy', 'PIL') if importlib.util.find_spec(name) is None]
+		if missing:
+			logger.warning(
+				f'PHASH_ENABLED is set but {", ".join(missing)} is not installed; '
+				'near-duplicate screenshots will not be detected'
+			)
+			return None
+		return cls(HashIndex(config.PHASH_RECENT_SIZE, config.PHASH_MAX_DISTANCE))
+
+	async def hash(self, image: bytes) -> int | None:
+		"""dHash of an image, or None if it can't be decoded"""
+		try:
+			return await asyncio.to_thread(dhash, image)
+		except Exception as e:
+			logger.warning(f'Could not hash screenshot: {e}')
+			return None
+
+	def find(self, value: int) -> NearDuplicate | None:
+		return self.index.nearest(value)
+
+	def candidates(self, value: int) -> list[NearDuplicate]:
+		return self.index.within(value)
+
+	def remember(self, value: int, key: Hashable) -> None:
+		self.index.add(value, key)
@@ -0,0 +1,157 @@
+"""Field-level repair of invalid Gemini extractions
+
+When an extraction fails validation on a few fields (an out-of-range
+`friendly_score`, a weapon name that isn't in the enum), most of the answer is
+still good. Rather than paying for a full multimodal call again, a repair plan
+turns the `ValidationError` locations into a small response model holding only
+the failed fields. Gemini is asked to re-read just those from the same images,
+and the answers are merged back into the partial result.
+
+Errors with no field location (cross-field model validators) and errors
+touching too many fields are not repaired. The caller treats them like any
+other invalid response.
+"""
+
+import copy
+from dataclasses import dataclass
+from typing import Annotated, Any, Optional, Union, get_args, get_origin
+
+from pydantic import BaseModel, Field, ValidationError, create_model
+from pydantic.fields import FieldInfo
+
+from app.shared.models.schemas import SCOREBOARD_TYPES, GameStatsResponse
+
+REPAIR_PROMPT = """
+Here are the same screenshots of a player in Call of Duty: Black ops 7.
+A previous reading of them produced invalid values for the fields below.
+Look at the images again and read only these fields for the highlighted
+player. Be careful to distinguish zeros and eights, and use the exact
+spelling of weapon, map and team names.
+
+%s
+"""
+
+Path = tuple[str, ...]
+
+
+def _model_type(annotation: Any) -> type[BaseModel] | None:
+	"""The pydantic model inside an `Optional[Model]` style annotation, if any"""
+	if get_origin(annotation) in (Union, Optional):
+		candidates = get_args(annotation)
+	else:
+		candidates = (annotation,)
+	models = [c for c in candidates if isinstance(c, type) and issubclass(c, BaseModel)]
+	return models[0] if len(models) == 1 else None
+
+
+def _child_model(model: type[BaseModel], name: str, data: dict[str, Any]) -> type[BaseModel] | None:
+	if model is GameStatsResponse and name == 'scoreboard':
+		# The scoreboard union is resolved by game_mode, like the validator does
+		return SCOREBOARD_TYPES.get(data.get('game_mode'))
+	return _model_type(model.model_fields[name].annotation)
+
+
+def field_path(loc: tuple, data: dict[str, Any]) -> Path | None:
+	"""Map a pydantic error location to the path of the field to re-ask
+
+	Union member tags in the location (e.g. 'HardpointScoreboard' or
+	'str-enum[AssaultRifles]') are skipped. Errors against a scoreboard type
+	other than the one for the game mode are irrelevant and give None.
+	"""
+	model: type[BaseModel] | None = GameStatsResponse
+	node: Any = data
+	path: list[str] = []
+	for part in loc:
+		if model is None:
+			# Reached a leaf; anything further is a union tag within the leaf type
+			break
+		if isinstance(part, str) and part in model.model_fields:
+			path.append(part)
+			child = _child_model(model, part, data)
+			node = node.get(part) if isinstance(node, dict) else None
+			# Re-ask a sub-model as a whole when it isn't an object in the answer
+			model = child if isinstance(node, dict) else None
+		elif part == model.__name__:
+			continue
+		else:
+			return None
+	return tuple(path) or None
+
+
+def _leaf_field(model: type[BaseModel], name: str) -> tuple[Any, FieldInfo]:
+	field = model.model_fields[name]
+	annotation = field.annotation
+	if field.metadata:
+		# Keep constraints such as le=HARDPOINT_SCORE_MAX in the repair schema
+		annotation = Annotated[(annotation, *field.metadata)]
+	return annotation, Field(..., description=field.description)
+
+
+@dataclass
+class RepairPlan:
+	"""The fields to re-ask and the response model that holds them"""
+
+	paths: list[Path]
+	errors: dict[Path, str]
+	model: type[BaseModel]
+
+	def prompt(self) -> str:
+		lines = [f'- {".".join(path)}: {self.errors[path]}' for path in self.paths]
+		return REPAIR_PROMPT % '\n'.join(lines)
+
+	def merge(self, data: dict[str, Any], repair: BaseModel) -> dict[str, Any]:
+		"""Copy of `data` with the repaired fields written over it"""
+		merged = copy.deepcopy(data)
+		fixed = repair.model_dump(mode='json')
+		for path in self.paths:
+			source, target = fixed, merged
+			for name in path[:-1]:
+				source = source[name]
+				target = target[name]
+			target[path[-1]] = source[path[-1]]
+		return merged
+
+
+def _build_model(
+	name: str, model: type[BaseModel], paths: list[Path], data: dict[str, Any]
+) -> type[BaseModel]:
+	"""Response model with only the fields in `paths`, nested like the original"""
+	fields: dict[str, Any] = {}
+	for head in dict.fromkeys(path[0] for path in paths):
+		rest = [path[1:] for path in paths if path[0] == head and len(path) > 1]
+		if rest:
+			# field_path only descends into fields with a known sub-model
+			child = _child_model(model, head, data)
+			fields[head] = (_build_model(f'{name}{child.__name__}', child, rest, data), Field(...))
+		else:
+			fields[head] = _leaf_field(model, head)
+	return create_model(name, **fields)
+
+
+def plan_repair(data: dict[str, Any], error: ValidationError, max_fields: int) -> RepairPlan | None:
+	"""Plan a repair of an invalid GameStatsResponse payload, or None if it can't be"""
+	if not isinstance(data, dict):
+		return None
+	errors: dict[Path, str] = {}
+	for detail in error.errors():
+		path = field_path(detail['loc'], data)
+		if path is None:
+			if not detail['loc']:
+				# A model-level check failed; no single field to blame
+				return None
+			continue
+		errors.setdefault(path, f'{detail["msg"]} (was {detail.get("input")!r})')
+	if not errors:
+		return None
+
+	# A field whose parent is also being re-asked comes back with the parent
+	paths = [
+		path
+		for path in errors
+		if not any(other != path and path[: len(other)] == other for other in errors)
+	]
+	if len(paths) > max_fields:
+		return None
+	return RepairPlan(
+		paths, errors, _build_model('GameStatsRepair', GameStatsResponse, paths, data)
+	)
@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 # Skip if discord isn't installed in the test environment
@@ -5,7 +7,7 @@ pytest.importorskip('discord')
 
 import app.shared.services.discord as dc
 from app.bot.commands import AnalyzeImagesCommand, QueryDatabaseCommand
-from app.tests.mocks import FakeAttachment, FakeCtx
+from app.tests.mocks import FakeAttachment, FakeCtx, FakeInteraction
 
 
 @pytest.mark.asyncio
@@ -92,3 +94,126 @@ async def test_query_with_input(fake_ctx: FakeCtx):
 
 	assert len(executed_commands) == 1
 	assert isinstance(executed_commands[0], QueryDatabaseCommand)
+
+
+@pytest.mark.asyncio
+async def test_slash_ping_responds():
+	interaction = FakeInteraction()
+	await dc.ping_slash.callback(interaction)
+	assert interaction.response.sent == [('Pong!', False)]
+
+
+@pytest.mark.asyncio
+async def test_slash_stats_defers_and_carries_interaction():
+	"""Test that /stats acknowledges at once and passes the token on for follow-ups"""
+	interaction = FakeInteraction()
+	await dc.stats_slash.callback(
+		interaction, FakeAttachment(b'scoreboard'), FakeAttachment(b'weapons')
+	)
+
+	assert interaction.response.deferred
+	(command,) = interaction.client.command_bus.executed_commands
+	assert isinstance(command, AnalyzeImagesCommand)
+	assert (command.image_one, command.image_two) == (b'scoreboard', b'weapons')
+	assert command.discord_message_id == interaction.id
+	assert command.discord_interaction_token == 'interaction-token'
+
+
+@pytest.mark.asyncio
+async def test_slash_stats_rejects_large_attachment_without_deferring():
+	interaction = FakeInteraction()
+	await dc.stats_slash.callback(interaction, FakeAttachment(b'x', size=11_000_000))
+
+	assert not interaction.response.deferred
+	assert interaction.response.sent == [('Please attach images smaller than 10MB.', True)]
+	assert interaction.client.command_bus.executed_commands == []
+
+
+@pytest.mark.asyncio
+async def test_slash_query_reports_failures_as_follow_up():
+	interaction = FakeInteraction()
+
+	async def failing(command):
+		raise RuntimeError('bus down')
+
+	interaction.client.command_bus.execute = failing
+	await dc.query_slash.callback(interaction, 'best map?')
+
+	assert interaction.response.deferred
+	assert interaction.followup.sent == ['❌ Error processing request: bus down']
+
+
+def test_message_intents_follow_prefix_commands():
+	assert dc.bot_intents(True).message_content
+	intents = dc.bot_intents(False)
+	assert not intents.message_content
+	assert not intents.guild_messages
+	assert intents.guilds
+
+
+def test_lean_cache_policy_caps_caches():
+	"""Test that the lean policy drops member chunking and unused guild data"""
+	from app.shared.core.settings import Settings
+
+	options = dc.bot_options(Settings(DISCORD_CACHE_POLICY='lean', DISCORD_MAX_MESSAGES=0))
+	assert options['max_messages'] is None
+	assert options['member_cache_flags'].value == 0
+	assert options['chunk_guilds_at_startup'] is False
+	assert not options['intents'].emojis_and_stickers
+	assert not options['intents'].voice_states
+
+	options = dc.bot_options(Settings(DISCORD_CACHE_POLICY='default'))
+	assert options['intents'].voice_states
+	assert 'max_messages' not in options
+
+
+@pytest.mark.asyncio
+async def test_slash_memory_is_owner_only(monkeypatch):
+	threads = []
+
+	def memory_report(**kwargs):
+		threads.append(threading.current_thread())
+		return report(**kwargs)
+
+	report = dc.memory_report
+	monkeypatch.setattr(dc, 'memory_report', memory_report)
+
+	interaction = FakeInteraction()
+	await dc.memory_slash.callback(interaction)
+	assert 'Objects by type' in interaction.followup.sent[0]
+	assert 'messages 0' in interaction.followup.sent[0]
+	# The report walks every object, so it must not block the event loop
+	assert len(threads) == 1 and threads[0] is not threading.main_thread()
+
+	interaction.user.id = 999
+	interaction.followup.sent.clear()
+	await dc.memory_slash.callback(interaction)
+	assert interaction.followup.sent == []
+	assert interaction.response.sent == [('This command is for the bot owner.', True)]
+
+
+def test_auto_sharded_bot_runs_configured_shards():
+	from discord.ext import commands
+
+	from app.shared.core.settings import Settings
+
+	config = Settings(DISCORD_AUTO_SHARD=True, DISCORD_SHARD_COUNT=8, DISCORD_SHARD_IDS='2,3')
+	bot = dc.create_bot(config)
+
+	assert isinstance(bot, commands.AutoShardedBot)
+	assert (bot.shard_count, bot.shard_ids) == (8, [2, 3])
+	assert not isinstance(dc.create_bot(Settings()), commands.AutoShardedBot)
+
+
+def test_shard_health_reports_each_shard():
+	class Shard:
+		def __init__(self, closed, latency):
+			self.closed, self.latency = closed, latency
+
+		def is_closed(self):
+			return self.closed
+
+	class ShardedClient:
+		shards = {2: Shard(False, 0.05), 3: Shard(True, float('inf'))}
+
+	assert dc.shard_health(ShardedClient()) == {2: (True, 0.05), 3: (False, float('inf'))}
@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+
+pytest.importorskip('fastapi')
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.gemini_stub import main
+
+from app.gemini_stub.cassettes import CassetteStore, request_key
+from app.gemini_stub.faults import FaultInjector
+from app.gemini_stub.main import create_app
+from app.shared.core.settings import Settings
+
+MODEL = 'gemini-2.5-flash-lite'
+URL = f'/v1beta/models/{MODEL}:generateContent'
+BODY = {'contents': [{'role': 'user', 'parts': [{'text': 'hello'}]}]}
+RECORDED = {
+	'candidates': [
+		{
+			'content': {'parts': [{'text': '{"stages": []}'}], 'role': 'model'},
+			'finishReason': 'STOP',
+		}
+	]
+}
+
+
+@pytest.fixture
+def store(tmp_path) -> CassetteStore:
+	store = CassetteStore(tmp_path)
+	store.save(request_key(MODEL, BODY), MODEL, RECORDED)
+	return store
+
+
+class TestGeminiStubReplay:
+	"""Integration tests for replaying recorded generateContent responses"""
+
+	def test_replays_recorded_response(self, store):
+		"""Test that a recorded request returns the recorded body"""
+		with TestClient(create_app(Settings(), store=store)) as client:
+			response = client.post(URL, json=BODY)
+
+		assert response.status_code == HTTPStatus.OK
+		assert response.json() == RECORDED
+
+	def test_unrecorded_request_returns_404(self, store):
+		"""Test that a request without a recording returns a Gemini-shaped 404"""
+		with TestClient(create_app(Settings(), store=store)) as client:
+			response = client.post(URL, json={'contents': ['something else']})
+
+		assert response.status_code == HTTPStatus.NOT_FOUND
+		assert response.json()['error']['status'] == 'NOT_FOUND'
+
+
+class TestGeminiStubRecord:
+	"""Integration tests for recording responses from the live API"""
+
+	def test_passes_through_non_json_upstream_error(self, tmp_path, monkeypatch):
+		"""Test that an upstream error page is returned as is and not recorded"""
+		upstream = httpx.MockTransport(
+			lambda request: httpx.Response(
+				502, content=b'<html>Bad Gateway</html>', headers={'content-type': 'text/html'}
+			)
+		)
+		client_class = httpx.AsyncClient
+		monkeypatch.setattr(
+			main.httpx, 'AsyncClient', lambda **kwargs: client_class(transport=upstream, **kwargs)
+		)
+		store = CassetteStore(tmp_path)
+		config = Settings(GEMINI_STUB_MODE='record')
+
+		with TestClient(create_app(config, store=store)) as client:
+			response = client.post(URL, json=BODY)
+
+		assert response.status_code == HTTPStatus.BAD_GATEWAY
+		assert response.text == '<html>Bad Gateway</html>'
+		assert response.headers['content-type'].startswith('text/html')
+		assert store.load(request_key(MODEL, BODY)) is None
+
+
+class TestGeminiStubFaults:
+	"""Integration tests for injected failures"""
+
+	def test_injects_rate_limit_with_retry_after(self, store):
+		"""Test that a 429 carries RESOURCE_EXHAUSTED and a Retry-After header"""
+		config = Settings(GEMINI_STUB_RETRY_AFTER_SECONDS=3)
+		faults = FaultInjector(rate_limit_probability=1.0)
+
+		with TestClient(create_app(config, store=store, faults=faults)) as client:
+			response = client.post(URL, json=BODY)
+
+		assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+		assert response.headers['retry-after'] == '3'
+		assert response.json()['error']['status'] == 'RESOURCE_EXHAUSTED'
+
+	def test_injects_malformed_json(self, store):
+		"""Test that a corrupted response keeps the envelope but truncates the text"""
+		faults = FaultInjector(malformed_probability=1.0)
+
+		with TestClient(create_app(Settings(), store=store, faults=faults)) as client:
+			response = client.post(URL, json=BODY)
+
+		assert response.status_code == HTTPStatus.OK
+		text = response.json()['candidates'][0]['content']['parts'][0]['text']
+		assert text != RECORDED['candidates'][0]['content']['parts'][0]['text']
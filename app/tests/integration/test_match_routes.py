@@ -278,3 +278,29 @@ class TestMatchesEndpointsErrorHandling:
 			assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
 		finally:
 			app.dependency_overrides.clear()
+
+
+class TestMetricsEndpoint:
+	"""Tests for the Prometheus scrape endpoint"""
+
+	def test_metrics_endpoint_returns_prometheus_text(self):
+		"""Test that /metrics is public and uses the text exposition format"""
+		with TestClient(app) as client:
+			response = client.get('/metrics')
+
+		assert response.status_code == HTTPStatus.OK
+		assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+		assert '# TYPE debrief_mongo_operation_duration_seconds histogram' in response.text
+
+
+class TestLifespan:
+	"""Integration tests for the API lifespan"""
+
+	def test_lifespan_opens_and_closes_container(self):
+		"""Test that each app startup opens a container that is closed on shutdown"""
+		with TestClient(app):
+			container = app.state.container
+			assert not container.http.is_closed
+
+		with pytest.raises(RuntimeError):
+			container.http
@@ -1,25 +1,42 @@
-from app.tests.mocks.db import FakeAsyncDatabase
-from app.tests.mocks.discord import FakeAttachment, FakeBot, FakeCommand, FakeCommandBus, FakeCtx
+from app.tests.mocks.db import FakeAsyncDatabase, FakeMatchDatabase
+from app.tests.mocks.discord import (
+	FakeAttachment,
+	FakeBot,
+	FakeCommand,
+	FakeCommandBus,
+	FakeCtx,
+	FakeInteraction,
+)
 from app.tests.mocks.dispatcher import FakeEventDispatcher
-from app.tests.mocks.gemini import FakeGeminiClient
+from app.tests.mocks.gemini import FakeGeminiClient, fake_genai_client, game_stats_payload
+from app.tests.mocks.jobs import FakeGridFSBucket, FakeGridFSDatabase, FakeJobDatabase
 from app.tests.mocks.oauth import (
 	FakeDiscordOAuthResponse,
 	FakeDiscordUserResponse,
 	create_fake_httpx_client,
 )
 from app.tests.mocks.repositories import FakeMatchRepository
+from app.tests.mocks.tracing import FakeSpanProcessor
 
 __all__ = [
 	'FakeMatchRepository',
 	'FakeGeminiClient',
 	'FakeEventDispatcher',
 	'FakeAsyncDatabase',
+	'FakeMatchDatabase',
 	'FakeBot',
 	'FakeCtx',
 	'FakeAttachment',
 	'FakeCommandBus',
 	'FakeCommand',
+	'FakeInteraction',
 	'FakeDiscordOAuthResponse',
 	'FakeDiscordUserResponse',
 	'create_fake_httpx_client',
+	'FakeSpanProcessor',
+	'FakeJobDatabase',
+	'FakeGridFSBucket',
+	'FakeGridFSDatabase',
+	'fake_genai_client',
+	'game_stats_payload',
 ]
@@ -1,3 +1,8 @@
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+
 class FakeCollection:
     """A fake collection for testing purposes"""
 
@@ -31,3 +36,120 @@ class FakeAsyncDatabase:
     def insert_one(self, document):
         self.collections.setdefault("matches", []).append(document)
         return {"inserted_id": len(self.collections["matches"]) - 1}
+
+
+def _equal(document: dict, query: dict) -> bool:
+    return all(
+        document.get(key) in value["$in"]
+        if isinstance(value, dict) and "$in" in value
+        else document.get(key) == value
+        for key, value in query.items()
+    )
+
+
+class FakeCursor:
+    """Async cursor over fixed documents, recording sort and limit"""
+
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+        self.sorted_by = None
+        self.limited_to = None
+
+    def sort(self, key, direction=1):
+        self.sorted_by = (key, direction)
+        self.documents = sorted(
+            self.documents, key=lambda d: d[key], reverse=direction == -1
+        )
+        return self
+
+    def limit(self, count):
+        self.limited_to = count
+        self.documents = self.documents[:count]
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeMatchCollection:
+    """In-memory matches collection recording the calls MatchRepository makes
+
+    Filters are matched on equality and `$in` only; `find` records its query and
+    returns every document, so tests assert on the query itself.
+    """
+
+    def __init__(self, index_error: Exception | None = None):
+        self.documents: list[dict] = []
+        self.indexes: list[tuple] = []
+        self.index_error = index_error
+        self.updates: list[tuple] = []
+        self.bulk_writes: list[tuple] = []
+        self.finds: list[tuple] = []
+        self.cursor: FakeCursor | None = None
+
+    async def create_index(self, keys, **kwargs):
+        if self.index_error is not None:
+            raise self.index_error
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name")
+
+    def _update(self, query: dict, update: dict, upsert: bool):
+        """Apply one update, returning (upserted _id or None, modified count)"""
+        for document in self.documents:
+            if _equal(document, query):
+                changes = update.get("$set", {})
+                document.update(changes)
+                return None, int(bool(changes))
+        if not upsert:
+            return None, 0
+        document = {"_id": ObjectId(), **query, **update.get("$setOnInsert", {})}
+        self.documents.append(document)
+        return document["_id"], 0
+
+    async def update_many(self, query, update):
+        self.updates.append((query, update, False))
+        modified = 0
+        for document in self.documents:
+            if _equal(document, query):
+                document.update(update.get("$set", {}))
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update, upsert))
+        upserted_id, modified = self._update(query, update, upsert)
+        return SimpleNamespace(upserted_id=upserted_id, modified_count=modified)
+
+    async def find_one(self, query, projection=None):
+        return next((d for d in self.documents if _equal(d, query)), None)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes.append((requests, ordered))
+        upserted_ids, modified_count = {}, 0
+        for index, request in enumerate(requests):
+            upserted_id, modified = self._update(
+                request._filter, request._doc, request._upsert
+            )
+            modified_count += modified
+            if upserted_id is not None:
+                upserted_ids[index] = upserted_id
+        # An unordered bulk write reports upserts in no particular order
+        upserted_ids = dict(reversed(upserted_ids.items()))
+        return SimpleNamespace(
+            upserted_count=len(upserted_ids),
+            upserted_ids=upserted_ids,
+            modified_count=modified_count,
+        )
+
+    def find(self, query, projection=None):
+        self.finds.append((query, projection))
+        self.cursor = FakeCursor(list(self.documents))
+        return self.cursor
+
+
+class FakeMatchDatabase:
+    """Database exposing a single fake matches collection"""
+
+    def __init__(self, index_error: Exception | None = None):
+        self.matches = FakeMatchCollection(index_error)
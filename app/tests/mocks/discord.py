@@ -38,6 +38,10 @@ class FakeBot:
 		self.dispatcher = FakeEventDispatcher()
 		self.command_bus = FakeCommandBus()
 		self._commands = {}
+		self.owner_id = 123
+		self.guilds = []
+		self.emojis = []
+		self.cached_messages = []
 
 	async def start(self, token: str):
 		self.started_with = token
@@ -53,6 +57,9 @@ class FakeBot:
 	def get_channel(self, channel_id):
 		return self.cached_channels.get(channel_id)
 
+	async def is_owner(self, user) -> bool:
+		return user.id == self.owner_id
+
 	async def fetch_channel(self, channel_id):
 		# Simulate an API call to fetch the channel
 		channel = self.get_channel(channel_id)
@@ -118,3 +125,42 @@ class FakeCtx:
 
 	async def send(self, content: str):
 		self.sent.append(content)
+
+
+class FakeInteractionResponse:
+	def __init__(self):
+		self.deferred = False
+		self.sent: list[tuple[str, bool]] = []
+
+	async def defer(self, thinking: bool = False, ephemeral: bool = False):
+		self.deferred = True
+
+	async def send_message(self, content: str, ephemeral: bool = False):
+		self.sent.append((content, ephemeral))
+
+
+class FakeFollowup:
+	def __init__(self):
+		self.sent: list[str] = []
+
+	async def send(self, content: str, ephemeral: bool = False):
+		self.sent.append(content)
+
+
+class FakeInteraction:
+	"""Slash command interaction recording its response and follow-ups"""
+
+	def __init__(
+		self,
+		id: int = 1_200_000_000_000_000_000,
+		user: FakeAuthor | None = None,
+		client: FakeBot | None = None,
+		channel_id: int = 456,
+	):
+		self.id = id
+		self.token = 'interaction-token'
+		self.user = user or FakeAuthor()
+		self.client = client or FakeBot()
+		self.channel_id = channel_id
+		self.response = FakeInteractionResponse()
+		self.followup = FakeFollowup()
@@ -1,5 +1,8 @@
+import json
+from types import SimpleNamespace
 from app.shared.models.schemas import GameStatsResponse
 from app.shared.services.gemini import GeminiClient
+from app.tools.samples import sample_payload
 from app.shared.models.enums import AssaultRifles, Pistols, Maps, GameModes, Teams
 from app.shared.models.schemas import (
     PrimaryWeaponStats,
@@ -70,3 +73,36 @@ class FakeGeminiClient(GeminiClient):
                 enemy_score=100,
             ),
         )
+
+
+def game_stats_payload(**changes) -> dict:
+    """A Hardpoint extraction with nested overrides, e.g. scoreboard__deaths=3"""
+    data = json.loads(sample_payload(GameModes.HARDPOINT))
+    for key, value in changes.items():
+        *parents, name = key.split("__")
+        target = data
+        for parent in parents:
+            target = target[parent]
+        target[name] = value
+    return data
+
+
+def fake_genai_client(*texts: str | Exception, usage: SimpleNamespace | None = None):
+    """Stand-in for genai.Client returning the given response texts in order
+
+    An exception in place of a text is raised by that call instead. Every
+    response carries `usage` as its usage metadata. Returns the client and a
+    list recording each generate_content call.
+    """
+    remaining = list(texts)
+    calls = []
+
+    async def generate_content(model, contents, config):
+        calls.append({"model": model, "prompt": contents[0], "config": config})
+        text = remaining.pop(0)
+        if isinstance(text, Exception):
+            raise text
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    models = SimpleNamespace(generate_content=generate_content)
+    return SimpleNamespace(aio=SimpleNamespace(models=models)), calls
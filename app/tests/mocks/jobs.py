@@ -0,0 +1,218 @@
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+
+def _matches(document: dict, query: dict) -> bool:
+	for key, condition in query.items():
+		value = document.get(key)
+		if isinstance(condition, dict):
+			for operator, operand in condition.items():
+				if operator == '$in' and value not in operand:
+					return False
+				if operator == '$lte' and (value is None or value > operand):
+					return False
+		elif value != condition:
+			return False
+	return True
+
+
+def _apply(document: dict, update: dict) -> None:
+	document.update(update.get('$set', {}))
+	for key, amount in update.get('$inc', {}).items():
+		document[key] = document.get(key, 0) + amount
+	for key in update.get('$unset', {}):
+		document.pop(key, None)
+
+
+class FakeJobCollection:
+	"""In-memory collection supporting the operations JobQueue uses"""
+
+	def __init__(self):
+		self.documents: list[dict] = []
+		self.indexes: list[tuple] = []
+
+	async def create_index(self, keys, **kwargs):
+		self.indexes.append((keys, kwargs))
+		return kwargs.get('name')
+
+	async def insert_one(self, document):
+		document = {'_id': ObjectId(), **document}
+		self.documents.append(document)
+		return SimpleNamespace(inserted_id=document['_id'])
+
+	async def find_one_and_update(self, query, update, sort=None, return_document=None):
+		candidates = [d for d in self.documents if _matches(d, query)]
+		if sort:
+			key, _ = sort[0]
+			candidates.sort(key=lambda d: d[key])
+		if not candidates:
+			return None
+		_apply(candidates[0], update)
+		return dict(candidates[0])
+
+	async def update_one(self, query, update):
+		for document in self.documents:
+			if _matches(document, query):
+				_apply(document, update)
+				return SimpleNamespace(modified_count=1)
+		return SimpleNamespace(modified_count=0)
+
+	def get(self, job_id) -> dict:
+		return next(d for d in self.documents if str(d['_id']) == str(job_id))
+
+
+class FakeGridOut:
+	def __init__(self, data: bytes, file_id=None, metadata=None, upload_date=None, chunk_size=4):
+		self._data = data
+		self._id = file_id
+		self.metadata = metadata
+		self.upload_date = upload_date
+		self.chunk_size = chunk_size
+		self._position = 0
+
+	async def read(self) -> bytes:
+		return self._data
+
+	async def readchunk(self) -> bytes:
+		chunk = self._data[self._position : self._position + self.chunk_size]
+		self._position += len(chunk)
+		return chunk
+
+
+_MISSING = object()
+
+
+def _field(document: dict, path: str):
+	for part in path.split('.'):
+		if not isinstance(document, dict) or part not in document:
+			return _MISSING
+		document = document[part]
+	return document
+
+
+def _file_matches(document: dict, query: dict) -> bool:
+	"""Evaluate the subset of query operators the screenshot archive uses"""
+	for key, condition in query.items():
+		if key == '$or':
+			if not any(_file_matches(document, option) for option in condition):
+				return False
+			continue
+		value = _field(document, key)
+		if not isinstance(condition, dict):
+			if value != condition:
+				return False
+			continue
+		for operator, operand in condition.items():
+			if operator == '$exists' and (value is not _MISSING) != operand:
+				return False
+			if operator == '$lt' and (value is _MISSING or not value < operand):
+				return False
+	return True
+
+
+class FakeGridFSBucket:
+	"""In-memory stand-in for AsyncGridFSBucket
+
+	`metadata.sha256` is treated as uniquely indexed, like the screenshot archive.
+	As in GridFS, an upload writes its chunks before the files document, so an
+	upload rejected by that index leaves its chunks behind.
+	"""
+
+	def __init__(self):
+		self.files: dict[ObjectId, bytes] = {}
+		self.metadata: dict[ObjectId, dict] = {}
+		self.upload_dates: dict[ObjectId, datetime] = {}
+		self.chunks: dict[ObjectId, bytes] = {}
+
+	async def upload_from_stream(self, filename, source: io.BytesIO, **kwargs):
+		file_id = ObjectId()
+		await self.upload_from_stream_with_id(file_id, filename, source, **kwargs)
+		return file_id
+
+	async def upload_from_stream_with_id(self, file_id, filename, source, metadata=None, **kwargs):
+		from pymongo.errors import DuplicateKeyError
+
+		data = source.read()
+		self.chunks[file_id] = data
+		sha256 = (metadata or {}).get('sha256')
+		if sha256 is not None and any(m.get('sha256') == sha256 for m in self.metadata.values()):
+			raise DuplicateKeyError('E11000 duplicate key error')
+		self.files[file_id] = data
+		self.metadata[file_id] = dict(metadata or {})
+		self.upload_dates[file_id] = datetime.now(timezone.utc)
+
+	async def open_download_stream(self, file_id):
+		return FakeGridOut(self.files[file_id])
+
+	async def delete(self, file_id):
+		del self.files[file_id]
+		self.metadata.pop(file_id, None)
+		self.upload_dates.pop(file_id, None)
+		self.chunks.pop(file_id, None)
+
+	def document(self, file_id) -> dict:
+		"""The files collection document of a stored file"""
+		return {
+			'_id': file_id,
+			'uploadDate': self.upload_dates[file_id],
+			'metadata': self.metadata[file_id],
+		}
+
+	async def find(self, query: dict, limit: int = 0):
+		found = 0
+		for file_id in list(self.files):
+			if not _file_matches(self.document(file_id), query):
+				continue
+			metadata, uploaded = self.metadata[file_id], self.upload_dates[file_id]
+			yield FakeGridOut(self.files[file_id], file_id, metadata, uploaded)
+			found += 1
+			if found == limit:
+				return
+
+
+class FakeGridFSCollection:
+	"""The files or chunks collection of a FakeGridFSBucket"""
+
+	def __init__(self, bucket: FakeGridFSBucket):
+		self.bucket = bucket
+		self.indexes: list[tuple] = []
+
+	async def create_index(self, keys, **kwargs):
+		self.indexes.append((keys, kwargs))
+		return kwargs.get('name')
+
+	async def update_one(self, query, update):
+		for file_id in self.bucket.files:
+			if _file_matches(self.bucket.document(file_id), query):
+				for path, value in update.get('$set', {}).items():
+					self.bucket.metadata[file_id][path.removeprefix('metadata.')] = value
+				return SimpleNamespace(modified_count=1)
+		return SimpleNamespace(modified_count=0)
+
+	async def delete_many(self, query):
+		removed = self.bucket.chunks.pop(query['files_id'], None)
+		return SimpleNamespace(deleted_count=0 if removed is None else 1)
+
+
+class FakeGridFSDatabase:
+	"""Database whose `<bucket>.files` and `<bucket>.chunks` are views of one bucket"""
+
+	def __init__(self, bucket: FakeGridFSBucket):
+		self.bucket = bucket
+		self.collections: dict[str, FakeGridFSCollection] = {}
+
+	def __getitem__(self, name):
+		return self.collections.setdefault(name, FakeGridFSCollection(self.bucket))
+
+
+class FakeJobDatabase:
+	"""Database exposing a single fake jobs collection"""
+
+	def __init__(self):
+		self.jobs = FakeJobCollection()
+
+	def __getitem__(self, name):
+		return self.jobs
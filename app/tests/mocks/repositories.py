@@ -8,12 +8,55 @@ class FakeMatchRepository:
 		self.matches = initial_matches if initial_matches is not None else []
 
 	async def insert_one(self, match_data: MatchDocument) -> str:
-		"""Simulate saving match data to MongoDB"""
+		"""Simulate saving match data to MongoDB, once per message"""
 		if not isinstance(match_data, MatchDocument):
 			raise ValueError('match_data must be an instance of MatchDocument')
-		self.matches.append(match_data.model_dump())
+		for i, match in enumerate(self.matches):
+			if (match['discord_message_id'], match['discord_user_id']) == (
+				match_data.discord_message_id,
+				match_data.discord_user_id,
+			):
+				return str(i)
+		self.matches.append(match_data.to_mongo())
 		return str(len(self.matches) - 1)
 
+	async def insert_many(self, matches: list[MatchDocument]) -> list[str]:
+		"""Simulate saving several matches at once, returning the new IDs"""
+		ids = []
+		for match in matches:
+			count = len(self.matches)
+			match_id = await self.insert_one(match)
+			if len(self.matches) > count:
+				ids.append(match_id)
+		return ids
+
+	async def iter_stale(self, version: str, models: list[str], limit: int | None = None):
+		"""Simulate finding matches to re-extract; `_id` is the list index"""
+		found = 0
+		for i, match in enumerate(self.matches):
+			extraction = match.get('extraction') or {}
+			if match.get('screenshots') is None or match.get('screenshots_missing'):
+				continue
+			model = extraction.get('model')
+			if extraction.get('version') == version and (model is None or model in models):
+				continue
+			if found == limit:
+				return
+			found += 1
+			yield {'_id': i, **match}
+
+	async def update_extractions(self, updates: list[tuple]) -> int:
+		"""Simulate a bulk update of game_stats and extraction stamps"""
+		for match_id, stats, stamp in updates:
+			self.matches[match_id].update(game_stats=stats, extraction=stamp)
+		return len(updates)
+
+	async def mark_screenshots_missing(self, match_ids: list) -> int:
+		"""Simulate flagging matches whose screenshots are gone"""
+		for match_id in match_ids:
+			self.matches[match_id]['screenshots_missing'] = True
+		return len(match_ids)
+
 	async def aggregate(self, pipeline: dict) -> list[dict]:
 		"""Simulate running an aggregation pipeline"""
 		# Validate the pipeline using MongoPipeline
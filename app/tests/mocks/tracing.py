@@ -0,0 +1,18 @@
+from app.shared.observability.tracing import Span
+
+
+class FakeSpanProcessor:
+	"""Collects finished spans in memory instead of exporting them"""
+
+	def __init__(self):
+		self.spans: list[Span] = []
+
+	def on_end(self, span: Span) -> None:
+		self.spans.append(span)
+
+	def shutdown(self, timeout: float = 5.0) -> None:
+		pass
+
+	def named(self, prefix: str) -> list[Span]:
+		"""Return finished spans whose name starts with prefix"""
+		return [span for span in self.spans if span.name.startswith(prefix)]
@@ -0,0 +1,153 @@
+import io
+import random
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.tests.mocks import FakeGeminiClient, FakeMatchRepository
+from app.tools.backfill import (
+	Backfill,
+	Checkpoint,
+	list_screenshots,
+	message_id_for,
+	pair_screenshots,
+)
+
+
+def write_images(root, *names):
+	for name in names:
+		path = root / name
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_bytes(name.encode())
+
+
+def directory_pairs(root):
+	with list_screenshots(root) as screenshots:
+		return pair_screenshots(screenshots)
+
+
+class FlakyAnalysis:
+	"""FakeGeminiClient analysis that fails for chosen screenshots"""
+
+	def __init__(self, fail_on: set[bytes] = frozenset()):
+		self.fail_on = fail_on
+		self.calls: list[bytes] = []
+
+	async def __call__(self, image_one, image_two=None):
+		self.calls.append(image_one)
+		if image_one in self.fail_on:
+			raise ValueError('unreadable')
+		return await FakeGeminiClient().generate_game_stats(image_one, image_two)
+
+
+def test_lists_images_from_directory_zip_and_tar(tmp_path):
+	"""Test that all three source kinds yield the same readable screenshots"""
+	source = tmp_path / 'shots'
+	write_images(source, 'a.png', 'b.JPG', 'notes.txt', 'sub/c.webp')
+
+	with zipfile.ZipFile(tmp_path / 'shots.zip', 'w') as archive:
+		for path in source.rglob('*'):
+			archive.write(path, path.relative_to(source))
+	with tarfile.open(tmp_path / 'shots.tar.gz', 'w:gz') as archive:
+		archive.add(source, arcname='.')
+
+	for path in (source, tmp_path / 'shots.zip', tmp_path / 'shots.tar.gz'):
+		with list_screenshots(path) as listed:
+			screenshots = {s.name.removeprefix('./'): s for s in listed}
+			assert sorted(screenshots) == ['a.png', 'b.JPG', 'sub/c.webp']
+			assert screenshots['sub/c.webp'].read() == b'sub/c.webp'
+
+
+def test_reads_tar_members_from_several_threads(tmp_path):
+	"""Test that concurrent analyses can read from one compressed tar archive"""
+	rng = random.Random(0)
+	images = {f'{i:02}.png': rng.randbytes(64 * 1024) for i in range(64)}
+	with tarfile.open(tmp_path / 'shots.tar.gz', 'w:gz') as archive:
+		for name, data in images.items():
+			info = tarfile.TarInfo(name)
+			info.size = len(data)
+			archive.addfile(info, io.BytesIO(data))
+
+	with list_screenshots(tmp_path / 'shots.tar.gz') as screenshots:
+		with ThreadPoolExecutor(4) as pool:
+			contents = list(pool.map(lambda s: s.read(), screenshots))
+
+	assert contents == list(images.values())
+
+
+def test_pairs_consecutive_screenshots_within_a_folder(tmp_path):
+	"""Test sequential pairing by name, with odd leftovers analyzed alone"""
+	write_images(tmp_path, '2.png', '1.png', '3.png', 'other/4.png', 'other/5.png')
+
+	with list_screenshots(tmp_path) as screenshots:
+		pairs = pair_screenshots(screenshots)
+		singles = pair_screenshots(screenshots, 'single')
+
+	assert [pair.key for pair in pairs] == ['1.png+2.png', '3.png', 'other/4.png+other/5.png']
+	assert len(singles) == 5
+
+
+def test_message_id_is_stable_and_fits_int64():
+	assert message_id_for(b'a', b'b') == message_id_for(b'a', b'b')
+	assert message_id_for(b'a', b'b') != message_id_for(b'a', None)
+	assert 0 <= message_id_for(b'a', b'b') < 2**63
+
+
+@pytest.mark.asyncio
+async def test_backfill_saves_in_batches_and_reports_failures(tmp_path):
+	"""Test that good pairs are bulk inserted and bad ones are reported, not fatal"""
+	write_images(tmp_path, '1.png', '2.png', '3.png', '4.png', '5.png', '6.png')
+	repository = FakeMatchRepository()
+	analysis = FlakyAnalysis(fail_on={b'3.png'})
+
+	report = await Backfill(
+		analysis, repository, discord_user_id=123, concurrency=2, batch_size=1
+	).run(directory_pairs(tmp_path))
+
+	assert report.saved == 2
+	assert report.failures == [('3.png+4.png', 'ValueError: unreadable')]
+	assert {match['discord_user_id'] for match in repository.matches} == {123}
+	assert '1 failed' in report.summary()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_skips_saved_pairs_on_rerun(tmp_path):
+	"""Test that a resumed backfill only analyzes what wasn't saved"""
+	write_images(tmp_path / 'shots', '1.png', '2.png', '3.png', '4.png')
+	pairs = directory_pairs(tmp_path / 'shots')
+	checkpoint_path = tmp_path / 'progress'
+
+	first = FlakyAnalysis(fail_on={b'3.png'})
+	await Backfill(first, FakeMatchRepository(), 1, checkpoint=Checkpoint(checkpoint_path)).run(
+		pairs
+	)
+	second = FlakyAnalysis()
+	report = await Backfill(
+		second, FakeMatchRepository(), 1, checkpoint=Checkpoint(checkpoint_path)
+	).run(pairs)
+
+	assert second.calls == [b'3.png']
+	assert report.skipped == 1
+	assert report.saved == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_insert_is_not_checkpointed(tmp_path):
+	"""Test that pairs are only marked done once they are in the database"""
+
+	class BrokenRepository(FakeMatchRepository):
+		async def insert_many(self, matches):
+			raise ConnectionError('mongo down')
+
+	write_images(tmp_path, '1.png', '2.png')
+	checkpoint = Checkpoint(tmp_path / 'progress')
+
+	report = await Backfill(FlakyAnalysis(), BrokenRepository(), 1, checkpoint=checkpoint).run(
+		directory_pairs(tmp_path)
+	)
+
+	assert report.saved == 0
+	assert report.failures == [('1.png+2.png', 'save failed: mongo down')]
+	assert checkpoint.done == set()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+
+from app.shared.observability.metrics import GEMINI_BATCH_FALLBACKS_TOTAL
+from app.shared.services.batching import AnalysisBatcher
+from app.shared.services.gemini import GeminiClient, batch_response_schema
+from app.tests.mocks import fake_genai_client, game_stats_payload
+
+
+class Recorder:
+	"""Batch and single analysis stand-ins that echo the first image back"""
+
+	def __init__(self, batch_results=None, batch_error: Exception | None = None):
+		self.batches: list[list] = []
+		self.singles: list[bytes] = []
+		self.batch_results = batch_results
+		self.batch_error = batch_error
+
+	async def run_batch(self, image_sets):
+		self.batches.append([image_one for image_one, _ in image_sets])
+		if self.batch_error is not None:
+			raise self.batch_error
+		if self.batch_results is not None:
+			return self.batch_results
+		return [f'batch:{image_one.decode()}' for image_one, _ in image_sets]
+
+	async def run_single(self, image_one, image_two):
+		self.singles.append(image_one)
+		if image_one == b'bad':
+			raise ValueError('unreadable')
+		return f'single:{image_one.decode()}'
+
+
+def batcher(recorder: Recorder, max_size: int = 4, max_wait: float = 0.01) -> AnalysisBatcher:
+	return AnalysisBatcher(recorder.run_batch, recorder.run_single, max_size, max_wait)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_analyses_share_one_request():
+	"""Test that analyses within the window go out together and get their own result"""
+	recorder = Recorder()
+	b = batcher(recorder)
+
+	results = await asyncio.gather(*(b.submit(name) for name in (b'a', b'b', b'c')))
+
+	assert results == ['batch:a', 'batch:b', 'batch:c']
+	assert recorder.batches == [[b'a', b'b', b'c']]
+	assert recorder.singles == []
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+	"""Test that reaching max_size flushes immediately and starts a new batch"""
+	recorder = Recorder()
+	b = batcher(recorder, max_size=2, max_wait=10)
+
+	results = await asyncio.wait_for(asyncio.gather(b.submit(b'a'), b.submit(b'b')), 1)
+
+	assert results == ['batch:a', 'batch:b']
+
+
+@pytest.mark.asyncio
+async def test_lone_analysis_uses_single_request():
+	"""Test that a batch of one is just a normal request"""
+	recorder = Recorder()
+
+	assert await batcher(recorder).submit(b'a') == 'single:a'
+	assert recorder.batches == []
+
+
+@pytest.mark.asyncio
+async def test_unanswered_items_fall_back_to_single_requests():
+	"""Test that only the items the batch couldn't answer are retried"""
+	recorder = Recorder(batch_results=['batch:a', None, 'batch:c'])
+	b = batcher(recorder)
+
+	results = await asyncio.gather(*(b.submit(name) for name in (b'a', b'b', b'c')))
+
+	assert results == ['batch:a', 'single:b', 'batch:c']
+	assert recorder.singles == [b'b']
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_per_item():
+	"""Test that a failed batch request turns into single requests with their own errors"""
+	recorder = Recorder(batch_error=RuntimeError('quota'))
+	b = batcher(recorder)
+	before = GEMINI_BATCH_FALLBACKS_TOTAL.value(reason='batch_failed')
+
+	results = await asyncio.gather(b.submit(b'a'), b.submit(b'bad'), return_exceptions=True)
+
+	assert results[0] == 'single:a'
+	assert isinstance(results[1], ValueError)
+	assert GEMINI_BATCH_FALLBACKS_TOTAL.value(reason='batch_failed') == before + 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_is_left_out():
+	"""Test that an analysis cancelled while waiting isn't sent"""
+	recorder = Recorder()
+	b = batcher(recorder, max_wait=0.05)
+
+	cancelled = asyncio.create_task(b.submit(b'gone'))
+	kept = asyncio.create_task(b.submit(b'kept'))
+	await asyncio.sleep(0)
+	cancelled.cancel()
+
+	assert await kept == 'single:kept'
+	assert recorder.singles == [b'kept']
+
+
+def test_batch_schema_is_an_array_of_game_stats():
+	"""Test that the batch schema wraps GameStatsResponse with shared $defs at the root"""
+	schema = batch_response_schema()
+	assert schema['type'] == 'array'
+	assert schema['items']['title'] == 'GameStatsResponse'
+	assert '$defs' not in schema['items']
+	assert 'HardpointScoreboard' in schema['$defs']
+
+
+@pytest.mark.asyncio
+async def test_client_splits_batch_answer_and_retries_invalid_items():
+	"""Test that one request answers the batch and only the invalid item is re-sent"""
+	valid = game_stats_payload()
+	invalid = game_stats_payload(map='KILLHOUSE')
+	client = GeminiClient(api_key='test-key', repair_max_fields=0, batch_max_size=3)
+	client.client, calls = fake_genai_client(json.dumps([valid, invalid, valid]), json.dumps(valid))
+
+	results = await asyncio.gather(
+		client.generate_game_stats(b'one'),
+		client.generate_game_stats(b'two', b'weapons'),
+		client.generate_game_stats(b'three'),
+	)
+
+	assert all(result.map == 'SCAR' for result in results)
+	assert len(calls) == 2
+	assert 'from 3 different matches' in calls[0]['prompt']
+	assert 'different matches' not in calls[1]['prompt']
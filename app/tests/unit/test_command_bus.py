@@ -1,5 +1,23 @@
+import asyncio
+
 import pytest
-from app.bot.commands import CommandBus, AnalyzeImagesCommand, QueryDatabaseCommand
+from app.bot.commands import (
+    CommandBus,
+    AnalyzeImagesCommand,
+    QueryDatabaseCommand,
+    SingleFlight,
+    Timeout,
+    timing,
+)
+from app.bot.handlers.gemini import handle_analyze_images_command
+from app.shared.services.dedupe import RecentKeys
+from app.tests.mocks import FakeEventDispatcher
+
+
+def query(text: str = "q") -> QueryDatabaseCommand:
+    return QueryDatabaseCommand(
+        query=text, discord_user_id=1, discord_message_id=2, discord_channel_id=3
+    )
 
 
 class TestCommandBusInit:
@@ -215,3 +233,129 @@ class TestCommandBusClearHandlers:
         bus.clear_handlers()  # Should not raise
 
         assert len(bus.handlers) == 0
+
+
+class TestCommandBusMiddleware:
+    """Test the middleware chain and the built-in middlewares"""
+
+    @pytest.mark.asyncio
+    async def test_middlewares_wrap_handler_in_order(self):
+        """Test that the first middleware is outermost and can change the result"""
+        calls = []
+
+        def tag(name):
+            async def middleware(command, call_next):
+                calls.append(f"{name} before")
+                result = await call_next(command)
+                calls.append(f"{name} after")
+                return f"{name}({result})"
+
+            return middleware
+
+        bus = CommandBus([tag("outer")])
+        bus.use(tag("inner"))
+        bus.register(QueryDatabaseCommand, lambda cmd: cmd.query)
+
+        assert await bus.execute(query("q")) == "outer(inner(q))"
+        assert calls == ["outer before", "inner before", "inner after", "outer after"]
+
+    @pytest.mark.asyncio
+    async def test_timeout_cancels_slow_handler(self):
+        cancelled = False
+
+        async def slow(cmd):
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        bus = CommandBus([timing, Timeout({QueryDatabaseCommand: 0.01})])
+        bus.register(QueryDatabaseCommand, slow)
+
+        with pytest.raises(TimeoutError, match="QueryDatabaseCommand timed out"):
+            await bus.execute(query())
+        assert cancelled is True
+
+    @pytest.mark.asyncio
+    async def test_single_flight_runs_identical_commands_once(self):
+        """Test that concurrent identical commands share one run and its result"""
+        runs = 0
+        release = asyncio.Event()
+
+        async def handler(cmd):
+            nonlocal runs
+            runs += 1
+            await release.wait()
+            return cmd.query
+
+        single_flight = SingleFlight()
+        bus = CommandBus([single_flight])
+        bus.register(QueryDatabaseCommand, handler)
+
+        # Identical apart from their trace context, which is not part of the key
+        first = asyncio.create_task(bus.execute(query("same")))
+        second = asyncio.create_task(bus.execute(query("same")))
+        other = asyncio.create_task(bus.execute(query("other")))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(first, second, other) == ["same", "same", "other"]
+        assert runs == 2
+        assert len(single_flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_single_flight_cancels_only_when_every_caller_left(self):
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def handler(cmd):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        bus = CommandBus([SingleFlight()])
+        bus.register(QueryDatabaseCommand, handler)
+        first = asyncio.create_task(bus.execute(query()))
+        second = asyncio.create_task(bus.execute(query()))
+        await started.wait()
+
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled.is_set()
+
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        with pytest.raises(asyncio.CancelledError):
+            await second
+
+    @pytest.mark.asyncio
+    async def test_timed_out_analysis_can_be_retried(self):
+        """Test that a cancelled analysis releases its dedupe claim"""
+        recent = RecentKeys(10, 60)
+
+        class SlowClient:
+            def __call__(self, api_key=None):
+                return self
+
+            async def generate_game_stats(self, image_one, image_two=None):
+                await asyncio.sleep(10)
+
+        bus = CommandBus([Timeout({AnalyzeImagesCommand: 0.01})])
+        bus.register(
+            AnalyzeImagesCommand,
+            lambda cmd: handle_analyze_images_command(
+                cmd, FakeEventDispatcher(), SlowClient(), recent=recent
+            ),
+        )
+        command = AnalyzeImagesCommand(
+            image_one=b"one", discord_user_id=1, discord_message_id=2, discord_channel_id=3
+        )
+
+        with pytest.raises(TimeoutError):
+            await bus.execute(command)
+        assert (2, 1) not in recent
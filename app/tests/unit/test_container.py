@@ -0,0 +1,64 @@
+import pytest
+
+from app.shared.core.container import Container, get_container
+from app.shared.core.settings import Settings
+from app.shared.db.mongo import create_client
+
+
+def test_create_client_applies_pool_settings():
+	"""Test that the Mongo pool is sized and tuned from settings"""
+	config = Settings(
+		MONGODB_MAX_POOL_SIZE=7,
+		MONGODB_MIN_POOL_SIZE=2,
+		MONGODB_CONNECT_TIMEOUT_MS=1500,
+		MONGODB_COMPRESSORS='zlib',
+	)
+
+	client = create_client(config)
+
+	pool_options = client.options.pool_options
+	assert pool_options.max_pool_size == 7
+	assert pool_options.min_pool_size == 2
+	assert pool_options.connect_timeout == 1.5
+	assert client.options._options['compressors'] == ['zlib']
+
+
+@pytest.mark.asyncio
+async def test_container_opens_and_closes_pools():
+	"""Test the container lifecycle and the process-wide accessor"""
+	with pytest.raises(RuntimeError):
+		get_container()
+
+	async with Container(Settings(HTTP_MAX_CONNECTIONS=5)) as container:
+		assert get_container() is container
+		assert container.db.name == container.config.MONGODB_DB
+		assert container.match_repository().db.name == container.config.MONGODB_DB
+		http = container.http
+
+	assert http.is_closed
+	with pytest.raises(RuntimeError):
+		get_container()
+	with pytest.raises(RuntimeError):
+		container.http
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_is_shared_per_api_key():
+	"""Test that Gemini clients are reused and built on the pooled HTTP client"""
+	async with Container() as container:
+		first = container.gemini_client(api_key='key')
+		assert container.gemini_client(api_key='key') is first
+		assert container.gemini_client(api_key='other') is not first
+		http_options = first.client._api_client._http_options
+		assert http_options.httpx_async_client is container.http
+		assert first.gateway is container.gemini_gateway
+		assert container.gemini_client(api_key='other').gateway is first.gateway
+
+
+@pytest.mark.asyncio
+async def test_hedging_is_opt_in():
+	"""Test that Gemini clients only hedge when enabled"""
+	async with Container() as container:
+		assert container.gemini_client(api_key='key').hedger is None
+	async with Container(Settings(GEMINI_HEDGING_ENABLED=True)) as container:
+		assert container.gemini_client(api_key='key').hedger is container.gemini_hedger is not None
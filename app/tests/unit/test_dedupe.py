@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from functools import partial
+
+import pytest
+
+from app.bot.commands import AnalyzeImagesCommand
+from app.bot.events import GameStatsAnalyzed, MatchSaveFailed
+from app.bot.handlers.db import handle_game_stats_analyzed
+from app.bot.handlers.gemini import handle_analyze_images_command, handle_match_save_failed
+from app.shared.models.schemas import MatchDocument
+from app.shared.observability.metrics import DUPLICATE_MATCHES_TOTAL
+from app.shared.services.dedupe import RecentKeys
+from app.tests.mocks import FakeEventDispatcher, FakeGeminiClient, FakeMatchRepository
+
+
+class Clock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self) -> float:
+		return self.now
+
+
+def analyze_command(message_id: int = 456) -> AnalyzeImagesCommand:
+	return AnalyzeImagesCommand(
+		image_one=b'one', discord_user_id=123, discord_message_id=message_id, discord_channel_id=789
+	)
+
+
+def test_claim_rejects_repeats_until_released():
+	recent = RecentKeys()
+	before = DUPLICATE_MATCHES_TOTAL.value(stage='memory')
+
+	assert recent.claim((1, 2))
+	assert not recent.claim((1, 2))
+	recent.release((1, 2))
+	assert recent.claim((1, 2))
+	assert DUPLICATE_MATCHES_TOTAL.value(stage='memory') == before + 1
+
+
+def test_keys_are_forgotten_after_ttl_or_when_full():
+	"""Test that memory stays bounded by both age and count"""
+	clock = Clock()
+	recent = RecentKeys(max_size=2, ttl=10, clock=clock)
+
+	recent.claim('a')
+	clock.now = 5
+	recent.claim('b')
+	clock.now = 10
+	assert 'a' not in recent
+	assert recent.claim('a')
+
+	recent.claim('c')
+	assert len(recent) == 2
+	assert 'b' not in recent
+
+
+@pytest.mark.asyncio
+async def test_repeated_command_is_analyzed_once():
+	"""Test that a redelivered command emits no second analysis"""
+	dispatcher = FakeEventDispatcher()
+	recent = RecentKeys()
+
+	await handle_analyze_images_command(analyze_command(), dispatcher, FakeGeminiClient, recent)
+	await handle_analyze_images_command(analyze_command(), dispatcher, FakeGeminiClient, recent)
+
+	analyzed = [e for e in dispatcher.emitted_events if isinstance(e, GameStatsAnalyzed)]
+	assert len(analyzed) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_analysis_can_be_retried():
+	"""Test that a failure releases the message so a retry runs"""
+
+	class BrokenClient(FakeGeminiClient):
+		async def generate_game_stats(self, image_one, image_two=None):
+			raise RuntimeError('quota')
+
+	recent = RecentKeys()
+
+	with pytest.raises(RuntimeError):
+		await handle_analyze_images_command(
+			analyze_command(), FakeEventDispatcher(), BrokenClient, recent
+		)
+
+	assert (456, 123) not in recent
+
+
+@pytest.mark.asyncio
+async def test_failed_save_can_be_retried():
+	"""Test that a match the repository couldn't save releases the message"""
+
+	class BrokenRepository(FakeMatchRepository):
+		async def insert_one(self, match_data):
+			raise ConnectionError('mongo down')
+
+	dispatcher = FakeEventDispatcher()
+	recent = RecentKeys()
+	dispatcher.subscribe(
+		GameStatsAnalyzed,
+		partial(
+			handle_game_stats_analyzed, dispatcher=dispatcher, matches_repository=BrokenRepository()
+		),
+	)
+	dispatcher.subscribe(MatchSaveFailed, partial(handle_match_save_failed, recent=recent))
+
+	await handle_analyze_images_command(analyze_command(), dispatcher, FakeGeminiClient, recent)
+
+	assert isinstance(dispatcher.emitted_events[-1], MatchSaveFailed)
+	assert (456, 123) not in recent
+
+
+@pytest.mark.asyncio
+async def test_repository_keeps_first_match_per_message():
+	"""Test upsert semantics: saving a message twice returns the original match"""
+	repository = FakeMatchRepository()
+	game_stats = await FakeGeminiClient().generate_game_stats(b'one')
+
+	def match(message_id: int) -> MatchDocument:
+		return MatchDocument(
+			discord_user_id=123,
+			discord_message_id=message_id,
+			discord_channel_id=789,
+			game_stats=game_stats,
+			created_at=datetime.now(timezone.utc),
+		)
+
+	first = await repository.insert_one(match(1))
+	assert await repository.insert_one(match(1)) == first
+	assert len(await repository.insert_many([match(1), match(2)])) == 1
+	assert len(repository.matches) == 2
@@ -115,12 +115,61 @@ async def test_handle_discord_response_channel_not_found():
 def test_register_discord_event_handlers():
     """Test that register_discord_event_handlers subscribes the handler to the dispatcher"""
     from app.bot.handlers.discord import register_discord_event_handlers
-    from app.bot.events import EventDispatcher, MatchSaved
+    from app.bot.events import (
+        CommandFailed,
+        DuplicateMatchDetected,
+        EventDispatcher,
+        MatchSaved,
+    )
 
     dispatcher = EventDispatcher()
     bot = FakeBot()
 
     register_discord_event_handlers(dispatcher, bot)
 
-    # Check that the dispatcher has a subscriber for MatchSaved and QueryExecuted events
-    assert set(dispatcher.registered_events) == {MatchSaved, QueryExecuted}
+    # Check that the dispatcher has a subscriber for every Discord-facing event
+    assert set(dispatcher.registered_events) == {
+        MatchSaved,
+        QueryExecuted,
+        CommandFailed,
+        DuplicateMatchDetected,
+    }
+
+
+@pytest.mark.asyncio
+async def test_slash_command_results_are_sent_as_follow_ups(monkeypatch):
+    """Test that replies use the interaction webhook, and the channel once it expired"""
+    pytest.importorskip("discord")
+    from discord.utils import time_snowflake
+    from datetime import datetime, timedelta, timezone
+    import app.bot.handlers.discord as handlers
+
+    class Recorder:
+        def __init__(self):
+            self.sent = []
+
+        async def send(self, content):
+            self.sent.append(content)
+
+    followup, channel = Recorder(), Recorder()
+    monkeypatch.setattr(handlers, "followup_webhook", lambda bot, token: followup)
+    bot = FakeBot()
+    bot.application_id = 42
+    bot.cached_channels[123] = channel
+
+    def event(used_at):
+        return QueryExecuted(
+            query="q",
+            db_response=[],
+            discord_user_id=1,
+            discord_message_id=time_snowflake(used_at),
+            discord_channel_id=123,
+            discord_interaction_token="token",
+        )
+
+    now = datetime.now(timezone.utc)
+    await handlers.handle_query_executed_event(bot, event(now))
+    await handlers.handle_query_executed_event(bot, event(now - timedelta(minutes=20)))
+
+    assert len(followup.sent) == 1
+    assert len(channel.sent) == 1
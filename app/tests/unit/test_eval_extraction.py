@@ -0,0 +1,108 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.shared.models.schemas import GameStatsResponse
+from app.shared.observability.metrics import GEMINI_TOKENS_TOTAL
+from app.shared.services.gemini import GeminiClient
+from app.shared.services.model_router import ModelRouter
+from app.tests.mocks import fake_genai_client, game_stats_payload
+from app.tools.eval_extraction import Budget, Evaluation, load_corpus
+
+
+def write_case(root, name: str, expected: dict, images=('1.png', '2.png')) -> None:
+	case_dir = root / name
+	case_dir.mkdir()
+	for image in images:
+		(case_dir / image).write_bytes(image.encode())
+	(case_dir / 'expected.json').write_text(json.dumps(expected))
+
+
+def analyzer(*payloads: dict):
+	"""Analyze callable answering with each payload in turn, raising for None"""
+	remaining = list(payloads)
+
+	async def analyze(image_one, image_two):
+		payload = remaining.pop(0)
+		if payload is None:
+			raise ValueError('unreadable')
+		return GameStatsResponse.model_validate(payload)
+
+	return analyze
+
+
+def test_load_corpus_reads_labelled_cases(tmp_path):
+	write_case(tmp_path, 'b', game_stats_payload(), images=('1.png',))
+	write_case(tmp_path, 'a', game_stats_payload())
+	(tmp_path / 'unlabelled').mkdir()
+
+	cases = load_corpus(tmp_path)
+
+	assert [c.name for c in cases] == ['a', 'b']
+	assert (cases[0].image_one, cases[0].image_two) == (b'1.png', b'2.png')
+	assert cases[1].image_two is None
+
+
+@pytest.mark.asyncio
+async def test_accuracy_is_scored_per_field(tmp_path):
+	"""Test that each wrong leaf counts against its own field only"""
+	write_case(tmp_path, 'a', game_stats_payload())
+	write_case(tmp_path, 'b', game_stats_payload())
+	cases = load_corpus(tmp_path)
+	analyze = analyzer(game_stats_payload(), game_stats_payload(scoreboard__deaths=99))
+
+	report = await Evaluation(analyze).run(cases)
+
+	accuracy = report.field_accuracy()
+	assert accuracy['scoreboard.deaths'] == 0.5
+	assert accuracy['map'] == 1.0
+	assert 0.9 < report.accuracy < 1.0
+
+
+@pytest.mark.asyncio
+async def test_failed_case_scores_zero_and_breaks_budget(tmp_path):
+	write_case(tmp_path, 'a', game_stats_payload())
+	write_case(tmp_path, 'b', game_stats_payload())
+	report = await Evaluation(analyzer(game_stats_payload(), None)).run(load_corpus(tmp_path))
+
+	assert report.accuracy == 0.5
+	assert [name for name, _ in report.failures] == ['b']
+	budget = Budget(min_accuracy=0.9, min_field_accuracy={'map': 1.0}, max_failures=0)
+	assert len(budget.violations(report)) == 3
+	assert Budget(min_accuracy=0.5).violations(report) == []
+
+
+@pytest.mark.asyncio
+async def test_latency_and_tokens_are_measured_per_case(tmp_path):
+	"""Test that the p95 latency and mean token budgets use per-case deltas"""
+	write_case(tmp_path, 'a', game_stats_payload())
+	ticks = iter([0.0, 1.0, 5.0, 8.0])
+	tokens = iter([100, 1100, 1100, 3100])
+	evaluation = Evaluation(
+		analyzer(game_stats_payload(), game_stats_payload()),
+		tokens_used=lambda: next(tokens),
+		clock=lambda: next(ticks),
+	)
+
+	report = await evaluation.run(load_corpus(tmp_path) * 2)
+
+	assert report.latencies == [1.0, 3.0]
+	assert report.tokens_per_case == 1500
+	assert Budget(max_latency_p95=2.0, max_tokens_per_case=1000).violations(report) == [
+		'latency p95 3.00s > 2.00s',
+		'1500 tokens per case > 1000',
+	]
+
+
+@pytest.mark.asyncio
+async def test_client_counts_reported_tokens():
+	client = GeminiClient(api_key='test-key', router=ModelRouter.single('flash'))
+	usage = SimpleNamespace(prompt_token_count=1200, candidates_token_count=300)
+	client.client, _ = fake_genai_client(json.dumps(game_stats_payload()), usage=usage)
+	before = GEMINI_TOKENS_TOTAL.total()
+
+	await client.generate_game_stats(b'one')
+
+	assert GEMINI_TOKENS_TOTAL.total() - before == 1500
+	assert GEMINI_TOKENS_TOTAL.value(model='flash', operation='generate_game_stats', kind='output')
@@ -1,5 +1,14 @@
+import asyncio
+
 import pytest
-from app.bot.events import EventDispatcher, GameStatsAnalyzed, MatchSaved
+from app.bot.events import (
+    BACKGROUND,
+    BackgroundPool,
+    EventDispatcher,
+    GameStatsAnalyzed,
+    MatchSaved,
+)
+from app.shared.observability.metrics import EVENT_BACKGROUND_DROPPED_TOTAL
 from app.shared.models.schemas import GameStatsResponse
 from app.tests.mocks import FakeGeminiClient
 
@@ -245,6 +254,109 @@ class TestEventDispatcherEmit:
         assert received_event.discord_user_id == 999
 
 
+class TestEventDispatcherPriorities:
+    """Test foreground and background subscribers"""
+
+    @staticmethod
+    async def analyzed_event() -> GameStatsAnalyzed:
+        game_stats = await FakeGeminiClient().generate_game_stats(b"test", b"test")
+        return GameStatsAnalyzed(
+            game_stats=game_stats,
+            discord_user_id=123,
+            discord_message_id=456,
+            discord_channel_id=789,
+        )
+
+    @pytest.mark.asyncio
+    async def test_background_handler_does_not_delay_emit(self):
+        """Test that emit returns after foreground handlers, before slow background ones"""
+        dispatcher = EventDispatcher()
+        release = asyncio.Event()
+        calls = []
+
+        async def bookkeeping(event):
+            await release.wait()
+            calls.append("background")
+
+        async def reply(event):
+            calls.append("foreground")
+
+        dispatcher.subscribe(GameStatsAnalyzed, bookkeeping, priority=BACKGROUND)
+        dispatcher.subscribe(GameStatsAnalyzed, reply)
+
+        await asyncio.wait_for(dispatcher.emit(await self.analyzed_event()), timeout=1)
+        assert calls == ["foreground"]
+
+        release.set()
+        await dispatcher.join()
+        assert calls == ["foreground", "background"]
+
+    @pytest.mark.asyncio
+    async def test_background_concurrency_is_bounded(self):
+        dispatcher = EventDispatcher(BackgroundPool(concurrency=2))
+        running = peak = 0
+
+        async def bookkeeping(event):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        dispatcher.subscribe(GameStatsAnalyzed, bookkeeping, priority=BACKGROUND)
+        event = await self.analyzed_event()
+        for _ in range(5):
+            await dispatcher.emit(event)
+        await dispatcher.join()
+
+        assert peak == 2
+        assert len(dispatcher.background) == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "overflow, kept", [("drop_oldest", [2, 3]), ("drop_newest", [1, 2])]
+    )
+    async def test_full_queue_applies_overflow_policy(self, overflow, kept):
+        """Test that a full queue drops the oldest or the newest waiting call"""
+        pool = BackgroundPool(concurrency=1, max_queue=2, overflow=overflow)
+        ran = []
+
+        async def record(number):
+            ran.append(number)
+
+        dropped = EVENT_BACKGROUND_DROPPED_TOTAL.value(event="Test", handler="record")
+        for number in (1, 2, 3):
+            pool.submit("Test", "record", lambda number=number: record(number))
+        await pool.join()
+
+        assert ran == kept
+        assert EVENT_BACKGROUND_DROPPED_TOTAL.value(event="Test", handler="record") == dropped + 1
+
+    @pytest.mark.asyncio
+    async def test_background_errors_are_contained(self):
+        dispatcher = EventDispatcher()
+        called = False
+
+        async def broken(event):
+            raise RuntimeError("rollup failed")
+
+        async def after(event):
+            nonlocal called
+            called = True
+
+        dispatcher.subscribe(GameStatsAnalyzed, broken, priority=BACKGROUND)
+        dispatcher.subscribe(GameStatsAnalyzed, after, priority=BACKGROUND)
+
+        await dispatcher.emit(await self.analyzed_event())
+        await dispatcher.join()
+
+        assert called is True
+
+    def test_unknown_priority_is_rejected(self):
+        with pytest.raises(ValueError):
+            EventDispatcher().subscribe(GameStatsAnalyzed, print, priority="urgent")
+
+
 class TestEventDispatcherClearHandlers:
     """Test EventDispatcher clear_handlers method"""
 
@@ -272,3 +384,24 @@ class TestEventDispatcherClearHandlers:
         dispatcher.clear_handlers()  # Should not raise
 
         assert len(dispatcher.handlers) == 0
+
+
+class TestEventTrustedConstruction:
+    """Test Event.trusted construction of already-validated data"""
+
+    @pytest.mark.asyncio
+    async def test_trusted_event_matches_validated_event(self):
+        """Test that trusted construction fills defaults and reuses the game stats"""
+        game_stats = await FakeGeminiClient().generate_game_stats(b"a", b"b")
+
+        event = GameStatsAnalyzed.trusted(
+            game_stats=game_stats,
+            discord_user_id=1,
+            discord_message_id=2,
+            discord_channel_id=3,
+        )
+
+        assert event.game_stats is game_stats
+        assert event.timestamp is not None
+        assert len(event.trace_id) == 32
+        assert event == GameStatsAnalyzed(**event.model_dump())
@@ -0,0 +1,259 @@
+import asyncio
+
+import httpx
+import pytest
+from google.genai import errors
+from pydantic import ValidationError
+
+from app.shared.observability.metrics import GEMINI_BREAKER_STATE, GEMINI_RETRIES_TOTAL
+from app.shared.services.gemini_gateway import (
+	ANALYSIS,
+	FATAL,
+	QUERY,
+	RATE_LIMITED,
+	UNAVAILABLE,
+	AdaptiveLimiter,
+	CircuitBreaker,
+	CircuitOpenError,
+	GeminiGateway,
+	TrafficClassPolicy,
+	classify_failure,
+	retry_after_seconds,
+)
+
+
+def api_error(
+	code: int, headers: dict | None = None, details: dict | None = None
+) -> errors.APIError:
+	return errors.APIError(
+		code,
+		details or {'error': {'code': code, 'message': 'failed', 'status': 'ERROR'}},
+		response=httpx.Response(code, headers=headers or {}),
+	)
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self) -> float:
+		return self.now
+
+
+def make_gateway(clock=None, **kwargs) -> tuple[GeminiGateway, list[float]]:
+	"""A gateway whose sleeps are recorded instead of awaited"""
+	sleeps = []
+
+	async def sleep(delay):
+		sleeps.append(delay)
+
+	gateway = GeminiGateway(
+		{
+			ANALYSIS: TrafficClassPolicy(max_concurrency=4, latency_target=10.0),
+			QUERY: TrafficClassPolicy(max_concurrency=2, latency_target=5.0),
+		},
+		clock=clock or FakeClock(),
+		sleep=sleep,
+		jitter=lambda: 1.0,
+		**kwargs,
+	)
+	return gateway, sleeps
+
+
+def failing(*excs):
+	"""A request raising each exception in turn, then returning 'ok'"""
+	remaining = list(excs)
+	calls = []
+
+	async def request():
+		calls.append(1)
+		if remaining:
+			raise remaining.pop(0)
+		return 'ok'
+
+	request.calls = calls
+	return request
+
+
+class TestClassifyFailure:
+	"""Tests for sorting errors into retryable and fatal"""
+
+	def test_classification(self):
+		"""Test that quota, server and network errors are retryable and the rest are not"""
+		assert classify_failure(api_error(429)) == RATE_LIMITED
+		assert classify_failure(api_error(503)) == UNAVAILABLE
+		assert classify_failure(httpx.ConnectError('refused')) == UNAVAILABLE
+		assert classify_failure(asyncio.TimeoutError()) == UNAVAILABLE
+		assert classify_failure(api_error(400)) == FATAL
+		assert classify_failure(ValueError('bad json')) == FATAL
+
+	def test_retry_after_header_and_retry_info(self):
+		"""Test that the server's requested delay is read from either source"""
+		assert retry_after_seconds(api_error(429, headers={'retry-after': '7'})) == 7.0
+		details = {
+			'error': {
+				'code': 429,
+				'details': [
+					{'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '12s'}
+				],
+			}
+		}
+		assert retry_after_seconds(api_error(429, details=details)) == 12.0
+		assert retry_after_seconds(api_error(429)) is None
+
+
+class TestAdaptiveLimiter:
+	"""Tests for the AIMD concurrency limit"""
+
+	def test_overload_halves_and_success_grows_back(self):
+		"""Test multiplicative decrease on overload and additive increase on fast calls"""
+		limiter = AdaptiveLimiter('test', max_limit=8, min_limit=1, latency_target=1.0)
+
+		limiter.on_overload()
+		assert limiter.limit == 4
+		limiter.on_overload()
+		limiter.on_overload()
+		limiter.on_overload()
+		assert limiter.limit == 1
+
+		for _ in range(3):
+			limiter.on_success(0.1)
+		assert int(limiter.limit) == 2
+
+	def test_slow_success_shrinks_limit(self):
+		"""Test that calls over the latency target count as overload"""
+		limiter = AdaptiveLimiter('test', max_limit=8, latency_target=1.0)
+		limiter.on_success(5.0)
+		assert limiter.limit == 4
+
+	@pytest.mark.asyncio
+	async def test_slot_waits_at_limit(self):
+		"""Test that no more than `limit` calls hold a slot at once"""
+		limiter = AdaptiveLimiter('test', max_limit=2)
+		release = asyncio.Event()
+		peak = 0
+
+		async def call():
+			nonlocal peak
+			async with limiter.slot():
+				peak = max(peak, limiter.inflight)
+				await release.wait()
+
+		tasks = [asyncio.create_task(call()) for _ in range(5)]
+		await asyncio.sleep(0)
+		assert limiter.inflight == 2
+		release.set()
+		await asyncio.gather(*tasks)
+		assert peak == 2
+		assert limiter.inflight == 0
+
+
+class TestCircuitBreaker:
+	"""Tests for the closed/open/half-open cycle"""
+
+	def test_opens_probes_and_closes(self):
+		"""Test the full breaker cycle with a single half-open probe"""
+		clock = FakeClock()
+		breaker = CircuitBreaker('test-cycle', failure_threshold=2, reset_timeout=30, clock=clock)
+
+		breaker.before_call()
+		breaker.on_failure()
+		assert breaker.state == CircuitBreaker.CLOSED
+		breaker.before_call()
+		breaker.on_failure()
+		assert breaker.state == CircuitBreaker.OPEN
+		assert GEMINI_BREAKER_STATE.value(traffic_class='test-cycle') == 2
+
+		clock.now = 10
+		with pytest.raises(CircuitOpenError):
+			breaker.before_call()
+
+		clock.now = 31
+		breaker.before_call()
+		assert breaker.state == CircuitBreaker.HALF_OPEN
+		# Only one probe at a time
+		with pytest.raises(CircuitOpenError):
+			breaker.before_call()
+
+		breaker.on_success()
+		assert breaker.state == CircuitBreaker.CLOSED
+		assert GEMINI_BREAKER_STATE.value(traffic_class='test-cycle') == 0
+
+	def test_failed_probe_reopens(self):
+		"""Test that a failed half-open probe starts a new cool-down"""
+		clock = FakeClock()
+		breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30, clock=clock)
+		breaker.on_failure()
+
+		clock.now = 31
+		breaker.before_call()
+		breaker.on_failure()
+
+		assert breaker.state == CircuitBreaker.OPEN
+		assert breaker.opened_at == 31
+
+
+class TestGeminiGateway:
+	"""Tests for retries and isolation in GeminiGateway.call"""
+
+	@pytest.mark.asyncio
+	async def test_retries_rate_limit_honouring_retry_after(self):
+		"""Test that a 429 is retried no sooner than Retry-After and shrinks the limit"""
+		gateway, sleeps = make_gateway()
+		before = GEMINI_RETRIES_TOTAL.value(traffic_class=ANALYSIS, reason=RATE_LIMITED)
+		request = failing(api_error(429, headers={'retry-after': '2'}))
+
+		assert await gateway.call(ANALYSIS, request) == 'ok'
+
+		assert len(request.calls) == 2
+		assert sleeps == [2.0]
+		assert gateway.limiters[ANALYSIS].limit < 4
+		assert GEMINI_RETRIES_TOTAL.value(traffic_class=ANALYSIS, reason=RATE_LIMITED) == before + 1
+
+	@pytest.mark.asyncio
+	async def test_backoff_grows_and_is_capped(self):
+		"""Test the exponential backoff ceiling with jitter pinned to its maximum"""
+		gateway, sleeps = make_gateway(
+			max_attempts=5, retry_base_seconds=1, retry_max_seconds=3, breaker_failure_threshold=10
+		)
+		request = failing(*(api_error(503) for _ in range(4)))
+
+		assert await gateway.call(QUERY, request) == 'ok'
+		assert sleeps == [1, 2, 3, 3]
+
+	@pytest.mark.asyncio
+	async def test_gives_up_after_max_attempts(self):
+		"""Test that the last error is raised once attempts are exhausted"""
+		gateway, sleeps = make_gateway(max_attempts=2)
+		request = failing(api_error(503), api_error(503), api_error(503))
+
+		with pytest.raises(errors.APIError):
+			await gateway.call(ANALYSIS, request)
+		assert len(request.calls) == 2
+
+	@pytest.mark.asyncio
+	async def test_fatal_errors_are_not_retried(self):
+		"""Test that bad requests and invalid output fail at once without tripping the breaker"""
+		gateway, sleeps = make_gateway(breaker_failure_threshold=1)
+
+		with pytest.raises(ValidationError):
+			await gateway.call(ANALYSIS, failing(ValidationError.from_exception_data('x', [])))
+		with pytest.raises(errors.APIError):
+			await gateway.call(ANALYSIS, failing(api_error(400)))
+
+		assert sleeps == []
+		assert gateway.breakers[ANALYSIS].state == CircuitBreaker.CLOSED
+
+	@pytest.mark.asyncio
+	async def test_open_circuit_fails_fast_per_traffic_class(self):
+		"""Test that an open analysis breaker does not block queries"""
+		gateway, _ = make_gateway(max_attempts=1, breaker_failure_threshold=1)
+
+		with pytest.raises(errors.APIError):
+			await gateway.call(ANALYSIS, failing(api_error(503)))
+
+		request = failing()
+		with pytest.raises(CircuitOpenError):
+			await gateway.call(ANALYSIS, request)
+		assert request.calls == []
+		assert await gateway.call(QUERY, failing()) == 'ok'
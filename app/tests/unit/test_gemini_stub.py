@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from app.gemini_stub.cassettes import CassetteStore, request_key
+from app.gemini_stub.faults import FaultInjector, corrupt_response
+
+
+class TestRequestKey:
+	"""Tests for cassette key hashing"""
+
+	def test_request_key_ignores_dict_ordering(self):
+		"""Test that key order in the body does not change the key"""
+		body_a = {'contents': [{'parts': [{'text': 'hi'}]}], 'generationConfig': {'a': 1, 'b': 2}}
+		body_b = {'generationConfig': {'b': 2, 'a': 1}, 'contents': [{'parts': [{'text': 'hi'}]}]}
+
+		assert request_key('model', body_a) == request_key('model', body_b)
+
+	def test_request_key_depends_on_model(self):
+		"""Test that the same body for a different model gets a different key"""
+		body = {'contents': []}
+
+		assert request_key('model-a', body) != request_key('model-b', body)
+
+	def test_request_key_depends_on_body(self):
+		"""Test that different prompts get different keys"""
+		assert request_key('model', {'contents': ['a']}) != request_key(
+			'model', {'contents': ['b']}
+		)
+
+
+class TestCassetteStore:
+	"""Tests for the file-backed cassette store"""
+
+	def test_load_missing_returns_none(self, tmp_path):
+		"""Test that an unrecorded key returns None"""
+		store = CassetteStore(tmp_path)
+		assert store.load('missing') is None
+
+	def test_save_then_load_round_trips(self, tmp_path):
+		"""Test that a saved response is returned by load"""
+		store = CassetteStore(tmp_path / 'cassettes')
+		response = {'candidates': [{'content': {'parts': [{'text': '{}'}]}}]}
+
+		path = store.save('abc', 'model', response)
+
+		assert path.exists()
+		assert json.loads(path.read_text())['model'] == 'model'
+		assert store.load('abc') == response
+
+
+class TestFaultInjector:
+	"""Tests for latency and failure injection"""
+
+	def test_no_distribution_adds_no_latency(self):
+		"""Test that the default injector adds no delay"""
+		assert FaultInjector().sample_latency() == 0.0
+
+	def test_fixed_latency(self):
+		"""Test that fixed latency is returned in seconds"""
+		assert FaultInjector(distribution='fixed', latency_ms=250).sample_latency() == 0.25
+
+	def test_uniform_latency_within_bounds(self):
+		"""Test that uniform latency stays within the configured spread"""
+		faults = FaultInjector(distribution='uniform', latency_ms=100, spread=50, seed=1)
+		samples = [faults.sample_latency() for _ in range(200)]
+
+		assert all(0.05 <= s <= 0.15 for s in samples)
+
+	def test_lognormal_latency_is_seeded(self):
+		"""Test that the same seed reproduces the same latency sequence"""
+		a = FaultInjector(distribution='lognormal', latency_ms=100, spread=0.5, seed=7)
+		b = FaultInjector(distribution='lognormal', latency_ms=100, spread=0.5, seed=7)
+
+		assert [a.sample_latency() for _ in range(5)] == [b.sample_latency() for _ in range(5)]
+
+	def test_latency_never_negative(self):
+		"""Test that a wide uniform spread is clamped at zero"""
+		faults = FaultInjector(distribution='uniform', latency_ms=10, spread=100, seed=3)
+		assert all(faults.sample_latency() >= 0 for _ in range(100))
+
+	@pytest.mark.parametrize('probability, expected', [(0.0, False), (1.0, True)])
+	def test_rate_limit_probability(self, probability, expected):
+		"""Test that 0 and 1 probabilities never and always inject 429s"""
+		faults = FaultInjector(rate_limit_probability=probability)
+		assert faults.should_rate_limit() is expected
+
+	@pytest.mark.parametrize('probability, expected', [(0.0, False), (1.0, True)])
+	def test_malformed_probability(self, probability, expected):
+		"""Test that 0 and 1 probabilities never and always corrupt responses"""
+		faults = FaultInjector(malformed_probability=probability)
+		assert faults.should_corrupt() is expected
+
+
+def test_corrupt_response_truncates_text_without_mutating_original():
+	"""Test that corrupt_response breaks the JSON payload but leaves the input alone"""
+	text = json.dumps({'map': 'SCAR', 'team': 'JSOC'})
+	response = {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}}]}
+
+	corrupted = corrupt_response(response)
+
+	corrupted_text = corrupted['candidates'][0]['content']['parts'][0]['text']
+	with pytest.raises(json.JSONDecodeError):
+		json.loads(corrupted_text)
+	assert response['candidates'][0]['content']['parts'][0]['text'] == text
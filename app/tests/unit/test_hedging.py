@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from app.shared.observability.metrics import GEMINI_HEDGES_TOTAL
+from app.shared.services.hedging import HedgeBudget, Hedger, LatencyWindow
+
+
+def warmed_hedger(latency: float = 0.01, samples: int = 20, **kwargs) -> Hedger:
+	"""A hedger that has already seen `samples` calls of the given latency"""
+	hedger = Hedger(min_delay=0.0, min_samples=samples, **kwargs)
+	for _ in range(samples):
+		hedger._window('analysis').record(latency)
+	hedger.budget.tokens = hedger.budget.burst
+	return hedger
+
+
+def scripted(*delays, error: Exception | None = None):
+	"""A request whose n-th call sleeps delays[n] and returns n"""
+	calls = []
+	cancelled = []
+
+	async def request():
+		index = len(calls)
+		calls.append(index)
+		try:
+			await asyncio.sleep(delays[index])
+		except asyncio.CancelledError:
+			cancelled.append(index)
+			raise
+		if error is not None:
+			raise error
+		return index
+
+	request.calls = calls
+	request.cancelled = cancelled
+	return request
+
+
+def test_latency_window_percentile():
+	"""Test that the percentile is taken over the most recent samples only"""
+	window = LatencyWindow(size=100)
+	assert window.percentile(0.95) is None
+	for latency in range(200):
+		window.record(latency)
+	assert window.percentile(0.95) == 195
+	assert window.percentile(0.5) == 150
+
+
+def test_budget_caps_hedge_ratio():
+	"""Test that hedges can't exceed max_ratio of requests"""
+	budget = HedgeBudget(max_ratio=0.1)
+	granted = 0
+	for _ in range(100):
+		budget.on_request()
+		granted += budget.try_acquire()
+	assert 9 <= granted <= 10
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_until_latencies_are_known():
+	"""Test that a cold hedger just awaits the request"""
+	hedger = Hedger(min_samples=5)
+	request = scripted(0.05)
+
+	assert await hedger.run('analysis', lambda: hedger.timed('analysis', request)) == 0
+	assert request.calls == [0]
+	assert len(hedger.latencies['analysis']) == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff_is_not_recorded_as_latency():
+	"""Test that only single attempts, not the sleeps between them, set the threshold"""
+	hedger = Hedger(min_samples=5)
+	failing = scripted(0.0, error=RuntimeError('429'))
+	request = scripted(0.01)
+
+	async def send():
+		# What the gateway does on a rate limited attempt
+		with pytest.raises(RuntimeError):
+			await hedger.timed('analysis', failing)
+		await asyncio.sleep(0.2)
+		return await hedger.timed('analysis', request)
+
+	assert await hedger.run('analysis', send) == 0
+	assert len(hedger.latencies['analysis']) == 1
+	assert hedger.latencies['analysis'].percentile(0.95) < 0.2
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_loser_cancelled():
+	"""Test that a call slower than the threshold races a second copy"""
+	hedger = warmed_hedger()
+	before = GEMINI_HEDGES_TOTAL.value(traffic_class='analysis', outcome='hedge_won')
+	request = scripted(10, 0.01)
+
+	assert await hedger.run('analysis', request) == 1
+
+	assert request.calls == [0, 1]
+	await asyncio.sleep(0)
+	assert request.cancelled == [0]
+	assert GEMINI_HEDGES_TOTAL.value(traffic_class='analysis', outcome='hedge_won') == before + 1
+
+
+@pytest.mark.asyncio
+async def test_fast_call_is_not_hedged():
+	"""Test that calls answering within the threshold are sent once"""
+	hedger = warmed_hedger(latency=1.0)
+	request = scripted(0.01)
+
+	assert await hedger.run('analysis', request) == 0
+	assert request.calls == [0]
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_waits_for_primary():
+	"""Test that no hedge is sent without budget"""
+	hedger = warmed_hedger()
+	hedger.budget.tokens = 0
+	request = scripted(0.05, 0.0)
+
+	assert await hedger.run('analysis', request) == 0
+	assert request.calls == [0]
+
+
+@pytest.mark.asyncio
+async def test_both_copies_failing_raises():
+	"""Test that the error is raised once both copies have failed"""
+	hedger = warmed_hedger()
+	request = scripted(0.05, 0.01, error=ValueError('bad response'))
+
+	with pytest.raises(ValueError):
+		await hedger.run('analysis', request)
+	assert request.calls == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_caller_cancellation_cancels_both_copies():
+	"""Test that cancelling the caller leaves no request running"""
+	hedger = warmed_hedger()
+	request = scripted(10, 10)
+
+	task = asyncio.create_task(hedger.run('analysis', request))
+	await asyncio.sleep(0.1)
+	task.cancel()
+	with pytest.raises(asyncio.CancelledError):
+		await task
+	await asyncio.sleep(0)
+
+	assert sorted(request.cancelled) == [0, 1]
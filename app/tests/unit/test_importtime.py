@@ -0,0 +1,38 @@
+from app.tools.importtime import is_loaded, measure, parse_importtime
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     google.genai.types
+import time:        30 |        150 |   google.genai
+import time:        10 |        160 | app.shared.services.gemini
+"""
+
+
+def test_parse_importtime():
+	"""Test parsing of -X importtime output into timings with nesting depth"""
+	timings = parse_importtime(SAMPLE)
+
+	assert [t.module for t in timings] == [
+		'google.genai.types',
+		'google.genai',
+		'app.shared.services.gemini',
+	]
+	assert timings[0].self_us == 120
+	assert timings[2].cumulative_us == 160
+	assert [t.depth for t in timings] == [2, 1, 0]
+
+
+def test_is_loaded_matches_package_and_submodules():
+	"""Test that a package counts as loaded when it or a submodule was imported"""
+	timings = parse_importtime(SAMPLE)
+
+	assert is_loaded(timings, 'google.genai')
+	assert not is_loaded(timings, 'google.gen')
+	assert not is_loaded(timings, 'pymongo')
+
+
+def test_bot_startup_does_not_import_gemini_sdk_or_pymongo():
+	"""Test that heavy SDKs are deferred until first use"""
+	timings = measure('app.bot.main')
+
+	assert not is_loaded(timings, 'google.genai')
+	assert not is_loaded(timings, 'pymongo')
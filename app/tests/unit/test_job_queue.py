@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+import pytest
+
+from app.bot.commands import AnalyzeImagesCommand, CommandBus, QueryDatabaseCommand
+from app.bot.events import CommandFailed
+from app.bot.handlers.jobs import register_job_queue_command_handlers
+from app.bot.worker import JobWorker
+from app.shared.job_queue import DONE, FAILED, LEASED, PENDING, JobQueue, utcnow
+from app.tests.mocks import FakeEventDispatcher, FakeGridFSBucket, FakeJobDatabase
+
+TYPES = ['AnalyzeImagesCommand', 'QueryDatabaseCommand']
+
+
+@pytest.fixture
+def queue():
+	queue = JobQueue(FakeJobDatabase(), max_attempts=3, retry_base_seconds=10)
+	queue._bucket = FakeGridFSBucket()
+	return queue
+
+
+def analyze_command() -> AnalyzeImagesCommand:
+	return AnalyzeImagesCommand(
+		image_one=b'one',
+		image_two=b'two',
+		discord_user_id=1,
+		discord_message_id=2,
+		discord_channel_id=3,
+	)
+
+
+class TestJobQueue:
+	"""Tests for claim/lease/ack semantics"""
+
+	@pytest.mark.asyncio
+	async def test_enqueue_stores_images_outside_the_job(self, queue):
+		"""Test that bytes fields go to GridFS and come back on load"""
+		job_id = await queue.enqueue(analyze_command())
+
+		document = queue.collection.get(job_id)
+		assert document['status'] == PENDING
+		assert 'image_one' not in document['payload']
+		assert set(document['blobs']) == {'image_one', 'image_two'}
+
+		job = await queue.claim('w1', TYPES, visibility_timeout=30)
+		assert await queue.load_blobs(job) == {'image_one': b'one', 'image_two': b'two'}
+
+	@pytest.mark.asyncio
+	async def test_claimed_job_is_hidden_until_lease_expires(self, queue):
+		"""Test that a leased job cannot be claimed twice before its lease expires"""
+		await queue.enqueue(analyze_command())
+
+		job = await queue.claim('w1', TYPES, visibility_timeout=30)
+
+		assert job.attempts == 1
+		assert queue.collection.get(job.id)['status'] == LEASED
+		assert await queue.claim('w2', TYPES, visibility_timeout=30) is None
+
+	@pytest.mark.asyncio
+	async def test_expired_lease_is_reclaimed_and_stale_ack_rejected(self, queue):
+		"""Test that a crashed worker's job is picked up and its late ack is ignored"""
+		await queue.enqueue(analyze_command())
+		stale = await queue.claim('w1', TYPES, visibility_timeout=0)
+
+		job = await queue.claim('w2', TYPES, visibility_timeout=30)
+
+		assert job.attempts == 2
+		assert not await queue.ack(stale)
+		assert await queue.ack(job)
+		assert queue.collection.get(job.id)['status'] == DONE
+
+	@pytest.mark.asyncio
+	async def test_ack_deletes_blobs(self, queue):
+		"""Test that finished jobs release their GridFS files"""
+		await queue.enqueue(analyze_command())
+		job = await queue.claim('w1', TYPES, visibility_timeout=30)
+
+		await queue.ack(job)
+
+		assert queue.bucket.files == {}
+		assert queue.collection.get(job.id)['finished_at'] is not None
+
+	@pytest.mark.asyncio
+	async def test_nack_retries_with_backoff_then_fails(self, queue):
+		"""Test exponential retry delay and failure after max attempts"""
+		await queue.enqueue(analyze_command())
+		job = await queue.claim('w1', TYPES, visibility_timeout=30)
+
+		assert await queue.nack(job, 'boom')
+		document = queue.collection.get(job.id)
+		assert document['status'] == PENDING
+		assert document['last_error'] == 'boom'
+		assert document['available_at'] > utcnow() + timedelta(seconds=9)
+
+		for attempt in (2, 3):
+			queue.collection.get(job.id)['available_at'] = utcnow()
+			job = await queue.claim('w1', TYPES, visibility_timeout=30)
+			assert job.attempts == attempt
+			retrying = await queue.nack(job, 'boom')
+
+		assert not retrying
+		assert queue.collection.get(job.id)['status'] == FAILED
+
+	@pytest.mark.asyncio
+	async def test_claim_filters_by_type(self, queue):
+		"""Test that workers only receive the job types they handle"""
+		await queue.enqueue(analyze_command())
+
+		assert await queue.claim('w1', ['QueryDatabaseCommand'], visibility_timeout=30) is None
+
+	@pytest.mark.asyncio
+	async def test_ensure_indexes(self, queue):
+		"""Test that the claim and retention indexes are created"""
+		await queue.ensure_indexes()
+
+		names = [kwargs['name'] for _, kwargs in queue.collection.indexes]
+		assert names == ['claim', 'retention']
+
+
+class TestJobWorker:
+	"""Tests for executing queued commands"""
+
+	@pytest.mark.asyncio
+	async def test_worker_executes_and_acks(self, queue):
+		"""Test that a job is rebuilt into its command, executed and acked"""
+		executed = []
+		bus = CommandBus()
+		bus.register(AnalyzeImagesCommand, lambda cmd: executed.append(cmd))
+		command = analyze_command()
+		job_id = await queue.enqueue(command)
+
+		worker = JobWorker(queue, bus, worker_id='w1')
+		assert await worker.run_once()
+
+		assert executed == [command]
+		assert queue.collection.get(job_id)['status'] == DONE
+		assert not await worker.run_once()
+
+	@pytest.mark.asyncio
+	async def test_worker_emits_command_failed_on_final_attempt(self, queue):
+		"""Test that the user is notified once retries are exhausted"""
+		dispatcher = FakeEventDispatcher()
+		bus = CommandBus()
+
+		def fail(cmd):
+			raise RuntimeError('Gemini unavailable')
+
+		bus.register(QueryDatabaseCommand, fail)
+		await queue.enqueue(
+			QueryDatabaseCommand(
+				query='q', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+			),
+			max_attempts=1,
+		)
+
+		await JobWorker(queue, bus, dispatcher, worker_id='w1').run_once()
+
+		failed = [e for e in dispatcher.emitted_events if isinstance(e, CommandFailed)]
+		assert len(failed) == 1
+		assert failed[0].command == 'QueryDatabaseCommand'
+		assert failed[0].error == 'Gemini unavailable'
+		assert failed[0].discord_channel_id == 3
+
+
+@pytest.mark.asyncio
+async def test_front_end_handlers_enqueue_commands(queue):
+	"""Test that the front-end command bus persists commands instead of running them"""
+	bus = CommandBus()
+	register_job_queue_command_handlers(bus, queue)
+
+	job_id = await bus.execute(analyze_command())
+
+	assert queue.collection.get(job_id)['type'] == 'AnalyzeImagesCommand'
+	assert set(bus.registered_commands) == {AnalyzeImagesCommand, QueryDatabaseCommand}
+
+
+@pytest.mark.asyncio
+async def test_front_end_drops_repeated_analysis(queue):
+	"""Test that a redelivered !stats message is only queued once"""
+	bus = CommandBus()
+	register_job_queue_command_handlers(bus, queue)
+
+	assert await bus.execute(analyze_command()) is not None
+	assert await bus.execute(analyze_command()) is None
+	assert len(queue.collection.documents) == 1
@@ -0,0 +1,38 @@
+import tracemalloc
+
+import pytest
+
+from app.shared.observability.memory import memory_report, object_usage, top_allocations
+
+
+class Marker:
+	pass
+
+
+def test_object_usage_groups_by_type():
+	markers = [Marker() for _ in range(500)]
+
+	usage = {u.name: u for u in object_usage(limit=1000)}
+
+	assert usage[f'{__name__}.Marker'].count >= len(markers)
+
+
+def test_report_includes_allocations_while_tracing():
+	"""Test that allocation lines are listed only while tracemalloc is tracing"""
+	if tracemalloc.is_tracing():
+		pytest.skip('tracemalloc was started outside the test')
+	assert top_allocations() is None
+	assert 'tracemalloc is off' in memory_report(caches={'messages': 3})
+
+	tracemalloc.start()
+	try:
+		data = [bytes(1000) for _ in range(100)]
+		allocations = top_allocations(limit=5)
+		report = memory_report(caches={'messages': 3})
+	finally:
+		tracemalloc.stop()
+
+	assert any(__file__ in a.location for a in allocations)
+	assert 'Traced memory' in report
+	assert 'messages 3' in report
+	del data
@@ -0,0 +1,199 @@
+import asyncio
+
+import pytest
+
+from app.bot.commands import CommandBus, QueryDatabaseCommand
+from app.bot.events import EventDispatcher, QueryExecuted
+from app.bot.events.dispatcher import handler_name
+from app.shared.observability.metrics import (
+	COMMAND_SECONDS,
+	COMMANDS_TOTAL,
+	EVENT_HANDLER_CALLS_TOTAL,
+	MetricsRegistry,
+	observe,
+	start_metrics_server,
+)
+
+
+class TestCounter:
+	"""Tests for labelled counters"""
+
+	def test_inc_and_render(self):
+		"""Test that increments are summed per label set and rendered"""
+		registry = MetricsRegistry()
+		counter = registry.counter('jobs_total', 'Jobs run', ('kind',))
+
+		counter.inc(kind='a')
+		counter.inc(2, kind='a')
+		counter.inc(kind='b')
+
+		rendered = registry.render()
+		assert '# TYPE jobs_total counter' in rendered
+		assert 'jobs_total{kind="a"} 3.0' in rendered
+		assert 'jobs_total{kind="b"} 1.0' in rendered
+
+	def test_wrong_labels_raise(self):
+		"""Test that using undeclared labels raises ValueError"""
+		counter = MetricsRegistry().counter('c', 'c', ('kind',))
+
+		with pytest.raises(ValueError):
+			counter.inc(other='x')
+
+	def test_negative_increment_raises(self):
+		"""Test that counters cannot go down"""
+		counter = MetricsRegistry().counter('c', 'c')
+
+		with pytest.raises(ValueError):
+			counter.inc(-1)
+
+	def test_label_values_are_escaped(self):
+		"""Test that quotes in label values are escaped"""
+		registry = MetricsRegistry()
+		registry.counter('c', 'c', ('name',)).inc(name='say "hi"')
+
+		assert 'c{name="say \\"hi\\""} 1.0' in registry.render()
+
+	def test_duplicate_registration_raises(self):
+		"""Test that a metric name can only be registered once"""
+		registry = MetricsRegistry()
+		registry.counter('c', 'c')
+
+		with pytest.raises(ValueError):
+			registry.counter('c', 'c')
+
+
+class TestHistogram:
+	"""Tests for histograms"""
+
+	def test_observe_fills_cumulative_buckets(self):
+		"""Test that buckets are cumulative and include +Inf, sum and count"""
+		registry = MetricsRegistry()
+		histogram = registry.histogram('latency', 'Latency', ('op',), buckets=(0.1, 1.0))
+
+		histogram.observe(0.05, op='x')
+		histogram.observe(0.5, op='x')
+		histogram.observe(5.0, op='x')
+
+		rendered = registry.render()
+		assert 'latency_bucket{op="x",le="0.1"} 1.0' in rendered
+		assert 'latency_bucket{op="x",le="1.0"} 2.0' in rendered
+		assert 'latency_bucket{op="x",le="+Inf"} 3.0' in rendered
+		assert 'latency_count{op="x"} 3.0' in rendered
+		assert histogram.sum(op='x') == pytest.approx(5.55)
+
+	def test_value_on_bucket_boundary_counts_in_bucket(self):
+		"""Test that le buckets are inclusive"""
+		histogram = MetricsRegistry().histogram('h', 'h', buckets=(1.0,))
+		histogram.observe(1.0)
+
+		assert 'h_bucket{le="1.0"} 1.0' in histogram.render()
+
+
+class TestObserve:
+	"""Tests for the observe context manager"""
+
+	def test_success_outcome(self):
+		"""Test that a clean block is recorded as success"""
+		registry = MetricsRegistry()
+		histogram = registry.histogram('h', 'h', ('op', 'outcome'))
+		counter = registry.counter('c', 'c', ('op', 'outcome'))
+
+		with observe(histogram, counter, op='x'):
+			pass
+
+		assert histogram.count(op='x', outcome='success') == 1
+		assert counter.value(op='x', outcome='success') == 1
+
+	def test_error_outcome_reraises(self):
+		"""Test that an exception is recorded as error and propagated"""
+		histogram = MetricsRegistry().histogram('h', 'h', ('outcome',))
+
+		with pytest.raises(RuntimeError):
+			with observe(histogram):
+				raise RuntimeError('boom')
+
+		assert histogram.count(outcome='error') == 1
+
+	def test_custom_outcome(self):
+		"""Test that a custom classifier decides the outcome label"""
+		histogram = MetricsRegistry().histogram('h', 'h', ('outcome',))
+
+		with pytest.raises(KeyError):
+			with observe(histogram, outcome=lambda exc: 'missing' if exc else 'ok'):
+				raise KeyError('x')
+
+		assert histogram.count(outcome='missing') == 1
+
+
+@pytest.mark.asyncio
+async def test_command_bus_records_command_metrics():
+	"""Test that CommandBus.execute records latency and count per command type"""
+	bus = CommandBus()
+	bus.register(QueryDatabaseCommand, lambda cmd: 'ok')
+	before = COMMANDS_TOTAL.value(command='QueryDatabaseCommand', outcome='success')
+
+	await bus.execute(
+		QueryDatabaseCommand(
+			query='q', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+		)
+	)
+
+	assert COMMANDS_TOTAL.value(command='QueryDatabaseCommand', outcome='success') == before + 1
+	assert COMMAND_SECONDS.count(command='QueryDatabaseCommand', outcome='success') >= 1
+
+
+@pytest.mark.asyncio
+async def test_event_dispatcher_records_handler_metrics():
+	"""Test that EventDispatcher.emit records each handler by name and outcome"""
+	dispatcher = EventDispatcher()
+
+	async def failing_metrics_handler(event):
+		raise RuntimeError('boom')
+
+	dispatcher.subscribe(QueryExecuted, failing_metrics_handler)
+	labels = {'event': 'QueryExecuted', 'handler': 'failing_metrics_handler', 'outcome': 'error'}
+	before = EVENT_HANDLER_CALLS_TOTAL.value(**labels)
+
+	await dispatcher.emit(
+		QueryExecuted(
+			query='q', db_response=[], discord_user_id=1, discord_message_id=2, discord_channel_id=3
+		)
+	)
+
+	assert EVENT_HANDLER_CALLS_TOTAL.value(**labels) == before + 1
+
+
+def test_handler_name_unwraps_partial():
+	"""Test that partial-wrapped handlers are labelled with the wrapped function"""
+	from functools import partial
+
+	def handle_something(bot, event):
+		pass
+
+	assert handler_name(partial(handle_something, None)) == 'handle_something'
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_scrape():
+	"""Test that the bot listener answers GET /metrics and 404s anything else"""
+	server = await start_metrics_server(0, '127.0.0.1')
+	port = server.sockets[0].getsockname()[1]
+
+	async def get(path: str) -> bytes:
+		reader, writer = await asyncio.open_connection('127.0.0.1', port)
+		writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+		await writer.drain()
+		data = await reader.read()
+		writer.close()
+		return data
+
+	try:
+		metrics = await get('/metrics')
+		missing = await get('/other')
+	finally:
+		server.close()
+		await server.wait_closed()
+
+	assert metrics.startswith(b'HTTP/1.1 200 OK')
+	assert b'debrief_commands_total' in metrics
+	assert missing.startswith(b'HTTP/1.1 404')
@@ -0,0 +1,173 @@
+import pytest
+from pydantic import ValidationError
+
+from app.shared.core.settings import Settings
+from app.shared.models.enums import GameModes
+from app.shared.models.schemas import GameStatsResponse, MongoPipeline
+from app.shared.observability.metrics import GEMINI_ROUTING_TOTAL
+from app.shared.services.gemini import GeminiClient
+from app.shared.services.model_router import ModelRouter, extraction_confidence
+from app.tools.samples import sample_payload
+
+FAST = 'fast-model'
+STRONG = 'strong-model'
+
+
+def game_stats(**scoreboard) -> GameStatsResponse:
+	stats = GameStatsResponse.model_validate_json(sample_payload(GameModes.HARDPOINT))
+	return stats.model_copy(update={'scoreboard': stats.scoreboard.model_copy(update=scoreboard)})
+
+
+def invalid_pipeline() -> ValidationError:
+	try:
+		MongoPipeline.model_validate({'stages': [{'operator': '$out', 'expression': 'x'}]})
+	except ValidationError as e:
+		return e
+
+
+def scripted(answers: dict):
+	"""A request returning (or raising) a fixed answer per model"""
+	calls = []
+
+	async def request(model):
+		calls.append(model)
+		answer = answers[model]
+		if isinstance(answer, Exception):
+			raise answer
+		return answer
+
+	request.calls = calls
+	return request
+
+
+@pytest.fixture
+def router():
+	return ModelRouter({'analysis': [FAST, STRONG], 'query': [FAST, STRONG]}, min_confidence=1.0)
+
+
+class TestExtractionConfidence:
+	"""Tests for the screenshot consistency score"""
+
+	def test_consistent_stats_score_one(self):
+		"""Test that a correctly read screenshot passes every check"""
+		assert extraction_confidence(game_stats()) == 1.0
+
+	def test_misread_deaths_lower_confidence(self):
+		"""Test that deaths no longer matching the E/D ratio lowers the score"""
+		assert extraction_confidence(game_stats(deaths=18)) < 1.0
+
+	def test_zero_deaths_uses_eliminations(self):
+		"""Test that a deathless game is consistent when the ratio equals eliminations"""
+		assert extraction_confidence(game_stats(deaths=0, elimination_death_ratio=25.0)) == 1.0
+
+
+class TestModelRouter:
+	"""Tests for escalation between model tiers"""
+
+	@pytest.mark.asyncio
+	async def test_confident_answer_stays_on_fast_tier(self, router):
+		"""Test that a good first answer never reaches the stronger model"""
+		before = GEMINI_ROUTING_TOTAL.value(operation='analysis', model=FAST, outcome='accepted')
+		request = scripted({FAST: game_stats(), STRONG: game_stats()})
+
+		await router.run('analysis', request, confidence=extraction_confidence)
+
+		assert request.calls == [FAST]
+		assert (
+			GEMINI_ROUTING_TOTAL.value(operation='analysis', model=FAST, outcome='accepted')
+			== before + 1
+		)
+
+	@pytest.mark.asyncio
+	async def test_validation_failure_escalates(self, router):
+		"""Test that an invalid answer is retried on the next model"""
+		request = scripted({FAST: invalid_pipeline(), STRONG: {'stages': []}})
+
+		assert await router.run('query', request) == {'stages': []}
+		assert request.calls == [FAST, STRONG]
+
+	@pytest.mark.asyncio
+	async def test_low_confidence_escalates(self, router):
+		"""Test that a valid but inconsistent answer is retried on the next model"""
+		strong = game_stats()
+		request = scripted({FAST: game_stats(deaths=18), STRONG: strong})
+
+		result = await router.run('analysis', request, confidence=extraction_confidence)
+
+		assert result is strong
+		assert request.calls == [FAST, STRONG]
+
+	@pytest.mark.asyncio
+	async def test_falls_back_to_best_answer(self, router):
+		"""Test that a low-confidence answer beats an error from the last tier"""
+		fast = game_stats(deaths=18)
+		request = scripted({FAST: fast, STRONG: invalid_pipeline()})
+
+		result = await router.run('analysis', request, confidence=extraction_confidence)
+
+		assert result is fast
+
+	@pytest.mark.asyncio
+	async def test_raises_when_every_tier_is_invalid(self, router):
+		"""Test that the last validation error is raised when nothing usable came back"""
+		request = scripted({FAST: invalid_pipeline(), STRONG: invalid_pipeline()})
+
+		with pytest.raises(ValidationError):
+			await router.run('query', request)
+
+	@pytest.mark.asyncio
+	async def test_other_errors_do_not_escalate(self, router):
+		"""Test that API errors propagate instead of trying a more expensive model"""
+		request = scripted({FAST: RuntimeError('quota'), STRONG: {'stages': []}})
+
+		with pytest.raises(RuntimeError):
+			await router.run('query', request)
+		assert request.calls == [FAST]
+
+	@pytest.mark.asyncio
+	async def test_later_tier_error_falls_back_to_best_answer(self):
+		"""Test that a failing stronger tier doesn't discard an earlier answer"""
+		router = ModelRouter({'analysis': [FAST, STRONG, 'strongest-model']})
+		fast = game_stats(deaths=18)
+		request = scripted({FAST: fast, STRONG: RuntimeError('circuit open')})
+
+		result = await router.run('analysis', request, confidence=extraction_confidence)
+
+		assert result is fast
+		assert request.calls == [FAST, STRONG]
+		assert GEMINI_ROUTING_TOTAL.value(operation='analysis', model=STRONG, outcome='error')
+
+
+def test_router_from_settings():
+	"""Test that tiers are read from comma-separated settings"""
+	router = ModelRouter.from_settings(
+		Settings(GEMINI_ANALYSIS_MODELS='a, b', GEMINI_QUERY_MODELS='c')
+	)
+	assert router.models('analysis') == ['a', 'b']
+	assert router.models('query') == ['c']
+
+
+def test_router_rejects_an_operation_without_models():
+	"""Test that an empty model list fails at startup rather than on every call"""
+	with pytest.raises(ValueError, match='GEMINI_ANALYSIS_MODELS'):
+		ModelRouter.from_settings(Settings(GEMINI_ANALYSIS_MODELS=' , '))
+	with pytest.raises(ValueError, match='query'):
+		ModelRouter({'analysis': [FAST], 'query': []})
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_sends_each_tier_its_model(monkeypatch, router):
+	"""Test that GeminiClient requests the model chosen by the router"""
+	client = GeminiClient(api_key='test-key', router=router)
+	models = []
+
+	async def request_db_query(model, prompt):
+		models.append(model)
+		if model == FAST:
+			raise invalid_pipeline()
+		return {'stages': []}
+
+	monkeypatch.setattr(client, '_request_db_query', request_db_query)
+
+	assert await client.generate_db_query('top matches') == {'stages': []}
+	assert models == [FAST, STRONG]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from app.shared.models.enums import AssaultRifles, GameModes, Maps, Pistols, SubMachineGuns
+from app.shared.models.normalize import EnumIndex, edit_distance, fold, normalize_game_stats
+from app.shared.services.gemini import GeminiClient
+from app.tests.mocks import fake_genai_client, game_stats_payload
+
+
+def test_fold_removes_accents_case_and_look_alikes():
+	"""Test that spelling variants fold to the same key"""
+	assert fold('JÄGER 45') == fold('jager-45')
+	assert fold('PEACEKEEPER MKI') == fold('PEACEKEEPER MK1')
+	assert fold('SEARCH & DESTROY') == fold('Search and Destroy')
+
+
+def test_edit_distance():
+	assert edit_distance('kitten', 'sitting') == 3
+	assert edit_distance('', 'abc') == 3
+	assert edit_distance('same', 'same') == 0
+
+
+@pytest.mark.parametrize(
+	'raw, expected',
+	[
+		('PEACEKEEPER MKI', AssaultRifles.PEACEKEEPER_MK1),
+		('M15 MODO', AssaultRifles.M15_MOD_0),
+		('DRAVEC45', SubMachineGuns.DRAVEC_45),
+		('DRAVEK 45', SubMachineGuns.DRAVEC_45),
+		('AK-47', None),
+		('', None),
+	],
+)
+def test_enum_index_match(raw, expected):
+	"""Test exact-key, fuzzy and rejected lookups across a weapon union"""
+	index = EnumIndex(AssaultRifles, SubMachineGuns)
+	assert index.match(raw) == expected
+
+
+def test_threshold_controls_fuzzy_matches():
+	"""Test that a stricter threshold leaves distant spellings unmatched"""
+	index = EnumIndex(Pistols)
+	assert index.match('JAEGER 45', threshold=0.8) == Pistols.JAEGER_45
+	assert index.match('JAEGER 45', threshold=0.95) is None
+
+
+def test_normalize_game_stats_fixes_fields_in_place():
+	"""Test that enum fields in a payload are rewritten to member values"""
+	data = game_stats_payload(
+		map='scar', game_mode='HARD POINT', secondary_weapon_stats__secondary_weapon_name='JAGER 45'
+	)
+
+	changed = normalize_game_stats(data)
+
+	assert data['map'] == Maps.SCAR
+	assert data['game_mode'] == GameModes.HARDPOINT
+	assert data['secondary_weapon_stats']['secondary_weapon_name'] == 'JÄGER 45'
+	assert set(changed) == {
+		('map',),
+		('game_mode',),
+		('secondary_weapon_stats', 'secondary_weapon_name'),
+	}
+
+
+def test_normalize_game_stats_skips_missing_and_unknown_values():
+	"""Test that absent sections and hopeless values are left for validation"""
+	data = game_stats_payload(map='KILLHOUSE', primary_weapon_stats=None)
+	assert normalize_game_stats(data) == []
+	assert data['map'] == 'KILLHOUSE'
+
+
+@pytest.mark.asyncio
+async def test_client_normalizes_before_repairing():
+	"""Test that a near-miss enum is fixed without a second Gemini call"""
+	client = GeminiClient(api_key='test-key', repair_max_fields=6)
+	data = game_stats_payload(primary_weapon_stats__primary_weapon_name='PEACEKEEPER MKI')
+	client.client, calls = fake_genai_client(json.dumps(data))
+
+	stats = await client.generate_game_stats(b'one')
+
+	assert stats.primary_weapon_stats.primary_weapon_name == AssaultRifles.PEACEKEEPER_MK1
+	assert len(calls) == 1
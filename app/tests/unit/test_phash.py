@@ -0,0 +1,183 @@
+import io
+
+import pytest
+
+from app.bot.commands import AnalyzeImagesCommand
+from app.bot.events import DuplicateMatchDetected, GameStatsAnalyzed
+from app.bot.handlers.gemini import handle_analyze_images_command
+from app.shared.core.settings import Settings
+from app.shared.models.schemas import GameStatsResponse
+from app.shared.observability.metrics import DUPLICATE_SCREENSHOTS_TOTAL
+from app.shared.services.phash import HashIndex, ScreenshotHasher, format_hash, hamming
+from app.tests.mocks import FakeEventDispatcher, FakeGeminiClient, game_stats_payload
+
+
+class FixedHasher(ScreenshotHasher):
+	"""Hasher that reads the hash from the image bytes instead of decoding them"""
+
+	def __init__(self, max_distance: int = 4):
+		super().__init__(HashIndex(max_size=10, max_distance=max_distance))
+
+	async def hash(self, image: bytes) -> int | None:
+		return int(image) if image.isdigit() else None
+
+
+def analyze_command(image: bytes, user_id: int, message_id: int) -> AnalyzeImagesCommand:
+	return AnalyzeImagesCommand(
+		image_one=image,
+		discord_user_id=user_id,
+		discord_message_id=message_id,
+		discord_channel_id=1,
+	)
+
+
+def test_hamming_and_format():
+	assert hamming(0b1011, 0b0001) == 2
+	assert format_hash(255) == '00000000000000ff'
+
+
+def test_index_finds_nearest_hash_within_distance():
+	"""Test that the closest hash wins and distant ones are ignored"""
+	index = HashIndex(max_size=10, max_distance=3)
+	index.add(0b1111_0000, 'a')
+	index.add(0b1111_1000, 'b')
+
+	assert index.nearest(0b1111_1001).key == 'b'
+	assert index.nearest(0b1111_1001).distance == 1
+	assert index.nearest(0b0000_1111) is None
+
+
+def test_index_lists_every_hash_within_distance_nearest_first():
+	index = HashIndex(max_size=10, max_distance=2)
+	for value, key in ((0b0011, 'a'), (0b0001, 'b'), (0b1100, 'c')):
+		index.add(value, key)
+
+	assert [(near.key, near.distance) for near in index.within(0b0001)] == [('b', 0), ('a', 1)]
+
+
+def test_index_forgets_oldest_hash_when_full():
+	index = HashIndex(max_size=2, max_distance=0)
+	for value, key in ((1, 'a'), (2, 'b'), (3, 'c')):
+		index.add(value, key)
+
+	assert len(index) == 2
+	assert index.nearest(1) is None
+	assert index.nearest(3).key == 'c'
+
+
+def test_hasher_is_opt_in():
+	assert ScreenshotHasher.from_settings(Settings(PHASH_ENABLED=False)) is None
+
+
+def scripted_client(*payloads: dict):
+	"""FakeGeminiClient class answering with the given payloads in turn"""
+	remaining = list(payloads)
+
+	class ScriptedClient(FakeGeminiClient):
+		calls: list[bytes] = []
+
+		async def generate_game_stats(self, image_one, image_two=None):
+			ScriptedClient.calls.append(image_one)
+			return GameStatsResponse.model_validate(remaining.pop(0))
+
+	return ScriptedClient
+
+
+@pytest.mark.asyncio
+async def test_repost_by_same_user_is_not_saved_again():
+	"""Test that a near-identical scoreboard with the same stats is a duplicate"""
+	dispatcher = FakeEventDispatcher()
+	hasher = FixedHasher()
+
+	await handle_analyze_images_command(
+		analyze_command(b'240', 7, 100), dispatcher, FakeGeminiClient, hasher=hasher
+	)
+	await handle_analyze_images_command(
+		analyze_command(b'241', 7, 101), dispatcher, FakeGeminiClient, hasher=hasher
+	)
+
+	analyzed, duplicate = dispatcher.emitted_events
+	assert isinstance(analyzed, GameStatsAnalyzed)
+	assert analyzed.image_hash == format_hash(240)
+	assert isinstance(duplicate, DuplicateMatchDetected)
+	assert duplicate.duplicate_of_message_id == 100
+	assert duplicate.distance == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_file_is_not_analyzed_again():
+	"""Test that a byte-identical repost is confirmed without calling Gemini"""
+	dispatcher = FakeEventDispatcher()
+	hasher = FixedHasher()
+	client = scripted_client(game_stats_payload())
+
+	for message_id in (100, 101):
+		await handle_analyze_images_command(
+			analyze_command(b'240', 7, message_id), dispatcher, client, hasher=hasher
+		)
+
+	assert client.calls == [b'240']
+	assert isinstance(dispatcher.emitted_events[-1], DuplicateMatchDetected)
+
+
+@pytest.mark.asyncio
+async def test_same_layout_with_different_stats_is_saved():
+	"""Test that a hash hit alone doesn't drop the user's next match"""
+	dispatcher = FakeEventDispatcher()
+	hasher = FixedHasher()
+	client = scripted_client(game_stats_payload(), game_stats_payload(scoreboard__eliminations=3))
+	before = DUPLICATE_SCREENSHOTS_TOTAL.value(outcome='distinct')
+
+	# Different files that hash identically, like two matches on the same UI
+	await handle_analyze_images_command(
+		analyze_command(b'240', 7, 100), dispatcher, client, hasher=hasher
+	)
+	await handle_analyze_images_command(
+		analyze_command(b'0240', 7, 101), dispatcher, client, hasher=hasher
+	)
+
+	assert all(isinstance(e, GameStatsAnalyzed) for e in dispatcher.emitted_events)
+	assert len(dispatcher.emitted_events) == 2
+	assert DUPLICATE_SCREENSHOTS_TOTAL.value(outcome='distinct') == before + 1
+
+
+@pytest.mark.asyncio
+async def test_same_scoreboard_from_another_user_is_flagged_and_analyzed():
+	"""Test that a teammate's upload of the same lobby still gets its own match"""
+	dispatcher = FakeEventDispatcher()
+	hasher = FixedHasher()
+	before = DUPLICATE_SCREENSHOTS_TOTAL.value(outcome='flagged')
+
+	await handle_analyze_images_command(
+		analyze_command(b'240', 7, 100), dispatcher, FakeGeminiClient, hasher=hasher
+	)
+	await handle_analyze_images_command(
+		analyze_command(b'240', 8, 101), dispatcher, FakeGeminiClient, hasher=hasher
+	)
+
+	assert all(isinstance(e, GameStatsAnalyzed) for e in dispatcher.emitted_events)
+	assert len(dispatcher.emitted_events) == 2
+	assert DUPLICATE_SCREENSHOTS_TOTAL.value(outcome='flagged') == before + 1
+
+
+def test_dhash_survives_rescaling_and_recompression():
+	"""Test that a resized JPEG of a screenshot hashes close to the PNG original"""
+	pytest.importorskip('numpy')
+	image_module = pytest.importorskip('PIL.Image')
+	from app.shared.services.phash import dhash
+
+	original = image_module.new('RGB', (320, 180))
+	for x in range(320):
+		for y in range(180):
+			original.putpixel((x, y), ((x * 7) % 256, (y * 3) % 256, (x + y) % 256))
+
+	def encode(image, fmt: str) -> bytes:
+		buffer = io.BytesIO()
+		image.save(buffer, format=fmt)
+		return buffer.getvalue()
+
+	copy = encode(original.resize((640, 360)), 'JPEG')
+	other = encode(original.rotate(180), 'PNG')
+
+	assert hamming(dhash(encode(original, 'PNG')), dhash(copy)) <= 8
+	assert hamming(dhash(encode(original, 'PNG')), dhash(other)) > 8
@@ -0,0 +1,195 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.bot.commands import AnalyzeImagesCommand
+from app.bot.events import GameStatsAnalyzed
+from app.bot.handlers.gemini import handle_analyze_images_command
+from app.shared.models.enums import Teams
+from app.shared.models.schemas import ExtractionStamp, MatchDocument
+from app.shared.services.gemini import GeminiClient, extraction_version
+from app.shared.services.model_router import ModelRouter
+from app.tests.mocks import (
+	FakeEventDispatcher,
+	FakeGeminiClient,
+	FakeMatchRepository,
+	fake_genai_client,
+	game_stats_payload,
+)
+from app.tools.reextract import Reextractor, diff_fields
+
+VERSION = 'v2'
+
+
+class FakeArchive:
+	def __init__(self, images: dict[str, bytes]):
+		self.images = images
+
+	async def read(self, key: str) -> bytes | None:
+		return self.images.get(key)
+
+
+class FakeTime:
+	"""Clock whose sleep advances it, recording every wait"""
+
+	def __init__(self):
+		self.now = 0.0
+		self.waits: list[float] = []
+
+	def clock(self) -> float:
+		return self.now
+
+	async def sleep(self, seconds: float) -> None:
+		self.waits.append(seconds)
+		self.now += seconds
+
+
+async def saved_match(
+	repository, message_id: int, extraction: ExtractionStamp | None, screenshots=('a',)
+) -> None:
+	game_stats = await FakeGeminiClient().generate_game_stats(b'old')
+	await repository.insert_one(
+		MatchDocument(
+			discord_user_id=1,
+			discord_message_id=message_id,
+			discord_channel_id=1,
+			game_stats=game_stats.model_copy(update={'team': Teams.JSOC}),
+			created_at=datetime.now(timezone.utc),
+			screenshots=list(screenshots) if screenshots else None,
+			extraction=extraction,
+		)
+	)
+
+
+def test_diff_fields_reports_nested_paths():
+	old = {'map': 'SCAR', 'scoreboard': {'kills': 1, 'deaths': 2}}
+	new = {'map': 'SCAR', 'scoreboard': {'kills': 3, 'deaths': 2}}
+	assert diff_fields(old, new) == ['scoreboard.kills']
+
+
+@pytest.mark.asyncio
+async def test_only_stale_matches_are_reextracted():
+	"""Test that current matches are left alone and stale ones get new stats and stamps"""
+	repository = FakeMatchRepository()
+	await saved_match(repository, 1, ExtractionStamp(version='v1', model='fast'))
+	await saved_match(repository, 2, ExtractionStamp(version=VERSION, model='retired'))
+	await saved_match(repository, 3, ExtractionStamp(version=VERSION, model='fast'))
+	await saved_match(repository, 4, None)
+	await saved_match(repository, 5, None, screenshots=None)
+	analyzed = []
+
+	async def analyze(image_one, image_two):
+		analyzed.append(image_one)
+		return await FakeGeminiClient().generate_game_stats(image_one, image_two)
+
+	time = FakeTime()
+	report = await Reextractor(
+		analyze,
+		repository,
+		FakeArchive({'a': b'image'}),
+		version=VERSION,
+		models=['fast'],
+		clock=time.clock,
+		sleep=time.sleep,
+	).run()
+
+	assert analyzed == [b'image'] * 3
+	assert report.changed == 3
+	assert report.field_changes['team'] == 3
+	assert [m['extraction'] for m in repository.matches[:2]] == [
+		{'version': VERSION, 'model': None}
+	] * 2
+	assert repository.matches[2]['game_stats']['team'] == Teams.JSOC
+	assert repository.matches[4]['extraction'] is None
+
+
+@pytest.mark.asyncio
+async def test_rate_spaces_requests_and_dry_run_writes_nothing():
+	repository = FakeMatchRepository()
+	for message_id in (1, 2, 3):
+		await saved_match(repository, message_id, None)
+	time = FakeTime()
+
+	report = await Reextractor(
+		FakeGeminiClient().generate_game_stats,
+		repository,
+		FakeArchive({'a': b'image'}),
+		version=VERSION,
+		models=[],
+		rate=2,
+		dry_run=True,
+		clock=time.clock,
+		sleep=time.sleep,
+	).run()
+
+	assert time.waits == [0.5, 0.5]
+	assert report.processed == 3
+	assert all(match['extraction'] is None for match in repository.matches)
+
+
+@pytest.mark.asyncio
+async def test_pruned_screenshots_are_counted_not_analyzed():
+	repository = FakeMatchRepository()
+	await saved_match(repository, 1, None, screenshots=('a', 'gone'))
+
+	report = await Reextractor(
+		FakeGeminiClient().generate_game_stats,
+		repository,
+		FakeArchive({'a': b'image'}),
+		version=VERSION,
+		models=[],
+	).run()
+
+	assert (report.processed, report.missing) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_unrecoverable_matches_are_not_selected_again():
+	"""Test that a limited second run moves on past matches whose screenshots are gone"""
+	repository = FakeMatchRepository()
+	await saved_match(repository, 1, None, screenshots=('gone',))
+	await saved_match(repository, 2, None)
+
+	def reextractor(**kwargs):
+		return Reextractor(
+			FakeGeminiClient().generate_game_stats,
+			repository,
+			FakeArchive({'a': b'image'}),
+			version=VERSION,
+			models=[],
+			**kwargs,
+		)
+
+	dry = await reextractor(dry_run=True).run(limit=1)
+	first = await reextractor().run(limit=1)
+	second = await reextractor().run(limit=1)
+
+	assert (dry.missing, first.missing, first.processed) == (1, 1, 0)
+	assert repository.matches[0]['screenshots_missing'] is True
+	assert (second.missing, second.processed) == (0, 1)
+	assert repository.matches[1]['extraction'] == {'version': VERSION, 'model': None}
+
+
+@pytest.mark.asyncio
+async def test_client_records_answering_model():
+	"""Test that generated stats carry the model that produced them"""
+	client = GeminiClient(api_key='test-key', router=ModelRouter.single('flash'))
+	client.client, _ = fake_genai_client(json.dumps(game_stats_payload()))
+
+	stats = await client.generate_game_stats(b'one')
+
+	assert stats.extracted_by == 'flash'
+
+
+@pytest.mark.asyncio
+async def test_new_matches_are_stamped_with_current_version():
+	dispatcher = FakeEventDispatcher()
+	command = AnalyzeImagesCommand(
+		image_one=b'one', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+	)
+
+	await handle_analyze_images_command(command, dispatcher, FakeGeminiClient)
+
+	event = next(e for e in dispatcher.emitted_events if isinstance(e, GameStatsAnalyzed))
+	assert event.extraction.version == extraction_version()
@@ -0,0 +1,160 @@
+import json
+
+import httpx
+import pytest
+from google.genai import errors
+from pydantic import ValidationError
+
+from app.shared.models.schemas import GameStatsResponse
+from app.shared.observability.metrics import GEMINI_REPAIRS_TOTAL, GEMINI_REQUESTS_TOTAL
+from app.shared.services.gemini import GeminiClient
+from app.shared.services.gemini_gateway import ANALYSIS, GeminiGateway, TrafficClassPolicy
+from app.shared.services.repair import field_path, plan_repair
+from app.tests.mocks import fake_genai_client, game_stats_payload
+
+
+def validation_error(data: dict) -> ValidationError:
+	with pytest.raises(ValidationError) as exc_info:
+		GameStatsResponse.model_validate(data)
+	return exc_info.value
+
+
+class TestPlanRepair:
+	"""Tests for turning validation errors into a repair request"""
+
+	def test_paths_skip_union_tags_and_other_game_modes(self):
+		"""Test that only fields of the game mode's scoreboard are re-asked"""
+		data = game_stats_payload(
+			scoreboard__friendly_score=900, primary_weapon_stats__primary_weapon_name='M15 MODO'
+		)
+
+		plan = plan_repair(data, validation_error(data), max_fields=6)
+
+		assert plan.paths == [
+			('primary_weapon_stats', 'primary_weapon_name'),
+			('scoreboard', 'friendly_score'),
+		]
+		assert 'scoreboard.friendly_score' in plan.prompt()
+		assert '900' in plan.prompt()
+
+	def test_repair_model_keeps_constraints(self):
+		"""Test that the small schema carries the original field constraints"""
+		data = game_stats_payload(scoreboard__friendly_score=900)
+		plan = plan_repair(data, validation_error(data), max_fields=6)
+
+		with pytest.raises(ValidationError):
+			plan.model.model_validate({'scoreboard': {'friendly_score': 900}})
+		schema = json.dumps(plan.model.model_json_schema())
+		assert '"maximum": 250' in schema
+		assert 'primary_weapon_stats' not in schema
+
+	def test_merge_writes_fixed_values_over_partial_result(self):
+		"""Test that merged data validates and the input is left untouched"""
+		data = game_stats_payload(scoreboard__friendly_score=900, map='SCARR')
+		plan = plan_repair(data, validation_error(data), max_fields=6)
+		repair = plan.model.model_validate({'map': 'SCAR', 'scoreboard': {'friendly_score': 200}})
+
+		stats = GameStatsResponse.model_validate(plan.merge(data, repair))
+
+		assert stats.scoreboard.friendly_score == 200
+		assert stats.scoreboard.enemy_score == 180
+		assert data['scoreboard']['friendly_score'] == 900
+
+	def test_too_many_fields_is_not_repaired(self):
+		"""Test that a mostly wrong answer is left to a full retry"""
+		data = game_stats_payload(scoreboard__friendly_score=900, map='SCARR', team='NOPE')
+		assert plan_repair(data, validation_error(data), max_fields=2) is None
+
+	def test_unknown_game_mode_re_asks_whole_scoreboard(self):
+		"""Test that the scoreboard is re-asked as a whole when its type is unknown"""
+		loc = ('scoreboard', 'OverloadScoreboard', 'overloads')
+		assert field_path(loc, game_stats_payload(game_mode='?')) == ('scoreboard',)
+
+
+class TestGeminiClientRepair:
+	"""Tests for the repair stage of generate_game_stats"""
+
+	@pytest.mark.asyncio
+	async def test_invalid_field_is_repaired_with_small_request(self):
+		"""Test that one bad field costs a small follow-up call instead of a failure"""
+		client = GeminiClient(api_key='test-key', repair_max_fields=6)
+		client.client, calls = fake_genai_client(
+			json.dumps(game_stats_payload(scoreboard__friendly_score=900)),
+			json.dumps({'scoreboard': {'friendly_score': 90}}),
+		)
+		before = GEMINI_REPAIRS_TOTAL.value(outcome='repaired')
+
+		stats = await client.generate_game_stats(b'one', b'two')
+
+		assert stats.scoreboard.friendly_score == 90
+		assert len(calls) == 2
+		assert 'scoreboard.friendly_score' in calls[1]['prompt']
+		assert list(calls[1]['config'].response_json_schema['properties']) == ['scoreboard']
+		assert GEMINI_REPAIRS_TOTAL.value(outcome='repaired') == before + 1
+
+	@pytest.mark.asyncio
+	async def test_repair_is_its_own_request(self):
+		"""Test that a rate limited repair is retried without repeating the extraction"""
+		sleeps = []
+
+		async def sleep(delay):
+			sleeps.append(delay)
+
+		gateway = GeminiGateway(
+			{ANALYSIS: TrafficClassPolicy(max_concurrency=1, latency_target=10.0)},
+			sleep=sleep,
+			jitter=lambda: 1.0,
+		)
+		client = GeminiClient(api_key='test-key', repair_max_fields=6, gateway=gateway)
+		rate_limited = errors.APIError(
+			429,
+			{'error': {'code': 429, 'message': 'quota', 'status': 'RESOURCE_EXHAUSTED'}},
+			response=httpx.Response(429),
+		)
+		client.client, calls = fake_genai_client(
+			json.dumps(game_stats_payload(scoreboard__friendly_score=900)),
+			rate_limited,
+			json.dumps({'scoreboard': {'friendly_score': 90}}),
+		)
+		model = client.router.models(ANALYSIS)[0]
+
+		def requests(outcome: str) -> float:
+			return GEMINI_REQUESTS_TOTAL.value(
+				model=model, operation='repair_game_stats', outcome=outcome
+			)
+
+		before = {outcome: requests(outcome) for outcome in ('success', 'rate_limited')}
+
+		stats = await client.generate_game_stats(b'one')
+
+		assert stats.scoreboard.friendly_score == 90
+		assert len(calls) == 3
+		assert 'scoreboard.friendly_score' in calls[1]['prompt']
+		assert 'scoreboard.friendly_score' in calls[2]['prompt']
+		assert len(sleeps) == 1
+		assert requests('success') == before['success'] + 1
+		assert requests('rate_limited') == before['rate_limited'] + 1
+
+	@pytest.mark.asyncio
+	async def test_failed_repair_raises(self):
+		"""Test that a repair answer that is still invalid fails the call"""
+		client = GeminiClient(api_key='test-key', repair_max_fields=6)
+		client.client, _ = fake_genai_client(
+			json.dumps(game_stats_payload(scoreboard__friendly_score=900)),
+			json.dumps({'scoreboard': {'friendly_score': 800}}),
+		)
+
+		with pytest.raises(ValidationError):
+			await client.generate_game_stats(b'one')
+
+	@pytest.mark.asyncio
+	async def test_repair_disabled(self):
+		"""Test that repair_max_fields=0 fails without a follow-up call"""
+		client = GeminiClient(api_key='test-key', repair_max_fields=0)
+		client.client, calls = fake_genai_client(
+			json.dumps(game_stats_payload(scoreboard__friendly_score=900))
+		)
+
+		with pytest.raises(ValidationError):
+			await client.generate_game_stats(b'one')
+		assert len(calls) == 1
@@ -1,6 +1,21 @@
+from datetime import datetime, timezone
+
 import pytest
+from pymongo.errors import OperationFailure
+
 from app.shared.models.schemas import MatchDocument, MongoPipeline
-from app.tests.mocks import FakeMatchRepository, FakeGeminiClient
+from app.shared.repositories import MatchRepository
+from app.tests.mocks import FakeMatchRepository, FakeGeminiClient, FakeMatchDatabase
+
+
+async def match_document(message_id: int, user_id: int = 123) -> MatchDocument:
+    return MatchDocument(
+        discord_user_id=user_id,
+        discord_message_id=message_id,
+        discord_channel_id=789,
+        game_stats=await FakeGeminiClient().generate_game_stats(b"test", b"test"),
+        created_at=datetime.now(timezone.utc),
+    )
 
 
 class TestMatchRepositoryInit:
@@ -69,6 +84,152 @@ class TestMatchRepositoryInsertOne:
         assert "must be an instance of MatchDocument" in str(exc_info.value)
 
 
+class TestMatchRepositoryInsertMany:
+    """Test MatchRepository insert_many method"""
+
+    @pytest.mark.asyncio
+    async def test_insert_many_returns_one_id_per_document(self):
+        """Test inserting several MatchDocuments at once"""
+        from datetime import datetime, timezone
+
+        repository = FakeMatchRepository()
+        game_stats = await FakeGeminiClient().generate_game_stats(b"test", b"test")
+        match_docs = [
+            MatchDocument(
+                discord_user_id=123,
+                discord_message_id=message_id,
+                discord_channel_id=789,
+                game_stats=game_stats,
+                created_at=datetime.now(timezone.utc),
+            )
+            for message_id in (1, 2, 3)
+        ]
+
+        result = await repository.insert_many(match_docs)
+
+        assert len(result) == 3
+        assert [m["discord_message_id"] for m in repository.matches] == [1, 2, 3]
+
+
+class TestMatchRepositoryMongo:
+    """Test the MongoDB calls MatchRepository makes, against a fake collection"""
+
+    @pytest.mark.asyncio
+    async def test_insert_one_upserts_once_per_message(self):
+        """Test that a repeat save keeps the stored match and returns its ID"""
+        db = FakeMatchDatabase()
+        repository = MatchRepository(db)
+        first = await match_document(456)
+
+        match_id = await repository.insert_one(first)
+        again = await repository.insert_one(await match_document(456))
+
+        query, update, upsert = db.matches.updates[0]
+        assert query == {"discord_message_id": 456, "discord_user_id": 123}
+        assert update == {"$setOnInsert": first.to_mongo()}
+        assert upsert is True
+        assert again == match_id == str(db.matches.documents[0]["_id"])
+        assert len(db.matches.documents) == 1
+
+    @pytest.mark.asyncio
+    async def test_insert_many_returns_new_ids_in_input_order(self):
+        """Test one unordered bulk upsert, skipping matches that were already saved"""
+        db = FakeMatchDatabase()
+        repository = MatchRepository(db)
+        await repository.insert_one(await match_document(2))
+        matches = [await match_document(message_id) for message_id in (1, 2, 3)]
+
+        result = await repository.insert_many(matches)
+
+        requests, ordered = db.matches.bulk_writes[0]
+        assert ordered is False
+        assert [request._filter["discord_message_id"] for request in requests] == [1, 2, 3]
+        assert all(request._upsert for request in requests)
+        assert requests[0]._doc == {"$setOnInsert": matches[0].to_mongo()}
+        ids = {d["discord_message_id"]: str(d["_id"]) for d in db.matches.documents}
+        assert result == [ids[1], ids[3]]
+
+    @pytest.mark.asyncio
+    async def test_ensure_indexes_makes_message_and_user_unique(self):
+        db = FakeMatchDatabase()
+
+        await MatchRepository(db).ensure_indexes()
+
+        keys, options = db.matches.indexes[0]
+        assert keys == [("discord_message_id", 1), ("discord_user_id", 1)]
+        assert options["unique"] is True
+
+    @pytest.mark.asyncio
+    async def test_ensure_indexes_survives_existing_duplicates(self, caplog):
+        """Test that an index blocked by duplicate matches is logged, not fatal"""
+        db = FakeMatchDatabase(index_error=OperationFailure("E11000 duplicate key error"))
+
+        await MatchRepository(db).ensure_indexes()
+
+        assert "remove duplicate matches" in caplog.text
+
+
+class TestMatchRepositoryReextraction:
+    """Test the stale-match query and bulk update used by re-extraction"""
+
+    @pytest.mark.asyncio
+    async def test_iter_stale_queries_other_versions_and_retired_models(self):
+        """Test the query document, projection, order and limit sent to MongoDB"""
+        db = FakeMatchDatabase()
+        db.matches.documents = [{"_id": 2}, {"_id": 1}]
+        repository = MatchRepository(db)
+
+        stale = [doc async for doc in repository.iter_stale("v2", ["flash", "pro"], limit=5)]
+
+        query, projection = db.matches.finds[0]
+        assert query == {
+            "screenshots": {"$ne": None},
+            "screenshots_missing": {"$ne": True},
+            "$or": [
+                {"extraction.version": {"$ne": "v2"}},
+                {"extraction.model": {"$nin": ["flash", "pro", None]}},
+            ],
+        }
+        assert projection == {"game_stats": 1, "screenshots": 1, "extraction": 1}
+        assert db.matches.cursor.sorted_by == ("_id", 1)
+        assert db.matches.cursor.limited_to == 5
+        assert stale == [{"_id": 1}, {"_id": 2}]
+
+    @pytest.mark.asyncio
+    async def test_update_extractions_sets_stats_and_stamp_in_one_bulk_write(self):
+        db = FakeMatchDatabase()
+        db.matches.documents = [{"_id": 1, "game_stats": {}}, {"_id": 2, "game_stats": {}}]
+        repository = MatchRepository(db)
+        stamp = {"version": "v2", "model": "pro"}
+
+        modified = await repository.update_extractions(
+            [(1, {"map": "SCAR"}, stamp), (2, {"map": "RAID"}, stamp)]
+        )
+
+        requests, ordered = db.matches.bulk_writes[0]
+        assert ordered is False
+        assert requests[0]._filter == {"_id": 1}
+        assert requests[0]._doc == {"$set": {"game_stats": {"map": "SCAR"}, "extraction": stamp}}
+        assert modified == 2
+        assert db.matches.documents[1]["extraction"] == stamp
+        assert await repository.update_extractions([]) == 0
+
+    @pytest.mark.asyncio
+    async def test_mark_screenshots_missing_flags_matches_in_one_update(self):
+        db = FakeMatchDatabase()
+        db.matches.documents = [{"_id": 1}, {"_id": 2}, {"_id": 3}]
+        repository = MatchRepository(db)
+
+        modified = await repository.mark_screenshots_missing([1, 3])
+
+        query, update, _ = db.matches.updates[0]
+        assert query == {"_id": {"$in": [1, 3]}}
+        assert update == {"$set": {"screenshots_missing": True}}
+        assert modified == 2
+        assert [d.get("screenshots_missing") for d in db.matches.documents] == [True, None, True]
+        assert await repository.mark_screenshots_missing([]) == 0
+
+
 class TestMatchRepositoryAggregate:
     """Test MatchRepository aggregate method"""
 
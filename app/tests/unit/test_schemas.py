@@ -110,3 +110,142 @@ def test_discriminated_union_rejects_wrong_scoreboard():
 
     with pytest.raises(ValidationError):
         HardpointGameStats(**payload)
+
+
+def _response_payload(game_mode, scoreboard):
+    return {
+        "map": Maps.SCAR,
+        "team": Teams.JSOC,
+        "game_mode": game_mode,
+        "scoreboard": scoreboard,
+    }
+
+
+OVERLOAD_SCOREBOARD = {
+    "player": "p",
+    "eliminations": 1,
+    "deaths": 0,
+    "elimination_death_ratio": 1.0,
+    "score": 5,
+    "overloads": 1,
+    "overload_devices_carrier_killed": 0,
+    "friendly_score": 3,
+    "enemy_score": 2,
+}
+
+
+def test_game_stats_response_validates_scoreboard_for_its_game_mode():
+    response = schemas.GameStatsResponse.model_validate(
+        _response_payload(GameModes.OVERLOAD, OVERLOAD_SCOREBOARD)
+    )
+
+    assert isinstance(response.scoreboard, schemas.OverloadScoreboard)
+
+
+def test_game_stats_response_mismatch_keeps_message():
+    with pytest.raises(ValidationError) as exc_info:
+        schemas.GameStatsResponse.model_validate(
+            _response_payload(GameModes.HARDPOINT, OVERLOAD_SCOREBOARD)
+        )
+
+    errors = exc_info.value.errors()
+    assert len(errors) == 1
+    assert errors[0]["loc"] == ()
+    assert "HardpointScoreboard for Hardpoint mode" in errors[0]["msg"]
+
+
+def test_game_stats_response_invalid_game_mode_reports_union_errors():
+    with pytest.raises(ValidationError) as exc_info:
+        schemas.GameStatsResponse.model_validate(
+            _response_payload("CAPTURE THE FLAG", OVERLOAD_SCOREBOARD)
+        )
+
+    locs = [error["loc"] for error in exc_info.value.errors()]
+    assert ("game_mode",) in locs
+    assert not any(loc[:1] == ("scoreboard",) for loc in locs)
+
+
+def test_game_stats_response_json_schema_is_plain_union():
+    schema = schemas.GameStatsResponse.model_json_schema()
+    refs = [option["$ref"] for option in schema["properties"]["scoreboard"]["anyOf"]]
+
+    assert refs == [
+        "#/$defs/HardpointScoreboard",
+        "#/$defs/OverloadScoreboard",
+        "#/$defs/SearchAndDestroyScoreboard",
+    ]
+    assert "discriminator" not in schema["properties"]["scoreboard"]
+
+
+def test_game_stats_document_is_dumped_once():
+    response = schemas.GameStatsResponse.model_validate(
+        _response_payload(GameModes.OVERLOAD, OVERLOAD_SCOREBOARD)
+    )
+
+    assert response.document is response.document
+    assert response.document == response.model_dump(mode="json")
+    # the cached dump must not change equality with an uncached copy
+    assert response == schemas.GameStatsResponse.model_validate(
+        _response_payload(GameModes.OVERLOAD, OVERLOAD_SCOREBOARD)
+    )
+
+
+def test_game_stats_document_cannot_go_stale():
+    response = schemas.GameStatsResponse.model_validate(
+        _response_payload(GameModes.OVERLOAD, OVERLOAD_SCOREBOARD)
+    )
+    assert response.document["map"] == Maps.SCAR.value
+
+    with pytest.raises(ValidationError):
+        response.map = Maps.RAID
+    with pytest.raises(ValidationError):
+        response.scoreboard.eliminations = 99
+
+    copy = response.model_copy(update={"map": Maps.RAID})
+    assert copy.document["map"] == Maps.RAID.value
+    assert response.document["map"] == Maps.SCAR.value
+
+
+def test_match_document_trusted_to_mongo_matches_model_dump():
+    from datetime import datetime, timezone
+
+    game_stats = schemas.GameStatsResponse.model_validate(
+        _response_payload(GameModes.OVERLOAD, OVERLOAD_SCOREBOARD)
+    )
+    data = {
+        "discord_user_id": 1,
+        "discord_message_id": 2,
+        "discord_channel_id": 3,
+        "game_stats": game_stats,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+    trusted = schemas.MatchDocument.trusted(**data)
+
+    assert trusted == schemas.MatchDocument(**data)
+    assert trusted.to_mongo() == trusted.model_dump()
+    assert trusted.to_mongo()["game_stats"] is game_stats.document
+
+
+def test_match_document_to_mongo_includes_every_field():
+    from datetime import datetime, timezone
+
+    game_stats = schemas.GameStatsResponse.model_validate(
+        _response_payload(GameModes.OVERLOAD, OVERLOAD_SCOREBOARD)
+    )
+    match = schemas.MatchDocument(
+        discord_user_id=1,
+        discord_message_id=2,
+        discord_channel_id=3,
+        game_stats=game_stats,
+        created_at=datetime.now(timezone.utc),
+        image_hash="ab" * 8,
+        screenshots=["cd" * 32],
+        extraction=schemas.ExtractionStamp(version="v1", model="gemini-2.5-flash"),
+    )
+
+    document = match.to_mongo()
+
+    assert document.keys() == schemas.MatchDocument.model_fields.keys()
+    assert document == match.model_dump()
+    assert document["extraction"] == {"version": "v1", "model": "gemini-2.5-flash"}
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.bot.commands import AnalyzeImagesCommand
+from app.bot.events import GameStatsAnalyzed
+from app.bot.handlers.gemini import handle_analyze_images_command
+from app.shared.screenshots import ScreenshotArchive, digest
+from app.tests.mocks import (
+	FakeEventDispatcher,
+	FakeGeminiClient,
+	FakeGridFSBucket,
+	FakeGridFSDatabase,
+)
+
+
+@pytest.fixture
+def archive():
+	bucket = FakeGridFSBucket()
+	archive = ScreenshotArchive(FakeGridFSDatabase(bucket), retention_days=30)
+	archive._bucket = bucket
+	return archive
+
+
+def file_id(archive, key):
+	return next(i for i, m in archive.bucket.metadata.items() if m['sha256'] == key)
+
+
+@pytest.mark.asyncio
+async def test_store_and_read_back(archive):
+	"""Test that a screenshot is addressed by its digest and streamed back whole"""
+	key = await archive.store(b'scoreboard bytes')
+
+	assert key == digest(b'scoreboard bytes')
+	assert await archive.read(key) == b'scoreboard bytes'
+	assert [chunk async for chunk in archive.stream(key)][0] == b'scor'
+	assert await archive.read(digest(b'missing')) is None
+
+
+@pytest.mark.asyncio
+async def test_same_image_is_stored_once(archive):
+	await archive.store(b'same')
+	await archive.store(b'same')
+
+	assert len(archive.bucket.files) == 1
+
+
+@pytest.mark.asyncio
+async def test_lost_upload_race_deletes_its_chunks(archive):
+	"""Test that chunks of an upload rejected by the unique digest index are removed"""
+	await archive.store(b'same')
+	winner = file_id(archive, digest(b'same'))
+
+	async def not_found_yet(key):
+		return None
+
+	archive._find = not_found_yet
+	assert await archive.store(b'same') == digest(b'same')
+
+	assert list(archive.bucket.chunks) == [winner]
+	assert len(archive.bucket.files) == 1
+
+
+@pytest.mark.asyncio
+async def test_prune_deletes_only_expired_screenshots(archive):
+	"""Test that screenshots not referenced within the retention period are removed"""
+	old = await archive.store(b'old')
+	new = await archive.store(b'new')
+	archive.bucket.metadata[file_id(archive, old)]['last_referenced'] -= timedelta(days=31)
+
+	assert await archive.prune() == 1
+	assert await archive.read(old) is None
+	assert await archive.read(new) == b'new'
+
+
+@pytest.mark.asyncio
+async def test_posting_again_postpones_pruning(archive):
+	"""Test that a deduplicated store keeps an old upload from being pruned"""
+	key = await archive.store(b'reposted')
+	old_id = file_id(archive, key)
+	archive.bucket.upload_dates[old_id] -= timedelta(days=200)
+	archive.bucket.metadata[old_id]['last_referenced'] -= timedelta(days=200)
+
+	await archive.store(b'reposted')
+
+	assert await archive.prune() == 0
+	assert await archive.read(key) == b'reposted'
+
+
+@pytest.mark.asyncio
+async def test_prune_falls_back_to_upload_date_for_older_files(archive):
+	key = await archive.store(b'legacy')
+	old_id = file_id(archive, key)
+	del archive.bucket.metadata[old_id]['last_referenced']
+	archive.bucket.upload_dates[old_id] -= timedelta(days=31)
+
+	assert await archive.prune() == 1
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_everything_without_retention(archive):
+	archive.retention_days = None
+	await archive.store(b'kept')
+
+	assert await archive.prune(now=datetime.now(timezone.utc) + timedelta(days=3650)) == 0
+
+
+@pytest.mark.asyncio
+async def test_analysis_links_archived_screenshots(archive):
+	"""Test that the analyzed event carries the digests of both screenshots"""
+	dispatcher = FakeEventDispatcher()
+	command = AnalyzeImagesCommand(
+		image_one=b'one',
+		image_two=b'two',
+		discord_user_id=1,
+		discord_message_id=2,
+		discord_channel_id=3,
+	)
+
+	await handle_analyze_images_command(command, dispatcher, FakeGeminiClient, archive=archive)
+
+	event = next(e for e in dispatcher.emitted_events if isinstance(e, GameStatsAnalyzed))
+	assert event.screenshots == [digest(b'one'), digest(b'two')]
+
+
+@pytest.mark.asyncio
+async def test_archive_failure_does_not_fail_analysis(archive):
+	"""Test that the match is still analyzed when GridFS is unavailable"""
+
+	class BrokenBucket(FakeGridFSBucket):
+		async def upload_from_stream_with_id(self, *args, **kwargs):
+			raise ConnectionError('mongo down')
+
+	archive._bucket = BrokenBucket()
+	dispatcher = FakeEventDispatcher()
+	command = AnalyzeImagesCommand(
+		image_one=b'one', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+	)
+
+	await handle_analyze_images_command(command, dispatcher, FakeGeminiClient, archive=archive)
+
+	event = next(e for e in dispatcher.emitted_events if isinstance(e, GameStatsAnalyzed))
+	assert event.screenshots is None
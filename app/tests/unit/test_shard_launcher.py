@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from app.bot.launcher import ShardLauncher, child_env, shard_ranges
+from app.shared.core.settings import Settings
+
+
+class FakeProcess:
+	def __init__(self, pid: int, exit_code: int | None = None):
+		self.pid = pid
+		self.returncode = None
+		self._exited = asyncio.Event()
+		if exit_code is not None:
+			self.exit(exit_code)
+
+	def exit(self, code: int) -> None:
+		self.returncode = code
+		self._exited.set()
+
+	def terminate(self) -> None:
+		self.exit(-15)
+
+	async def wait(self) -> int:
+		await self._exited.wait()
+		return self.returncode
+
+
+def test_shard_ranges_are_contiguous_and_balanced():
+	assert shard_ranges(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+	assert shard_ranges(2, 4) == [[0], [1]]
+
+
+def test_child_env_assigns_shards_ports_and_one_command_sync():
+	config = Settings(BOT_METRICS_PORT=9100)
+
+	first = child_env(0, [0, 1], 4, config, environ={'MONGODB_DB': 'prod'})
+	second = child_env(1, [2, 3], 4, config, environ={'MONGODB_DB': 'prod'})
+
+	assert first['DISCORD_SHARD_IDS'] == '0,1'
+	assert second['DISCORD_SHARD_IDS'] == '2,3'
+	assert second['DISCORD_SHARD_COUNT'] == '4'
+	assert (first['BOT_METRICS_PORT'], second['BOT_METRICS_PORT']) == ('9100', '9101')
+	assert 'DISCORD_SYNC_COMMANDS' not in first
+	assert second['DISCORD_SYNC_COMMANDS'] == 'false'
+	assert second['MONGODB_DB'] == 'prod'
+
+
+@pytest.mark.asyncio
+async def test_exited_process_is_restarted_with_backoff():
+	"""Test that a crashed shard process is restarted and stop ends supervision"""
+	spawned: list[FakeProcess] = []
+	waits: list[float] = []
+
+	async def spawn(env):
+		# The first process crashes at once; its replacement keeps running
+		process = FakeProcess(len(spawned), exit_code=1 if not spawned else None)
+		spawned.append(process)
+		return process
+
+	async def sleep(seconds):
+		waits.append(seconds)
+
+	launcher = ShardLauncher(
+		[[0, 1]], 2, restart_delay=5, spawn=spawn, sleep=sleep, config=Settings()
+	)
+	run = asyncio.create_task(launcher.run())
+	while len(spawned) < 2:
+		await asyncio.sleep(0)
+
+	launcher.stop()
+	await asyncio.wait_for(run, timeout=1)
+
+	assert launcher.restarts == {0: 1}
+	assert waits == [5]
+	assert spawned[1].returncode == -15
+
+
+@pytest.mark.asyncio
+async def test_process_started_during_stop_is_terminated():
+	"""Test that stop reaches a process whose spawn was still in flight"""
+	spawning = asyncio.Event()
+	release = asyncio.Event()
+	spawned: list[FakeProcess] = []
+
+	async def spawn(env):
+		spawning.set()
+		await release.wait()
+		spawned.append(FakeProcess(1))
+		return spawned[-1]
+
+	launcher = ShardLauncher([[0]], 1, spawn=spawn, config=Settings())
+	run = asyncio.create_task(launcher.run())
+	await spawning.wait()
+
+	launcher.stop()
+	release.set()
+	await asyncio.wait_for(run, timeout=1)
+
+	assert spawned[0].returncode == -15
+
+
+@pytest.mark.asyncio
+async def test_restart_delay_resets_after_a_stable_run():
+	"""Test that backoff only grows while a process keeps crashing soon after starting"""
+	now = [0.0]
+	uptimes = [1, 1, 1000, 1]
+	waits: list[float] = []
+	launcher = None
+
+	class CrashingProcess(FakeProcess):
+		def __init__(self, pid: int, uptime: float):
+			super().__init__(pid, exit_code=1)
+			self.uptime = uptime
+
+		async def wait(self) -> int:
+			now[0] += self.uptime
+			return await super().wait()
+
+	async def spawn(env):
+		if not uptimes:
+			launcher.stop()
+			return FakeProcess(len(waits), exit_code=0)
+		return CrashingProcess(len(waits), uptimes.pop(0))
+
+	async def sleep(seconds):
+		waits.append(seconds)
+
+	launcher = ShardLauncher(
+		[[0]],
+		1,
+		restart_delay=5,
+		stable_after=600,
+		spawn=spawn,
+		sleep=sleep,
+		clock=lambda: now[0],
+		config=Settings(),
+	)
+	await asyncio.wait_for(launcher.run(), timeout=1)
+
+	assert waits == [5, 10, 5, 10]
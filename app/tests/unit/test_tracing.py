@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+from app.bot.commands import AnalyzeImagesCommand, CommandBus
+from app.bot.events import EventDispatcher, GameStatsAnalyzed, MatchSaved
+from app.bot.handlers.db import handle_game_stats_analyzed
+from app.bot.handlers.gemini import handle_analyze_images_command
+from app.shared.observability import tracing
+from app.shared.observability.tracing import (
+	Span,
+	SpanProcessor,
+	current_span,
+	jsonl_writer,
+	start_span,
+	to_otlp,
+)
+from app.tests.mocks import FakeGeminiClient, FakeMatchRepository, FakeSpanProcessor
+
+
+@pytest.fixture
+def spans():
+	processor = FakeSpanProcessor()
+	tracing.set_span_processor(processor)
+	yield processor
+	tracing.set_span_processor(None)
+
+
+class TestStartSpan:
+	"""Tests for span creation and nesting"""
+
+	def test_nested_span_joins_parent_trace(self, spans):
+		"""Test that a child span shares the trace ID and points at its parent"""
+		with start_span('parent') as parent:
+			with start_span('child') as child:
+				assert current_span() is child
+
+		assert child.trace_id == parent.trace_id
+		assert child.parent_span_id == parent.span_id
+		assert parent.parent_span_id is None
+		assert current_span() is None
+		assert [s.name for s in spans.spans] == ['child', 'parent']
+
+	def test_explicit_trace_context_is_used(self, spans):
+		"""Test that explicit IDs continue an existing trace"""
+		with start_span('work', trace_id='a' * 32, parent_span_id='b' * 16) as span:
+			pass
+
+		assert span.trace_id == 'a' * 32
+		assert span.parent_span_id == 'b' * 16
+
+	def test_exception_marks_span_as_error(self, spans):
+		"""Test that a failing block records an error status and re-raises"""
+		with pytest.raises(ValueError):
+			with start_span('failing'):
+				raise ValueError('bad')
+
+		assert spans.spans[0].status == 'error'
+		assert 'bad' in spans.spans[0].status_message
+		assert spans.spans[0].end_time_ns is not None
+
+
+def test_models_inherit_current_trace():
+	"""Test that commands and events created inside a span carry its context"""
+	with start_span('root') as root:
+		command = AnalyzeImagesCommand(
+			image_one=b'x', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+		)
+
+	assert command.trace_id == root.trace_id
+	assert command.parent_span_id == root.span_id
+
+
+def test_models_outside_a_span_start_a_new_trace():
+	"""Test that a command created without a span gets its own trace ID"""
+	command = AnalyzeImagesCommand(
+		image_one=b'x', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+	)
+
+	assert len(command.trace_id) == 32
+	assert command.parent_span_id is None
+
+
+@pytest.mark.asyncio
+async def test_trace_spans_command_to_event_chain(spans):
+	"""Test that one !stats request produces a single connected trace"""
+	bus = CommandBus()
+	dispatcher = EventDispatcher()
+	repository = FakeMatchRepository()
+	bus.register(
+		AnalyzeImagesCommand,
+		lambda cmd: handle_analyze_images_command(cmd, dispatcher, FakeGeminiClient),
+	)
+	dispatcher.subscribe(
+		GameStatsAnalyzed, lambda event: handle_game_stats_analyzed(event, dispatcher, repository)
+	)
+	dispatcher.subscribe(MatchSaved, lambda event: None)
+
+	with start_span('discord !stats') as root:
+		command = AnalyzeImagesCommand(
+			image_one=b'x', discord_user_id=1, discord_message_id=2, discord_channel_id=3
+		)
+		await bus.execute(command)
+
+	assert {span.trace_id for span in spans.spans} == {root.trace_id}
+	command_span = spans.named('command AnalyzeImagesCommand')[0]
+	analyzed_span = spans.named('handle GameStatsAnalyzed')[0]
+	saved_span = spans.named('handle MatchSaved')[0]
+	assert command_span.parent_span_id == root.span_id
+	assert analyzed_span.parent_span_id == command_span.span_id
+	assert saved_span.parent_span_id == analyzed_span.span_id
+
+
+def test_jsonl_writer_appends_spans(tmp_path):
+	"""Test that the JSON lines exporter writes one object per span"""
+	path = tmp_path / 'traces.jsonl'
+	export = jsonl_writer(str(path))
+	span = Span(name='a', trace_id='t' * 32, span_id='s' * 16, end_time_ns=1)
+
+	export([span])
+	export([span])
+
+	lines = path.read_text().splitlines()
+	assert len(lines) == 2
+	assert json.loads(lines[0])['name'] == 'a'
+
+
+def test_to_otlp_encodes_spans():
+	"""Test the OTLP/HTTP JSON encoding of spans and attributes"""
+	span = Span(
+		name='gemini generate_game_stats',
+		trace_id='1' * 32,
+		span_id='2' * 16,
+		parent_span_id='3' * 16,
+		kind='client',
+		start_time_ns=10,
+		end_time_ns=20,
+		attributes={'model': 'm', 'attempt': 2, 'ratio': 0.5, 'hedged': True},
+		status='error',
+		status_message='boom',
+	)
+
+	payload = to_otlp([span], 'debrief-bot')
+
+	resource_spans = payload['resourceSpans'][0]
+	assert resource_spans['resource']['attributes'][0]['value'] == {'stringValue': 'debrief-bot'}
+	otlp_span = resource_spans['scopeSpans'][0]['spans'][0]
+	assert otlp_span['parentSpanId'] == '3' * 16
+	assert otlp_span['kind'] == 3
+	assert otlp_span['startTimeUnixNano'] == '10'
+	assert otlp_span['status'] == {'code': 2, 'message': 'boom'}
+	attributes = {a['key']: a['value'] for a in otlp_span['attributes']}
+	assert attributes['attempt'] == {'intValue': '2'}
+	assert attributes['ratio'] == {'doubleValue': 0.5}
+	assert attributes['hedged'] == {'boolValue': True}
+
+
+def test_span_processor_flushes_on_shutdown():
+	"""Test that queued spans are exported when the processor shuts down"""
+	exported = []
+	processor = SpanProcessor(exported.extend, flush_interval=60)
+
+	processor.on_end(Span(name='a', trace_id='t', span_id='s'))
+	processor.shutdown()
+
+	assert [span.name for span in exported] == ['a']
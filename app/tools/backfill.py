@@ -0,0 +1,311 @@
+"""Backfill matches from a folder or archive of old screenshots
+
+Usage:
+    uv run python -m app.tools.backfill SOURCE --discord-user-id ID [--concurrency 4]
+        [--pairing sequential|single] [--checkpoint FILE] [--batch-size 50]
+
+SOURCE is a directory (searched recursively) or a .zip/.tar(.gz) archive.
+Screenshots are sorted by name within each folder. With `sequential` pairing,
+consecutive files form an (end-of-game, weapon stats) pair, the order most
+capture tools produce. With `single`, every screenshot is analyzed on its own.
+
+Each pair is analyzed exactly like `!stats` (`GeminiClient.generate_game_stats`,
+so the same gateway, routing and repair apply), and results are written with
+`MatchRepository.insert_many` in batches. After every batch the pair keys are
+appended to the checkpoint file, and a re-run skips pairs already saved. The
+`discord_message_id` of a backfilled match is derived from a hash of its
+screenshots, so importing the same screenshots twice saves them only once.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Awaitable, Callable, Iterator
+
+from app.shared.models.schemas import ExtractionStamp, GameStatsResponse, MatchDocument
+from app.shared.services.gemini import extraction_version
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.webp'}
+
+
+@dataclass
+class Screenshot:
+	"""An image in the source, read on demand"""
+
+	name: str
+	modified: float
+	read: Callable[[], bytes] = field(repr=False)
+
+
+@dataclass
+class ScreenshotPair:
+	first: Screenshot
+	second: Screenshot | None = None
+
+	@property
+	def key(self) -> str:
+		"""Stable identifier used in the checkpoint file"""
+		if self.second is None:
+			return self.first.name
+		return f'{self.first.name}+{self.second.name}'
+
+
+def _is_image(name: str) -> bool:
+	path = PurePosixPath(name)
+	return path.suffix.lower() in IMAGE_SUFFIXES and not path.name.startswith('.')
+
+
+@contextmanager
+def list_screenshots(source: Path) -> Iterator[list[Screenshot]]:
+	"""Screenshots in a directory tree or a zip/tar archive, open until the block exits"""
+	if source.is_dir():
+		yield [
+			Screenshot(str(path.relative_to(source)), path.stat().st_mtime, path.read_bytes)
+			for path in source.rglob('*')
+			if path.is_file() and _is_image(path.name)
+		]
+	elif zipfile.is_zipfile(source):
+		with zipfile.ZipFile(source) as archive:
+			yield [
+				Screenshot(
+					info.filename,
+					datetime(*info.date_time, tzinfo=timezone.utc).timestamp(),
+					lambda info=info: archive.read(info),
+				)
+				for info in archive.infolist()
+				if not info.is_dir() and _is_image(info.filename)
+			]
+	elif tarfile.is_tarfile(source):
+		# Members share the archive's file position, so reads from the
+		# analysis threads must take turns
+		lock = threading.Lock()
+
+		def read(member: tarfile.TarInfo) -> bytes:
+			with lock:
+				return archive.extractfile(member).read()
+
+		with tarfile.open(source) as archive:
+			yield [
+				Screenshot(member.name, member.mtime, partial(read, member))
+				for member in archive.getmembers()
+				if member.isfile() and _is_image(member.name)
+			]
+	else:
+		raise ValueError(f'{source} is not a directory or a zip/tar archive')
+
+
+def pair_screenshots(
+	screenshots: list[Screenshot], pairing: str = 'sequential'
+) -> list[ScreenshotPair]:
+	"""Group screenshots into analysis units, never pairing across folders"""
+	folders: dict[PurePosixPath, list[Screenshot]] = {}
+	for screenshot in sorted(screenshots, key=lambda s: s.name):
+		folders.setdefault(PurePosixPath(screenshot.name).parent, []).append(screenshot)
+
+	pairs = []
+	for folder in folders.values():
+		if pairing == 'single':
+			pairs.extend(ScreenshotPair(screenshot) for screenshot in folder)
+			continue
+		for i in range(0, len(folder), 2):
+			pairs.append(ScreenshotPair(*folder[i : i + 2]))
+	return pairs
+
+
+def message_id_for(image_one: bytes, image_two: bytes | None) -> int:
+	"""Synthetic Discord message ID, stable for the same screenshots"""
+	digest = hashlib.sha256(image_one)
+	if image_two is not None:
+		digest.update(image_two)
+	# Positive and within a signed 64-bit int, like a real snowflake
+	return int.from_bytes(digest.digest()[:8], 'big') >> 1
+
+
+class Checkpoint:
+	"""Append-only file of pair keys that have been saved"""
+
+	def __init__(self, path: Path | None):
+		self.path = path
+		self.done: set[str] = set()
+		if path is not None and path.exists():
+			self.done = {line for line in path.read_text().splitlines() if line}
+
+	def mark(self, keys: list[str]) -> None:
+		self.done.update(keys)
+		if self.path is not None and keys:
+			with self.path.open('a') as f:
+				f.write(''.join(f'{key}\n' for key in keys))
+
+
+@dataclass
+class BackfillReport:
+	total: int = 0
+	skipped: int = 0
+	saved: int = 0
+	failures: list[tuple[str, str]] = field(default_factory=list)
+	elapsed: float = 0.0
+
+	def summary(self) -> str:
+		processed = self.saved + len(self.failures)
+		rate = processed / self.elapsed if self.elapsed else 0.0
+		lines = [
+			f'{self.total} pairs: {self.saved} saved, {len(self.failures)} failed, '
+			f'{self.skipped} already done',
+			f'{processed} analyzed in {self.elapsed:.1f}s ({rate:.2f} pairs/s)',
+		]
+		lines.extend(f'  FAILED {key}: {error}' for key, error in self.failures)
+		return '\n'.join(lines)
+
+
+class Backfill:
+	"""Analyze screenshot pairs with bounded concurrency and save them in batches"""
+
+	def __init__(
+		self,
+		analyze: Callable[[bytes, bytes | None], Awaitable[GameStatsResponse]],
+		repository,
+		discord_user_id: int,
+		discord_channel_id: int = 0,
+		checkpoint: Checkpoint | None = None,
+		concurrency: int = 4,
+		batch_size: int = 50,
+	):
+		self.analyze = analyze
+		self.repository = repository
+		self.discord_user_id = discord_user_id
+		self.discord_channel_id = discord_channel_id
+		self.checkpoint = checkpoint or Checkpoint(None)
+		self.concurrency = concurrency
+		self.batch_size = batch_size
+		self._buffer: list[tuple[str, MatchDocument]] = []
+		self._flush_lock = asyncio.Lock()
+
+	async def run(self, pairs: list[ScreenshotPair]) -> BackfillReport:
+		report = BackfillReport(total=len(pairs))
+		todo = [pair for pair in pairs if pair.key not in self.checkpoint.done]
+		report.skipped = len(pairs) - len(todo)
+		started = time.monotonic()
+
+		queue: asyncio.Queue[ScreenshotPair] = asyncio.Queue()
+		for pair in todo:
+			queue.put_nowait(pair)
+		await asyncio.gather(*(self._worker(queue, report) for _ in range(self.concurrency)))
+		await self._flush(report)
+
+		report.elapsed = time.monotonic() - started
+		return report
+
+	async def _worker(self, queue: asyncio.Queue, report: BackfillReport) -> None:
+		while not queue.empty():
+			pair = queue.get_nowait()
+			try:
+				document = await self._analyze(pair)
+			except Exception as e:
+				logger.warning(f'Failed to analyze {pair.key}: {e}')
+				report.failures.append((pair.key, f'{type(e).__name__}: {e}'))
+				continue
+			self._buffer.append((pair.key, document))
+			if len(self._buffer) >= self.batch_size:
+				await self._flush(report)
+
+	async def _analyze(self, pair: ScreenshotPair) -> MatchDocument:
+		image_one = await asyncio.to_thread(pair.first.read)
+		image_two = await asyncio.to_thread(pair.second.read) if pair.second else None
+		game_stats = await self.analyze(image_one, image_two)
+		return MatchDocument.trusted(
+			discord_user_id=self.discord_user_id,
+			discord_message_id=message_id_for(image_one, image_two),
+			discord_channel_id=self.discord_channel_id,
+			game_stats=game_stats,
+			# When the match was played, as near as the files can tell
+			created_at=datetime.fromtimestamp(pair.first.modified, timezone.utc),
+			extraction=ExtractionStamp(version=extraction_version(), model=game_stats.extracted_by),
+		)
+
+	async def _flush(self, report: BackfillReport) -> None:
+		async with self._flush_lock:
+			batch, self._buffer = self._buffer, []
+			if not batch:
+				return
+			keys = [key for key, _ in batch]
+			try:
+				await self.repository.insert_many([document for _, document in batch])
+			except Exception as e:
+				logger.error(f'Failed to save {len(batch)} matches: {e}')
+				report.failures.extend((key, f'save failed: {e}') for key in keys)
+				return
+			self.checkpoint.mark(keys)
+			report.saved += len(batch)
+			logger.info(f'Saved {report.saved} matches')
+
+
+def _iter_failures(report: BackfillReport) -> Iterator[str]:
+	for key, error in report.failures:
+		yield json.dumps({'pair': key, 'error': error})
+
+
+async def backfill(args: argparse.Namespace) -> BackfillReport:
+	from app.shared.core.container import Container
+	from app.shared.core.settings import settings
+
+	with list_screenshots(args.source) as screenshots:
+		pairs = pair_screenshots(screenshots, args.pairing)
+		logger.info(f'Found {len(pairs)} screenshot pairs in {args.source}')
+		async with Container() as container:
+			gemini = container.gemini_client(api_key=settings.GEMINI_API_KEY)
+			repository = container.match_repository()
+			await repository.ensure_indexes()
+			runner = Backfill(
+				gemini.generate_game_stats,
+				repository,
+				discord_user_id=args.discord_user_id,
+				discord_channel_id=args.discord_channel_id,
+				checkpoint=Checkpoint(args.checkpoint),
+				concurrency=args.concurrency,
+				batch_size=args.batch_size,
+			)
+			return await runner.run(pairs)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('source', type=Path, help='directory or .zip/.tar archive of screenshots')
+	parser.add_argument('--discord-user-id', type=int, required=True, help='owner of the matches')
+	parser.add_argument('--discord-channel-id', type=int, default=0, help='channel to file under')
+	parser.add_argument('--pairing', choices=('sequential', 'single'), default='sequential')
+	parser.add_argument('--concurrency', type=int, default=4, help='analyses in flight')
+	parser.add_argument('--batch-size', type=int, default=50, help='matches per insert_many')
+	parser.add_argument(
+		'--checkpoint', type=Path, help='progress file (default: SOURCE name + .backfill)'
+	)
+	parser.add_argument('--failures', type=Path, help='write failed pairs here as JSON lines')
+	args = parser.parse_args()
+	if args.checkpoint is None:
+		args.checkpoint = args.source.with_name(f'{args.source.name}.backfill')
+
+	logging.basicConfig(
+		level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+	)
+	report = asyncio.run(backfill(args))
+	print(report.summary())
+	if args.failures is not None and report.failures:
+		args.failures.write_text('\n'.join(_iter_failures(report)) + '\n')
+	sys.exit(1 if report.failures else 0)
+
+
+if __name__ == '__main__':
+	main()
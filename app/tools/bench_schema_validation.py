@@ -0,0 +1,87 @@
+"""Benchmark GameStatsResponse validation against the previous plain-Union schema
+
+Usage:
+    uv run python -m app.tools.bench_schema_validation [--number 20000]
+
+The legacy model below mirrors the schema before the scoreboard was dispatched
+on game_mode: pydantic tried each scoreboard model in turn, then an after
+validator re-checked the type against game_mode.
+"""
+
+import argparse
+import timeit
+from typing import Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.shared.models.enums import GameModes, Maps, Teams
+from app.shared.models.schemas import (
+	GameStatsResponse,
+	HardpointScoreboard,
+	MeleeWeaponStats,
+	OverloadScoreboard,
+	PrimaryWeaponStats,
+	SearchAndDestroyScoreboard,
+	SecondaryWeaponStats,
+)
+from app.tools.samples import SCOREBOARDS, sample_payload
+
+
+class LegacyGameStatsResponse(BaseModel):
+	primary_weapon_stats: Optional[PrimaryWeaponStats] = None
+	secondary_weapon_stats: Optional[SecondaryWeaponStats] = None
+	melee_weapon_stats: Optional[MeleeWeaponStats] = None
+	map: Maps
+	team: Teams
+	game_mode: GameModes
+	scoreboard: Union[HardpointScoreboard, OverloadScoreboard, SearchAndDestroyScoreboard] = Field(
+		...
+	)
+
+	@model_validator(mode='after')
+	def validate_scoreboard(self):
+		expected = {
+			GameModes.HARDPOINT: HardpointScoreboard,
+			GameModes.OVERLOAD: OverloadScoreboard,
+			GameModes.SEARCH_AND_DESTROY: SearchAndDestroyScoreboard,
+		}[self.game_mode]
+		if not isinstance(self.scoreboard, expected):
+			raise ValueError(f'Scoreboard must be of type {expected.__name__}')
+		return self
+
+
+def bench(number: int) -> None:
+	print(f'{"game mode":<20} {"legacy µs":>10} {"current µs":>11} {"speedup":>8}')
+	for game_mode in SCOREBOARDS:
+		payload = sample_payload(game_mode)
+		# Validate once up front so both models are known to accept the payload
+		GameStatsResponse.model_validate_json(payload)
+		LegacyGameStatsResponse.model_validate_json(payload)
+
+		legacy = min(
+			timeit.repeat(
+				lambda: LegacyGameStatsResponse.model_validate_json(payload),
+				number=number,
+				repeat=5,
+			)
+		)
+		current = min(
+			timeit.repeat(
+				lambda: GameStatsResponse.model_validate_json(payload), number=number, repeat=5
+			)
+		)
+		print(
+			f'{game_mode.value:<20} {legacy / number * 1e6:>10.2f} '
+			f'{current / number * 1e6:>11.2f} {legacy / current:>7.2f}x'
+		)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--number', type=int, default=20_000, help='validations per timing run')
+	args = parser.parse_args()
+	bench(args.number)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,283 @@
+"""Measure extraction accuracy, tokens and latency against a labelled corpus
+
+Usage:
+    uv run python -m app.tools.eval_extraction CORPUS [--budget budget.json]
+        [--output results.json] [--base-url http://localhost:8080] [--model NAME]
+
+The corpus is a directory with one sub-directory per case. Each case holds one
+or two screenshots (sorted by file name, so `1.png` and `2.png` work) and an
+`expected.json` with the `GameStatsResponse` the screenshots should produce:
+
+    corpus/
+        hardpoint-scar/
+            1.png
+            2.png
+            expected.json
+
+Cases run one at a time through `GeminiClient`, without the gateway or hedging,
+so latencies measure the extraction path itself. Run against the live API, or
+replay recorded answers by pointing `--base-url` at the Gemini stand-in server
+(`app.gemini_stub`). Recording the corpus once in `record` mode makes later
+runs free and repeatable, though replayed latencies only reflect local work.
+
+Every leaf of `expected.json` is scored separately, and a case that fails to
+extract scores zero on all of its fields. With `--budget`, the run exits with
+status 1 when it falls short of the budget:
+
+    {
+        "min_accuracy": 0.97,
+        "min_field_accuracy": {"map": 1.0, "scoreboard.eliminations": 0.95},
+        "max_failures": 0,
+        "max_latency_p95": 6.0,
+        "max_tokens_per_case": 2500
+    }
+
+All keys are optional.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from app.shared.models.schemas import GameStatsResponse
+from app.tools.reextract import diff_fields
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.webp'}
+
+
+@dataclass
+class Case:
+	name: str
+	image_one: bytes
+	image_two: bytes | None
+	expected: dict
+
+
+def load_corpus(directory: str | Path) -> list[Case]:
+	"""Read every case directory that has an `expected.json` and a screenshot"""
+	cases = []
+	for case_dir in sorted(Path(directory).iterdir()):
+		expected_path = case_dir / 'expected.json'
+		if not expected_path.is_file():
+			continue
+		images = sorted(p for p in case_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+		if not images:
+			logger.warning(f'Skipping {case_dir.name}: no screenshots')
+			continue
+		expected = json.loads(expected_path.read_text(encoding='utf-8'))
+		# Round-trip through the schema so the expected values use the same
+		# representation as extracted ones
+		expected = GameStatsResponse.model_validate(expected).document
+		cases.append(
+			Case(
+				name=case_dir.name,
+				image_one=images[0].read_bytes(),
+				image_two=images[1].read_bytes() if len(images) > 1 else None,
+				expected=expected,
+			)
+		)
+	return cases
+
+
+def leaf_paths(value: Any, prefix: str = '') -> list[str]:
+	"""Dotted paths of every non-dict value in a stats document"""
+	if isinstance(value, dict):
+		paths = []
+		for key in sorted(value):
+			paths.extend(leaf_paths(value[key], f'{prefix}.{key}' if prefix else key))
+		return paths
+	return [prefix]
+
+
+def percentile(values: list[float], q: float) -> float | None:
+	if not values:
+		return None
+	ordered = sorted(values)
+	return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+@dataclass
+class EvaluationReport:
+	cases: int = 0
+	failures: list[tuple[str, str]] = field(default_factory=list)
+	correct: Counter = field(default_factory=Counter)
+	total: Counter = field(default_factory=Counter)
+	latencies: list[float] = field(default_factory=list)
+	tokens: list[float] = field(default_factory=list)
+
+	@property
+	def accuracy(self) -> float:
+		fields = sum(self.total.values())
+		return sum(self.correct.values()) / fields if fields else 0.0
+
+	def field_accuracy(self) -> dict[str, float]:
+		return {path: self.correct[path] / count for path, count in sorted(self.total.items())}
+
+	@property
+	def tokens_per_case(self) -> float:
+		return sum(self.tokens) / len(self.tokens) if self.tokens else 0.0
+
+	def to_dict(self) -> dict:
+		return {
+			'cases': self.cases,
+			'failures': len(self.failures),
+			'accuracy': self.accuracy,
+			'field_accuracy': self.field_accuracy(),
+			'latency_p50': percentile(self.latencies, 0.5),
+			'latency_p95': percentile(self.latencies, 0.95),
+			'latency_max': max(self.latencies, default=None),
+			'tokens_per_case': self.tokens_per_case,
+			'tokens_total': sum(self.tokens),
+		}
+
+	def summary(self) -> str:
+		data = self.to_dict()
+		lines = [
+			f'{self.cases} cases, {len(self.failures)} failed, accuracy {self.accuracy:.2%}',
+			f'latency p50 {data["latency_p50"] or 0:.2f}s, p95 {data["latency_p95"] or 0:.2f}s, '
+			f'max {data["latency_max"] or 0:.2f}s',
+			f'tokens {self.tokens_per_case:.0f} per case, {data["tokens_total"]:.0f} total',
+		]
+		# Worst fields first, perfect ones are left out
+		for path, accuracy in sorted(self.field_accuracy().items(), key=lambda item: item[1]):
+			if accuracy < 1:
+				lines.append(f'  {path}: {accuracy:.2%}')
+		lines.extend(f'  FAILED {name}: {error}' for name, error in self.failures)
+		return '\n'.join(lines)
+
+
+@dataclass
+class Budget:
+	min_accuracy: float | None = None
+	min_field_accuracy: dict[str, float] = field(default_factory=dict)
+	max_failures: int | None = None
+	max_latency_p95: float | None = None
+	max_tokens_per_case: float | None = None
+
+	@classmethod
+	def load(cls, path: str | Path) -> 'Budget':
+		return cls(**json.loads(Path(path).read_text(encoding='utf-8')))
+
+	def violations(self, report: EvaluationReport) -> list[str]:
+		"""Every way the report falls short of the budget; empty when it passes"""
+		found = []
+		if self.min_accuracy is not None and report.accuracy < self.min_accuracy:
+			found.append(f'accuracy {report.accuracy:.2%} < {self.min_accuracy:.2%}')
+		field_accuracy = report.field_accuracy()
+		for path, minimum in sorted(self.min_field_accuracy.items()):
+			accuracy = field_accuracy.get(path)
+			if accuracy is None:
+				found.append(f'{path} is not in the corpus')
+			elif accuracy < minimum:
+				found.append(f'{path} accuracy {accuracy:.2%} < {minimum:.2%}')
+		if self.max_failures is not None and len(report.failures) > self.max_failures:
+			found.append(f'{len(report.failures)} failed cases > {self.max_failures}')
+		p95 = percentile(report.latencies, 0.95)
+		if self.max_latency_p95 is not None and p95 is not None and p95 > self.max_latency_p95:
+			found.append(f'latency p95 {p95:.2f}s > {self.max_latency_p95:.2f}s')
+		if (
+			self.max_tokens_per_case is not None
+			and report.tokens_per_case > self.max_tokens_per_case
+		):
+			found.append(
+				f'{report.tokens_per_case:.0f} tokens per case > {self.max_tokens_per_case:.0f}'
+			)
+		return found
+
+
+class Evaluation:
+	"""Run each case through an analyze callable and score it against its labels"""
+
+	def __init__(
+		self,
+		analyze: Callable[[bytes, bytes | None], Awaitable[GameStatsResponse]],
+		tokens_used: Callable[[], float] = lambda: 0.0,
+		clock: Callable[[], float] = time.perf_counter,
+	):
+		self.analyze = analyze
+		# Running token count; the difference across a case is what it used
+		self.tokens_used = tokens_used
+		self.clock = clock
+
+	async def run(self, cases: list[Case]) -> EvaluationReport:
+		report = EvaluationReport()
+		for case in cases:
+			await self._evaluate(case, report)
+		return report
+
+	async def _evaluate(self, case: Case, report: EvaluationReport) -> None:
+		report.cases += 1
+		paths = leaf_paths(case.expected)
+		report.total.update(paths)
+
+		tokens_before = self.tokens_used()
+		started = self.clock()
+		try:
+			stats = await self.analyze(case.image_one, case.image_two)
+		except Exception as e:
+			logger.warning(f'Failed to extract {case.name}: {e}')
+			report.failures.append((case.name, f'{type(e).__name__}: {e}'))
+			return
+		finally:
+			report.tokens.append(self.tokens_used() - tokens_before)
+		report.latencies.append(self.clock() - started)
+
+		wrong = set(diff_fields(case.expected, stats.document))
+		report.correct.update(path for path in paths if path not in wrong)
+
+
+async def evaluate(args: argparse.Namespace) -> EvaluationReport:
+	from app.shared.core.settings import settings
+	from app.shared.observability.metrics import GEMINI_TOKENS_TOTAL
+	from app.shared.services.gemini import GeminiClient
+	from app.shared.services.model_router import ModelRouter
+
+	cases = load_corpus(args.corpus)
+	logger.info(f'Evaluating {len(cases)} cases')
+	client = GeminiClient(
+		api_key=settings.GEMINI_API_KEY,
+		base_url=args.base_url,
+		router=ModelRouter.single(args.model) if args.model else ModelRouter.from_settings(),
+	)
+	try:
+		return await Evaluation(client.generate_game_stats, GEMINI_TOKENS_TOTAL.total).run(cases)
+	finally:
+		await client.aclose()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('corpus', help='directory of labelled cases')
+	parser.add_argument('--budget', help='JSON budget; exit with status 1 when it is missed')
+	parser.add_argument('--output', help='write the results as JSON, e.g. to keep a baseline')
+	parser.add_argument('--base-url', help='Gemini endpoint, e.g. the stand-in server')
+	parser.add_argument('--model', help='use only this model instead of GEMINI_ANALYSIS_MODELS')
+	args = parser.parse_args()
+
+	logging.basicConfig(
+		level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+	)
+	report = asyncio.run(evaluate(args))
+	print(report.summary())
+	if args.output:
+		Path(args.output).write_text(json.dumps(report.to_dict(), indent=2), encoding='utf-8')
+
+	if args.budget:
+		violations = Budget.load(args.budget).violations(report)
+		for violation in violations:
+			print(f'BUDGET {violation}')
+		if violations:
+			sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,101 @@
+"""Audit process startup imports with `python -X importtime`
+
+Usage:
+    uv run python -m app.tools.importtime [module ...] [--top 25] [--forbid PACKAGE ...]
+
+Each module is imported in a fresh interpreter so results are not skewed by
+modules already loaded here. The report lists the slowest imports by cumulative
+and self time. `--forbid` exits non-zero when a package is imported anyway,
+e.g. to check that the API process never loads `google.genai`:
+
+    uv run python -m app.tools.importtime app.api.main --forbid google.genai discord
+"""
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+
+DEFAULT_MODULES = ('app.api.main', 'app.bot.main')
+
+
+@dataclass
+class ImportTiming:
+	"""One line of `-X importtime` output, times in microseconds"""
+
+	module: str
+	self_us: int
+	cumulative_us: int
+	depth: int
+
+
+def parse_importtime(output: str) -> list[ImportTiming]:
+	"""Parse the stderr produced by `python -X importtime`"""
+	timings = []
+	for line in output.splitlines():
+		if not line.startswith('import time:'):
+			continue
+		try:
+			self_us, cumulative_us, name = line[len('import time:') :].split('|', 2)
+			timing = ImportTiming(
+				module=name.strip(),
+				self_us=int(self_us),
+				cumulative_us=int(cumulative_us),
+				depth=(len(name) - len(name.lstrip()) - 1) // 2,
+			)
+		except ValueError:
+			# Header line ("self [us] | cumulative | imported package")
+			continue
+		timings.append(timing)
+	return timings
+
+
+def measure(module: str) -> list[ImportTiming]:
+	"""Import a module in a fresh interpreter and return its import timings"""
+	result = subprocess.run(
+		[sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+		capture_output=True,
+		text=True,
+	)
+	if result.returncode != 0:
+		raise RuntimeError(f'Importing {module} failed:\n{result.stderr[-2000:]}')
+	return parse_importtime(result.stderr)
+
+
+def is_loaded(timings: list[ImportTiming], package: str) -> bool:
+	return any(t.module == package or t.module.startswith(f'{package}.') for t in timings)
+
+
+def report(module: str, timings: list[ImportTiming], top: int) -> None:
+	total = next((t.cumulative_us for t in timings if t.module == module), 0)
+	print(f'== {module}: {total / 1000:.1f} ms, {len(timings)} modules')
+	print(f'{"cumulative ms":>14} {"self ms":>8}  module')
+	for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+		print(
+			f'{t.cumulative_us / 1000:>14.1f} {t.self_us / 1000:>8.1f}  {"  " * t.depth}{t.module}'
+		)
+	print()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='modules to import')
+	parser.add_argument('--top', type=int, default=25, help='number of imports to list')
+	parser.add_argument(
+		'--forbid', nargs='*', default=[], metavar='PACKAGE', help='packages that must not load'
+	)
+	args = parser.parse_args()
+
+	failed = False
+	for module in args.modules:
+		timings = measure(module)
+		report(module, timings, args.top)
+		for package in args.forbid:
+			if is_loaded(timings, package):
+				print(f'!! {module} imports forbidden package {package}')
+				failed = True
+	sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+	main()
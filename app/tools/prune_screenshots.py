@@ -0,0 +1,37 @@
+"""Delete archived screenshots not referenced within the retention period
+
+Usage:
+    uv run python -m app.tools.prune_screenshots [--days N]
+
+Run it periodically (e.g. a daily cron job). The retention period defaults to
+`SCREENSHOT_RETENTION_DAYS`; with no retention set, nothing is deleted.
+"""
+
+import argparse
+import asyncio
+import logging
+
+
+async def prune(days: int | None) -> int:
+	from app.shared.core.container import Container
+
+	async with Container() as container:
+		archive = container.screenshot_archive()
+		if days is not None:
+			archive.retention_days = days
+		return await archive.prune()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--days', type=int, help='override SCREENSHOT_RETENTION_DAYS')
+	args = parser.parse_args()
+
+	logging.basicConfig(
+		level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+	)
+	print(f'Deleted {asyncio.run(prune(args.days))} screenshots')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,184 @@
+"""Re-extract matches produced by an older prompt or a retired model
+
+Usage:
+    uv run python -m app.tools.reextract [--rate 0.5] [--limit N] [--batch-size 50]
+        [--dry-run]
+
+Every match records which prompt version (`extraction_version()`, a
+fingerprint of `MATCH_ANALYSIS_PROMPT` and the response schema) and which model
+produced its stats. This job finds matches whose version differs from the
+current one, or whose model is no longer in `GEMINI_ANALYSIS_MODELS`. It then
+analyzes their archived screenshots again and writes the new stats in bulk.
+
+Requests are spaced to `--rate` analyses per second so a large upgrade doesn't
+crowd out live traffic. The report counts how often each field changed, and
+`--dry-run` prints that report without writing anything, so a prompt change
+can be judged before it is applied. Matches without archived screenshots are
+skipped. Matches whose screenshots have been pruned are marked as such, so later
+runs (and `--limit`) don't keep selecting them.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from app.shared.models.schemas import ExtractionStamp, GameStatsResponse
+
+logger = logging.getLogger(__name__)
+
+
+def diff_fields(old: Any, new: Any, prefix: str = '') -> list[str]:
+	"""Dotted paths of the values that differ between two stats documents"""
+	if isinstance(old, dict) and isinstance(new, dict):
+		changed = []
+		for key in sorted(old.keys() | new.keys()):
+			path = f'{prefix}.{key}' if prefix else key
+			changed.extend(diff_fields(old.get(key), new.get(key), path))
+		return changed
+	return [] if old == new else [prefix]
+
+
+@dataclass
+class ReextractReport:
+	processed: int = 0
+	changed: int = 0
+	missing: int = 0
+	failures: list[tuple[Any, str]] = field(default_factory=list)
+	field_changes: Counter = field(default_factory=Counter)
+	elapsed: float = 0.0
+
+	def summary(self) -> str:
+		lines = [
+			f'{self.processed} re-extracted ({self.changed} changed), {self.missing} without '
+			f'screenshots, {len(self.failures)} failed in {self.elapsed:.1f}s'
+		]
+		lines.extend(f'  {path}: {count}' for path, count in self.field_changes.most_common())
+		lines.extend(f'  FAILED {match_id}: {error}' for match_id, error in self.failures)
+		return '\n'.join(lines)
+
+
+class Reextractor:
+	"""Re-analyze stale matches at a steady rate and update them in batches"""
+
+	def __init__(
+		self,
+		analyze: Callable[[bytes, bytes | None], Awaitable[GameStatsResponse]],
+		repository,
+		archive,
+		version: str,
+		models: list[str],
+		rate: float = 0.5,
+		batch_size: int = 50,
+		dry_run: bool = False,
+		clock: Callable[[], float] = time.monotonic,
+		sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+	):
+		self.analyze = analyze
+		self.repository = repository
+		self.archive = archive
+		self.version = version
+		self.models = models
+		self.rate = rate
+		self.batch_size = batch_size
+		self.dry_run = dry_run
+		self.clock = clock
+		self.sleep = sleep
+		self._next_at = 0.0
+		self._pending: list[tuple[Any, dict, dict]] = []
+		self._missing: list[Any] = []
+
+	async def run(self, limit: int | None = None) -> ReextractReport:
+		report = ReextractReport()
+		started = self.clock()
+		async for match in self.repository.iter_stale(self.version, self.models, limit):
+			await self._reextract(match, report)
+			if len(self._pending) + len(self._missing) >= self.batch_size:
+				await self._flush()
+		await self._flush()
+		report.elapsed = self.clock() - started
+		return report
+
+	async def _reextract(self, match: dict, report: ReextractReport) -> None:
+		images = [await self.archive.read(key) for key in match['screenshots']]
+		if not images or any(image is None for image in images):
+			report.missing += 1
+			self._missing.append(match['_id'])
+			return
+
+		await self._throttle()
+		try:
+			stats = await self.analyze(images[0], images[1] if len(images) > 1 else None)
+		except Exception as e:
+			logger.warning(f'Failed to re-extract match {match["_id"]}: {e}')
+			report.failures.append((match['_id'], f'{type(e).__name__}: {e}'))
+			return
+
+		report.processed += 1
+		changed = diff_fields(match['game_stats'], stats.document)
+		if changed:
+			report.changed += 1
+			report.field_changes.update(changed)
+		stamp = ExtractionStamp(version=self.version, model=stats.extracted_by)
+		# Unchanged matches are stamped too, so they aren't picked up again
+		self._pending.append((match['_id'], stats.document, stamp.model_dump()))
+
+	async def _throttle(self) -> None:
+		now = self.clock()
+		if self._next_at > now:
+			await self.sleep(self._next_at - now)
+		self._next_at = max(now, self._next_at) + 1 / self.rate
+
+	async def _flush(self) -> None:
+		updates, self._pending = self._pending, []
+		missing, self._missing = self._missing, []
+		if self.dry_run:
+			return
+		if updates:
+			await self.repository.update_extractions(updates)
+			logger.info(f'Updated {len(updates)} matches')
+		if missing:
+			await self.repository.mark_screenshots_missing(missing)
+			logger.info(f'Marked {len(missing)} matches without screenshots')
+
+
+async def reextract(args: argparse.Namespace) -> ReextractReport:
+	from app.shared.core.container import Container
+	from app.shared.core.settings import settings
+	from app.shared.services.gemini import extraction_version
+	from app.shared.services.gemini_gateway import ANALYSIS
+
+	async with Container() as container:
+		gemini = container.gemini_client(api_key=settings.GEMINI_API_KEY)
+		runner = Reextractor(
+			gemini.generate_game_stats,
+			container.match_repository(),
+			container.screenshot_archive(),
+			version=extraction_version(),
+			models=container.gemini_router.models(ANALYSIS),
+			rate=args.rate,
+			batch_size=args.batch_size,
+			dry_run=args.dry_run,
+		)
+		return await runner.run(args.limit)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--rate', type=float, default=0.5, help='analyses per second')
+	parser.add_argument('--limit', type=int, help='stop after this many matches')
+	parser.add_argument('--batch-size', type=int, default=50, help='matches per bulk update')
+	parser.add_argument('--dry-run', action='store_true', help='report changes without saving')
+	args = parser.parse_args()
+
+	logging.basicConfig(
+		level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+	)
+	print(asyncio.run(reextract(args)).summary())
+
+
+if __name__ == '__main__':
+	main()
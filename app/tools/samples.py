@@ -0,0 +1,76 @@
+"""Sample Gemini extraction payloads for the benchmarks and tests"""
+
+import json
+
+from app.shared.models.enums import GameModes
+
+_BASE_SCOREBOARD = {
+	'player': 'Player',
+	'eliminations': 25,
+	'deaths': 12,
+	'elimination_death_ratio': 2.08,
+	'score': 4200,
+}
+
+SCOREBOARDS = {
+	GameModes.HARDPOINT: {
+		**_BASE_SCOREBOARD,
+		'time': 95,
+		'objective_captures': 3,
+		'objective_kills': 9,
+		'captures': 2,
+		'friendly_score': 250,
+		'enemy_score': 180,
+	},
+	GameModes.OVERLOAD: {
+		**_BASE_SCOREBOARD,
+		'overloads': 2,
+		'overload_devices_carrier_killed': 3,
+		'friendly_score': 8,
+		'enemy_score': 5,
+	},
+	GameModes.SEARCH_AND_DESTROY: {
+		**_BASE_SCOREBOARD,
+		'plants': 2,
+		'defuses': 1,
+		'objective_kills': 4,
+		'objective_score': 600,
+		'friendly_score': 6,
+		'enemy_score': 4,
+	},
+}
+
+
+def sample_payload(game_mode: GameModes) -> str:
+	"""A Gemini-style JSON response for the given game mode"""
+	return json.dumps(
+		{
+			'primary_weapon_stats': {
+				'primary_weapon_name': 'M15 MOD 0',
+				'eliminations': 20,
+				'elimination_death_ratio': 1.8,
+				'damage_dealt': 3200,
+				'headshot_kills': 6,
+				'headshot_percentage': 30.0,
+				'accuracy_percentage': 24.5,
+			},
+			'secondary_weapon_stats': {
+				'secondary_weapon_name': 'CODA 9',
+				'eliminations': 3,
+				'elimination_death_ratio': 0.5,
+				'damage_dealt': 400,
+				'headshot_kills': 1,
+				'headshot_percentage': 33.3,
+				'accuracy_percentage': 18.0,
+			},
+			'melee_weapon_stats': {
+				'melee_weapon_name': 'Combat Knife',
+				'kill_death_ratio': 1.0,
+				'damage_dealt': 150,
+			},
+			'map': 'SCAR',
+			'team': 'JSOC',
+			'game_mode': game_mode.value,
+			'scoreboard': SCOREBOARDS[game_mode],
+		}
+	)